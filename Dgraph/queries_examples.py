@@ -4,6 +4,11 @@ Plataforma de Integración de Datos de Salud
 
 Este archivo contiene ejemplos de consultas que se pueden ejecutar
 en el sistema Dgraph para satisfacer los requerimientos funcionales.
+
+Ninguna consulta parte de has() en la raíz: el bloque raíz usa eq() sobre
+un predicado indexado (o type() cuando se necesita todo el tipo) y has()
+queda en @filter. Comprobar con `python linter_dql.py` tras cualquier
+cambio en este archivo o en schema.rdf.
 """
 
 # =============================================================================
@@ -170,13 +175,15 @@ CONSULTA_DIAGNOSTICOS_FULLTEXT = """
 # =============================================================================
 CONSULTA_MEDICAMENTOS_TOP = """
 {
-  medicamentos(func: has(medicamento.nombre_comercial), 
-               orderdesc: count(medicamento.recetas), 
-               first: 10) {
+  var(func: type(Medicamento)) {
+    total as count(medicamento.recetas)
+  }
+  
+  medicamentos(func: uid(total), orderdesc: val(total), first: 10) {
     medicamento.nombre_comercial
     medicamento.principio_activo
     medicamento.via_administracion
-    total_recetas: count(medicamento.recetas)
+    total_recetas: val(total)
   }
 }
 """
@@ -269,7 +276,7 @@ CONSULTA_AGENDA_DOCTOR = """
 # =============================================================================
 CONSULTA_PACIENTES_ALERGIA = """
 {
-  var(func: has(alergia.nombre)) @filter(eq(alergia.nombre, "Penicilina")) {
+  var(func: eq(alergia.nombre, "Penicilina")) {
     pacientes_con_alergia as alergia.paciente
   }
   
@@ -294,8 +301,7 @@ CONSULTA_PACIENTES_ALERGIA = """
 # =============================================================================
 CONSULTA_TRATAMIENTOS_ACTIVOS = """
 {
-  tratamientos(func: has(tratamiento.nombre)) 
-  @filter(eq(tratamiento.estado, "activo")) {
+  tratamientos(func: eq(tratamiento.estado, "activo")) {
     tratamiento.nombre
     tratamiento.descripcion
     tratamiento.fecha_inicio
@@ -426,8 +432,8 @@ CONSULTA_ESTADISTICAS_HOSPITAL = """
 # =============================================================================
 CONSULTA_CITAS_COMPLETADAS = """
 {
-  citas(func: has(cita.id)) 
-  @filter(eq(cita.estado, "completada") AND has(cita.diagnosticos)) {
+  citas(func: eq(cita.estado, "completada")) 
+  @filter(has(cita.diagnosticos)) {
     cita.fecha_hora
     cita.motivo
     
@@ -454,7 +460,8 @@ CONSULTA_CITAS_COMPLETADAS = """
 # =============================================================================
 CONSULTA_MEDICAMENTOS_CONTRAINDICACIONES = """
 {
-  medicamentos(func: has(medicamento.contraindicaciones)) {
+  medicamentos(func: type(Medicamento)) 
+  @filter(has(medicamento.contraindicaciones)) {
     medicamento.nombre_comercial
     medicamento.principio_activo
     medicamento.contraindicaciones
@@ -468,7 +475,7 @@ CONSULTA_MEDICAMENTOS_CONTRAINDICACIONES = """
 # =============================================================================
 CONSULTA_PACIENTES_CONDICIONES_CRONICAS = """
 {
-  var(func: has(historial.condiciones_cronicas)) {
+  var(func: type(HistorialMedico)) @filter(has(historial.condiciones_cronicas)) {
     pacientes_cronicos as historial.paciente
   }
   
@@ -490,13 +497,11 @@ CONSULTA_PACIENTES_CONDICIONES_CRONICAS = """
 # =============================================================================
 CONSULTA_ESPECIALIDADES_DEMANDADAS = """
 {
-  var(func: has(doctor.especialidad)) {
-    especialidad as doctor.especialidad
+  var(func: type(Doctor)) {
     citas_por_doc as count(doctor.citas)
   }
   
-  especialidades(func: uid(especialidad)) {
-    especialidad: val(especialidad)
+  especialidades(func: type(Doctor)) @groupby(doctor.especialidad) {
     total_citas: sum(val(citas_por_doc))
   }
 }
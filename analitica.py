@@ -0,0 +1,738 @@
+"""
+Motor de Análisis Columnar
+Plataforma de Integración de Datos de Salud
+
+Resuelve los 15 informes de menu_analisis sin recorrer el grafo en cada
+petición. Un extracto periódico copia los campos que usan los informes a
+arrays columnares de NumPy (archivos .npy en data/analitica/) y los
+informes se calculan con operaciones vectorizadas (bincount, unique,
+máscaras) sobre esos arrays abiertos con mmap:
+
+| Clase de columna | Archivos                                  | Contenido              |
+|------------------|-------------------------------------------|------------------------|
+| id, texto        | <tipo>.<campo>.npy                        | Cadenas (dtype U)      |
+| categoria        | <tipo>.<campo>.npy + .categorias.json     | Códigos int32 + valores|
+| entero, bool     | <tipo>.<campo>.npy                        | int64 / bool           |
+| fecha            | <tipo>.<campo>.npy                        | datetime64[s] (NaT)    |
+| ref:<tipo>       | <tipo>.<campo>.npy                        | Fila referenciada (-1) |
+| lista, lista_ref | <tipo>.<campo>.npy + .desplazamientos.npy | Listas aplanadas (CSR) |
+
+Las referencias se guardan como número de fila del tipo referenciado, de
+modo que un "join" es una indexación de arrays. Cada extracto se escribe
+en su propio directorio de versión (data/analitica/<versión>/) y se publica
+reemplazando de forma atómica el puntero ACTUAL, que contiene el nombre de
+la versión vigente. Un ExtractoColumnar queda fijado a la versión que abrió,
+así que aunque cargue columnas bajo demanda nunca mezcla dos extractos. El
+router abre la nueva versión al ver que ACTUAL ha cambiado. Se conservan
+VERSIONES_CONSERVADAS versiones para que los lectores de la anterior
+terminen.
+
+Se usa NumPy (dependencia de pandas) y no Parquet porque pyarrow no está
+en requirements.txt y los .npy se pueden abrir con mmap sin copiarlos.
+
+Uso:
+    python analitica.py --fuente generador --citas 100000   # extracto sintético
+    python analitica.py --fuente bases --cada 15            # MongoDB + Dgraph cada 15 min
+    python analitica.py --informe 4                         # imprime un informe
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, List, Callable, Tuple, Union
+
+import numpy as np
+
+from modelos import MODELOS
+from utils.data_generator import SEMILLA_POR_DEFECTO, TIPOS, DataGenerator, calcular_volumen
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIRECTORIO_ANALITICA = os.getenv(
+    'ANALITICA_DIRECTORIO',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'analitica'))
+
+MANIFIESTO = 'extracto.json'
+
+# Archivo con el nombre de la versión vigente
+PUNTERO = 'ACTUAL'
+
+# Versiones que se conservan (la vigente y las anteriores más recientes)
+VERSIONES_CONSERVADAS = 2
+
+# Nodos por página al extraer desde Dgraph
+TAM_PAGINA_EXTRACCION = 5000
+
+# Resultados por defecto en los informes de tipo "top N"
+LIMITE_POR_DEFECTO = 10
+
+# (edad mínima, edad máxima exclusiva, etiqueta)
+GRUPOS_EDAD = ((0, 18, '0-17'), (18, 40, '18-39'), (40, 65, '40-64'), (65, 200, '65+'))
+
+# Tipo -> campo -> clase de columna. Solo los campos que usan los informes,
+# en el orden de TIPOS para que las referencias apunten a tipos ya leídos.
+COLUMNAS: Dict[str, Dict[str, str]] = {
+    'hospitales': {'id': 'id', 'nombre': 'texto', 'capacidad_camas': 'entero', 'tiene_urgencias': 'bool'},
+    'departamentos': {'id': 'id', 'hospital_id': 'ref:hospitales'},
+    'doctores': {'id': 'id', 'especialidad': 'categoria', 'hospital_id': 'ref:hospitales'},
+    'pacientes': {'id': 'id', 'ciudad': 'categoria', 'tipo_sangre': 'categoria', 'fecha_nacimiento': 'fecha'},
+    'historiales': {'id': 'id', 'condiciones_cronicas': 'lista', 'paciente_id': 'ref:pacientes'},
+    'alergias': {'id': 'id', 'nombre': 'categoria', 'paciente_id': 'ref:pacientes'},
+    'medicamentos': {'id': 'id', 'nombre_comercial': 'texto'},
+    'citas': {'id': 'id', 'fecha_hora': 'fecha', 'estado': 'categoria', 'duracion_minutos': 'entero',
+              'paciente_id': 'ref:pacientes', 'doctor_id': 'ref:doctores'},
+    'diagnosticos': {'id': 'id', 'codigo_icd10': 'categoria', 'nombre': 'categoria',
+                     'fecha_diagnostico': 'fecha', 'doctor_id': 'ref:doctores'},
+    'tratamientos': {'id': 'id', 'estado': 'categoria', 'fecha_inicio': 'fecha', 'fecha_fin': 'fecha',
+                     'diagnostico_id': 'ref:diagnosticos'},
+    'recetas': {'id': 'id', 'estado': 'categoria', 'medicamento_ids': 'lista_ref:medicamentos'},
+}
+
+# Tipos cuyo id -> fila se conserva durante la extracción para resolver referencias
+_REFERENCIADOS = {clase.split(':', 1)[1] for campos in COLUMNAS.values()
+                  for clase in campos.values() if ':' in clase}
+
+
+# =============================================================================
+# FUENTES DE REGISTROS
+# =============================================================================
+
+def fuente_generador(semilla: int = SEMILLA_POR_DEFECTO,
+                     volumen: Optional[Dict[str, int]] = None) -> Callable[[str], Iterable[Dict[str, Any]]]:
+    """Registros del generador determinista (mismos datos que los cargadores)."""
+    return DataGenerator(semilla, volumen).generar
+
+
+def _registros_dgraph(cliente: Any, tipo: str) -> Iterable[Dict[str, Any]]:
+    """Recorre un tipo de Dgraph por páginas con los predicados de COLUMNAS."""
+    from populate_dgraph import ARISTAS
+    from utils.decodificador_dgraph import decodificar
+
+    modelo = MODELOS[tipo]
+    campos = COLUMNAS[tipo]
+    escalares = [f"{modelo.prefijo}.{c}" for c, clase in campos.items() if not clase.startswith(('ref', 'lista_ref'))]
+    aristas = {predicado: (campo, campo.rsplit('_', 1)[0])
+               for sujeto, predicado, campo in ARISTAS.get(tipo, ()) if sujeto == 'self' and campo in campos}
+    bloques = ' '.join(f"{p} {{ {destino}.id }}" for p, (_, destino) in aristas.items())
+    consulta = (f"query extracto($limite: int, $despues: string) {{ "
+                f"nodos(func: type({modelo.__name__}), first: $limite, after: $despues) {{ "
+                f"uid {' '.join(escalares)} {bloques} }} }}")
+
+    txn = cliente.txn(read_only=True)
+    try:
+        cursor = '0x0'
+        while True:
+            respuesta = txn.query(consulta, variables={'$limite': str(TAM_PAGINA_EXTRACCION), '$despues': cursor})
+            pagina = list(decodificar(respuesta.json, 'nodos', compacto=False))
+            for nodo in pagina:
+                registro = {c.split('.', 1)[1]: nodo.get(c) for c in escalares}
+                for predicado, (campo, destino) in aristas.items():
+                    vecinos = nodo.get(predicado) or []
+                    if isinstance(vecinos, dict):
+                        vecinos = [vecinos]
+                    ids = [v.get(f"{destino}.id") for v in vecinos]
+                    registro[campo] = ids if campo.endswith('_ids') else (ids[0] if ids else None)
+                yield registro
+            if len(pagina) < TAM_PAGINA_EXTRACCION:
+                return
+            cursor = pagina[-1]['uid']
+    finally:
+        txn.discard()
+
+
+def fuente_bases(db: Any, cliente: Any) -> Callable[[str], Iterable[Dict[str, Any]]]:
+    """
+    Registros de las bases reales: MongoDB para las colecciones que tiene
+    (con proyección de los campos necesarios) y Dgraph para el resto.
+    """
+    from populate_mongodb import COLECCIONES
+    colecciones = {tipo: coleccion for coleccion, tipo in COLECCIONES.items()}
+
+    def registros(tipo: str) -> Iterable[Dict[str, Any]]:
+        if db is not None and tipo in colecciones:
+            proyeccion = {campo: 1 for campo in COLUMNAS[tipo] if campo != 'id'}
+            for documento in db[colecciones[tipo]].find({}, proyeccion, batch_size=TAM_PAGINA_EXTRACCION):
+                documento['id'] = documento.pop('_id')
+                yield documento
+        elif cliente is not None:
+            yield from _registros_dgraph(cliente, tipo)
+        else:
+            raise RuntimeError(f"Sin conexión para extraer {tipo}")
+    return registros
+
+
+# =============================================================================
+# EXTRACCIÓN
+# =============================================================================
+
+def _a_fecha(valor: Any) -> str:
+    if isinstance(valor, datetime):
+        return valor.isoformat()[:19]
+    return valor[:19] if valor else 'NaT'
+
+
+def _extraer_tipo(tipo: str, registros: Iterable[Dict[str, Any]],
+                  filas_por_id: Dict[str, Dict[str, int]]) -> Tuple[Dict[str, Any], int]:
+    """Convierte los registros de un tipo en arrays, columna a columna."""
+    campos = COLUMNAS[tipo]
+    valores: Dict[str, List[Any]] = {campo: [] for campo in campos}
+    desplazamientos: Dict[str, List[int]] = {c: [0] for c, clase in campos.items() if clase.startswith('lista')}
+    categorias: Dict[str, Dict[Any, int]] = {c: {} for c, clase in campos.items() if clase in ('categoria', 'lista')}
+    filas = 0
+
+    for registro in registros:
+        for campo, clase in campos.items():
+            valor = registro.get(campo)
+            if clase == 'categoria':
+                indice = categorias[campo]
+                valores[campo].append(indice.setdefault(valor, len(indice)))
+            elif clase == 'fecha':
+                valores[campo].append(_a_fecha(valor))
+            elif clase.startswith('ref:'):
+                valores[campo].append(filas_por_id[clase[4:]].get(valor, -1))
+            elif clase == 'lista':
+                indice = categorias[campo]
+                valores[campo].extend(indice.setdefault(v, len(indice)) for v in valor or ())
+                desplazamientos[campo].append(len(valores[campo]))
+            elif clase.startswith('lista_ref:'):
+                destino = filas_por_id[clase[10:]]
+                valores[campo].extend(destino.get(v, -1) for v in valor or ())
+                desplazamientos[campo].append(len(valores[campo]))
+            else:
+                valores[campo].append(valor)
+        filas += 1
+
+    arrays = {}
+    for campo, clase in campos.items():
+        if clase in ('id', 'texto'):
+            arrays[campo] = np.array(valores[campo], dtype=str)
+        elif clase in ('categoria', 'lista') or clase.startswith(('ref:', 'lista_ref:')):
+            arrays[campo] = np.array(valores[campo], dtype=np.int32)
+        elif clase == 'fecha':
+            arrays[campo] = np.array(valores[campo], dtype='datetime64[s]')
+        elif clase == 'bool':
+            arrays[campo] = np.array(valores[campo], dtype=bool)
+        else:
+            arrays[campo] = np.array([v if v is not None else 0 for v in valores[campo]], dtype=np.int64)
+        if campo in desplazamientos:
+            arrays[campo + '.desplazamientos'] = np.array(desplazamientos[campo], dtype=np.int64)
+        if campo in categorias:
+            arrays[campo + '.categorias'] = list(categorias[campo])
+
+    if tipo in _REFERENCIADOS:
+        filas_por_id[tipo] = {id_: fila for fila, id_ in enumerate(valores['id'])}
+    return arrays, filas
+
+
+def extraer(registros_de: Callable[[str], Iterable[Dict[str, Any]]],
+            directorio: str = DIRECTORIO_ANALITICA,
+            origen: str = '') -> Dict[str, Any]:
+    """
+    Genera un extracto columnar completo en una versión nueva de
+    `directorio` y la publica.
+
+    Args:
+        registros_de: Función tipo -> registros (fuente_generador, fuente_bases)
+        directorio: Directorio de versiones del extracto
+        origen: Descripción de la fuente para el manifiesto
+
+    Returns:
+        El manifiesto escrito
+    """
+    version = f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    temporal = os.path.join(directorio, version)
+    os.makedirs(temporal)
+
+    inicio = time.perf_counter()
+    filas_por_id: Dict[str, Dict[str, int]] = {}
+    manifiesto = {'fecha': datetime.now().isoformat(timespec='seconds'), 'origen': origen, 'version': version,
+                  'tipos': {}}
+
+    for tipo in TIPOS:
+        arrays, filas = _extraer_tipo(tipo, registros_de(tipo), filas_por_id)
+        for nombre, valor in arrays.items():
+            if nombre.endswith('.categorias'):
+                with open(os.path.join(temporal, f"{tipo}.{nombre}.json"), 'w', encoding='utf-8') as f:
+                    json.dump(valor, f, ensure_ascii=False)
+            else:
+                np.save(os.path.join(temporal, f"{tipo}.{nombre}.npy"), valor)
+        manifiesto['tipos'][tipo] = {'filas': filas, 'columnas': COLUMNAS[tipo]}
+        print(f"✓ {tipo}: {filas:,} filas")
+
+    manifiesto['segundos'] = round(time.perf_counter() - inicio, 3)
+    with open(os.path.join(temporal, MANIFIESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+    publicar_version(directorio, version)
+    return manifiesto
+
+
+def version_actual(directorio: str = DIRECTORIO_ANALITICA) -> Optional[str]:
+    """Versión publicada en `directorio`, o None si no hay ninguna."""
+    try:
+        with open(os.path.join(directorio, PUNTERO), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def publicar_version(directorio: str, version: str):
+    """Apunta ACTUAL a `version` (os.replace es atómico) y borra versiones antiguas."""
+    temporal = os.path.join(directorio, PUNTERO + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(temporal, os.path.join(directorio, PUNTERO))
+
+    # Los nombres de versión empiezan por la fecha: ordenarlos es ordenarlas
+    versiones = sorted(
+        nombre for nombre in os.listdir(directorio)
+        if os.path.isfile(os.path.join(directorio, nombre, MANIFIESTO)))
+    for antigua in versiones[:-VERSIONES_CONSERVADAS]:
+        if antigua != version:
+            shutil.rmtree(os.path.join(directorio, antigua), ignore_errors=True)
+
+
+# =============================================================================
+# LECTURA DEL EXTRACTO
+# =============================================================================
+
+class ExtractoColumnar:
+    """
+    Columnas de un extracto, abiertas con mmap bajo demanda.
+
+    Se fija a la versión vigente al abrirlo (o a `version`): las columnas
+    cargadas después salen de esa misma versión aunque se publique otra.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_ANALITICA, version: Optional[str] = None):
+        self.raiz = directorio
+        self.version = version or version_actual(directorio)
+        if self.version is None:
+            raise FileNotFoundError(f"No hay ningún extracto publicado en {directorio}")
+        self.directorio = os.path.join(directorio, self.version)
+        with open(os.path.join(self.directorio, MANIFIESTO), 'r', encoding='utf-8') as f:
+            self.manifiesto = json.load(f)
+        self._arrays: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def fecha(self) -> np.datetime64:
+        return np.datetime64(self.manifiesto['fecha'], 's')
+
+    def filas(self, tipo: str) -> int:
+        return self.manifiesto['tipos'][tipo]['filas']
+
+    def _cargar(self, nombre: str) -> Any:
+        valor = self._arrays.get(nombre)
+        if valor is None:
+            with self._lock:
+                valor = self._arrays.get(nombre)
+                if valor is None:
+                    ruta = os.path.join(self.directorio, nombre)
+                    if nombre.endswith('.json'):
+                        with open(ruta, 'r', encoding='utf-8') as f:
+                            valor = json.load(f)
+                    else:
+                        valor = np.load(ruta, mmap_mode='r')
+                    self._arrays[nombre] = valor
+        return valor
+
+    def columna(self, tipo: str, campo: str) -> np.ndarray:
+        return self._cargar(f"{tipo}.{campo}.npy")
+
+    def categorias(self, tipo: str, campo: str) -> List[Any]:
+        return self._cargar(f"{tipo}.{campo}.categorias.json")
+
+    def desplazamientos(self, tipo: str, campo: str) -> np.ndarray:
+        return self._cargar(f"{tipo}.{campo}.desplazamientos.npy")
+
+    def codigo(self, tipo: str, campo: str, valor: Any) -> int:
+        """Código de un valor de categoría (-1 si no aparece)."""
+        categorias = self.categorias(tipo, campo)
+        return categorias.index(valor) if valor in categorias else -1
+
+
+_extracto: Optional[ExtractoColumnar] = None
+_extracto_lock = threading.Lock()
+
+
+def obtener_extracto(directorio: str = DIRECTORIO_ANALITICA) -> Optional[ExtractoColumnar]:
+    """
+    Extracto vigente, reabierto si se ha publicado una versión nueva.
+
+    Quien ya tiene el anterior sigue leyendo su versión.
+
+    Returns:
+        ExtractoColumnar o None si todavía no existe ningún extracto
+    """
+    global _extracto
+    version = version_actual(directorio)
+    if version is None:
+        return None
+    with _extracto_lock:
+        if _extracto is None or _extracto.raiz != directorio or _extracto.version != version:
+            _extracto = ExtractoColumnar(directorio, version)
+        return _extracto
+
+
+# =============================================================================
+# OPERACIONES VECTORIZADAS
+# =============================================================================
+
+def _ranking(conteos: np.ndarray, etiquetas: List[Any], limite: Optional[int] = None,
+             clave: str = 'valor') -> List[Dict[str, Any]]:
+    """[{clave, total}] ordenado de mayor a menor, sin los ceros."""
+    orden = np.argsort(-conteos, kind='stable')
+    orden = orden[conteos[orden] > 0]
+    if limite:
+        orden = orden[:limite]
+    return [{clave: etiquetas[i], 'total': int(conteos[i])} for i in orden]
+
+
+def _conteo_cruzado(filas: np.ndarray, columnas: np.ndarray, n_filas: int, n_columnas: int) -> np.ndarray:
+    """Tabla de contingencia filas x columnas con un solo bincount."""
+    return np.bincount(filas.astype(np.int64) * n_columnas + columnas,
+                       minlength=n_filas * n_columnas).reshape(n_filas, n_columnas)
+
+
+Fecha = Union[str, datetime, None]
+
+
+def _mascara_periodo(fechas: np.ndarray, desde: Fecha, hasta: Fecha) -> np.ndarray:
+    """Filas con fecha en [desde, hasta); los límites admiten texto ISO o datetime."""
+    mascara = ~np.isnat(fechas)
+    if desde:
+        mascara &= fechas >= np.datetime64(_a_fecha(desde), 's')
+    if hasta:
+        mascara &= fechas < np.datetime64(_a_fecha(hasta), 's')
+    return mascara
+
+
+def _por_estado(x: ExtractoColumnar, tipo: str) -> Dict[str, int]:
+    conteos = np.bincount(x.columna(tipo, 'estado'), minlength=len(x.categorias(tipo, 'estado')))
+    return {estado: int(n) for estado, n in zip(x.categorias(tipo, 'estado'), conteos)}
+
+
+def _hospital_de_cita(x: ExtractoColumnar, mascara: Optional[np.ndarray] = None) -> np.ndarray:
+    doctores = x.columna('citas', 'doctor_id')
+    if mascara is not None:
+        doctores = doctores[mascara]
+    doctores = doctores[doctores >= 0]
+    hospitales = x.columna('doctores', 'hospital_id')[doctores]
+    return hospitales[hospitales >= 0]
+
+
+# =============================================================================
+# INFORMES (menu_analisis)
+# =============================================================================
+
+def _distribucion_ciudad(x: ExtractoColumnar) -> List[Dict[str, Any]]:
+    conteos = np.bincount(x.columna('pacientes', 'ciudad'), minlength=len(x.categorias('pacientes', 'ciudad')))
+    return _ranking(conteos, x.categorias('pacientes', 'ciudad'), clave='ciudad')
+
+
+def _distribucion_tipo_sangre(x: ExtractoColumnar) -> List[Dict[str, Any]]:
+    conteos = np.bincount(x.columna('pacientes', 'tipo_sangre'),
+                          minlength=len(x.categorias('pacientes', 'tipo_sangre')))
+    return _ranking(conteos, x.categorias('pacientes', 'tipo_sangre'), clave='tipo_sangre')
+
+
+def _especialidades_demandadas(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO,
+                               desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+    doctores = x.columna('citas', 'doctor_id')[_mascara_periodo(x.columna('citas', 'fecha_hora'), desde, hasta)]
+    especialidades = x.columna('doctores', 'especialidad')[doctores[doctores >= 0]]
+    etiquetas = x.categorias('doctores', 'especialidad')
+    return _ranking(np.bincount(especialidades, minlength=len(etiquetas)), etiquetas, limite, 'especialidad')
+
+
+def _diagnosticos_frecuentes(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO,
+                             desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+    mascara = _mascara_periodo(x.columna('diagnosticos', 'fecha_diagnostico'), desde, hasta)
+    codigos = x.columna('diagnosticos', 'codigo_icd10')[mascara]
+    nombres = x.columna('diagnosticos', 'nombre')[mascara]
+    etiquetas = x.categorias('diagnosticos', 'codigo_icd10')
+    conteos = np.bincount(codigos, minlength=len(etiquetas))
+    # Nombre de cada código: el de su primera aparición
+    _, primera = np.unique(codigos, return_index=True)
+    nombre_de = dict(zip(codigos[primera].tolist(), nombres[primera].tolist()))
+    nombres_categoria = x.categorias('diagnosticos', 'nombre')
+    ranking = _ranking(conteos, list(range(len(etiquetas))), limite, 'codigo_icd10')
+    for fila in ranking:
+        codigo = fila['codigo_icd10']
+        fila['codigo_icd10'] = etiquetas[codigo]
+        fila['nombre'] = nombres_categoria[nombre_de[codigo]]
+    return ranking
+
+
+def _medicamentos_recetados(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO) -> List[Dict[str, Any]]:
+    medicamentos = x.columna('recetas', 'medicamento_ids')
+    conteos = np.bincount(medicamentos[medicamentos >= 0], minlength=x.filas('medicamentos'))
+    ids, nombres = x.columna('medicamentos', 'id'), x.columna('medicamentos', 'nombre_comercial')
+    return [
+        {'id': str(ids[fila['fila']]), 'nombre_comercial': str(nombres[fila['fila']]), 'total': fila['total']}
+        for fila in _ranking(conteos, list(range(len(conteos))), limite, 'fila')
+    ]
+
+
+def _ocupacion_hospitales(x: ExtractoColumnar, desde: Optional[str] = None,
+                          hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Citas del período por cama disponible (no hay datos de ingresos)."""
+    mascara = _mascara_periodo(x.columna('citas', 'fecha_hora'), desde, hasta)
+    citas = np.bincount(_hospital_de_cita(x, mascara), minlength=x.filas('hospitales'))
+    camas = np.asarray(x.columna('hospitales', 'capacidad_camas'))
+    tasa = np.divide(citas, camas, out=np.zeros(len(camas)), where=camas > 0)
+    ids, nombres = x.columna('hospitales', 'id'), x.columna('hospitales', 'nombre')
+    return [
+        {'id': str(ids[i]), 'nombre': str(nombres[i]), 'camas': int(camas[i]),
+         'citas': int(citas[i]), 'citas_por_cama': round(float(tasa[i]), 2)}
+        for i in np.argsort(-tasa, kind='stable')
+    ]
+
+
+def _citas_por_periodo(x: ExtractoColumnar, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       granularidad: str = 'mes') -> List[Dict[str, Any]]:
+    unidades = {'dia': 'D', 'mes': 'M', 'anio': 'Y'}
+    if granularidad not in unidades:
+        raise ValueError(f"Granularidad desconocida: {granularidad} (dia, mes, anio)")
+    fechas = x.columna('citas', 'fecha_hora')
+    mascara = _mascara_periodo(fechas, desde, hasta)
+    periodos, inverso = np.unique(fechas[mascara].astype(f"datetime64[{unidades[granularidad]}]"),
+                                  return_inverse=True)
+    estados = x.categorias('citas', 'estado')
+    tabla = _conteo_cruzado(inverso, x.columna('citas', 'estado')[mascara], len(periodos), len(estados))
+    return [
+        dict({'periodo': str(periodo), 'total': int(fila.sum())},
+             **{estado: int(n) for estado, n in zip(estados, fila)})
+        for periodo, fila in zip(periodos, tabla)
+    ]
+
+
+def _duracion_tratamientos(x: ExtractoColumnar) -> Dict[str, Any]:
+    inicio = x.columna('tratamientos', 'fecha_inicio')
+    fin = x.columna('tratamientos', 'fecha_fin')
+    validos = ~np.isnat(inicio) & ~np.isnat(fin)
+    dias = (fin[validos] - inicio[validos]).astype('timedelta64[s]').astype(np.float64) / 86400
+    estados = x.columna('tratamientos', 'estado')[validos]
+    etiquetas = x.categorias('tratamientos', 'estado')
+    totales = np.bincount(estados, minlength=len(etiquetas))
+    sumas = np.bincount(estados, weights=dias, minlength=len(etiquetas))
+    return {
+        'tratamientos': int(validos.sum()),
+        'promedio_dias': round(float(dias.mean()), 1) if len(dias) else None,
+        'mediana_dias': round(float(np.median(dias)), 1) if len(dias) else None,
+        'por_estado': {e: round(float(s / n), 1) for e, s, n in zip(etiquetas, sumas, totales) if n},
+    }
+
+
+def _alergias_por_edad(x: ExtractoColumnar, limite: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+    pacientes = x.columna('alergias', 'paciente_id')
+    validas = pacientes >= 0
+    nacimiento = x.columna('pacientes', 'fecha_nacimiento')[pacientes[validas]]
+    con_fecha = ~np.isnat(nacimiento)
+    edades = (x.fecha - nacimiento[con_fecha]).astype('timedelta64[D]').astype(np.int64) // 365
+    grupos = np.digitize(edades, [g[0] for g in GRUPOS_EDAD[1:]])
+    alergias = x.columna('alergias', 'nombre')[validas][con_fecha]
+    etiquetas = x.categorias('alergias', 'nombre')
+    tabla = _conteo_cruzado(grupos, alergias, len(GRUPOS_EDAD), len(etiquetas))
+    return {grupo[2]: _ranking(tabla[i], etiquetas, limite, 'alergia') for i, grupo in enumerate(GRUPOS_EDAD)}
+
+
+def _tendencias_diagnosticos(x: ExtractoColumnar, desde: Optional[str] = None,
+                             hasta: Optional[str] = None) -> Dict[str, Any]:
+    fechas = x.columna('diagnosticos', 'fecha_diagnostico')
+    mascara = _mascara_periodo(fechas, desde, hasta)
+    meses, por_mes = np.unique(fechas[mascara].astype('datetime64[M]'), return_counts=True)
+    anios, inverso = np.unique(fechas[mascara].astype('datetime64[Y]'), return_inverse=True)
+    etiquetas = x.categorias('diagnosticos', 'nombre')
+    tabla = _conteo_cruzado(inverso, x.columna('diagnosticos', 'nombre')[mascara], len(anios), len(etiquetas))
+    return {
+        'por_mes': [{'periodo': str(m), 'total': int(n)} for m, n in zip(meses, por_mes)],
+        'por_anio': [
+            {'anio': str(a), 'total': int(fila.sum()), 'mas_frecuente': etiquetas[int(fila.argmax())]}
+            for a, fila in zip(anios, tabla)
+        ],
+    }
+
+
+def _efectividad_tratamientos(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO) -> List[Dict[str, Any]]:
+    """Tasa de tratamientos completados frente a suspendidos por diagnóstico."""
+    diagnosticos = x.columna('tratamientos', 'diagnostico_id')
+    validos = diagnosticos >= 0
+    nombres = x.columna('diagnosticos', 'nombre')[diagnosticos[validos]]
+    etiquetas = x.categorias('diagnosticos', 'nombre')
+    estados = x.categorias('tratamientos', 'estado')
+    tabla = _conteo_cruzado(nombres, x.columna('tratamientos', 'estado')[validos], len(etiquetas), len(estados))
+    completado = tabla[:, estados.index('completado')] if 'completado' in estados else np.zeros(len(etiquetas))
+    suspendido = tabla[:, estados.index('suspendido')] if 'suspendido' in estados else np.zeros(len(etiquetas))
+    cerrados = completado + suspendido
+    tasa = np.divide(completado, cerrados, out=np.zeros(len(etiquetas)), where=cerrados > 0)
+    totales = tabla.sum(axis=1)
+    filas = []
+    for i in np.argsort(-totales, kind='stable')[:limite]:
+        if totales[i] == 0:
+            break
+        filas.append(dict({'diagnostico': etiquetas[i], 'total': int(totales[i]),
+                           'tasa_exito': round(float(tasa[i]), 3)},
+                          **{estado: int(n) for estado, n in zip(estados, tabla[i])}))
+    return filas
+
+
+def _comparativa_hospitales(x: ExtractoColumnar) -> List[Dict[str, Any]]:
+    n = x.filas('hospitales')
+    doctores = x.columna('doctores', 'hospital_id')
+    departamentos = x.columna('departamentos', 'hospital_id')
+    n_doctores = np.bincount(doctores[doctores >= 0], minlength=n)
+    n_departamentos = np.bincount(departamentos[departamentos >= 0], minlength=n)
+
+    citas_doctor = x.columna('citas', 'doctor_id')
+    pacientes = x.columna('citas', 'paciente_id')
+    validas = citas_doctor >= 0
+    hospital = doctores[citas_doctor[validas]]
+    validas_hospital = hospital >= 0
+    hospital, pacientes = hospital[validas_hospital], pacientes[validas][validas_hospital]
+    n_citas = np.bincount(hospital, minlength=n)
+    pares = np.unique(hospital.astype(np.int64) * max(1, x.filas('pacientes')) + pacientes)
+    n_pacientes = np.bincount(pares // max(1, x.filas('pacientes')), minlength=n)
+
+    ids, nombres = x.columna('hospitales', 'id'), x.columna('hospitales', 'nombre')
+    camas, urgencias = x.columna('hospitales', 'capacidad_camas'), x.columna('hospitales', 'tiene_urgencias')
+    return [
+        {'id': str(ids[i]), 'nombre': str(nombres[i]), 'camas': int(camas[i]), 'urgencias': bool(urgencias[i]),
+         'departamentos': int(n_departamentos[i]), 'doctores': int(n_doctores[i]),
+         'citas': int(n_citas[i]), 'pacientes': int(n_pacientes[i]),
+         'citas_por_doctor': round(float(n_citas[i] / n_doctores[i]), 1) if n_doctores[i] else 0.0}
+        for i in np.argsort(-n_citas, kind='stable')
+    ]
+
+
+def _carga_doctores(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO,
+                    desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+    n = x.filas('doctores')
+    mascara = _mascara_periodo(x.columna('citas', 'fecha_hora'), desde, hasta)
+    doctores = x.columna('citas', 'doctor_id')[mascara]
+    minutos = x.columna('citas', 'duracion_minutos')[mascara]
+    validas = doctores >= 0
+    n_citas = np.bincount(doctores[validas], minlength=n)
+    n_minutos = np.bincount(doctores[validas], weights=minutos[validas], minlength=n)
+    diagnosticos = x.columna('diagnosticos', 'doctor_id')
+    n_diagnosticos = np.bincount(diagnosticos[diagnosticos >= 0], minlength=n)
+
+    ids, especialidades = x.columna('doctores', 'id'), x.columna('doctores', 'especialidad')
+    etiquetas = x.categorias('doctores', 'especialidad')
+    return [
+        {'id': str(ids[i]), 'especialidad': etiquetas[especialidades[i]], 'citas': int(n_citas[i]),
+         'horas': round(float(n_minutos[i]) / 60, 1), 'diagnosticos': int(n_diagnosticos[i])}
+        for i in np.argsort(-n_citas, kind='stable')[:limite]
+    ]
+
+
+def _condiciones_cronicas(x: ExtractoColumnar, limite: int = LIMITE_POR_DEFECTO) -> Dict[str, Any]:
+    condiciones = x.columna('historiales', 'condiciones_cronicas')
+    por_historial = np.diff(x.desplazamientos('historiales', 'condiciones_cronicas'))
+    etiquetas = x.categorias('historiales', 'condiciones_cronicas')
+    return {
+        'pacientes': x.filas('historiales'),
+        'con_condiciones': int((por_historial > 0).sum()),
+        'con_varias': int((por_historial > 1).sum()),
+        'condiciones': _ranking(np.bincount(condiciones, minlength=len(etiquetas)), etiquetas, limite, 'condicion'),
+    }
+
+
+def _dashboard(x: ExtractoColumnar) -> Dict[str, Any]:
+    return {
+        'fecha_extracto': x.manifiesto['fecha'],
+        'origen': x.manifiesto.get('origen', ''),
+        'totales': {tipo: datos['filas'] for tipo, datos in x.manifiesto['tipos'].items()},
+        'citas_por_estado': _por_estado(x, 'citas'),
+        'tratamientos_por_estado': _por_estado(x, 'tratamientos'),
+        'recetas_por_estado': _por_estado(x, 'recetas'),
+        'hospitales_con_urgencias': int(np.asarray(x.columna('hospitales', 'tiene_urgencias')).sum()),
+        'camas': int(np.asarray(x.columna('hospitales', 'capacidad_camas')).sum()),
+    }
+
+
+# opción de menu_analisis -> (descripción, función(extracto, **parametros))
+INFORMES: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    '1': ('Distribución de pacientes por ciudad', _distribucion_ciudad),
+    '2': ('Distribución de pacientes por tipo de sangre', _distribucion_tipo_sangre),
+    '3': ('Especialidades médicas más demandadas', _especialidades_demandadas),
+    '4': ('Diagnósticos más frecuentes', _diagnosticos_frecuentes),
+    '5': ('Medicamentos más recetados', _medicamentos_recetados),
+    '6': ('Tasa de ocupación de hospitales', _ocupacion_hospitales),
+    '7': ('Análisis de citas por período', _citas_por_periodo),
+    '8': ('Tiempo promedio de tratamientos', _duracion_tratamientos),
+    '9': ('Alergias más comunes por grupo de edad', _alergias_por_edad),
+    '10': ('Tendencias de diagnósticos por mes/año', _tendencias_diagnosticos),
+    '11': ('Análisis de efectividad de tratamientos', _efectividad_tratamientos),
+    '12': ('Comparativa de hospitales por métricas', _comparativa_hospitales),
+    '13': ('Análisis de carga de trabajo por doctor', _carga_doctores),
+    '14': ('Reporte de pacientes con condiciones crónicas', _condiciones_cronicas),
+    '15': ('Dashboard general del sistema', _dashboard),
+}
+
+
+def informe(extracto: ExtractoColumnar, opcion: str, **parametros) -> Any:
+    """Calcula el informe `opcion` de menu_analisis sobre un extracto."""
+    if opcion not in INFORMES:
+        raise KeyError(f"Informe desconocido: {opcion}")
+    return INFORMES[opcion][1](extracto, **parametros)
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def _extraer_desde(fuente: str, semilla: int, citas: Optional[int], directorio: str) -> Optional[Dict[str, Any]]:
+    if fuente == 'generador':
+        volumen = calcular_volumen(citas) if citas else None
+        return extraer(fuente_generador(semilla, volumen), directorio, f"generador (semilla {semilla})")
+
+    from connect import conectar_mongodb, conectar_dgraph
+    db, cliente = conectar_mongodb(), conectar_dgraph()
+    if db is None and cliente is None:
+        print("✗ No hay conexión con MongoDB ni con Dgraph")
+        return None
+    return extraer(fuente_bases(db, cliente), directorio, 'bases')
+
+
+def main():
+    """Genera extractos (una vez o periódicamente) o imprime un informe."""
+    parser = argparse.ArgumentParser(description="Extractos columnares e informes de análisis")
+    parser.add_argument('--fuente', choices=('generador', 'bases'), default=None,
+                        help="Generar un extracto desde el generador o desde MongoDB/Dgraph")
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--directorio', default=DIRECTORIO_ANALITICA)
+    parser.add_argument('--cada', type=float, default=None, help="Repetir la extracción cada N minutos")
+    parser.add_argument('--informe', default=None, help="Opción de menu_analisis a imprimir")
+    args = parser.parse_args()
+
+    if args.fuente:
+        while True:
+            manifiesto = _extraer_desde(args.fuente, args.semilla, args.citas, args.directorio)
+            if manifiesto:
+                print(f"✓ Extracto publicado en {args.directorio} ({manifiesto['segundos']} s)")
+            if args.cada is None:
+                break
+            time.sleep(args.cada * 60)
+
+    if args.informe:
+        extracto = obtener_extracto(args.directorio)
+        if extracto is None:
+            print(f"✗ No hay extracto en {args.directorio}; generar uno con --fuente")
+            return
+        inicio = time.perf_counter()
+        resultado = informe(extracto, args.informe)
+        segundos = time.perf_counter() - inicio
+        print(json.dumps(resultado, ensure_ascii=False, indent=2, default=str))
+        print(f"✓ {INFORMES[args.informe][0]} en {segundos * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,662 @@
+"""
+Benchmark de Cargas y Consultas
+Plataforma de Integración de Datos de Salud
+
+Mide, para varias escalas de datos (10k, 100k y 1M citas):
+- El throughput de los cargadores de MongoDB, Cassandra y Dgraph
+- La latencia p50/p95/p99 y operaciones/segundo de las 20 consultas de
+  catalogo_consultas (las de Dgraph/queries_examples.py) y de sus
+  equivalentes en MongoDB y Cassandra (las implementaciones del router)
+- La memoria residente máxima del proceso
+- (modo local) El coste de decodificar respuestas de Dgraph con
+  json.loads frente a utils.decodificador_dgraph (incremental, con y sin
+  registros compactos) y la memoria y el coste de conversión de los
+  registros del generador frente a las entidades de modelos.py
+
+El resultado se guarda en JSON para poder comparar ejecuciones
+(--comparar anterior.json muestra la variación de p50 por consulta).
+
+Modos:
+- local: sin red, sobre utils.almacen_memoria (sustituto en proceso de las
+  tres bases). Útil para cambios en generador, modelo de datos o cargadores
+- contenedores: contra las bases de docker-compose vía connect.py. Cada
+  escala vacía y vuelve a poblar las tres bases
+
+Con --arranque mide en su lugar el tiempo hasta que main.py muestra el
+menú principal y comprueba que no se ha importado ningún driver.
+
+Uso:
+    python benchmark.py --modo local --escalas 10k,100k
+    python benchmark.py --arranque
+    python benchmark.py --modo contenedores --escalas 10k --comparar data/benchmark_anterior.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from catalogo_consultas import CATALOGO
+from modelos import MODELOS
+from particiones_cassandra import particiones_rango
+from utils.data_generator import (
+    SEMILLA_POR_DEFECTO, TIPOS, DataGenerator, calcular_volumen, generar_en_paralelo
+)
+from utils.decodificador_dgraph import decodificar
+from utils.metricas import MedidorThroughput, MedidorLatencia, memoria_maxima_mb
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+# Ejecuciones medidas por consulta y ejecuciones previas descartadas
+REPETICIONES = 200
+CALENTAMIENTO = 10
+
+# Pacientes incluidos en la respuesta de historial_completo que se decodifica
+PACIENTES_DECODIFICACION = 1000
+
+# Tipo cuyos registros se comparan con las entidades de modelos.py
+TIPO_MODELO = 'citas'
+
+# Recetas por lote en la verificación de alergias (compatibilidad_alergias.py)
+LOTE_RECETAS = 5000
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+# =============================================================================
+# PARÁMETROS DE CONSULTA
+# =============================================================================
+#
+# Los valores salen del propio generador, así existen en los datos cargados
+# con la misma semilla. Cada repetición usa una entidad distinta para que el
+# resultado no dependa de cachés del servidor.
+
+def _k(g: DataGenerator, tipo: str, i: int) -> int:
+    return (i * 7919) % g.volumen[tipo]
+
+
+def _dia(g: DataGenerator, i: int, dias: int = 1) -> Tuple[datetime, datetime]:
+    inicio = datetime.fromisoformat(g.cita(_k(g, 'citas', i))['fecha_hora'][:10])
+    return inicio, inicio + timedelta(days=dias) - timedelta(seconds=1)
+
+
+def _iso(valor: datetime) -> str:
+    return valor.isoformat() + 'Z'
+
+
+def _rango(g: DataGenerator, i: int, dias: int) -> Dict[str, str]:
+    desde, hasta = _dia(g, i, dias)
+    return {'desde': _iso(desde), 'hasta': _iso(hasta)}
+
+
+PARAMETROS: Dict[str, Callable[[DataGenerator, int], Dict[str, Any]]] = {
+    'paciente_por_email': lambda g, i: {'email': g.paciente(_k(g, 'pacientes', i))['email']},
+    'doctores_por_especialidad': lambda g, i: {'especialidad': g.doctor(_k(g, 'doctores', i))['especialidad'], 'experiencia': 5},
+    'doctores_experiencia': lambda g, i: {'experiencia': 5 + i % 20, 'limite': 100},
+    'historial_completo': lambda g, i: {'paciente': g.paciente(_k(g, 'pacientes', i))['id']},
+    'citas_por_fecha': lambda g, i: dict(_rango(g, i, 7), estado='programada'),
+    'diagnosticos_fulltext': lambda g, i: {'texto': ' '.join(g.diagnostico(_k(g, 'diagnosticos', i))['descripcion'].split()[:2])},
+    'medicamentos_top': lambda g, i: {'limite': 10},
+    'hospitales_urgencias': lambda g, i: {'ciudad': g.hospital(_k(g, 'hospitales', i))['ciudad'], 'urgencias': True},
+    'recetas_paciente': lambda g, i: {'paciente': g.receta(_k(g, 'recetas', i))['paciente_id'], 'estado': 'activa'},
+    'agenda_doctor': lambda g, i: dict(_rango(g, i, 1), doctor=g.cita(_k(g, 'citas', i))['doctor_id']),
+    'pacientes_alergia': lambda g, i: {'alergia': g.alergia(_k(g, 'alergias', i))['nombre']},
+    'tratamientos_por_estado': lambda g, i: {'estado': 'activo', 'limite': 100},
+    'doctores_hospital': lambda g, i: {'hospital': g.hospital(_k(g, 'hospitales', i))['id']},
+    'pacientes_tipo_sangre': lambda g, i: {'tipo_sangre': g.paciente(_k(g, 'pacientes', i))['tipo_sangre'], 'limite': 100},
+    'diagnosticos_icd10': lambda g, i: {'codigo': g.diagnostico(_k(g, 'diagnosticos', i))['codigo_icd10']},
+    'buscar_paciente_nombre': lambda g, i: {'nombre': g.paciente(_k(g, 'pacientes', i))['nombre']},
+    'estadisticas_hospital': lambda g, i: {'hospital': g.hospital(_k(g, 'hospitales', i))['id']},
+    'citas_con_diagnosticos': lambda g, i: {'estado': 'completada', 'limite': 100},
+    'medicamentos_contraindicaciones': lambda g, i: {'limite': 100},
+    'pacientes_condiciones_cronicas': lambda g, i: {'limite': 100},
+    'especialidades_demandadas': lambda g, i: {},
+}
+
+# nombre -> (menú, opción, base de datos, parámetros, equivalente en memoria)
+EQUIVALENTES: Dict[str, Tuple[str, str, str, Callable, Callable]] = {
+    'mongodb.paciente_por_id': (
+        'menu_pacientes', '1', 'mongodb',
+        lambda g, i: {'id': g.paciente(_k(g, 'pacientes', i))['id']},
+        lambda a, id: a.mongo_por_id('pacientes', id)),
+    'mongodb.paciente_por_email': (
+        'menu_pacientes', '3', 'mongodb',
+        lambda g, i: {'email': g.paciente(_k(g, 'pacientes', i))['email']},
+        lambda a, email: a.mongo_por_campo('pacientes', 'email', email)),
+    'mongodb.citas_paciente': (
+        'menu_citas', '2', 'mongodb',
+        lambda g, i: {'id': g.cita(_k(g, 'citas', i))['paciente_id']},
+        lambda a, id: a.mongo_por_campo('citas', 'paciente_id', id)),
+    'mongodb.citas_por_rango': (
+        'menu_citas', '4', 'mongodb',
+        lambda g, i: dict(zip(('desde', 'hasta'), _dia(g, i, 7))),
+        lambda a, desde, hasta: a.mongo_citas_entre(_iso(desde), _iso(hasta))),
+    'cassandra.pacientes_por_ciudad': (
+        'menu_pacientes', '4', 'cassandra',
+        lambda g, i: {'ciudad': g.paciente(_k(g, 'pacientes', i))['ciudad']},
+        lambda a, ciudad: a.cassandra_particion('pacientes_por_ciudad', (ciudad,))),
+    'cassandra.citas_paciente': (
+        'menu_citas', '2', 'cassandra',
+        lambda g, i: {'id': g.cita(_k(g, 'citas', i))['paciente_id']},
+        lambda a, id: a.cassandra_particion('citas_por_paciente', (id,))),
+    'cassandra.citas_doctor': (
+        'menu_citas', '3', 'cassandra',
+        lambda g, i: {'id': g.cita(_k(g, 'citas', i))['doctor_id']},
+        lambda a, id: a.cassandra_particion('citas_por_doctor', (id,))),
+    'cassandra.citas_por_rango': (
+        'menu_citas', '4', 'cassandra',
+        lambda g, i: dict(zip(('desde', 'hasta'), _dia(g, i, 7))),
+        lambda a, desde, hasta: [
+            fila
+            for particion in particiones_rango(desde, hasta)
+            for fila in a.cassandra_particion('citas_por_fecha', particion, 10 ** 9)
+        ]),
+}
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def medir_operacion(nombre: str,
+                    funcion: Callable[..., Any],
+                    parametros: Callable[[int], Dict[str, Any]],
+                    repeticiones: int = REPETICIONES,
+                    calentamiento: int = CALENTAMIENTO) -> Dict[str, Any]:
+    """Ejecuta una operación `repeticiones` veces y resume sus latencias."""
+    for i in range(calentamiento):
+        try:
+            funcion(**parametros(i))
+        except Exception:
+            pass
+
+    medidor = MedidorLatencia(nombre)
+    ultimo_error = None
+    for i in range(repeticiones):
+        valores = parametros(calentamiento + i)
+        try:
+            medidor.medir(funcion, **valores)
+        except Exception as e:
+            ultimo_error = str(e)
+    resumen = medidor.resumen()
+    if ultimo_error:
+        resumen['ultimo_error'] = ultimo_error
+    return resumen
+
+
+# Formas de leer el bloque de una respuesta de Dgraph
+DECODIFICADORES = {
+    'json_loads': lambda datos, bloque: json.loads(datos)[bloque],
+    'incremental': lambda datos, bloque: decodificar(datos, bloque, compacto=False),
+    'incremental_compacto': lambda datos, bloque: decodificar(datos, bloque, compacto=True),
+}
+
+
+def medir_decodificacion(datos: bytes, bloque: str, repeticiones: int = 5) -> Dict[str, Any]:
+    """
+    Compara los decodificadores sobre una misma respuesta.
+
+    Para cada uno mide el mejor tiempo de recorrer el bloque completo y el
+    pico de memoria (tracemalloc) de dos formas: recorriendo sin retener
+    los elementos y conservándolos todos en una lista.
+    """
+    resultado = {'bytes': len(datos)}
+    for nombre, funcion in DECODIFICADORES.items():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in funcion(datos, bloque):
+                pass
+            tiempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        for _ in funcion(datos, bloque):
+            pass
+        _, pico_recorrido = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        retenidos = list(funcion(datos, bloque))
+        retenido, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del retenidos
+
+        resultado[nombre] = {
+            'mejor_ms': round(min(tiempos) * 1000, 3),
+            'pico_recorrido_kb': round(pico_recorrido / 1024, 1),
+            'retenido_kb': round(retenido / 1024, 1),
+        }
+    return resultado
+
+
+def _retenido_kb(construir: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    valor = construir()
+    retenido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del valor
+    return round(retenido / 1024, 1)
+
+
+def _mejor_ms(funcion: Callable[[], Any], repeticiones: int = 3) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(min(tiempos) * 1000, 3)
+
+
+def medir_modelo(tipo: str, registros: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compara registros del generador (dicts) con entidades de modelos.py.
+
+    Mide la memoria retenida por una copia de los registros en cada forma
+    y el tiempo de convertirlos a documento de MongoDB, filas de Cassandra
+    y nodos de Dgraph desde los registros (lo que hacen los cargadores:
+    desde_registro() y el método de la entidad) y desde entidades ya
+    construidas.
+    """
+    from populate_cassandra import TABLAS
+    from populate_dgraph import a_nodo
+    from populate_mongodb import a_documento
+
+    modelo = MODELOS[tipo]
+    entidades = [modelo.desde_registro(r) for r in registros]
+    tablas = [d for d in TABLAS.values() if d['origen'] == tipo]
+
+    return {
+        'tipo': tipo,
+        'registros': len(registros),
+        'dict_kb': _retenido_kb(lambda: [dict(r) for r in registros]),
+        'entidad_kb': _retenido_kb(lambda: [modelo.desde_registro(r) for r in registros]),
+        'desde_registro_ms': _mejor_ms(lambda: [modelo.desde_registro(r) for r in registros]),
+        'documento_ms': {
+            'dict': _mejor_ms(lambda: [a_documento(tipo, r) for r in registros]),
+            'entidad': _mejor_ms(lambda: [e.a_documento() for e in entidades]),
+        },
+        'filas_ms': {
+            'dict': _mejor_ms(lambda: [d['fila'](r) for d in tablas for r in registros]),
+            'entidad': _mejor_ms(lambda: [e.a_fila(d['columnas']) for d in tablas for e in entidades]),
+        },
+        'nodo_ms': {
+            'dict': _mejor_ms(lambda: [a_nodo(tipo, r) for r in registros]),
+            'entidad': _mejor_ms(lambda: [e.a_nodo() for e in entidades]),
+        },
+    }
+
+
+# =============================================================================
+# MODO LOCAL
+# =============================================================================
+
+# Campo anidado de historial_completo -> prefijo de sus predicados
+_PREFIJOS_ANIDADOS = {
+    'alergias': 'alergia',
+    'historial_medico': 'historial',
+    'diagnosticos': 'diagnostico',
+    'tratamientos': 'tratamiento',
+    'medicamentos': 'medicamento',
+}
+
+
+def _a_dgraph(registro: Dict[str, Any], prefijo: str) -> Dict[str, Any]:
+    """Registro anidado del almacén con los nombres de predicado de Dgraph."""
+    nodo = {'uid': f"_:{registro['id']}"}
+    for campo, valor in registro.items():
+        if campo in _PREFIJOS_ANIDADOS:
+            valor = [_a_dgraph(v, _PREFIJOS_ANIDADOS[campo]) for v in valor]
+        elif campo.endswith('_id') or campo.endswith('_ids'):
+            continue
+        nodo[f"{prefijo}.{campo}"] = valor
+    return nodo
+
+
+def _respuesta_historiales(almacen: Any, generador: DataGenerator) -> bytes:
+    """Respuesta de historial_completo para varios pacientes, como la envía Dgraph."""
+    from utils.almacen_memoria import ejecutar_consulta
+
+    cantidad = min(PACIENTES_DECODIFICACION, generador.volumen['pacientes'])
+    pacientes = [
+        _a_dgraph(p, 'paciente')
+        for i in range(cantidad)
+        for p in ejecutar_consulta(almacen, 'historial_completo', **PARAMETROS['historial_completo'](generador, i))
+    ]
+    return json.dumps({'paciente': pacientes}, ensure_ascii=False).encode('utf-8')
+
+
+def _benchmark_local(semilla: int, volumen: Dict[str, int], procesos: Optional[int],
+                     repeticiones: int) -> Dict[str, Any]:
+    from populate_cassandra import TABLAS
+    from populate_mongodb import COLECCIONES
+    from utils.almacen_memoria import AlmacenMemoria, ejecutar_consulta
+
+    almacen = AlmacenMemoria()
+    carga = {}
+    colecciones_por_tipo = {tipo: coleccion for coleccion, tipo in COLECCIONES.items()}
+    para_alergias: Dict[str, List[Dict[str, Any]]] = {}
+
+    for tipo in TIPOS:
+        registros = [r for bloque in generar_en_paralelo(tipo, semilla, volumen, procesos) for r in bloque]
+        if tipo == TIPO_MODELO:
+            modelo = medir_modelo(tipo, registros)
+        if tipo in ('medicamentos', 'alergias'):
+            para_alergias[tipo] = registros
+        elif tipo == 'recetas':
+            para_alergias[tipo] = registros[:LOTE_RECETAS]
+
+        medidor = MedidorThroughput(f"dgraph.{tipo}").iniciar()
+        medidor.sumar(almacen.cargar_dgraph(tipo, registros))
+        carga[medidor.nombre] = medidor.detener().resumen()
+
+        if tipo in colecciones_por_tipo:
+            medidor = MedidorThroughput(f"mongodb.{colecciones_por_tipo[tipo]}").iniciar()
+            medidor.sumar(almacen.cargar_mongodb(colecciones_por_tipo[tipo], registros))
+            carga[medidor.nombre] = medidor.detener().resumen()
+
+        for tabla, definicion in TABLAS.items():
+            if definicion['origen'] == tipo:
+                medidor = MedidorThroughput(f"cassandra.{tabla}").iniciar()
+                medidor.sumar(almacen.cargar_cassandra(tabla, registros))
+                carga[medidor.nombre] = medidor.detener().resumen()
+
+    almacen.finalizar()
+    generador = DataGenerator(semilla, volumen)
+
+    consultas = {}
+    for nombre in CATALOGO:
+        consultas[f"dgraph.{nombre}"] = medir_operacion(
+            nombre,
+            lambda _nombre=nombre, **valores: ejecutar_consulta(almacen, _nombre, **valores),
+            lambda i, _nombre=nombre: PARAMETROS[_nombre](generador, i),
+            repeticiones)
+    for nombre, (_, _, _, parametros, equivalente) in EQUIVALENTES.items():
+        consultas[nombre] = medir_operacion(
+            nombre,
+            lambda _equivalente=equivalente, **valores: _equivalente(almacen, **valores),
+            lambda i, _parametros=parametros: _parametros(generador, i),
+            repeticiones)
+
+    from compatibilidad_alergias import IndiceAlergias
+    inicio = time.perf_counter()
+    indice = IndiceAlergias.desde_registros(para_alergias['medicamentos'], para_alergias['alergias'])
+    carga['alergias.indice'] = {'segundos': round(time.perf_counter() - inicio, 3)}
+    consultas['alergias.verificar_recetas'] = medir_operacion(
+        'verificar_recetas',
+        lambda: indice.verificar_recetas(para_alergias['recetas']),
+        lambda i: {},
+        repeticiones)
+
+    try:
+        import analitica
+    except ImportError:
+        print("⚠ NumPy no está instalado: se omiten los informes de analitica.py")
+    else:
+        with tempfile.TemporaryDirectory() as directorio:
+            manifiesto = analitica.extraer(analitica.fuente_generador(semilla, volumen), directorio, 'benchmark')
+            carga['analitica.extracto'] = {'segundos': manifiesto['segundos']}
+            extracto = analitica.ExtractoColumnar(directorio)
+            for opcion in analitica.INFORMES:
+                consultas[f"columnar.informe_{opcion}"] = medir_operacion(
+                    f"informe_{opcion}",
+                    lambda _opcion=opcion: analitica.informe(extracto, _opcion),
+                    lambda i: {},
+                    repeticiones)
+
+    decodificacion = medir_decodificacion(_respuesta_historiales(almacen, generador), 'paciente')
+    return {'carga': carga, 'consultas': consultas, 'decodificacion': decodificacion, 'modelo': modelo}
+
+
+# =============================================================================
+# MODO CONTENEDORES
+# =============================================================================
+
+def _reiniciar_bases(db: Any, session: Any, cliente: Any):
+    """Deja las tres bases vacías antes de poblar una escala."""
+    import pydgraph
+    from connect import aplicar_schema_dgraph
+    from populate_cassandra import TABLAS, verificar_tablas
+    from populate_dgraph import MapaUids
+    from populate_mongodb import COLECCIONES
+
+    for coleccion in COLECCIONES:
+        db[coleccion].drop()
+    if not verificar_tablas(session):
+        raise RuntimeError("El schema de Cassandra no está preparado: ejecute python connect.py --preparar")
+    for tabla in TABLAS:
+        session.execute(f"TRUNCATE {tabla}")
+    cliente.alter(pydgraph.Operation(drop_all=True))
+    aplicar_schema_dgraph(cliente)
+    mapa = MapaUids()
+    mapa.limpiar()
+    mapa.cerrar()
+
+
+def _benchmark_contenedores(semilla: int, volumen: Dict[str, int], procesos: Optional[int],
+                            repeticiones: int) -> Dict[str, Any]:
+    from connect import conectar_mongodb, conectar_cassandra, conectar_dgraph, preparar_cassandra
+    from populate_cassandra import poblar_cassandra
+    from populate_dgraph import poblar_dgraph
+    from populate_mongodb import poblar_mongodb
+    from router_consultas import crear_router
+
+    preparar_cassandra()
+    db, session, cliente = conectar_mongodb(), conectar_cassandra(), conectar_dgraph()
+    if db is None or session is None or cliente is None:
+        raise RuntimeError("El modo contenedores necesita MongoDB, Cassandra y Dgraph disponibles")
+
+    _reiniciar_bases(db, session, cliente)
+    carga = {}
+    for base, resumen in (
+        ('mongodb', poblar_mongodb(db, semilla, volumen, procesos=procesos)),
+        ('cassandra', poblar_cassandra(session, semilla, volumen, procesos=procesos)),
+        ('dgraph', poblar_dgraph(semilla, volumen, procesos=procesos)),
+    ):
+        for nombre, datos in resumen.items():
+            carga[f"{base}.{nombre}"] = datos
+
+    generador = DataGenerator(semilla, volumen)
+    conexiones = {'mongodb': db, 'cassandra': session}
+    router = crear_router()
+
+    consultas = {}
+    for nombre, consulta in CATALOGO.items():
+        # Sin caché: se mide la consulta en el servidor
+        consultas[f"dgraph.{nombre}"] = medir_operacion(
+            nombre,
+            lambda _consulta=consulta, **valores: _consulta.ejecutar(cliente, **valores),
+            lambda i, _nombre=nombre: PARAMETROS[_nombre](generador, i),
+            repeticiones)
+    for nombre, (menu, opcion, base, parametros, _) in EQUIVALENTES.items():
+        funcion = router.implementacion(menu, opcion, base)
+        consultas[nombre] = medir_operacion(
+            nombre,
+            lambda _funcion=funcion, _conexion=conexiones[base], **valores: _funcion(_conexion, **valores),
+            lambda i, _parametros=parametros: _parametros(generador, i),
+            repeticiones)
+
+    return {'carga': carga, 'consultas': consultas}
+
+
+# =============================================================================
+# ARRANQUE DEL MENÚ
+# =============================================================================
+
+# Objetivo de tiempo hasta ver el menú principal (proceso completo)
+OBJETIVO_ARRANQUE_MS = 200
+
+# Módulos que no deben cargarse para mostrar el menú
+MODULOS_PESADOS = ('pymongo', 'motor', 'cassandra', 'pydgraph', 'grpc', 'numpy',
+                   'connect', 'router_consultas', 'catalogo_consultas')
+
+_SCRIPT_ARRANQUE = """
+import sys, time, json, io, contextlib
+inicio = time.perf_counter()
+import main
+with contextlib.redirect_stdout(io.StringIO()):
+    main.mostrar_banner()
+    main.mostrar_informacion_bases()
+    main.mostrar_menu_principal()
+print(json.dumps({'menu_ms': (time.perf_counter() - inicio) * 1000,
+                  'cargados': [m for m in %r if m in sys.modules]}))
+"""
+
+
+def medir_arranque(repeticiones: int = 20) -> Dict[str, Any]:
+    """
+    Lanza main.py en procesos nuevos (con '0' como entrada) y mide el tiempo
+    hasta salir, intérprete incluido, y aparte el de importar main y
+    mostrar el menú. Cada proceso parte sin módulos cargados.
+    """
+    import subprocess
+    import sys
+
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    total = MedidorLatencia('arranque')
+    menu = MedidorLatencia('menu')
+    cargados = set()
+    for _ in range(repeticiones):
+        total.medir(subprocess.run, [sys.executable, os.path.join(directorio, 'main.py')], input='0\n',
+                    cwd=directorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True, check=False)
+        salida = subprocess.run([sys.executable, '-c', _SCRIPT_ARRANQUE % (MODULOS_PESADOS,)], cwd=directorio,
+                                capture_output=True, text=True, check=True).stdout
+        datos = json.loads(salida.strip().splitlines()[-1])
+        menu.muestras.append(datos['menu_ms'] / 1000)
+        cargados.update(datos['cargados'])
+    resultado = {'proceso': total.resumen(), 'menu': menu.resumen(), 'cargados': sorted(cargados)}
+    resultado['cumple'] = resultado['proceso']['p99_ms'] < OBJETIVO_ARRANQUE_MS and not cargados
+    return resultado
+
+
+# =============================================================================
+# EJECUCIÓN Y COMPARACIÓN
+# =============================================================================
+
+MODOS = {
+    'local': _benchmark_local,
+    'contenedores': _benchmark_contenedores,
+}
+
+
+def ejecutar_benchmark(modo: str = 'local',
+                       escalas: List[str] = ('10k', '100k', '1M'),
+                       semilla: int = SEMILLA_POR_DEFECTO,
+                       procesos: Optional[int] = None,
+                       repeticiones: int = REPETICIONES) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark en las escalas indicadas, de menor a mayor.
+
+    La memoria máxima es acumulativa dentro del proceso, por eso las
+    escalas se recorren en orden creciente.
+    """
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'modo': modo,
+        'semilla': semilla,
+        'repeticiones': repeticiones,
+        'python': platform.python_version(),
+        'escalas': {},
+    }
+    for escala in sorted(escalas, key=lambda e: ESCALAS[e]):
+        volumen = calcular_volumen(ESCALAS[escala])
+        print(f"\n▶ Escala {escala} ({ESCALAS[escala]:,} citas)")
+        datos = MODOS[modo](semilla, volumen, procesos, repeticiones)
+        datos['volumen'] = volumen
+        datos['memoria_max_mb'] = memoria_maxima_mb()
+        resultado['escalas'][escala] = datos
+        for nombre, resumen in datos['consultas'].items():
+            print(f"  {nombre:<45} p50 {resumen['p50_ms']} ms  p99 {resumen['p99_ms']} ms")
+        for nombre in DECODIFICADORES:
+            if nombre in datos.get('decodificacion', {}):
+                medida = datos['decodificacion'][nombre]
+                print(f"  decodificacion.{nombre:<30} {medida['mejor_ms']} ms  "
+                      f"retenido {medida['retenido_kb']} KB  pico {medida['pico_recorrido_kb']} KB")
+        if 'modelo' in datos:
+            modelo = datos['modelo']
+            print(f"  modelo.{modelo['tipo']:<38} dict {modelo['dict_kb']} KB  entidad {modelo['entidad_kb']} KB")
+    return resultado
+
+
+def comparar(anterior: Dict[str, Any], actual: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Variación de p50 por escala y consulta entre dos resultados."""
+    filas = []
+    for escala, datos in actual['escalas'].items():
+        previas = anterior.get('escalas', {}).get(escala, {}).get('consultas', {})
+        for nombre, resumen in datos['consultas'].items():
+            previo = previas.get(nombre, {}).get('p50_ms')
+            if previo and resumen['p50_ms'] is not None:
+                filas.append({
+                    'escala': escala,
+                    'consulta': nombre,
+                    'p50_anterior_ms': previo,
+                    'p50_actual_ms': resumen['p50_ms'],
+                    'variacion': round(resumen['p50_ms'] / previo - 1, 4),
+                })
+    return filas
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Benchmark de cargas y consultas")
+    parser.add_argument('--modo', choices=tuple(MODOS), default='local')
+    parser.add_argument('--escalas', default='10k,100k,1M', help="Escalas separadas por comas")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del generador")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--salida', default=None, help="Archivo JSON de resultados")
+    parser.add_argument('--comparar', default=None, help="Resultado anterior contra el que comparar")
+    parser.add_argument('--arranque', action='store_true', help="Medir solo el arranque del menú de main.py")
+    args = parser.parse_args()
+
+    if args.arranque:
+        r = medir_arranque(min(args.repeticiones, 50))
+        print(f"Arranque de main.py hasta salir: p50 {r['proceso']['p50_ms']} ms  p99 {r['proceso']['p99_ms']} ms")
+        print(f"Importar main y mostrar el menú: p50 {r['menu']['p50_ms']} ms  p99 {r['menu']['p99_ms']} ms")
+        if r['cargados']:
+            print(f"✗ Módulos cargados al arrancar: {', '.join(r['cargados'])}")
+        print(f"{'✓' if r['cumple'] else '✗'} Objetivo: menú en menos de {OBJETIVO_ARRANQUE_MS} ms sin drivers")
+        return
+
+    escalas = [e.strip() for e in args.escalas.split(',') if e.strip()]
+    desconocidas = [e for e in escalas if e not in ESCALAS]
+    if desconocidas:
+        parser.error(f"Escalas desconocidas: {', '.join(desconocidas)} (disponibles: {', '.join(ESCALAS)})")
+
+    print("=" * 70)
+    print(f"BENCHMARK ({args.modo})")
+    print("=" * 70)
+
+    resultado = ejecutar_benchmark(args.modo, escalas, args.semilla, args.procesos, args.repeticiones)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            resultado['comparacion'] = comparar(json.load(f), resultado)
+        for fila in resultado['comparacion']:
+            print(f"  {fila['escala']:<5} {fila['consulta']:<45} {fila['variacion']:+.1%}")
+
+    salida = args.salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"benchmark_{args.modo}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+
+    print("=" * 70)
+    print(f"✓ Resultados guardados en {salida}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
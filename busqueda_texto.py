@@ -0,0 +1,741 @@
+"""
+Búsqueda de Texto
+Plataforma de Integración de Datos de Salud
+
+Índice invertido en el proceso para las búsquedas por nombre y descripción
+(menu_pacientes 2, menu_diagnosticos 3 y 10, menu_medicamentos 2 y 3).
+alloftext de Dgraph y los índices de texto de MongoDB no encuentran
+"gonzal" en "González" ni toleran "Gonzales": aquí el texto se normaliza
+para español (minúsculas, sin acentos ni palabras vacías y, en las
+descripciones, en singular) y cada palabra de la búsqueda se compara con
+el vocabulario de tres formas:
+
+- exacta
+- como prefijo (autocompletado), limitada a las MAX_EXPANSIONES_PREFIJO
+  palabras más frecuentes
+- con una errata (inserción, borrado, sustitución o transposición) si no
+  hay coincidencia exacta ni por prefijo. Se buscan con un diccionario de
+  borrados (cada palabra indexada bajo las variantes que resultan de
+  quitarle una letra), así que no se recorre el vocabulario
+
+Muchas entidades comparten el mismo texto (nombres y apellidos, el nombre y
+la descripción de un código ICD-10), así que el índice guarda cada texto
+distinto una sola vez con los IDs que lo tienen. La puntuación (IDF de las
+palabras coincidentes, ponderado por el tipo de coincidencia) se calcula
+sobre los textos y los k primeros se expanden a sus entidades.
+
+El índice se construye desde el generador o desde MongoDB y se guarda en
+BUSQUEDA_DIRECTORIO. Las escrituras del menú CRUD se añaden a un diario
+(cambios.jsonl) con indexar_crud(); cada proceso aplica las líneas nuevas
+del diario antes de buscar, de modo que ve también las escrituras de otros
+procesos sin reconstruir el índice.
+
+Cada reconstrucción abre una generación nueva: la instantánea y la primera
+línea del diario llevan su identificador, y el diario anterior se sustituye
+(os.replace) en vez de vaciarse. Un proceso que encuentra otra generación
+en el diario, o un diario más corto que la posición que había leído,
+vuelve a cargar la instantánea en lugar de seguir leyendo desde su posición.
+
+Uso:
+    python busqueda_texto.py --construir --fuente generador --citas 100000
+    python busqueda_texto.py --construir --fuente mongodb
+    python busqueda_texto.py --buscar "mar gonzales"
+    python busqueda_texto.py --buscar "diabet" --entidad diagnosticos --campo descripcion
+    python busqueda_texto.py --benchmark
+"""
+
+import argparse
+import bisect
+import gzip
+import heapq
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Set, Tuple
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+BUSQUEDA_DIRECTORIO = os.getenv(
+    'BUSQUEDA_DIRECTORIO',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'busqueda'))
+
+ARCHIVO_INDICE = 'indice.json.gz'
+ARCHIVO_DIARIO = 'cambios.jsonl'
+
+# entidad -> índice -> (campos concatenados, reducir a singular)
+CAMPOS_BUSQUEDA = {
+    'pacientes': {'nombre': (('nombre', 'apellido'), False)},
+    'diagnosticos': {'descripcion': (('nombre', 'descripcion'), True)},
+    'medicamentos': {
+        'nombre_comercial': (('nombre_comercial',), False),
+        'principio_activo': (('principio_activo',), False),
+    },
+}
+
+# Opción de menu_crud -> (entidad, alta/baja)
+OPCIONES_CRUD = {
+    '1': ('pacientes', 'alta'),
+    '2': ('pacientes', 'alta'),
+    '3': ('pacientes', 'baja'),
+    '9': ('diagnosticos', 'alta'),
+    '13': ('medicamentos', 'alta'),
+}
+
+# Peso de cada tipo de coincidencia sobre el IDF de la palabra indexada
+PESO_EXACTA = 1.0
+PESO_PREFIJO = 0.8
+PESO_ERRATA = 0.6
+
+# Palabras del vocabulario que puede abarcar un prefijo
+MAX_EXPANSIONES_PREFIJO = 64
+
+# Con menos textos candidatos, las demás palabras de la consulta se
+# comparan con ellos directamente
+MAX_CANDIDATOS_DIRECTOS = 2000
+
+# Longitud mínima para tolerar una errata ("ana" y "ane" son nombres distintos)
+MIN_LONGITUD_ERRATA = 4
+
+PALABRAS_VACIAS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'sin', 'su', 'sus', 'un', 'una', 'y',
+))
+
+_PALABRA = re.compile(r'\w+')
+
+
+# =============================================================================
+# NORMALIZACIÓN
+# =============================================================================
+
+def _singular(palabra: str) -> str:
+    # Igual que compatibilidad_alergias.normalizar_termino: "crónicas" -> "cronica"
+    return palabra[:-1] if len(palabra) > 4 and palabra.endswith('s') else palabra
+
+
+def normalizar(texto: Optional[str], singular: bool = False, conservar_ultima: bool = False) -> List[str]:
+    """
+    Palabras comparables de un texto en español: minúsculas, sin acentos
+    (la ñ queda como n) y sin palabras vacías.
+
+    Con conservar_ultima la última palabra se mantiene aunque sea vacía: en
+    una búsqueda puede ser el prefijo que se está tecleando ("al" -> "alberto").
+    """
+    if not texto:
+        return []
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    todas = _PALABRA.findall(texto)
+    palabras = [p for p in todas if p not in PALABRAS_VACIAS]
+    if conservar_ultima and todas and todas[-1] in PALABRAS_VACIAS:
+        palabras.append(todas[-1])
+    return [_singular(p) for p in palabras] if singular else palabras
+
+
+def _borrados(palabra: str) -> Set[str]:
+    """Variantes de una palabra con una letra menos."""
+    return {palabra[:i] + palabra[i + 1:] for i in range(len(palabra))}
+
+
+def a_una_edicion(a: str, b: str) -> bool:
+    """Distancia de Damerau-Levenshtein <= 1 (sin calcular la matriz)."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < len(a) and i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return (a[i + 1:] == b[i + 1:]
+                or (a[i + 2:] == b[i + 2:] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 1:i + 2] == b[i:i + 1]))
+    if len(a) < len(b):
+        a, b = b, a
+    return a[i + 1:] == b[i:]
+
+
+# =============================================================================
+# ÍNDICE DE UN CAMPO
+# =============================================================================
+
+class IndiceTexto:
+    """
+    Índice invertido palabra -> textos distintos de un campo de búsqueda.
+
+    Cada texto guarda los valores originales de sus campos (para mostrar
+    el resultado) y los IDs de las entidades que lo tienen, en orden de
+    inserción (un dict: quitar es O(1) y los k primeros no exigen ordenar).
+    """
+
+    def __init__(self, entidad: str, nombre: str, campos: Tuple[str, ...], singular: bool = False):
+        self.entidad = entidad
+        self.nombre = nombre
+        self.campos = campos
+        self.singular = singular
+        self._valores: List[Tuple[Any, ...]] = []
+        self._palabras: List[Tuple[str, ...]] = []
+        self._ids: List[Dict[str, None]] = []
+        self._por_clave: Dict[Tuple[str, ...], int] = {}
+        self._por_valores: Dict[Tuple[Any, ...], int] = {}
+        self._texto_de: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._por_borrado: Dict[str, Set[str]] = {}
+        self._vocabulario: Optional[List[str]] = None
+
+    # -------------------------------------------------------------------------
+    # Escritura
+    # -------------------------------------------------------------------------
+
+    def _texto(self, valores: Tuple[Any, ...]) -> Optional[int]:
+        # Los valores repetidos (la mayoría) no se vuelven a normalizar
+        texto = self._por_valores.get(valores)
+        if texto is not None:
+            return texto
+        palabras = tuple(p for v in valores for p in normalizar(v, self.singular))
+        if not palabras:
+            return None
+        texto = self._por_clave.get(palabras)
+        if texto is None:
+            texto = self._por_clave[palabras] = len(self._valores)
+            self._valores.append(valores)
+            self._palabras.append(palabras)
+            self._ids.append({})
+            self._indexar_palabras(texto, palabras)
+        self._por_valores[valores] = texto
+        return texto
+
+    def _indexar_palabras(self, texto: int, palabras: Tuple[str, ...]):
+        for palabra in set(palabras):
+            postings = self._postings.get(palabra)
+            if postings is None:
+                postings = self._postings[palabra] = set()
+                if len(palabra) >= MIN_LONGITUD_ERRATA:
+                    for variante in _borrados(palabra):
+                        self._por_borrado.setdefault(variante, set()).add(palabra)
+                if self._vocabulario is not None:
+                    bisect.insort(self._vocabulario, palabra)
+            postings.add(texto)
+
+    def agregar(self, registro: Dict[str, Any]):
+        """Indexa (o reindexa) una entidad."""
+        self.quitar(registro['id'])
+        texto = self._texto(tuple(registro.get(c) for c in self.campos))
+        if texto is not None:
+            self._ids[texto][registro['id']] = None
+            self._texto_de[registro['id']] = texto
+
+    def agregar_texto(self, valores: Iterable[Any], ids: Iterable[str]):
+        """Indexa de una vez todas las entidades con el mismo texto."""
+        texto = self._texto(tuple(valores))
+        if texto is None:
+            return
+        for id in ids:
+            self.quitar(id)
+            self._ids[texto][id] = None
+            self._texto_de[id] = texto
+
+    def quitar(self, id: str):
+        # El texto se conserva aunque quede sin IDs: es probable que vuelva
+        # a usarse y los textos vacíos no aparecen en los resultados
+        texto = self._texto_de.pop(id, None)
+        if texto is not None:
+            self._ids[texto].pop(id, None)
+
+    # -------------------------------------------------------------------------
+    # Búsqueda
+    # -------------------------------------------------------------------------
+
+    def _idf(self, palabra: str) -> float:
+        return math.log(1 + len(self._valores) / len(self._postings[palabra]))
+
+    def expansiones(self, palabra: str) -> Dict[str, float]:
+        """Palabras del vocabulario que coinciden con una de la búsqueda, con su peso."""
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self._postings)
+        pesos = {}
+        if palabra in self._postings:
+            pesos[palabra] = PESO_EXACTA
+        inicio = bisect.bisect_right(self._vocabulario, palabra)
+        fin = bisect.bisect_left(self._vocabulario, palabra + '\uffff', inicio)
+        prefijos = self._vocabulario[inicio:fin]
+        # Una sola letra apenas discrimina: se expande a menos palabras
+        maximo = MAX_EXPANSIONES_PREFIJO if len(palabra) > 1 else MAX_EXPANSIONES_PREFIJO // 4
+        if len(prefijos) > maximo:
+            prefijos = heapq.nlargest(maximo, prefijos, key=lambda p: len(self._postings[p]))
+        for candidata in prefijos:
+            pesos[candidata] = PESO_PREFIJO
+        if pesos or len(palabra) < MIN_LONGITUD_ERRATA:
+            return pesos
+
+        candidatas = set(self._por_borrado.get(palabra, ()))
+        for variante in _borrados(palabra):
+            candidatas.update(self._por_borrado.get(variante, ()))
+            if variante in self._postings:
+                candidatas.add(variante)
+        for candidata in candidatas:
+            if a_una_edicion(palabra, candidata):
+                pesos[candidata] = PESO_ERRATA
+        return pesos
+
+    def _coincidencia(self, palabra: str, palabras: Tuple[str, ...]) -> float:
+        """Mejor puntuación de una palabra de la consulta contra las de un texto."""
+        mejor = 0.0
+        for candidata in palabras:
+            if candidata == palabra:
+                peso = PESO_EXACTA
+            elif candidata.startswith(palabra):
+                peso = PESO_PREFIJO
+            elif len(palabra) >= MIN_LONGITUD_ERRATA and a_una_edicion(palabra, candidata):
+                peso = PESO_ERRATA
+            else:
+                continue
+            mejor = max(mejor, peso * self._idf(candidata))
+        return mejor
+
+    def buscar(self, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Entidades cuyo texto contiene todas las palabras de la consulta (o
+        un prefijo o una errata de cada una), de mayor a menor puntuación.
+        """
+        palabras = list(dict.fromkeys(normalizar(consulta, self.singular, conservar_ultima=True)))
+        if not palabras:
+            return []
+
+        # Se empieza por las palabras más largas (más selectivas). Cuando
+        # quedan pocos textos candidatos, las siguientes palabras se comparan
+        # directamente con ellos en vez de expandirse por el vocabulario
+        puntuaciones: Optional[Dict[int, float]] = None
+        for palabra in sorted(palabras, key=len, reverse=True):
+            if puntuaciones is not None and len(puntuaciones) <= MAX_CANDIDATOS_DIRECTOS:
+                nuevas = {}
+                for texto, acumulada in puntuaciones.items():
+                    puntuacion = self._coincidencia(palabra, self._palabras[texto])
+                    if puntuacion:
+                        nuevas[texto] = acumulada + puntuacion
+            else:
+                propias: Dict[int, float] = {}
+                for candidata, peso in self.expansiones(palabra).items():
+                    puntuacion = peso * self._idf(candidata)
+                    for texto in self._postings[candidata]:
+                        if puntuacion > propias.get(texto, 0.0):
+                            propias[texto] = puntuacion
+                if puntuaciones is None:
+                    nuevas = propias
+                else:
+                    nuevas = {t: p + propias[t] for t, p in puntuaciones.items() if t in propias}
+            if not nuevas:
+                return []
+            puntuaciones = nuevas
+
+        # Entre textos con las mismas coincidencias, los que tienen menos
+        # palabras sin buscar van primero. Cada texto con IDs aporta al
+        # menos una entidad, así que bastan los `limite` mejores
+        n = len(palabras)
+        mejores = heapq.nlargest(limite, (
+            (puntuacion / (1 + 0.1 * (len(self._palabras[t]) - n)), t)
+            for t, puntuacion in puntuaciones.items() if self._ids[t]
+        ))
+
+        resultados = []
+        for puntuacion, texto in mejores:
+            for id in self._ids[texto]:
+                resultado = {'id': id}
+                resultado.update(zip(self.campos, self._valores[texto]))
+                resultado['puntuacion'] = round(puntuacion, 4)
+                resultados.append(resultado)
+                if len(resultados) >= limite:
+                    return resultados
+        return resultados
+
+    # -------------------------------------------------------------------------
+    # Persistencia
+    # -------------------------------------------------------------------------
+
+    def exportar(self) -> List[List[Any]]:
+        """[valores..., [ids]] por texto con alguna entidad."""
+        return [list(valores) + [list(ids)] for valores, ids in zip(self._valores, self._ids) if ids]
+
+    def resumen(self) -> Dict[str, int]:
+        return {'entidades': len(self._texto_de), 'textos': len(self._valores), 'palabras': len(self._postings)}
+
+
+# =============================================================================
+# CONJUNTO DE ÍNDICES
+# =============================================================================
+
+class IndicesBusqueda:
+    """Índices de CAMPOS_BUSQUEDA con su instantánea en disco y el diario de cambios."""
+
+    def __init__(self, directorio: str = BUSQUEDA_DIRECTORIO):
+        self.directorio = directorio
+        self.indices = {
+            (entidad, nombre): IndiceTexto(entidad, nombre, campos, singular)
+            for entidad, indices in CAMPOS_BUSQUEDA.items()
+            for nombre, (campos, singular) in indices.items()
+        }
+        self.creado = datetime.utcnow().isoformat()
+        # Generación de la instantánea y del diario (None hasta guardarla)
+        self.generacion: Optional[str] = None
+        self._posicion_diario = 0
+        # Generación del diario que no corresponde a ninguna instantánea
+        # (reconstrucción a medias): no se vuelve a recargar por ella
+        self._generacion_descartada: Optional[str] = None
+        self._lock = threading.RLock()
+
+    @property
+    def ruta_diario(self) -> str:
+        return os.path.join(self.directorio, ARCHIVO_DIARIO)
+
+    def agregar(self, entidad: str, registro: Dict[str, Any]):
+        with self._lock:
+            for (tipo, _), indice in self.indices.items():
+                if tipo == entidad:
+                    indice.agregar(registro)
+
+    def quitar(self, entidad: str, id: str):
+        with self._lock:
+            for (tipo, _), indice in self.indices.items():
+                if tipo == entidad:
+                    indice.quitar(id)
+
+    def buscar(self, entidad: str, campo: str, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.al_dia()
+            return self.indices[(entidad, campo)].buscar(consulta, limite)
+
+    def al_dia(self, recargar: bool = True) -> int:
+        """
+        Aplica las líneas del diario escritas desde la última lectura. Si el
+        diario es de otra generación o más corto que la posición leída (otro
+        proceso ha reconstruido el índice) se recarga la instantánea.
+
+        Returns:
+            Líneas del diario aplicadas (0 si se recarga la instantánea)
+        """
+        try:
+            f = open(self.ruta_diario, 'rb')
+        except OSError:
+            return 0
+        aplicadas = 0
+        with self._lock, f:
+            generacion = _generacion_diario(f.readline())
+            tamaño = os.fstat(f.fileno()).st_size
+            if generacion != self.generacion or tamaño < self._posicion_diario:
+                if recargar and generacion != self._generacion_descartada:
+                    return self._recargar(generacion)
+                return 0
+            if tamaño == self._posicion_diario:
+                return 0
+            f.seek(self._posicion_diario)
+            for linea in f:
+                # Una línea a medio escribir por otro proceso se lee después
+                if not linea.endswith(b'\n'):
+                    break
+                self._posicion_diario += len(linea)
+                cambio = json.loads(linea)
+                if cambio['registro'] is None:
+                    self.quitar(cambio['entidad'], cambio['id'])
+                else:
+                    self.agregar(cambio['entidad'], cambio['registro'])
+                aplicadas += 1
+        return aplicadas
+
+    def _recargar(self, generacion: Optional[str]) -> int:
+        """Sustituye el contenido por la instantánea en disco si es de `generacion`."""
+        nuevos = IndicesBusqueda.cargar(self.directorio)
+        if nuevos is None or nuevos.generacion != generacion:
+            # La instantánea aún no es la del diario: se espera a la siguiente
+            self._generacion_descartada = generacion
+            return 0
+        self.indices = nuevos.indices
+        self.creado = nuevos.creado
+        self.generacion = nuevos.generacion
+        self._posicion_diario = nuevos._posicion_diario
+        self._generacion_descartada = None
+        return 0
+
+    # -------------------------------------------------------------------------
+    # Construcción y persistencia
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def desde_registros(cls, registros: Dict[str, Iterable[Dict[str, Any]]],
+                        directorio: str = BUSQUEDA_DIRECTORIO) -> 'IndicesBusqueda':
+        indices = cls(directorio)
+        for entidad, lista in registros.items():
+            for registro in lista:
+                indices.agregar(entidad, registro)
+        return indices
+
+    @classmethod
+    def desde_generador(cls, semilla: int, volumen: Dict[str, int],
+                        directorio: str = BUSQUEDA_DIRECTORIO) -> 'IndicesBusqueda':
+        from utils.data_generator import DataGenerator
+        generador = DataGenerator(semilla, volumen)
+        return cls.desde_registros({e: generador.generar(e) for e in CAMPOS_BUSQUEDA}, directorio)
+
+    @classmethod
+    def desde_mongodb(cls, db: Any, directorio: str = BUSQUEDA_DIRECTORIO) -> 'IndicesBusqueda':
+        def registros(entidad):
+            campos = {c for campos, _ in CAMPOS_BUSQUEDA[entidad].values() for c in campos}
+            for documento in db[entidad].find({}, {c: 1 for c in campos}).batch_size(10000):
+                documento['id'] = documento.pop('_id')
+                yield documento
+        return cls.desde_registros({e: registros(e) for e in CAMPOS_BUSQUEDA}, directorio)
+
+    def guardar(self, reiniciar_diario: bool = False):
+        """
+        Escribe la instantánea (de forma atómica). Con reiniciar_diario (solo
+        tras una reconstrucción completa; también si el índice no se había
+        guardado nunca) se abre una generación nueva: primero la instantánea
+        y después un diario vacío con su cabecera, que sustituye al anterior.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            cabecera = None
+            if reiniciar_diario or self.generacion is None:
+                self.generacion = uuid.uuid4().hex
+                cabecera = (json.dumps({'generacion': self.generacion}) + '\n').encode('utf-8')
+                self._posicion_diario = len(cabecera)
+            contenido = {
+                'creado': self.creado,
+                'generacion': self.generacion,
+                'diario': self._posicion_diario,
+                'indices': {f"{e}.{n}": indice.exportar() for (e, n), indice in self.indices.items()},
+            }
+        _escribir_atomico(os.path.join(self.directorio, ARCHIVO_INDICE),
+                          lambda f: f.write(json.dumps(contenido, ensure_ascii=False).encode('utf-8')),
+                          comprimir=True)
+        if cabecera is not None:
+            _escribir_atomico(self.ruta_diario, lambda f: f.write(cabecera))
+
+    @classmethod
+    def cargar(cls, directorio: str = BUSQUEDA_DIRECTORIO) -> Optional['IndicesBusqueda']:
+        """Instantánea más el diario posterior, o None si no se ha construido."""
+        ruta = os.path.join(directorio, ARCHIVO_INDICE)
+        if not os.path.exists(ruta):
+            return None
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            contenido = json.load(f)
+        indices = cls(directorio)
+        indices.creado = contenido['creado']
+        indices.generacion = contenido['generacion']
+        indices._posicion_diario = contenido['diario']
+        for clave, textos in contenido['indices'].items():
+            entidad, nombre = clave.split('.', 1)
+            indice = indices.indices.get((entidad, nombre))
+            if indice is None:
+                continue
+            for fila in textos:
+                indice.agregar_texto(fila[:-1], fila[-1])
+        indices.al_dia(recargar=False)
+        return indices
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        return {f"{e}.{n}": indice.resumen() for (e, n), indice in self.indices.items()}
+
+
+def _generacion_diario(primera: bytes) -> Optional[str]:
+    """Generación de la cabecera del diario (None si falta o está a medias)."""
+    if not primera.endswith(b'\n'):
+        return None
+    try:
+        return json.loads(primera).get('generacion')
+    except (ValueError, AttributeError):
+        return None
+
+
+def _escribir_atomico(ruta: str, escribir: Any, comprimir: bool = False):
+    """
+    Escribe en un temporal propio del mismo directorio y lo renombra sobre
+    `ruta`: dos procesos que reconstruyen a la vez no comparten temporal.
+    """
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=os.path.basename(ruta) + '.')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            if comprimir:
+                with gzip.GzipFile(fileobj=f, mode='wb') as comprimido:
+                    escribir(comprimido)
+            else:
+                escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+_indices: Optional[IndicesBusqueda] = None
+_indices_lock = threading.Lock()
+
+
+def obtener_indices() -> Optional[IndicesBusqueda]:
+    """Índices del proceso, cargados del disco la primera vez (None si no existen)."""
+    global _indices
+    with _indices_lock:
+        if _indices is None:
+            try:
+                _indices = IndicesBusqueda.cargar()
+            except (OSError, ValueError) as e:
+                print(f"⚠ No se pudo cargar el índice de búsqueda: {e}")
+        return _indices
+
+
+def fijar_indices(indices: IndicesBusqueda):
+    """Sustituye los índices del proceso (tras construirlos, pruebas manuales)."""
+    global _indices
+    with _indices_lock:
+        _indices = indices
+
+
+def indexar_crud(opcion: str, registro: Dict[str, Any], directorio: str = BUSQUEDA_DIRECTORIO):
+    """
+    Lleva una escritura de menu_crud al índice: la añade al diario (para
+    los demás procesos y la próxima carga) y la aplica si está cargado.
+    """
+    if opcion not in OPCIONES_CRUD:
+        return
+    entidad, operacion = OPCIONES_CRUD[opcion]
+    campos = {c for campos, _ in CAMPOS_BUSQUEDA[entidad].values() for c in campos}
+    cambio = {
+        'entidad': entidad,
+        'id': registro['id'],
+        'registro': None if operacion == 'baja' else {c: registro.get(c) for c in campos | {'id'}},
+    }
+    try:
+        # Una sola escritura en modo append por línea: las de varios
+        # procesos no se mezclan. Sin diario no hay índice construido (la
+        # construcción lo crea con su cabecera) y no hay nada que registrar
+        ruta = os.path.join(directorio, ARCHIVO_DIARIO)
+        if os.path.exists(ruta):
+            with open(ruta, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(cambio, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"⚠ No se pudo registrar el cambio en el índice de búsqueda: {e}")
+    if _indices is not None and _indices.directorio == directorio:
+        if cambio['registro'] is None:
+            _indices.quitar(entidad, registro['id'])
+        else:
+            _indices.agregar(entidad, cambio['registro'])
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def _con_errata(palabra: str, aleatorio: random.Random) -> str:
+    if len(palabra) < MIN_LONGITUD_ERRATA:
+        return palabra
+    i = aleatorio.randrange(len(palabra) - 1)
+    return palabra[:i] + palabra[i + 1] + palabra[i] + palabra[i + 2:]
+
+
+def medir_autocompletado(indices: IndicesBusqueda, consultas: int = 2000, semilla: int = 7) -> List[Dict[str, Any]]:
+    """
+    Latencia de búsquedas tecleadas: prefijos de 1 a n letras de textos
+    indexados y, una de cada cuatro, con una errata en la palabra completa.
+    """
+    aleatorio = random.Random(semilla)
+    filas = []
+    for (entidad, nombre), indice in indices.indices.items():
+        textos = [' '.join(str(v) for v in valores if v) for valores in indice._valores]
+        if not textos:
+            continue
+        tiempos = []
+        resultados = 0
+        for _ in range(consultas):
+            palabras = aleatorio.choice(textos).split()[:2]
+            if aleatorio.random() < 0.25:
+                consulta = ' '.join(_con_errata(p.lower(), aleatorio) for p in palabras)
+            else:
+                ultima = palabras[-1]
+                consulta = ' '.join(palabras[:-1] + [ultima[:aleatorio.randint(1, len(ultima))]])
+            inicio = time.perf_counter()
+            resultados += bool(indices.buscar(entidad, nombre, consulta, 10))
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+        filas.append({
+            'indice': f"{entidad}.{nombre}",
+            'consultas': consultas,
+            'con_resultados': resultados,
+            'p50_ms': round(tiempos[len(tiempos) // 2] * 1000, 3),
+            'p99_ms': round(tiempos[int(len(tiempos) * 0.99)] * 1000, 3),
+            'max_ms': round(tiempos[-1] * 1000, 3),
+        })
+    return filas
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    """Construye, consulta o mide el índice de búsqueda de texto."""
+    parser = argparse.ArgumentParser(description="Índice de búsqueda de texto (nombres, diagnósticos, medicamentos)")
+    parser.add_argument('--construir', action='store_true', help="Reconstruir el índice y guardarlo")
+    parser.add_argument('--fuente', choices=['generador', 'mongodb'], default='generador')
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--buscar', default=None, help="Texto a buscar")
+    parser.add_argument('--entidad', default='pacientes', choices=list(CAMPOS_BUSQUEDA))
+    parser.add_argument('--campo', default=None, help="Índice de la entidad (por defecto el primero)")
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--benchmark', action='store_true', help="Medir la latencia de autocompletado")
+    args = parser.parse_args()
+
+    if args.construir:
+        inicio = time.perf_counter()
+        if args.fuente == 'mongodb':
+            from connect import conectar_mongodb
+            db = conectar_mongodb()
+            if db is None:
+                print("✗ MongoDB no disponible")
+                return
+            indices = IndicesBusqueda.desde_mongodb(db)
+        else:
+            from utils.data_generator import SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen
+            volumen = calcular_volumen(args.citas) if args.citas else dict(VOLUMEN_BASE)
+            semilla = SEMILLA_POR_DEFECTO if args.semilla is None else args.semilla
+            indices = IndicesBusqueda.desde_generador(semilla, volumen)
+        indices.guardar(reiniciar_diario=True)
+        print(f"✓ Índice construido desde {args.fuente} en {time.perf_counter() - inicio:.2f}s "
+              f"({os.path.join(indices.directorio, ARCHIVO_INDICE)})")
+        for clave, resumen in indices.resumen().items():
+            print(f"  {clave:<30} {resumen['entidades']:>10,} entidades "
+                  f"{resumen['textos']:>9,} textos {resumen['palabras']:>8,} palabras")
+        fijar_indices(indices)
+
+    indices = obtener_indices()
+    if indices is None:
+        if args.buscar or args.benchmark:
+            print("✗ No hay índice: ejecuta primero con --construir")
+        return
+
+    if args.buscar:
+        campo = args.campo or next(iter(CAMPOS_BUSQUEDA[args.entidad]))
+        inicio = time.perf_counter()
+        resultados = indices.buscar(args.entidad, campo, args.buscar, args.limite)
+        print(f"\n{len(resultados)} resultados para '{args.buscar}' en {args.entidad}.{campo} "
+              f"({(time.perf_counter() - inicio) * 1000:.2f} ms)")
+        for resultado in resultados:
+            print("  " + json.dumps(resultado, ensure_ascii=False))
+
+    if args.benchmark:
+        print(f"\n{'Índice':<30} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8} {'con resultados':>15}")
+        for fila in medir_autocompletado(indices):
+            print(f"{fila['indice']:<30} {fila['p50_ms']:>8} {fila['p99_ms']:>8} {fila['max_ms']:>8} "
+                  f"{fila['con_resultados']:>8,}/{fila['consultas']:,}")
+            print(f"  {'✓' if fila['p99_ms'] < 5 else '✗'} p99 {'<' if fila['p99_ms'] < 5 else '>='} 5 ms")
+
+
+if __name__ == "__main__":
+    main()
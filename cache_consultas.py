@@ -0,0 +1,423 @@
+"""
+Caché de Consultas
+Plataforma de Integración de Datos de Salud
+
+Caché de lectura delante de catalogo_consultas para las búsquedas que se
+repiten constantemente en recepción (paciente por email, historial
+completo, estadísticas de hospital...) sobre datos que cambian poco.
+
+- Nivel local: LRU en memoria del proceso, acotado en número de entradas
+- Nivel compartido (opcional, CACHE_COMPARTIDA=1): colección de MongoDB
+  con índice TTL, útil cuando hay varios procesos o equipos de recepción
+- La clave es consulta + variables; cada consulta tiene su propio TTL
+- Cada resultado se etiqueta con las entidades de las que depende
+  (paciente:P00000001, doctor:D000001, hospital:H00001), tomadas de las
+  variables y de los IDs presentes en el propio resultado. Las escrituras
+  del menú CRUD invalidan por etiqueta con invalidar_por_crud()
+- Una lectura que empezó antes de una invalidación de sus etiquetas no
+  guarda su resultado: podría ser anterior a la escritura. La comprobación
+  es por proceso; entre procesos, el nivel compartido puede guardar un
+  resultado así hasta su TTL
+- Los resultados se devuelven como copias: modificarlos no altera la caché
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Callable, Iterable, Set, Tuple
+
+from catalogo_consultas import obtener_consulta
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Entradas máximas del nivel local
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', 10000))
+
+# TTL de las consultas sin TTL propio
+CACHE_TTL_DEFECTO_SEG = float(os.getenv('CACHE_TTL_DEFECTO_SEG', 60))
+
+# Activa el nivel compartido en MongoDB
+CACHE_COMPARTIDA = os.getenv('CACHE_COMPARTIDA', '0') == '1'
+
+COLECCION_CACHE = 'cache_consultas'
+
+# TTL por consulta del catálogo: las fichas cambian poco, los listados y
+# los agregados globales se recalculan con más frecuencia
+TTL_POR_CONSULTA = {
+    'paciente_por_email': 600,
+    'historial_completo': 300,
+    'recetas_paciente': 120,
+    'doctores_hospital': 900,
+    'estadisticas_hospital': 600,
+    'hospitales_urgencias': 3600,
+    'doctores_por_especialidad': 900,
+    'doctores_experiencia': 900,
+    'diagnosticos_icd10': 300,
+    'medicamentos_top': 300,
+    'especialidades_demandadas': 300,
+    'citas_por_fecha': 30,
+    'agenda_doctor': 30,
+}
+
+# Variables del catálogo que identifican una entidad
+VARIABLES_ENTIDAD = {'paciente': 'paciente', 'doctor': 'doctor', 'hospital': 'hospital'}
+
+# Opción de menu_crud -> (tipo de entidad, campo del registro con su ID)
+INVALIDACIONES_CRUD = {
+    '1': [('paciente', 'id')],
+    '2': [('paciente', 'id')],
+    '3': [('paciente', 'id')],
+    '4': [('doctor', 'id'), ('hospital', 'hospital_id')],
+    '5': [('doctor', 'id'), ('hospital', 'hospital_id')],
+    '6': [('hospital', 'id')],
+    '7': [('paciente', 'paciente_id'), ('doctor', 'doctor_id')],
+    '8': [('paciente', 'paciente_id'), ('doctor', 'doctor_id')],
+    '9': [('paciente', 'paciente_id'), ('doctor', 'doctor_id')],
+    '10': [('paciente', 'paciente_id')],
+    '11': [('paciente', 'paciente_id'), ('doctor', 'doctor_id')],
+    '12': [('paciente', 'paciente_id')],
+    '13': [],
+    '14': [('paciente', 'paciente_id')],
+}
+
+# Listados y agregados sin una entidad concreta: se invalidan cuando una
+# opción de menu_crud crea o elimina entidades, incluidas las citas
+# (especialidades_demandadas) y las recetas (medicamentos_top)
+CONSULTAS_GLOBALES = (
+    'medicamentos_top', 'especialidades_demandadas', 'pacientes_tipo_sangre',
+    'hospitales_urgencias', 'doctores_por_especialidad', 'doctores_experiencia',
+)
+OPCIONES_ALTA_BAJA = {'1', '3', '4', '6', '7', '11', '13'}
+
+# Invalidaciones recientes recordadas para descartar lecturas en curso
+MAX_INVALIDACIONES_RECORDADAS = 10000
+
+# Prefijo del ID de cada entidad en los resultados de Dgraph
+_PREDICADOS_ID = {'paciente.id': 'paciente', 'doctor.id': 'doctor', 'hospital.id': 'hospital'}
+
+
+def etiqueta(tipo: str, id: str) -> str:
+    return f"{tipo}:{id}"
+
+
+def clave_consulta(nombre: str, valores: Dict[str, Any]) -> str:
+    """Clave estable de una consulta con sus variables."""
+    return nombre + '|' + json.dumps(valores, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def _etiquetas_resultado(resultado: Any, etiquetas: Set[str], profundidad: int = 0):
+    # Los IDs de entidades relevantes aparecen en los primeros niveles
+    if profundidad > 4:
+        return
+    if isinstance(resultado, dict):
+        for campo, valor in resultado.items():
+            if campo in _PREDICADOS_ID and isinstance(valor, str):
+                etiquetas.add(etiqueta(_PREDICADOS_ID[campo], valor))
+            elif isinstance(valor, (dict, list)):
+                _etiquetas_resultado(valor, etiquetas, profundidad + 1)
+    elif isinstance(resultado, list):
+        for elemento in resultado:
+            _etiquetas_resultado(elemento, etiquetas, profundidad + 1)
+
+
+def copiar(valor: Any) -> Any:
+    """Copia de un resultado JSON (dicts, listas y escalares), más rápida que deepcopy."""
+    if isinstance(valor, dict):
+        return {k: copiar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [copiar(v) for v in valor]
+    return valor
+
+
+def etiquetas_de(nombre: str, valores: Dict[str, Any], resultado: Any) -> Set[str]:
+    """Entidades de las que depende un resultado."""
+    etiquetas = {etiqueta('consulta', nombre)}
+    for variable, tipo in VARIABLES_ENTIDAD.items():
+        if variable in valores:
+            etiquetas.add(etiqueta(tipo, valores[variable]))
+    _etiquetas_resultado(resultado, etiquetas)
+    return etiquetas
+
+
+# =============================================================================
+# NIVEL LOCAL
+# =============================================================================
+
+class CacheLRU:
+    """
+    LRU en memoria con expiración por entrada e índice de etiquetas.
+
+    Cada invalidación incrementa una generación y anota, por etiqueta, la
+    generación en que se invalidó. guardar() recibe la generación leída
+    antes de la consulta y descarta el resultado si alguna de sus etiquetas
+    se invalidó después.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._entradas: 'OrderedDict[str, Tuple[Any, float, Set[str]]]' = OrderedDict()
+        self._por_etiqueta: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._generacion = 0
+        self._invalidada_en: 'OrderedDict[str, int]' = OrderedDict()
+        # Las lecturas anteriores a la invalidación más antigua olvidada no
+        # se pueden comprobar y no se guardan
+        self._generacion_minima = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartadas = 0
+
+    def generacion(self) -> int:
+        """Generación actual, a leer antes de ejecutar la consulta."""
+        with self._lock:
+            return self._generacion
+
+    def obtener(self, clave: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[1] <= time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return False, None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return True, entrada[0]
+
+    def guardar(self, clave: str, valor: Any, ttl: float, etiquetas: Iterable[str],
+                desde: Optional[int] = None) -> bool:
+        """
+        Guarda un resultado leído en la generación `desde`. Retorna False si
+        alguna de sus etiquetas se invalidó después y no lo guarda.
+        """
+        with self._lock:
+            etiquetas = set(etiquetas)
+            if desde is not None and desde < self._generacion and (
+                    desde < self._generacion_minima
+                    or any(self._invalidada_en.get(e, 0) > desde for e in etiquetas)):
+                self.descartadas += 1
+                return False
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, time.monotonic() + ttl, etiquetas)
+            for e in etiquetas:
+                self._por_etiqueta.setdefault(e, set()).add(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+            return True
+
+    def _quitar(self, clave: str):
+        _, _, etiquetas = self._entradas.pop(clave)
+        for e in etiquetas:
+            claves = self._por_etiqueta.get(e)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[e]
+
+    def invalidar(self, etiquetas: Iterable[str]) -> int:
+        """Elimina las entradas con alguna de las etiquetas. Retorna cuántas."""
+        with self._lock:
+            self._generacion += 1
+            claves = set()
+            for e in etiquetas:
+                claves |= self._por_etiqueta.get(e, set())
+                self._invalidada_en[e] = self._generacion
+                self._invalidada_en.move_to_end(e)
+            while len(self._invalidada_en) > MAX_INVALIDACIONES_RECORDADAS:
+                _, generacion = self._invalidada_en.popitem(last=False)
+                self._generacion_minima = max(self._generacion_minima, generacion)
+            for clave in claves:
+                self._quitar(clave)
+            return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_etiqueta.clear()
+            # Las lecturas en curso no pueden guardar lo leído antes de limpiar
+            self._generacion += 1
+            self._generacion_minima = self._generacion
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+# =============================================================================
+# NIVEL COMPARTIDO (MONGODB)
+# =============================================================================
+
+class CacheCompartida:
+    """
+    Caché en una colección de MongoDB con índice TTL.
+
+    Los errores se ignoran: si MongoDB no está disponible la consulta se
+    resuelve igualmente contra Dgraph.
+    """
+
+    def __init__(self, db: Any):
+        self.coleccion = db[COLECCION_CACHE]
+        self._indices_creados = False
+
+    def _asegurar_indices(self):
+        if not self._indices_creados:
+            self.coleccion.create_index('expira', expireAfterSeconds=0, name='expiracion')
+            self.coleccion.create_index('etiquetas', name='etiquetas')
+            self._indices_creados = True
+
+    def obtener(self, clave: str) -> Tuple[bool, Any]:
+        try:
+            documento = self.coleccion.find_one({'_id': clave, 'expira': {'$gt': datetime.utcnow()}})
+        except Exception:
+            return False, None
+        if documento is None:
+            return False, None
+        return True, json.loads(documento['valor'])
+
+    def guardar(self, clave: str, valor: Any, ttl: float, etiquetas: Iterable[str]):
+        try:
+            self._asegurar_indices()
+            self.coleccion.replace_one({'_id': clave}, {
+                '_id': clave,
+                # Serializado: los resultados de Dgraph pueden tener claves con '.'
+                'valor': json.dumps(valor, ensure_ascii=False),
+                'etiquetas': sorted(etiquetas),
+                'expira': datetime.utcnow() + timedelta(seconds=ttl),
+            }, upsert=True)
+        except Exception:
+            pass
+
+    def invalidar(self, etiquetas: Iterable[str]) -> int:
+        try:
+            return self.coleccion.delete_many({'etiquetas': {'$in': list(etiquetas)}}).deleted_count
+        except Exception:
+            return 0
+
+
+# =============================================================================
+# CACHÉ DE DOS NIVELES
+# =============================================================================
+
+class CacheConsultas:
+    """Caché de lectura para las consultas del catálogo."""
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS, compartida: Optional[CacheCompartida] = None):
+        self.local = CacheLRU(max_entradas)
+        self.compartida = compartida
+
+    def consultar(self, cliente: Any, nombre: str, /, **valores) -> Dict[str, Any]:
+        """Ejecuta una consulta del catálogo, usando la caché si es posible."""
+        consulta = obtener_consulta(nombre)
+        return self._consultar(nombre, valores, lambda: consulta.ejecutar(cliente, **valores))
+
+    def consultar_generada(self, cliente: Any, nombre: str, consulta: Any,
+                           valores: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta una consulta generada al vuelo (p. ej. con una lista literal
+        en eq(), que las variables DQL no admiten). Se guarda en la caché
+        como `nombre` con `valores`, que deben identificar su texto.
+        """
+        return self._consultar(nombre, valores, lambda: consulta.ejecutar(cliente))
+
+    def _consultar(self, nombre: str, valores: Dict[str, Any], ejecutar: Callable[[], Any]) -> Dict[str, Any]:
+        clave = clave_consulta(nombre, valores)
+
+        encontrado, resultado = self.local.obtener(clave)
+        if encontrado:
+            return copiar(resultado)
+
+        # Generación antes de leer: si durante la lectura se invalidan sus
+        # etiquetas, el resultado puede ser anterior a la escritura
+        desde = self.local.generacion()
+        ttl = TTL_POR_CONSULTA.get(nombre, CACHE_TTL_DEFECTO_SEG)
+        if self.compartida is not None:
+            encontrado, resultado = self.compartida.obtener(clave)
+            if encontrado:
+                self.local.guardar(clave, resultado, ttl, etiquetas_de(nombre, valores, resultado), desde)
+                return copiar(resultado)
+
+        resultado = ejecutar()
+        etiquetas = etiquetas_de(nombre, valores, resultado)
+        if self.local.guardar(clave, resultado, ttl, etiquetas, desde) and self.compartida is not None:
+            self.compartida.guardar(clave, resultado, ttl, etiquetas)
+        return copiar(resultado)
+
+    def invalidar(self, etiquetas: Iterable[str]) -> int:
+        etiquetas = list(etiquetas)
+        eliminadas = self.local.invalidar(etiquetas)
+        if self.compartida is not None:
+            eliminadas += self.compartida.invalidar(etiquetas)
+        return eliminadas
+
+    def estadisticas(self) -> Dict[str, Any]:
+        total = self.local.aciertos + self.local.fallos
+        return {
+            'entradas': len(self.local),
+            'aciertos': self.local.aciertos,
+            'fallos': self.local.fallos,
+            'descartadas': self.local.descartadas,
+            'tasa_aciertos': round(self.local.aciertos / total, 4) if total else 0.0,
+            'compartida': self.compartida is not None,
+        }
+
+
+_cache: Optional[CacheConsultas] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache() -> CacheConsultas:
+    """Retorna la caché compartida del proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            compartida = None
+            if CACHE_COMPARTIDA:
+                from connect import conectar_mongodb
+                db = conectar_mongodb()
+                if db is not None:
+                    compartida = CacheCompartida(db)
+            _cache = CacheConsultas(compartida=compartida)
+        return _cache
+
+
+def consultar(cliente: Any, nombre: str, /, **valores) -> Dict[str, Any]:
+    """Atajo de obtener_cache().consultar()."""
+    return obtener_cache().consultar(cliente, nombre, **valores)
+
+
+def consultar_generada(cliente: Any, nombre: str, consulta: Any, valores: Dict[str, Any]) -> Dict[str, Any]:
+    """Atajo de obtener_cache().consultar_generada()."""
+    return obtener_cache().consultar_generada(cliente, nombre, consulta, valores)
+
+
+def invalidar_entidad(tipo: str, id: str) -> int:
+    """Invalida los resultados que dependen de una entidad."""
+    return obtener_cache().invalidar([etiqueta(tipo, id)])
+
+
+def invalidar_por_crud(opcion: str, registro: Dict[str, Any]) -> int:
+    """
+    Invalida lo afectado por una operación de menu_crud.
+
+    Args:
+        opcion: Opción de menu_crud ('1'..'14')
+        registro: Registro escrito, con el formato de utils.data_generator
+
+    Returns:
+        Número de entradas eliminadas
+    """
+    etiquetas = [
+        etiqueta(tipo, registro[campo])
+        for tipo, campo in INVALIDACIONES_CRUD.get(opcion, [])
+        if registro.get(campo)
+    ]
+    if opcion in OPCIONES_ALTA_BAJA:
+        etiquetas += [etiqueta('consulta', nombre) for nombre in CONSULTAS_GLOBALES]
+    if not etiquetas:
+        return 0
+    return obtener_cache().invalidar(etiquetas)
@@ -0,0 +1,779 @@
+"""
+Catálogo de Consultas Parametrizadas de Dgraph
+Plataforma de Integración de Datos de Salud
+
+Versión ejecutable de las 20 consultas de Dgraph/queries_examples.py. En
+lugar de literales ("juan.perez@email.com", "P001", "Cardiología") cada
+consulta declara variables DQL ($email, $paciente, ...) que se envían
+aparte con txn.query(consulta, variables=...):
+
+- El texto de cada consulta es siempre el mismo, se construye una sola vez
+  al importar el módulo y se interna con sys.intern()
+- Los valores nunca se concatenan en el texto, por lo que no es posible
+  inyectar DQL desde un parámetro
+- Al cargar el catálogo se comprueba contra Dgraph/schema.rdf que cada
+  variable se usa sobre un predicado existente, con un tipo compatible y
+  con el índice que requiere la función (eq, between, alloftext...)
+- Los listados que pueden crecer sin límite (first: $limite, after:
+  $despues) se recorren con paginar_consulta(), un generador que pide una
+  página cada vez usando el último uid como cursor
+- iterar_consulta() decodifica la respuesta de forma incremental
+  (utils/decodificador_dgraph) y produce registros compactos con
+  __slots__ en lugar de diccionarios
+
+Los valores de ejemplo de cada consulta son los literales originales de
+queries_examples.py.
+
+Uso:
+    from catalogo_consultas import ejecutar_consulta
+    ejecutar_consulta(cliente, 'paciente_por_email', email='juan.perez@email.com')
+    for paciente in paginar_consulta(cliente, 'pacientes_tipo_sangre', tipo_sangre='O+'):
+        ...
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
+
+from utils.decodificador_dgraph import decodificar
+
+# =============================================================================
+# SCHEMA DE DGRAPH
+# =============================================================================
+
+RUTA_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dgraph', 'schema.rdf')
+
+_PATRON_PREDICADO = re.compile(r'^([\w.]+)\s*:\s*(\[?\w+\]?)\s*(.*?)\s*\.\s*$')
+_PATRON_INDICE = re.compile(r'@index\(([^)]*)\)')
+
+
+def cargar_schema(ruta: str = RUTA_SCHEMA) -> Dict[str, Dict[str, Any]]:
+    """
+    Lee las definiciones de predicados de schema.rdf.
+
+    Returns:
+        Diccionario predicado -> {'tipo', 'lista', 'indices', 'directivas'}
+    """
+    predicados = {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.split('#', 1)[0].strip()
+            coincidencia = _PATRON_PREDICADO.match(linea)
+            if not coincidencia:
+                continue
+            nombre, tipo, resto = coincidencia.groups()
+            indice = _PATRON_INDICE.search(resto)
+            predicados[nombre] = {
+                'tipo': tipo.strip('[]'),
+                'lista': tipo.startswith('['),
+                'indices': {i.strip() for i in indice.group(1).split(',')} if indice else set(),
+                'directivas': set(re.findall(r'@(\w+)', resto)) - {'index'},
+            }
+    return predicados
+
+
+# =============================================================================
+# VALIDACIÓN
+# =============================================================================
+
+# Tipo de variable DQL aceptado por cada tipo de predicado
+TIPO_VARIABLE = {
+    'string': 'string',
+    'datetime': 'string',
+    'int': 'int',
+    'float': 'float',
+    'bool': 'bool',
+}
+
+_INDICES_ORDENABLES = {'exact', 'int', 'float', 'year', 'month', 'day', 'hour'}
+
+# Función DQL -> índices que la resuelven (cualquiera de ellos)
+INDICES_REQUERIDOS = {
+    'eq': {'exact', 'hash', 'term', 'int', 'float', 'bool', 'year', 'month', 'day', 'hour'},
+    'ge': _INDICES_ORDENABLES,
+    'gt': _INDICES_ORDENABLES,
+    'le': _INDICES_ORDENABLES,
+    'lt': _INDICES_ORDENABLES,
+    'between': _INDICES_ORDENABLES,
+    'allofterms': {'term'},
+    'anyofterms': {'term'},
+    'alloftext': {'fulltext'},
+    'anyoftext': {'fulltext'},
+    'regexp': {'trigram'},
+}
+
+_PATRON_CABECERA = re.compile(r'^\s*query\s+\w+\s*\(([^)]*)\)', re.S)
+_PATRON_DECLARACION = re.compile(r'\$(\w+)\s*:\s*(\w+)(?:\s*=\s*([^,]+))?')
+_PATRON_FUNCION = re.compile(r'\b(' + '|'.join(INDICES_REQUERIDOS) + r')\(\s*([\w.]+)\s*,([^()]*)\)')
+_PATRON_VARIABLE = re.compile(r'\$(\w+)')
+_PATRON_PAGINADO = re.compile(r'(\w+)\s*\(\s*func\s*:[^\n]*\bafter\s*:\s*\$despues')
+_PATRON_BLOQUE = re.compile(r'^\s*(\w+)\s*(?:as\s+\w+\s*)?\(\s*func\s*:', re.M)
+
+# Variables reservadas para la paginación por cursor
+VARIABLE_TAM_PAGINA = 'limite'
+VARIABLE_CURSOR = 'despues'
+
+# Resultados por página por defecto al paginar
+TAM_PAGINA = 1000
+
+
+class ErrorCatalogo(ValueError):
+    """Consulta del catálogo incoherente con el schema o mal invocada."""
+
+
+class ConsultaParametrizada:
+    """Consulta DQL con variables, validada contra el schema."""
+
+    __slots__ = ('nombre', 'descripcion', 'texto', 'variables', 'opcionales', 'ejemplo',
+                 'bloque_paginado', 'bloque_principal')
+
+    def __init__(self, nombre: str, descripcion: str, texto: str, ejemplo: Dict[str, Any]):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.texto = sys.intern(texto.strip())
+        self.variables, self.opcionales = self._leer_cabecera()
+        self.ejemplo = ejemplo
+        paginado = _PATRON_PAGINADO.search(self.texto)
+        self.bloque_paginado = paginado.group(1) if paginado else None
+        bloques = [b for b in _PATRON_BLOQUE.findall(self.texto) if b != 'var']
+        self.bloque_principal = bloques[0] if bloques else None
+
+    def _leer_cabecera(self) -> Tuple[Dict[str, str], Set[str]]:
+        cabecera = _PATRON_CABECERA.match(self.texto)
+        if cabecera is None:
+            return {}, set()
+        variables, opcionales = {}, set()
+        for nombre, tipo, por_defecto in _PATRON_DECLARACION.findall(cabecera.group(1)):
+            variables[nombre] = tipo
+            if por_defecto:
+                opcionales.add(nombre)
+        return variables, opcionales
+
+    def validar(self, schema: Dict[str, Dict[str, Any]]):
+        """
+        Comprueba las variables contra el schema.
+
+        Raises:
+            ErrorCatalogo: Con la descripción del primer problema encontrado
+        """
+        cuerpo = self.texto[_PATRON_CABECERA.match(self.texto).end():] if self.variables else self.texto
+        usadas = set(_PATRON_VARIABLE.findall(cuerpo))
+
+        for nombre in usadas - set(self.variables):
+            raise ErrorCatalogo(f"{self.nombre}: ${nombre} se usa sin declarar")
+        for nombre in set(self.variables) - usadas:
+            raise ErrorCatalogo(f"{self.nombre}: ${nombre} está declarada y no se usa")
+        for nombre, tipo in self.variables.items():
+            if tipo not in set(TIPO_VARIABLE.values()):
+                raise ErrorCatalogo(f"{self.nombre}: ${nombre} tiene un tipo DQL inválido ({tipo})")
+
+        for funcion, predicado, argumentos in _PATRON_FUNCION.findall(cuerpo):
+            if predicado not in schema:
+                raise ErrorCatalogo(f"{self.nombre}: {predicado} no existe en schema.rdf")
+            definicion = schema[predicado]
+            if not definicion['indices'] & INDICES_REQUERIDOS[funcion]:
+                raise ErrorCatalogo(
+                    f"{self.nombre}: {funcion}({predicado}) requiere un índice "
+                    f"{sorted(INDICES_REQUERIDOS[funcion])} y el schema tiene {sorted(definicion['indices'])}"
+                )
+            esperado = TIPO_VARIABLE.get(definicion['tipo'])
+            for nombre in _PATRON_VARIABLE.findall(argumentos):
+                if self.variables[nombre] != esperado:
+                    raise ErrorCatalogo(
+                        f"{self.nombre}: ${nombre} es {self.variables[nombre]} pero "
+                        f"{predicado} es {definicion['tipo']} (se esperaba {esperado})"
+                    )
+
+        for nombre in self.variables:
+            if nombre not in self.ejemplo and nombre not in self.opcionales:
+                raise ErrorCatalogo(f"{self.nombre}: falta el valor de ejemplo de ${nombre}")
+
+        if self.bloque_paginado:
+            cabecera = re.search(r'\b' + self.bloque_paginado + r'\s*\(\s*func\s*:[^{]*', cuerpo).group()
+            if self.variables.get(VARIABLE_TAM_PAGINA) != 'int' or 'first' not in cabecera:
+                raise ErrorCatalogo(f"{self.nombre}: la paginación necesita first: ${VARIABLE_TAM_PAGINA} (int)")
+            if re.search(r'\border(?:asc|desc)\s*:', cabecera):
+                raise ErrorCatalogo(f"{self.nombre}: after: solo es válido con el orden por uid")
+            if not re.search(r'\{\s*uid\b', cuerpo[cuerpo.index(cabecera):]):
+                raise ErrorCatalogo(f"{self.nombre}: el bloque paginado debe seleccionar uid")
+
+    def preparar_variables(self, valores: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Convierte los valores de Python al formato de txn.query().
+
+        pydgraph exige claves con '$' y valores de tipo str.
+        """
+        desconocidas = set(valores) - set(self.variables)
+        if desconocidas:
+            raise ErrorCatalogo(f"{self.nombre}: variables desconocidas {sorted(desconocidas)}")
+        faltantes = set(self.variables) - self.opcionales - set(valores)
+        if faltantes:
+            raise ErrorCatalogo(f"{self.nombre}: faltan variables {sorted(faltantes)}")
+
+        variables = {}
+        for nombre, valor in valores.items():
+            tipo = self.variables[nombre]
+            if tipo == 'bool':
+                if not isinstance(valor, bool):
+                    raise ErrorCatalogo(f"{self.nombre}: ${nombre} debe ser bool")
+                valor = 'true' if valor else 'false'
+            elif tipo in ('int', 'float'):
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    raise ErrorCatalogo(f"{self.nombre}: ${nombre} debe ser numérico")
+                valor = str(int(valor) if tipo == 'int' else float(valor))
+            elif isinstance(valor, (datetime, date)):
+                valor = valor.isoformat()
+            elif not isinstance(valor, str):
+                raise ErrorCatalogo(f"{self.nombre}: ${nombre} debe ser str")
+            variables['$' + nombre] = valor
+        return variables
+
+    def ejecutar(self, cliente: Any, **valores) -> Dict[str, Any]:
+        """Ejecuta la consulta en una transacción de solo lectura."""
+        variables = self.preparar_variables(valores)
+        txn = cliente.txn(read_only=True, best_effort=True)
+        try:
+            respuesta = txn.query(self.texto, variables=variables)
+            return json.loads(respuesta.json)
+        finally:
+            txn.discard()
+
+    def iterar(self, cliente: Any, compacto: bool = True, **valores) -> Iterator[Any]:
+        """
+        Ejecuta la consulta y recorre su bloque principal sin json.loads.
+
+        Los elementos se decodifican de uno en uno y, si compacto, se
+        proyectan a registros con __slots__ (registro.nombre en lugar de
+        d['paciente.nombre']).
+        """
+        variables = self.preparar_variables(valores)
+        txn = cliente.txn(read_only=True, best_effort=True)
+        try:
+            respuesta = txn.query(self.texto, variables=variables)
+        finally:
+            txn.discard()
+        return decodificar(respuesta.json, self.bloque_principal, compacto)
+
+    def paginar(self, cliente: Any, tam_pagina: int = TAM_PAGINA,
+                por_paginas: bool = False, compacto: bool = False, cursor: str = '0x0',
+                **valores) -> Iterator[Any]:
+        """
+        Recorre el resultado completo por páginas con cursor (first/after).
+
+        Solo hay una página en memoria a la vez; el consumidor puede dejar
+        de iterar cuando quiera. Todas las páginas se leen en la misma
+        transacción de solo lectura, así que ven la misma instantánea.
+
+        Args:
+            cliente: Cliente de Dgraph
+            tam_pagina: Nodos por página
+            por_paginas: Producir listas (una por página) en lugar de nodos
+            compacto: Producir registros con __slots__ en lugar de dicts
+            cursor: Uid a partir del cual empezar (exclusivo); permite
+                continuar un recorrido anterior y leer solo los nodos nuevos
+            **valores: Resto de variables de la consulta
+
+        Yields:
+            Cada nodo del bloque paginado, o cada página si por_paginas
+        """
+        if self.bloque_paginado is None:
+            raise ErrorCatalogo(f"{self.nombre}: la consulta no admite paginación")
+        if VARIABLE_TAM_PAGINA in valores or VARIABLE_CURSOR in valores:
+            raise ErrorCatalogo(f"{self.nombre}: ${VARIABLE_TAM_PAGINA} y ${VARIABLE_CURSOR} los gestiona paginar()")
+
+        txn = cliente.txn(read_only=True)
+        try:
+            while True:
+                variables = self.preparar_variables(
+                    dict(valores, **{VARIABLE_TAM_PAGINA: tam_pagina, VARIABLE_CURSOR: cursor}))
+                respuesta = txn.query(self.texto, variables=variables)
+                pagina = list(decodificar(respuesta.json, self.bloque_paginado, compacto))
+                if not pagina:
+                    return
+                cursor = pagina[-1].uid if compacto else pagina[-1]['uid']
+                if por_paginas:
+                    yield pagina
+                else:
+                    yield from pagina
+                if len(pagina) < tam_pagina:
+                    return
+        finally:
+            txn.discard()
+
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+
+# nombre -> (descripción, texto DQL, valores de ejemplo)
+_DEFINICIONES = {
+    'paciente_por_email': ('Información completa de un paciente por email', """
+query paciente_por_email($email: string) {
+  pacientes(func: eq(paciente.email, $email)) {
+    uid
+    paciente.id
+    paciente.nombre
+    paciente.apellido
+    paciente.fecha_nacimiento
+    paciente.genero
+    paciente.tipo_sangre
+    paciente.telefono
+    paciente.direccion
+    paciente.ciudad
+    paciente.alergias {
+      alergia.nombre
+      alergia.tipo
+      alergia.gravedad
+      alergia.reaccion
+    }
+  }
+}
+""", {'email': 'juan.perez@email.com'}),
+
+    'doctores_por_especialidad': ('Doctores de una especialidad con experiencia mínima', """
+query doctores_por_especialidad($especialidad: string, $experiencia: int = 0) {
+  doctores(func: eq(doctor.especialidad, $especialidad))
+  @filter(ge(doctor.años_experiencia, $experiencia)) {
+    uid
+    doctor.nombre
+    doctor.apellido
+    doctor.años_experiencia
+    doctor.numero_licencia
+    doctor.telefono
+    doctor.hospital {
+      hospital.nombre
+      hospital.ciudad
+      hospital.tiene_urgencias
+    }
+    total_citas: count(doctor.citas)
+  }
+}
+""", {'especialidad': 'Cardiología', 'experiencia': 5}),
+
+    'doctores_experiencia': ('Doctores con experiencia mínima', """
+query doctores_experiencia($experiencia: int, $limite: int = 100, $despues: string = "0x0") {
+  doctores(func: ge(doctor.años_experiencia, $experiencia), first: $limite, after: $despues) {
+    uid
+    doctor.id
+    doctor.nombre
+    doctor.apellido
+    doctor.especialidad
+    doctor.años_experiencia
+    doctor.hospital {
+      hospital.nombre
+      hospital.ciudad
+    }
+  }
+}
+""", {'experiencia': 20, 'limite': 100}),
+
+    'historial_completo': ('Historial médico completo de un paciente', """
+query historial_completo($paciente: string) {
+  paciente(func: eq(paciente.id, $paciente)) {
+    paciente.nombre
+    paciente.apellido
+    paciente.fecha_nacimiento
+    paciente.tipo_sangre
+    paciente.alergias {
+      alergia.nombre
+      alergia.tipo
+      alergia.gravedad
+      alergia.fecha_deteccion
+    }
+    paciente.historial_medico {
+      historial.condiciones_cronicas
+      historial.cirugias_previas
+      historial.hospitalizaciones
+      historial.vacunas
+      historial.diagnosticos {
+        diagnostico.nombre
+        diagnostico.codigo_icd10
+        diagnostico.fecha_diagnostico
+        diagnostico.gravedad
+        diagnostico.tratamientos {
+          tratamiento.nombre
+          tratamiento.fecha_inicio
+          tratamiento.fecha_fin
+          tratamiento.estado
+          tratamiento.medicamentos {
+            medicamento.nombre_comercial
+            medicamento.principio_activo
+            medicamento.dosis
+            medicamento.via_administracion
+          }
+        }
+      }
+    }
+  }
+}
+""", {'paciente': 'P001'}),
+
+    'citas_por_fecha': ('Citas en un rango de fechas con un estado dado', """
+query citas_por_fecha($desde: string, $hasta: string, $estado: string = "programada",
+                      $limite: int = 1000, $despues: string = "0x0") {
+  citas(func: between(cita.fecha_hora, $desde, $hasta), first: $limite, after: $despues)
+  @filter(eq(cita.estado, $estado)) {
+    uid
+    cita.id
+    cita.fecha_hora
+    cita.motivo
+    cita.tipo_consulta
+    cita.duracion_minutos
+    cita.paciente {
+      paciente.nombre
+      paciente.apellido
+      paciente.telefono
+    }
+    cita.doctor {
+      doctor.nombre
+      doctor.apellido
+      doctor.especialidad
+    }
+  }
+}
+""", {'desde': '2025-11-01T00:00:00', 'hasta': '2025-11-30T23:59:59', 'estado': 'programada'}),
+
+    'diagnosticos_fulltext': ('Búsqueda fulltext en la descripción de diagnósticos', """
+query diagnosticos_fulltext($texto: string) {
+  diagnosticos(func: alloftext(diagnostico.descripcion, $texto)) {
+    diagnostico.nombre
+    diagnostico.codigo_icd10
+    diagnostico.descripcion
+    diagnostico.fecha_diagnostico
+    diagnostico.gravedad
+    diagnostico.paciente {
+      paciente.nombre
+      paciente.apellido
+      fecha_nacimiento: paciente.fecha_nacimiento
+    }
+    diagnostico.doctor {
+      doctor.nombre
+      doctor.especialidad
+    }
+    total_tratamientos: count(diagnostico.tratamientos)
+  }
+}
+""", {'texto': 'diabetes tipo 2'}),
+
+    'medicamentos_top': ('Medicamentos más recetados', """
+query medicamentos_top($limite: int = 10) {
+  var(func: type(Medicamento)) {
+    recetas as count(medicamento.recetas)
+  }
+  medicamentos(func: uid(recetas), orderdesc: val(recetas), first: $limite) {
+    medicamento.nombre_comercial
+    medicamento.principio_activo
+    medicamento.via_administracion
+    total_recetas: val(recetas)
+  }
+}
+""", {'limite': 10}),
+
+    'hospitales_urgencias': ('Hospitales de una ciudad con servicio de urgencias', """
+query hospitales_urgencias($ciudad: string, $urgencias: bool = true) {
+  hospitales(func: eq(hospital.ciudad, $ciudad))
+  @filter(eq(hospital.tiene_urgencias, $urgencias)) {
+    hospital.nombre
+    hospital.direccion
+    hospital.telefono
+    hospital.nivel_atencion
+    hospital.capacidad_camas
+    total_doctores: count(hospital.doctores)
+    hospital.departamentos {
+      departamento.nombre
+      departamento.especialidad
+    }
+  }
+}
+""", {'ciudad': 'Madrid', 'urgencias': True}),
+
+    'recetas_paciente': ('Recetas de un paciente con un estado dado', """
+query recetas_paciente($paciente: string, $estado: string = "activa") {
+  paciente(func: eq(paciente.id, $paciente)) {
+    paciente.nombre
+    paciente.apellido
+    paciente.recetas @filter(eq(receta.estado, $estado)) {
+      receta.fecha_emision
+      receta.duracion_dias
+      receta.instrucciones
+      receta.doctor {
+        doctor.nombre
+        doctor.especialidad
+      }
+      receta.medicamentos {
+        medicamento.nombre_comercial
+        medicamento.principio_activo
+        medicamento.dosis
+        medicamento.frecuencia
+        medicamento.contraindicaciones
+      }
+    }
+  }
+}
+""", {'paciente': 'P001', 'estado': 'activa'}),
+
+    'agenda_doctor': ('Citas de un doctor en un intervalo', """
+query agenda_doctor($doctor: string, $desde: string, $hasta: string) {
+  doctor(func: eq(doctor.id, $doctor)) {
+    doctor.nombre
+    doctor.apellido
+    doctor.especialidad
+    doctor.citas @filter(between(cita.fecha_hora, $desde, $hasta))
+                 (orderasc: cita.fecha_hora) {
+      cita.fecha_hora
+      cita.motivo
+      cita.tipo_consulta
+      cita.duracion_minutos
+      cita.estado
+      cita.paciente {
+        paciente.nombre
+        paciente.apellido
+        paciente.telefono
+      }
+    }
+  }
+}
+""", {'doctor': 'D001', 'desde': '2025-11-15T00:00:00', 'hasta': '2025-11-15T23:59:59'}),
+
+    'pacientes_alergia': ('Pacientes con una alergia específica', """
+query pacientes_alergia($alergia: string) {
+  var(func: eq(alergia.nombre, $alergia)) {
+    pacientes_con_alergia as alergia.paciente
+  }
+  pacientes(func: uid(pacientes_con_alergia)) {
+    paciente.nombre
+    paciente.apellido
+    paciente.email
+    paciente.telefono
+    paciente.alergias @filter(eq(alergia.nombre, $alergia)) {
+      alergia.tipo
+      alergia.gravedad
+      alergia.reaccion
+      alergia.fecha_deteccion
+    }
+  }
+}
+""", {'alergia': 'Penicilina'}),
+
+    'tratamientos_por_estado': ('Tratamientos en un estado con sus diagnósticos', """
+query tratamientos_por_estado($estado: string = "activo", $limite: int = 100) {
+  tratamientos(func: eq(tratamiento.estado, $estado), first: $limite) {
+    tratamiento.nombre
+    tratamiento.descripcion
+    tratamiento.fecha_inicio
+    tratamiento.fecha_fin
+    tratamiento.diagnostico {
+      diagnostico.nombre
+      diagnostico.gravedad
+      diagnostico.paciente {
+        paciente.nombre
+        paciente.apellido
+      }
+    }
+    tratamiento.medicamentos {
+      medicamento.nombre_comercial
+      medicamento.dosis
+      medicamento.frecuencia
+    }
+  }
+}
+""", {'estado': 'activo', 'limite': 100}),
+
+    'doctores_hospital': ('Doctores de un hospital agrupados por departamento', """
+query doctores_hospital($hospital: string) {
+  hospital(func: eq(hospital.id, $hospital)) {
+    hospital.nombre
+    hospital.ciudad
+    hospital.departamentos {
+      departamento.nombre
+      departamento.especialidad
+      departamento.doctores {
+        doctor.nombre
+        doctor.apellido
+        doctor.años_experiencia
+        doctor.numero_licencia
+        total_citas: count(doctor.citas)
+      }
+    }
+  }
+}
+""", {'hospital': 'H001'}),
+
+    'pacientes_tipo_sangre': ('Pacientes por tipo de sangre', """
+query pacientes_tipo_sangre($tipo_sangre: string, $limite: int = 100, $despues: string = "0x0") {
+  pacientes(func: eq(paciente.tipo_sangre, $tipo_sangre), first: $limite, after: $despues) {
+    uid
+    paciente.id
+    paciente.nombre
+    paciente.apellido
+    paciente.telefono
+    paciente.email
+    paciente.ciudad
+  }
+}
+""", {'tipo_sangre': 'O+', 'limite': 100}),
+
+    'diagnosticos_icd10': ('Diagnósticos por código ICD-10', """
+query diagnosticos_icd10($codigo: string) {
+  diagnosticos(func: eq(diagnostico.codigo_icd10, $codigo)) {
+    diagnostico.nombre
+    diagnostico.descripcion
+    diagnostico.fecha_diagnostico
+    diagnostico.gravedad
+    diagnostico.paciente {
+      paciente.nombre
+      fecha_nacimiento: paciente.fecha_nacimiento
+    }
+    diagnostico.cita {
+      cita.fecha_hora
+      cita.motivo
+    }
+  }
+}
+""", {'codigo': 'E11'}),
+
+    'buscar_paciente_nombre': ('Búsqueda fulltext de pacientes por nombre', """
+query buscar_paciente_nombre($nombre: string) {
+  pacientes(func: alloftext(paciente.nombre, $nombre)) {
+    paciente.nombre
+    paciente.apellido
+    paciente.email
+    paciente.telefono
+    paciente.ciudad
+    total_citas: count(paciente.citas)
+  }
+}
+""", {'nombre': 'Juan'}),
+
+    'estadisticas_hospital': ('Estadísticas de un hospital', """
+query estadisticas_hospital($hospital: string) {
+  hospital(func: eq(hospital.id, $hospital)) {
+    hospital.nombre
+    hospital.nivel_atencion
+    hospital.capacidad_camas
+    hospital.tiene_urgencias
+    total_doctores: count(hospital.doctores)
+    total_departamentos: count(hospital.departamentos)
+    hospital.doctores {
+      total_citas_doctor: count(doctor.citas)
+    }
+  }
+}
+""", {'hospital': 'H001'}),
+
+    'citas_con_diagnosticos': ('Citas en un estado que tienen diagnósticos', """
+query citas_con_diagnosticos($estado: string = "completada", $limite: int = 100) {
+  citas(func: eq(cita.estado, $estado), first: $limite) @filter(has(cita.diagnosticos)) {
+    cita.fecha_hora
+    cita.motivo
+    cita.paciente {
+      paciente.nombre
+      paciente.apellido
+    }
+    cita.doctor {
+      doctor.nombre
+      doctor.especialidad
+    }
+    cita.diagnosticos {
+      diagnostico.nombre
+      diagnostico.gravedad
+    }
+  }
+}
+""", {'estado': 'completada', 'limite': 100}),
+
+    'medicamentos_contraindicaciones': ('Medicamentos con contraindicaciones', """
+query medicamentos_contraindicaciones($limite: int = 100, $despues: string = "0x0") {
+  medicamentos(func: type(Medicamento), first: $limite, after: $despues)
+  @filter(has(medicamento.contraindicaciones)) {
+    uid
+    medicamento.nombre_comercial
+    medicamento.principio_activo
+    medicamento.contraindicaciones
+    medicamento.via_administracion
+  }
+}
+""", {'limite': 100}),
+
+    'pacientes_condiciones_cronicas': ('Pacientes con condiciones crónicas', """
+query pacientes_condiciones_cronicas($limite: int = 100) {
+  var(func: type(HistorialMedico)) @filter(has(historial.condiciones_cronicas)) {
+    pacientes_cronicos as historial.paciente
+  }
+  pacientes(func: uid(pacientes_cronicos), first: $limite) {
+    paciente.nombre
+    paciente.apellido
+    paciente.telefono
+    paciente.historial_medico {
+      historial.condiciones_cronicas
+      historial.fecha_creacion
+    }
+  }
+}
+""", {'limite': 100}),
+
+    'especialidades_demandadas': ('Citas totales por especialidad', """
+{
+  var(func: type(Doctor)) {
+    citas_por_doc as count(doctor.citas)
+  }
+  especialidades(func: type(Doctor)) @groupby(doctor.especialidad) {
+    total_citas: sum(val(citas_por_doc))
+  }
+}
+""", {}),
+}
+
+
+def construir_catalogo(schema: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, ConsultaParametrizada]:
+    """
+    Construye y valida todas las consultas del catálogo.
+
+    Raises:
+        ErrorCatalogo: Si alguna consulta no es coherente con el schema
+    """
+    schema = schema if schema is not None else cargar_schema()
+    catalogo = {}
+    for nombre, (descripcion, texto, ejemplo) in _DEFINICIONES.items():
+        consulta = ConsultaParametrizada(nombre, descripcion, texto, ejemplo)
+        consulta.validar(schema)
+        catalogo[nombre] = consulta
+    return catalogo
+
+
+CATALOGO: Dict[str, ConsultaParametrizada] = construir_catalogo()
+
+
+def obtener_consulta(nombre: str) -> ConsultaParametrizada:
+    """Retorna una consulta del catálogo por nombre."""
+    try:
+        return CATALOGO[nombre]
+    except KeyError:
+        raise KeyError(f"Consulta desconocida: {nombre}. Disponibles: {', '.join(sorted(CATALOGO))}")
+
+
+def ejecutar_consulta(cliente: Any, nombre: str, /, **valores) -> Dict[str, Any]:
+    """Ejecuta una consulta del catálogo con los valores indicados."""
+    return obtener_consulta(nombre).ejecutar(cliente, **valores)
+
+
+def paginar_consulta(cliente: Any, nombre: str, /, tam_pagina: int = TAM_PAGINA, **valores) -> Iterator[Any]:
+    """Itera todos los nodos de una consulta paginable del catálogo."""
+    return obtener_consulta(nombre).paginar(cliente, tam_pagina, **valores)
+
+
+def iterar_consulta(cliente: Any, nombre: str, /, compacto: bool = True, **valores) -> Iterator[Any]:
+    """Recorre el bloque principal de una consulta con decodificación incremental."""
+    return obtener_consulta(nombre).iterar(cliente, compacto, **valores)
+
+
+def listar_consultas() -> List[Dict[str, Any]]:
+    """Nombre, descripción y variables de cada consulta."""
+    return [
+        {'nombre': c.nombre, 'descripcion': c.descripcion, 'variables': dict(c.variables),
+         'paginable': c.bloque_paginado is not None}
+        for c in CATALOGO.values()
+    ]
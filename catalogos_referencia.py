@@ -0,0 +1,520 @@
+"""
+Catálogos de Referencia Mapeados en Memoria
+Plataforma de Integración de Datos de Salud
+
+Los códigos ICD-10 y los medicamentos de referencia (PASO 5.2 de
+populate.py) se compilan una vez a un archivo binario de solo lectura que
+cada proceso abre con mmap. Abrirlo no lee el catálogo: solo la cabecera.
+Las páginas se cargan al consultarlas y son las mismas (caché de páginas
+del sistema) para todos los procesos y workers que lo abren, así que no se
+construye un dict por proceso.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+
+    cabecera   CABECERA: firma, versión, nº de campos, nº de registros,
+               nº de cubetas, longitud de los metadatos y desplazamientos
+               de tabla, hash y arena
+    metadatos  JSON: campos, campo clave, normalización, campos lista
+    tabla      por registro y campo (desplazamiento, longitud) en la arena,
+               u32 + u32. El campo 0 es la clave normalizada y los
+               registros están ordenados por ella (bytes UTF-8)
+    hash       cubetas u32 (índice del registro + 1, 0 = vacía) con
+               direccionamiento abierto lineal sobre crc32 de la clave.
+               Factor de carga <= 0.5
+    arena      cadenas UTF-8 sin repetir; las listas se unen con SEPARADOR
+
+- obtener(clave): O(1), una cubeta (o unas pocas) y una comparación
+- prefijo('E11'): búsqueda binaria sobre la tabla ordenada; devuelve E11 y
+  toda su jerarquía (E11.0, E11.9...). 'E11.*' y 'E11*' son equivalentes
+
+El archivo se reescribe de forma atómica (os.replace): los procesos que
+tienen abierto el anterior siguen leyéndolo hasta que lo vuelven a abrir.
+abrir_catalogo() comprueba en cada acceso (un os.stat) si el archivo es
+otro (inodo, mtime o tamaño) y en ese caso lo reabre, también en los
+procesos que no lo compilaron.
+
+Uso:
+    python catalogos_referencia.py --compilar
+    python catalogos_referencia.py --compilar --icd10 cie10.tsv --medicamentos medicamentos.tsv
+    python catalogos_referencia.py --buscar "E11.*"
+    python catalogos_referencia.py --buscar amoxicilina --catalogo medicamentos
+    python catalogos_referencia.py --benchmark --sintetico 70000
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Sequence, Tuple
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+CATALOGOS_DIRECTORIO = os.getenv(
+    'CATALOGOS_DIRECTORIO',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'catalogos'))
+
+FIRMA = b'SALUDCAT'
+VERSION = 1
+
+# firma, versión, campos, registros, cubetas, longitud de metadatos,
+# desplazamiento de tabla, hash y arena, longitud de la arena
+CABECERA = struct.Struct('<8sHHIII4xQQQQ')
+
+# Separador de los elementos de un campo lista dentro de la arena
+SEPARADOR = '\x1f'
+
+# nombre -> definición del catálogo
+CATALOGOS = {
+    'icd10': {
+        'campos': ('codigo', 'nombre', 'descripcion'),
+        'clave': 'codigo',
+        'normalizacion': 'codigo',
+        'listas': (),
+    },
+    'medicamentos': {
+        'campos': ('nombre_comercial', 'principio_activo', 'dosis', 'via_administracion',
+                   'frecuencia', 'contraindicaciones'),
+        'clave': 'nombre_comercial',
+        'normalizacion': 'texto',
+        'listas': ('contraindicaciones',),
+    },
+}
+
+
+# =============================================================================
+# CLAVES
+# =============================================================================
+
+def normalizar_clave(valor: str, normalizacion: str) -> str:
+    """
+    Clave de búsqueda: 'codigo' en mayúsculas sin espacios ('e11.9 ' ->
+    'E11.9'); 'texto' en minúsculas, sin acentos y con espacios simples.
+    """
+    if normalizacion == 'codigo':
+        return ''.join(valor.split()).upper()
+    texto = unicodedata.normalize('NFKD', valor.lower())
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# =============================================================================
+# COMPILACIÓN
+# =============================================================================
+
+def compilar(ruta: str, campos: Sequence[str], registros: Iterable[Dict[str, Any]], clave: str,
+             normalizacion: str = 'codigo', listas: Sequence[str] = (), origen: str = '') -> int:
+    """
+    Escribe un catálogo. Si dos registros tienen la misma clave normalizada
+    se queda el último.
+
+    Returns:
+        Número de registros escritos
+    """
+    por_clave = {}
+    for registro in registros:
+        valor = registro.get(clave)
+        if valor:
+            por_clave[normalizar_clave(str(valor), normalizacion)] = registro
+    claves = sorted(por_clave, key=lambda k: k.encode('utf-8'))
+
+    arena = bytearray()
+    posiciones: Dict[bytes, int] = {}
+
+    def guardar(texto: str) -> Tuple[int, int]:
+        datos = texto.encode('utf-8')
+        if datos not in posiciones:
+            posiciones[datos] = len(arena)
+            arena.extend(datos)
+        return posiciones[datos], len(datos)
+
+    tabla = array('I')
+    for k in claves:
+        registro = por_clave[k]
+        tabla.extend(guardar(k))
+        for campo in campos:
+            valor = registro.get(campo)
+            if campo in listas:
+                texto = SEPARADOR.join(str(v) for v in (valor or []))
+            else:
+                texto = '' if valor is None else str(valor)
+            tabla.extend(guardar(texto))
+
+    cubetas = 8
+    while cubetas < 2 * len(claves):
+        cubetas *= 2
+    mascara = cubetas - 1
+    hash_ = array('I', bytes(4 * cubetas))
+    for i, k in enumerate(claves):
+        h = zlib.crc32(k.encode('utf-8')) & mascara
+        while hash_[h]:
+            h = (h + 1) & mascara
+        hash_[h] = i + 1
+
+    if tabla.itemsize != 4 or hash_.itemsize != 4:
+        raise RuntimeError("array('I') no es de 32 bits en esta plataforma")
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        tabla.byteswap()
+        hash_.byteswap()
+
+    metadatos = json.dumps({
+        'campos': list(campos), 'clave': clave, 'normalizacion': normalizacion,
+        'listas': list(listas), 'origen': origen, 'creado': datetime.utcnow().isoformat(),
+    }, ensure_ascii=False).encode('utf-8')
+    inicio_tabla = _alinear(CABECERA.size + len(metadatos))
+    inicio_hash = _alinear(inicio_tabla + len(tabla) * 4)
+    inicio_arena = _alinear(inicio_hash + len(hash_) * 4)
+
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    # Temporal propio de cada escritor: dos workers compilando a la vez no se
+    # pisan, gana el último os.replace y los dos archivos son completos
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=os.path.basename(ruta) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(CABECERA.pack(FIRMA, VERSION, len(campos) + 1, len(claves), cubetas, len(metadatos),
+                                  inicio_tabla, inicio_hash, inicio_arena, len(arena)))
+            f.write(metadatos)
+            f.write(b'\0' * (inicio_tabla - f.tell()))
+            f.write(tabla.tobytes())
+            f.write(b'\0' * (inicio_hash - f.tell()))
+            f.write(hash_.tobytes())
+            f.write(b'\0' * (inicio_arena - f.tell()))
+            f.write(arena)
+        # mkstemp lo crea con 0600; el catálogo lo leen procesos de otros usuarios
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    return len(claves)
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+class CatalogoMapeado:
+    """Catálogo compilado abierto con mmap (solo lectura, seguro entre hilos)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (firma, version, self._n_campos, self._n, self._cubetas, longitud_metadatos,
+         self._tabla, self._hash, self._arena, _) = CABECERA.unpack_from(self._mm, 0)
+        if firma != FIRMA or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{ruta} no es un catálogo compilado (versión {VERSION})")
+        metadatos = json.loads(bytes(self._mm[CABECERA.size:CABECERA.size + longitud_metadatos]))
+        self.campos: Tuple[str, ...] = tuple(metadatos['campos'])
+        self.clave: str = metadatos['clave']
+        self.normalizacion: str = metadatos['normalizacion']
+        self.listas = frozenset(metadatos['listas'])
+        self.metadatos = metadatos
+        self._fila = struct.Struct('<' + 'II' * self._n_campos)
+        self._par = struct.Struct('<II')
+        self._cubeta = struct.Struct('<I')
+        self._mascara = self._cubetas - 1
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _clave_bytes(self, i: int) -> bytes:
+        desplazamiento, longitud = self._par.unpack_from(self._mm, self._tabla + i * self._fila.size)
+        inicio = self._arena + desplazamiento
+        return self._mm[inicio:inicio + longitud]
+
+    def registro(self, i: int) -> Dict[str, Any]:
+        """Registro i (en orden de clave) como dict."""
+        valores = self._fila.unpack_from(self._mm, self._tabla + i * self._fila.size)
+        registro = {}
+        for campo, j in zip(self.campos, range(2, len(valores), 2)):
+            inicio = self._arena + valores[j]
+            texto = self._mm[inicio:inicio + valores[j + 1]].decode('utf-8')
+            registro[campo] = (texto.split(SEPARADOR) if texto else []) if campo in self.listas else texto
+        return registro
+
+    def indice_de(self, clave: str) -> int:
+        """Posición de una clave (normalizada aquí) o -1."""
+        buscada = normalizar_clave(clave, self.normalizacion).encode('utf-8')
+        h = zlib.crc32(buscada) & self._mascara
+        while True:
+            (valor,) = self._cubeta.unpack_from(self._mm, self._hash + h * 4)
+            if not valor:
+                return -1
+            if self._clave_bytes(valor - 1) == buscada:
+                return valor - 1
+            h = (h + 1) & self._mascara
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        i = self.indice_de(clave)
+        return self.registro(i) if i >= 0 else None
+
+    def __contains__(self, clave: str) -> bool:
+        return self.indice_de(clave) >= 0
+
+    def _primera_no_menor(self, buscada: bytes) -> int:
+        bajo, alto = 0, self._n
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._clave_bytes(medio) < buscada:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def rango_prefijo(self, prefijo: str) -> Tuple[int, int]:
+        """[inicio, fin) de las claves que empiezan por prefijo ('E11.*' = 'E11')."""
+        prefijo = prefijo.strip().rstrip('*')
+        if self.normalizacion == 'codigo':
+            prefijo = prefijo.rstrip('.')
+        buscada = normalizar_clave(prefijo, self.normalizacion).encode('utf-8')
+        # 0xFF no aparece en UTF-8: es cota superior de todo lo que empieza por buscada
+        return self._primera_no_menor(buscada), self._primera_no_menor(buscada + b'\xff')
+
+    def prefijo(self, prefijo: str, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Registros cuya clave empieza por prefijo, en orden de clave."""
+        inicio, fin = self.rango_prefijo(prefijo)
+        if limite is not None:
+            fin = min(fin, inicio + limite)
+        return [self.registro(i) for i in range(inicio, fin)]
+
+    def claves(self, prefijo: str = '') -> List[str]:
+        inicio, fin = self.rango_prefijo(prefijo) if prefijo else (0, self._n)
+        return [self._clave_bytes(i).decode('utf-8') for i in range(inicio, fin)]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.registro(i) for i in range(self._n))
+
+    def cerrar(self):
+        self._mm.close()
+
+
+# =============================================================================
+# CATÁLOGOS DEL PROYECTO
+# =============================================================================
+
+def registros_generador(nombre: str) -> List[Dict[str, Any]]:
+    """Catálogo base de utils/data_generator.py (DIAGNOSTICOS_ICD10 o MEDICAMENTOS)."""
+    from utils.data_generator import DIAGNOSTICOS_ICD10, MEDICAMENTOS
+
+    filas = DIAGNOSTICOS_ICD10 if nombre == 'icd10' else MEDICAMENTOS
+    return [dict(zip(CATALOGOS[nombre]['campos'], fila)) for fila in filas]
+
+
+def leer_tsv(ruta: str, nombre: str) -> Iterator[Dict[str, Any]]:
+    """
+    Registros de un TSV con cabecera (columnas con los nombres de
+    CATALOGOS[nombre]['campos']). Las listas van separadas por ';'.
+    """
+    listas = CATALOGOS[nombre]['listas']
+    with open(ruta, encoding='utf-8', newline='') as f:
+        for fila in csv.DictReader(f, delimiter='\t'):
+            for campo in listas:
+                fila[campo] = [v.strip() for v in (fila.get(campo) or '').split(';') if v.strip()]
+            yield fila
+
+
+def ruta_catalogo(nombre: str, directorio: str = CATALOGOS_DIRECTORIO) -> str:
+    return os.path.join(directorio, f"{nombre}.cat")
+
+
+def compilar_catalogo(nombre: str, tsv: Optional[str] = None, directorio: str = CATALOGOS_DIRECTORIO) -> int:
+    """Compila un catálogo desde un TSV o, si no se indica, desde el generador."""
+    definicion = CATALOGOS[nombre]
+    registros = leer_tsv(tsv, nombre) if tsv else registros_generador(nombre)
+    total = compilar(ruta_catalogo(nombre, directorio), definicion['campos'], registros, definicion['clave'],
+                     definicion['normalizacion'], definicion['listas'], origen=tsv or 'generador')
+    # Los procesos que ya lo tenían abierto lo reabren en la próxima consulta
+    # (abrir_catalogo ve que el archivo ha cambiado)
+    return total
+
+
+def _identidad(ruta: str) -> Optional[Tuple[int, int, int, int]]:
+    """(dispositivo, inodo, mtime en ns, tamaño) del archivo, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return estado.st_dev, estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+
+# (nombre, directorio) -> (identidad del archivo abierto, catálogo)
+_catalogos: Dict[Tuple[str, str], Tuple[Tuple[int, int, int, int], CatalogoMapeado]] = {}
+_catalogos_lock = threading.Lock()
+
+
+def abrir_catalogo(nombre: str, directorio: str = CATALOGOS_DIRECTORIO) -> CatalogoMapeado:
+    """
+    Catálogo del proceso (se compila desde el generador si no existe). Si
+    el archivo se ha recompilado desde que se abrió, se abre el nuevo; el
+    mapa anterior se libera cuando nadie lo usa.
+    """
+    ruta = ruta_catalogo(nombre, directorio)
+    identidad = _identidad(ruta)
+    if identidad is None:
+        compilar_catalogo(nombre, directorio=directorio)
+        identidad = _identidad(ruta)
+    with _catalogos_lock:
+        abierto = _catalogos.get((nombre, directorio))
+        if abierto is not None and abierto[0] == identidad:
+            return abierto[1]
+    # Si el archivo cambia entre el stat y la apertura, el siguiente acceso lo reabre
+    catalogo = CatalogoMapeado(ruta)
+    with _catalogos_lock:
+        _catalogos[(nombre, directorio)] = (identidad, catalogo)
+    return catalogo
+
+
+def icd10() -> CatalogoMapeado:
+    return abrir_catalogo('icd10')
+
+
+def medicamentos() -> CatalogoMapeado:
+    return abrir_catalogo('medicamentos')
+
+
+def codigos_icd10(patron: str) -> List[str]:
+    """
+    Códigos ICD-10 de un patrón: 'E11', 'E11.*' y 'E11*' devuelven lo
+    mismo, el código y toda su jerarquía (E11.0, E11.9...). Un código sin
+    comodín que no está en el catálogo se devuelve tal cual para
+    consultarlo igualmente.
+    """
+    catalogo = icd10()
+    codigos = catalogo.claves(patron)
+    if not codigos and '*' not in patron:
+        return [normalizar_clave(patron, 'codigo')]
+    return codigos
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def _icd10_sintetico(total: int) -> Iterator[Dict[str, Any]]:
+    """Códigos con la forma de ICD-10 (A00, A00.0 ... A00.9, A01...)."""
+    emitidos = 0
+    for letra in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+        for categoria in range(100):
+            codigo = f"{letra}{categoria:02d}"
+            for sufijo in [''] + [f".{d}" for d in range(10)]:
+                if emitidos >= total:
+                    return
+                yield {'codigo': codigo + sufijo, 'nombre': f"Categoría {codigo}{sufijo}",
+                       'descripcion': f"Descripción sintética de {codigo}{sufijo}"}
+                emitidos += 1
+
+
+def medir(total: int, consultas: int = 100000) -> Dict[str, Any]:
+    """Compara abrir el catálogo con mmap frente a cargar un TSV en un dict."""
+    import random
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'icd10.cat')
+        tsv = os.path.join(directorio, 'icd10.tsv')
+        registros = list(_icd10_sintetico(total))
+        with open(tsv, 'w', encoding='utf-8') as f:
+            f.write('codigo\tnombre\tdescripcion\n')
+            for r in registros:
+                f.write(f"{r['codigo']}\t{r['nombre']}\t{r['descripcion']}\n")
+        inicio = time.perf_counter()
+        compilar(ruta, CATALOGOS['icd10']['campos'], registros, 'codigo')
+        segundos_compilar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        catalogo = CatalogoMapeado(ruta)
+        segundos_abrir = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with open(tsv, encoding='utf-8', newline='') as f:
+            diccionario = {fila['codigo']: fila for fila in csv.DictReader(f, delimiter='\t')}
+        segundos_dict = time.perf_counter() - inicio
+
+        aleatorio = random.Random(1)
+        codigos = [aleatorio.choice(registros)['codigo'] for _ in range(consultas)]
+        inicio = time.perf_counter()
+        for codigo in codigos:
+            catalogo.indice_de(codigo)
+        segundos_indice = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        for codigo in codigos[:consultas // 10]:
+            catalogo.obtener(codigo)
+        segundos_obtener = time.perf_counter() - inicio
+        categorias = [c[:3] for c in codigos[:consultas // 10]]
+        inicio = time.perf_counter()
+        for categoria in categorias:
+            catalogo.prefijo(categoria)
+        segundos_prefijo = time.perf_counter() - inicio
+        resultado = {
+            'registros': len(catalogo),
+            'bytes': os.path.getsize(ruta),
+            'compilar_ms': round(segundos_compilar * 1000, 1),
+            'abrir_ms': round(segundos_abrir * 1000, 3),
+            'cargar_dict_ms': round(segundos_dict * 1000, 1),
+            'indice_us': round(segundos_indice / consultas * 1e6, 2),
+            'obtener_us': round(segundos_obtener / (consultas // 10) * 1e6, 2),
+            'prefijo_us': round(segundos_prefijo / len(categorias) * 1e6, 2),
+            'coincide': all(catalogo.obtener(c)['nombre'] == diccionario[c]['nombre'] for c in codigos[:1000]),
+        }
+        catalogo.cerrar()
+        return resultado
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    """Compila, consulta o mide los catálogos de referencia."""
+    parser = argparse.ArgumentParser(description="Catálogos ICD-10 y medicamentos mapeados en memoria")
+    parser.add_argument('--compilar', action='store_true', help="Compilar los catálogos")
+    parser.add_argument('--icd10', default=None, help="TSV de códigos ICD-10 (codigo, nombre, descripcion)")
+    parser.add_argument('--medicamentos', default=None, help="TSV de medicamentos")
+    parser.add_argument('--buscar', default=None, help="Clave o prefijo ('E11', 'E11.*', 'amoxi*')")
+    parser.add_argument('--catalogo', choices=list(CATALOGOS), default='icd10')
+    parser.add_argument('--benchmark', action='store_true', help="Comparar mmap con cargar un dict")
+    parser.add_argument('--sintetico', type=int, default=70000, help="Códigos del catálogo del benchmark")
+    args = parser.parse_args()
+
+    if args.compilar:
+        for nombre, tsv in (('icd10', args.icd10), ('medicamentos', args.medicamentos)):
+            total = compilar_catalogo(nombre, tsv)
+            print(f"✓ {nombre}: {total:,} registros desde {tsv or 'el generador'} -> {ruta_catalogo(nombre)}")
+
+    if args.buscar:
+        catalogo = abrir_catalogo(args.catalogo)
+        inicio = time.perf_counter()
+        exacto = None if '*' in args.buscar else catalogo.obtener(args.buscar)
+        resultados = [exacto] if exacto else catalogo.prefijo(args.buscar, limite=50)
+        print(f"\n{len(resultados)} resultados en {args.catalogo} "
+              f"({(time.perf_counter() - inicio) * 1e6:.0f} µs)")
+        for registro in resultados:
+            print("  " + json.dumps(registro, ensure_ascii=False))
+
+    if args.benchmark:
+        print(f"\nCatálogo ICD-10 sintético de {args.sintetico:,} códigos...")
+        r = medir(args.sintetico)
+        print(f"  Archivo: {r['bytes'] / 1024:,.0f} KiB, compilado en {r['compilar_ms']} ms")
+        print(f"  Abrir con mmap: {r['abrir_ms']} ms | cargar TSV en dict: {r['cargar_dict_ms']} ms")
+        print(f"  Posición por clave: {r['indice_us']} µs | registro completo: {r['obtener_us']} µs | "
+              f"jerarquía (prefijo de 3): {r['prefijo_us']} µs")
+        print(f"  {'✓' if r['coincide'] else '✗'} Los registros coinciden con el dict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+"""
+Compatibilidad de Medicamentos y Alergias
+Plataforma de Integración de Datos de Salud
+
+"Verificar compatibilidad medicamento-paciente" y "Alertas de alergias para
+prescripción" (menu_alergias 9 y 10) se consultan en cada receta. Recorrer
+en Dgraph paciente -> alergias y medicamento -> contraindicaciones por cada
+receta es demasiado lento para la prescripción por lotes, así que ambos
+lados se precalculan en memoria como conjuntos de términos normalizados:
+
+- medicamento -> términos de alergia que lo contraindican: su principio
+  activo (cada componente de una combinación), la familia farmacológica
+  del principio activo y las contraindicaciones "Alergia a ..."
+- paciente -> términos de sus alergias
+
+Comprobar una receta es la intersección de dos frozenset (microsegundos);
+verificar_recetas() comprueba miles de recetas en una llamada y devuelve
+solo las que tienen conflicto.
+
+El índice se carga de Dgraph con consultas paginadas por uid. Los uid de
+Dgraph crecen con cada nodo nuevo, así que refrescar() continúa desde el
+último uid leído y solo trae las alergias y medicamentos añadidos. Una
+alergia leída antes de tener su arista alergia.paciente (o su nombre) queda
+pendiente y se vuelve a pedir por uid en cada refresco hasta que está
+completa. Las modificaciones y borrados se recogen con una recarga completa
+cada RECARGA_INDICE_ALERGIAS_SEG.
+
+Uso:
+    from compatibilidad_alergias import obtener_indice
+    indice = obtener_indice(cliente)
+    indice.verificar_receta('P001', ['M005'])
+    conflictos = indice.verificar_recetas(recetas)
+
+    python compatibilidad_alergias.py --paciente P001 --medicamento M005
+    python compatibilidad_alergias.py --fuente generador --citas 100000
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Optional, Dict, Any, List, Iterable, FrozenSet, Set, Tuple
+
+from catalogo_consultas import ConsultaParametrizada, cargar_schema
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Segundos entre lecturas incrementales (solo nodos con uid nuevo)
+REFRESCO_INDICE_ALERGIAS_SEG = float(os.getenv('REFRESCO_INDICE_ALERGIAS_SEG', 60))
+
+# Segundos entre recargas completas (recogen modificaciones y borrados)
+RECARGA_INDICE_ALERGIAS_SEG = float(os.getenv('RECARGA_INDICE_ALERGIAS_SEG', 3600))
+
+# Nodos por página al leer de Dgraph
+TAM_PAGINA_INDICE = 5000
+
+# Principio activo (normalizado) -> familia cuya alergia lo contraindica
+FAMILIAS_PRINCIPIO_ACTIVO = {
+    'amoxicilina': 'penicilina',
+    'acido acetilsalicilico': 'aine',
+    'ibuprofeno': 'aine',
+    'diclofenaco': 'aine',
+    'metamizol': 'pirazolona',
+    'azitromicina': 'macrolido',
+    'ciprofloxacino': 'quinolona',
+}
+
+_PREFIJO_ALERGIA = 'alergia a '
+
+
+# =============================================================================
+# TÉRMINOS
+# =============================================================================
+
+def normalizar_termino(texto: str) -> str:
+    """
+    Forma comparable de un nombre de alergia o principio activo.
+
+    Minúsculas, sin acentos ni el prefijo "alergia a " y en singular
+    ("Alergia a AINEs" -> "aine", "Macrólidos" -> "macrolido").
+    """
+    texto = unicodedata.normalize('NFKD', texto.strip().lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    if texto.startswith(_PREFIJO_ALERGIA):
+        texto = texto[len(_PREFIJO_ALERGIA):]
+    palabras = re.findall(r'\w+', texto)
+    return ' '.join(p[:-1] if len(p) > 4 and p.endswith('s') else p for p in palabras)
+
+
+def terminos_medicamento(principio_activo: Optional[str],
+                         contraindicaciones: Iterable[str] = ()) -> FrozenSet[str]:
+    """Términos de alergia que contraindican un medicamento."""
+    terminos = set()
+    for componente in (principio_activo or '').split('/'):
+        termino = normalizar_termino(componente)
+        if termino:
+            terminos.add(termino)
+            if termino in FAMILIAS_PRINCIPIO_ACTIVO:
+                terminos.add(FAMILIAS_PRINCIPIO_ACTIVO[termino])
+    for contraindicacion in contraindicaciones or ():
+        if contraindicacion.strip().lower().startswith(_PREFIJO_ALERGIA):
+            terminos.add(normalizar_termino(contraindicacion))
+    return frozenset(terminos)
+
+
+# =============================================================================
+# CONSULTAS DE CARGA
+# =============================================================================
+
+# Recorren todos los nodos de un tipo por orden de uid; el cursor de
+# paginar() permite continuar desde el último uid leído
+_DEFINICIONES_INDICE = {
+    'alergias_indice': ('Alergias con su paciente para el índice de compatibilidad', """
+query alergias_indice($limite: int = 1000, $despues: string = "0x0") {
+  alergias(func: type(Alergia), first: $limite, after: $despues) {
+    uid
+    alergia.id
+    alergia.nombre
+    alergia.gravedad
+    alergia.paciente {
+      paciente.id
+    }
+  }
+}
+"""),
+    'alergias_por_uid': ('Alergias pendientes de completar, por uid ("[0x1, 0x2]")', """
+query alergias_por_uid($uids: string = "[]") {
+  alergias(func: uid($uids)) {
+    uid
+    alergia.id
+    alergia.nombre
+    alergia.gravedad
+    alergia.paciente {
+      paciente.id
+    }
+  }
+}
+"""),
+    'medicamentos_indice': ('Medicamentos con principio activo y contraindicaciones', """
+query medicamentos_indice($limite: int = 1000, $despues: string = "0x0") {
+  medicamentos(func: type(Medicamento), first: $limite, after: $despues) {
+    uid
+    medicamento.id
+    medicamento.nombre_comercial
+    medicamento.principio_activo
+    medicamento.contraindicaciones
+  }
+}
+"""),
+}
+
+_consultas: Optional[Dict[str, ConsultaParametrizada]] = None
+
+
+def _consulta(nombre: str) -> ConsultaParametrizada:
+    global _consultas
+    if _consultas is None:
+        schema = cargar_schema()
+        consultas = {}
+        for clave, (descripcion, texto) in _DEFINICIONES_INDICE.items():
+            consulta = ConsultaParametrizada(clave, descripcion, texto, {})
+            consulta.validar(schema)
+            consultas[clave] = consulta
+        _consultas = consultas
+    return _consultas[nombre]
+
+
+def _id_paciente(alergia: Dict[str, Any]) -> Optional[str]:
+    paciente = alergia.get('alergia.paciente')
+    if isinstance(paciente, list):
+        paciente = paciente[0] if paciente else None
+    return paciente.get('paciente.id') if paciente else None
+
+
+def _uid_mayor(a: str, b: str) -> str:
+    return a if int(a, 16) >= int(b, 16) else b
+
+
+# =============================================================================
+# ÍNDICE
+# =============================================================================
+
+class IndiceAlergias:
+    """
+    Medicamento -> términos contraindicados y paciente -> términos de alergia.
+
+    Los conjuntos son frozenset que se sustituyen (nunca se modifican) al
+    añadir o quitar, así que las comprobaciones no toman el cerrojo: una
+    lectura concurrente ve el conjunto anterior o el nuevo.
+    """
+
+    def __init__(self):
+        self.medicamentos: Dict[str, FrozenSet[str]] = {}
+        self.nombres: Dict[str, str] = {}
+        self.por_termino: Dict[str, FrozenSet[str]] = {}
+        self.pacientes: Dict[str, FrozenSet[str]] = {}
+        # (paciente, término) -> alergia_id -> (nombre, gravedad)
+        self._detalle: Dict[Tuple[str, str], Dict[str, Tuple[str, str]]] = {}
+        self._alergias: Dict[str, Tuple[str, str]] = {}
+        self.cursor_alergias = '0x0'
+        # Uid de alergias leídas sin paciente o sin nombre, a releer
+        self.alergias_pendientes: Set[str] = set()
+        self.cursor_medicamentos = '0x0'
+        self.cargado = 0.0
+        self.refrescado = 0.0
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Mantenimiento
+    # -------------------------------------------------------------------------
+
+    def agregar_medicamento(self, medicamento_id: str, principio_activo: Optional[str],
+                            contraindicaciones: Iterable[str] = (), nombre: Optional[str] = None):
+        """Añade o sustituye un medicamento."""
+        terminos = terminos_medicamento(principio_activo, contraindicaciones)
+        with self._lock:
+            for termino in self.medicamentos.get(medicamento_id, frozenset()) - terminos:
+                self.por_termino[termino] = self.por_termino[termino] - {medicamento_id}
+            for termino in terminos:
+                self.por_termino[termino] = self.por_termino.get(termino, frozenset()) | {medicamento_id}
+            self.medicamentos[medicamento_id] = terminos
+            if nombre:
+                self.nombres[medicamento_id] = nombre
+
+    def agregar_alergia(self, alergia_id: str, paciente_id: Optional[str], nombre: Optional[str],
+                        gravedad: Optional[str] = None):
+        """Añade o sustituye una alergia de un paciente."""
+        if not paciente_id or not nombre:
+            return
+        termino = normalizar_termino(nombre)
+        with self._lock:
+            self._quitar(alergia_id)
+            self._alergias[alergia_id] = (paciente_id, termino)
+            self._detalle.setdefault((paciente_id, termino), {})[alergia_id] = (nombre, gravedad or '')
+            self.pacientes[paciente_id] = self.pacientes.get(paciente_id, frozenset()) | {termino}
+
+    def quitar_alergia(self, alergia_id: str):
+        """Quita una alergia (p. ej. descartada tras una prueba)."""
+        with self._lock:
+            self._quitar(alergia_id)
+
+    def _quitar(self, alergia_id: str):
+        anterior = self._alergias.pop(alergia_id, None)
+        if anterior is None:
+            return
+        paciente_id, termino = anterior
+        detalle = self._detalle[(paciente_id, termino)]
+        del detalle[alergia_id]
+        if detalle:
+            return
+        del self._detalle[(paciente_id, termino)]
+        restantes = self.pacientes[paciente_id] - {termino}
+        if restantes:
+            self.pacientes[paciente_id] = restantes
+        else:
+            del self.pacientes[paciente_id]
+
+    # -------------------------------------------------------------------------
+    # Comprobaciones
+    # -------------------------------------------------------------------------
+
+    def _alergias_de(self, paciente_id: str, terminos: Iterable[str]) -> List[Dict[str, str]]:
+        return [
+            {'alergia_id': alergia_id, 'nombre': nombre, 'gravedad': gravedad}
+            for termino in sorted(terminos)
+            for alergia_id, (nombre, gravedad) in self._detalle.get((paciente_id, termino), {}).items()
+        ]
+
+    def conflictos(self, paciente_id: str, medicamento_ids: Iterable[str]) -> Dict[str, FrozenSet[str]]:
+        """Medicamento -> términos en conflicto (solo los que tienen alguno)."""
+        alergias = self.pacientes.get(paciente_id)
+        if not alergias:
+            return {}
+        medicamentos = self.medicamentos
+        resultado = {}
+        for medicamento_id in medicamento_ids:
+            comunes = alergias & medicamentos.get(medicamento_id, frozenset())
+            if comunes:
+                resultado[medicamento_id] = comunes
+        return resultado
+
+    def verificar_receta(self, paciente_id: str, medicamento_ids: Iterable[str]) -> Dict[str, Any]:
+        """
+        "Verificar compatibilidad medicamento-paciente" (menu_alergias 9).
+
+        Returns:
+            {'compatible', 'paciente_id', 'conflictos': [{medicamento_id,
+            alergias: [{alergia_id, nombre, gravedad}]}], 'desconocidos'}
+        """
+        medicamento_ids = list(medicamento_ids)
+        conflictos = self.conflictos(paciente_id, medicamento_ids)
+        return {
+            'compatible': not conflictos,
+            'paciente_id': paciente_id,
+            'conflictos': [
+                {'medicamento_id': m, 'alergias': self._alergias_de(paciente_id, terminos)}
+                for m, terminos in conflictos.items()
+            ],
+            'desconocidos': [m for m in medicamento_ids if m not in self.medicamentos],
+        }
+
+    def verificar_recetas(self, recetas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Comprueba un lote de recetas ({id, paciente_id, medicamento_ids}).
+
+        Returns:
+            Solo las recetas con algún conflicto, en el orden de entrada
+        """
+        pacientes = self.pacientes
+        medicamentos = self.medicamentos
+        vacio: FrozenSet[str] = frozenset()
+        resultado = []
+        for receta in recetas:
+            paciente_id = receta['paciente_id']
+            alergias = pacientes.get(paciente_id)
+            if not alergias:
+                continue
+            conflictos = []
+            for medicamento_id in receta['medicamento_ids']:
+                comunes = alergias & medicamentos.get(medicamento_id, vacio)
+                if comunes:
+                    conflictos.append({'medicamento_id': medicamento_id,
+                                       'alergias': self._alergias_de(paciente_id, comunes)})
+            if conflictos:
+                resultado.append({'receta_id': receta.get('id'), 'paciente_id': paciente_id,
+                                  'conflictos': conflictos})
+        return resultado
+
+    def alertas(self, paciente_id: str) -> List[Dict[str, Any]]:
+        """
+        "Alertas de alergias para prescripción" (menu_alergias 10): los
+        medicamentos que no se deben recetar a un paciente.
+        """
+        por_medicamento: Dict[str, set] = {}
+        for termino in self.pacientes.get(paciente_id, frozenset()):
+            for medicamento_id in self.por_termino.get(termino, frozenset()):
+                por_medicamento.setdefault(medicamento_id, set()).add(termino)
+        return [
+            {'medicamento_id': m, 'nombre_comercial': self.nombres.get(m),
+             'alergias': self._alergias_de(paciente_id, terminos)}
+            for m, terminos in sorted(por_medicamento.items())
+        ]
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'medicamentos': len(self.medicamentos),
+            'pacientes_con_alergias': len(self.pacientes),
+            'alergias': len(self._alergias),
+            'terminos': len(self.por_termino),
+        }
+
+    # -------------------------------------------------------------------------
+    # Carga
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def desde_registros(cls, medicamentos: Iterable[Dict[str, Any]],
+                        alergias: Iterable[Dict[str, Any]]) -> 'IndiceAlergias':
+        """Índice a partir de registros del generador (o de MongoDB)."""
+        indice = cls()
+        for m in medicamentos:
+            indice.agregar_medicamento(m.get('id') or m.get('_id'), m.get('principio_activo'),
+                                       m.get('contraindicaciones') or (), m.get('nombre_comercial'))
+        for a in alergias:
+            indice.agregar_alergia(a.get('id') or a.get('_id'), a.get('paciente_id'),
+                                   a.get('nombre'), a.get('gravedad'))
+        indice.cargado = indice.refrescado = time.monotonic()
+        return indice
+
+    def refrescar(self, cliente: Any) -> Dict[str, int]:
+        """
+        Lee de Dgraph los medicamentos y alergias con uid posterior al
+        último leído, más las alergias pendientes de completar. Con los
+        cursores en '0x0' es una carga completa.
+
+        Returns:
+            Nodos nuevos (o completados) añadidos al índice por tipo
+        """
+        nuevos = {'medicamentos': 0, 'alergias': 0}
+        for m in _consulta('medicamentos_indice').paginar(cliente, TAM_PAGINA_INDICE,
+                                                          cursor=self.cursor_medicamentos):
+            self.agregar_medicamento(m.get('medicamento.id'), m.get('medicamento.principio_activo'),
+                                     m.get('medicamento.contraindicaciones') or (),
+                                     m.get('medicamento.nombre_comercial'))
+            self.cursor_medicamentos = _uid_mayor(self.cursor_medicamentos, m['uid'])
+            nuevos['medicamentos'] += 1
+        pendientes = sorted(self.alergias_pendientes, key=lambda uid: int(uid, 16))
+        for i in range(0, len(pendientes), TAM_PAGINA_INDICE):
+            lote = pendientes[i:i + TAM_PAGINA_INDICE]
+            respuesta = _consulta('alergias_por_uid').ejecutar(cliente, uids=f"[{', '.join(lote)}]")
+            for a in respuesta.get('alergias', []):
+                if len(a) == 1:
+                    # Solo queda el uid: el nodo se ha borrado
+                    self.alergias_pendientes.discard(a['uid'])
+                elif self._leer_alergia(a):
+                    nuevos['alergias'] += 1
+        for a in _consulta('alergias_indice').paginar(cliente, TAM_PAGINA_INDICE,
+                                                      cursor=self.cursor_alergias):
+            if self._leer_alergia(a):
+                nuevos['alergias'] += 1
+            self.cursor_alergias = _uid_mayor(self.cursor_alergias, a['uid'])
+        self.refrescado = time.monotonic()
+        if not self.cargado:
+            self.cargado = self.refrescado
+        return nuevos
+
+    def _leer_alergia(self, alergia: Dict[str, Any]) -> bool:
+        """
+        Añade una alergia leída de Dgraph. Si aún no tiene paciente o nombre
+        (p. ej. el nodo se creó antes que su arista) queda pendiente.
+        """
+        paciente_id, nombre = _id_paciente(alergia), alergia.get('alergia.nombre')
+        if not paciente_id or not nombre:
+            self.alergias_pendientes.add(alergia['uid'])
+            return False
+        self.alergias_pendientes.discard(alergia['uid'])
+        self.agregar_alergia(alergia.get('alergia.id') or alergia['uid'], paciente_id,
+                             nombre, alergia.get('alergia.gravedad'))
+        return True
+
+    @classmethod
+    def desde_dgraph(cls, cliente: Any) -> 'IndiceAlergias':
+        indice = cls()
+        indice.refrescar(cliente)
+        return indice
+
+
+# =============================================================================
+# ÍNDICE COMPARTIDO
+# =============================================================================
+
+_indice: Optional[IndiceAlergias] = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice(cliente: Any = None) -> IndiceAlergias:
+    """
+    Índice del proceso: recarga completa si ha caducado, lectura
+    incremental si toca, y el índice vigente si Dgraph no responde.
+    """
+    global _indice
+    with _indice_lock:
+        ahora = time.monotonic()
+        if _indice is not None and ahora - _indice.refrescado < REFRESCO_INDICE_ALERGIAS_SEG:
+            return _indice
+        if cliente is None:
+            from connect import conectar_dgraph
+            cliente = conectar_dgraph()
+        if cliente is None:
+            return _indice if _indice is not None else IndiceAlergias()
+        try:
+            if _indice is None or ahora - _indice.cargado >= RECARGA_INDICE_ALERGIAS_SEG:
+                _indice = IndiceAlergias.desde_dgraph(cliente)
+            else:
+                _indice.refrescar(cliente)
+        except Exception as e:
+            print(f"⚠ No se pudo refrescar el índice de alergias: {e}")
+            if _indice is None:
+                return IndiceAlergias()
+        return _indice
+
+
+def fijar_indice(indice: IndiceAlergias):
+    """Sustituye el índice compartido (carga desde el generador, pruebas manuales)."""
+    global _indice
+    with _indice_lock:
+        _indice = indice
+        _indice.refrescado = float('inf')
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Verifica recetas contra las alergias de los pacientes."""
+    parser = argparse.ArgumentParser(description="Compatibilidad de medicamentos con las alergias del paciente")
+    parser.add_argument('--fuente', choices=('dgraph', 'generador'), default='dgraph')
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--paciente', default=None, help="ID del paciente")
+    parser.add_argument('--medicamento', action='append', default=[], help="ID de medicamento (repetible)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.fuente == 'generador':
+        from utils.data_generator import SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen, generar_en_paralelo
+        volumen = calcular_volumen(args.citas) if args.citas else dict(VOLUMEN_BASE)
+        medicamentos = (m for b in generar_en_paralelo('medicamentos', SEMILLA_POR_DEFECTO, volumen) for m in b)
+        alergias = (a for b in generar_en_paralelo('alergias', SEMILLA_POR_DEFECTO, volumen) for a in b)
+        indice = IndiceAlergias.desde_registros(medicamentos, alergias)
+    else:
+        from connect import conectar_dgraph
+        cliente = conectar_dgraph()
+        if cliente is None:
+            print("✗ No hay conexión con Dgraph")
+            return
+        indice = IndiceAlergias.desde_dgraph(cliente)
+    print(f"✓ Índice cargado en {(time.perf_counter() - inicio) * 1000:.0f} ms: {indice.resumen()}")
+
+    if args.fuente == 'generador' and not args.paciente:
+        recetas = [r for b in generar_en_paralelo('recetas', SEMILLA_POR_DEFECTO, volumen) for r in b]
+        inicio = time.perf_counter()
+        conflictos = indice.verificar_recetas(recetas)
+        segundos = time.perf_counter() - inicio
+        print(f"✓ {len(recetas):,} recetas verificadas en {segundos * 1000:.1f} ms "
+              f"({segundos / max(len(recetas), 1) * 1e6:.2f} µs/receta): {len(conflictos):,} con conflicto")
+        for conflicto in conflictos[:10]:
+            print(f"  ⚠ {conflicto['receta_id']} ({conflicto['paciente_id']}): "
+                  + ', '.join(f"{c['medicamento_id']} [{', '.join(a['nombre'] for a in c['alergias'])}]"
+                              for c in conflicto['conflictos']))
+        return
+
+    if args.paciente:
+        if args.medicamento:
+            resultado = indice.verificar_receta(args.paciente, args.medicamento)
+            marca = '✓ Compatible' if resultado['compatible'] else '✗ Incompatible'
+            print(f"{marca}: {args.paciente} con {', '.join(args.medicamento)}")
+            for conflicto in resultado['conflictos']:
+                for alergia in conflicto['alergias']:
+                    print(f"  ⚠ {conflicto['medicamento_id']}: alergia a {alergia['nombre']} ({alergia['gravedad']})")
+        else:
+            alertas = indice.alertas(args.paciente)
+            print(f"{len(alertas)} medicamentos contraindicados para {args.paciente}")
+            for alerta in alertas:
+                nombres = ', '.join(a['nombre'] for a in alerta['alergias'])
+                print(f"  ⚠ {alerta['medicamento_id']} {alerta['nombre_comercial'] or ''}: {nombres}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,314 @@ Este módulo establece las conexiones a las tres bases de datos:
 - Dgraph: Base de datos de grafos
 
 Cada conexión utiliza contenedores Docker para facilitar el desarrollo.
+
+Las conexiones se mantienen en un registro único por proceso
+(RegistroConexiones): se abren la primera vez que se necesitan y se
+reutilizan después, de modo que ninguna operación paga de nuevo el
+handshake. El tamaño de los pools se configura con variables de entorno
+(MONGO_MAX_POOL_SIZE, CASSANDRA_CONEXIONES_POR_HOST, DGRAPH_NUM_STUBS).
+
+Importar este módulo no importa ningún driver: pymongo, cassandra-driver y
+pydgraph se importan al conectar con cada base. Conectar tampoco ejecuta
+DDL; el keyspace, las tablas y el schema de Dgraph se crean una sola vez
+con preparar_bases() (python connect.py --preparar).
 """
 
+import argparse
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+# =============================================================================
+# CONFIGURACIÓN DEL POOL DE CONEXIONES
+# =============================================================================
+
+# Tamaño máximo y mínimo del pool de sockets de MongoClient
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+
+# Conexiones por host de Cassandra (el driver solo permite ajustarlo con
+# protocolo v1/v2; en v3+ una conexión multiplexa miles de peticiones)
+CASSANDRA_CONEXIONES_POR_HOST = int(os.getenv('CASSANDRA_CONEXIONES_POR_HOST', 2))
+
+# Keyspace de Cassandra (lo crea preparar_cassandra)
+CASSANDRA_KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'plataforma_salud')
+
+# Número de stubs gRPC de Dgraph que se reparten en round-robin
+DGRAPH_NUM_STUBS = int(os.getenv('DGRAPH_NUM_STUBS', 4))
+
+# Segundos durante los que una conexión reutilizada se considera sana
+# sin volver a comprobarla contra el servidor
+INTERVALO_VERIFICACION = float(os.getenv('INTERVALO_VERIFICACION_SEG', 30))
+
+
+def configuracion_mongodb() -> Tuple[str, str]:
+    """
+    URI y base de datos de MongoDB a partir de las variables MONGO_*.
+
+    La comparten el MongoClient del registro y el cliente de Motor de
+    consultas_async.py.
+    """
+    MONGO_HOST = os.getenv('MONGO_HOST', 'localhost')
+    MONGO_PORT = int(os.getenv('MONGO_PORT', 27017))
+    MONGO_USER = os.getenv('MONGO_USER', 'admin')
+    MONGO_PASSWORD = os.getenv('MONGO_PASSWORD', 'password')
+    MONGO_DATABASE = os.getenv('MONGO_DATABASE', 'plataforma_salud')
+    return f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/", MONGO_DATABASE
+
+
+# =============================================================================
+# REGISTRO DE CONEXIONES (SINGLETON POR PROCESO)
+# =============================================================================
+
+class RegistroConexiones:
+    """
+    Registro único de conexiones compartido por todo el proceso.
+    
+    Cada backend se conecta de forma perezosa la primera vez que se solicita
+    y las llamadas siguientes reutilizan el mismo cliente (con su pool
+    interno). La conexión solo se vuelve a verificar contra el servidor cuando
+    han pasado más de INTERVALO_VERIFICACION segundos desde la última
+    comprobación; si la verificación falla se descarta y se reconecta.
+    
+    Si el proceso se bifurca (multiprocessing con fork), el hijo detecta el
+    cambio de PID y abre sus propias conexiones, ya que ni MongoClient ni el
+    Cluster de Cassandra son seguros tras un fork.
+    """
+    
+    _instancia = None
+    _lock_instancia = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instancia is None:
+            with cls._lock_instancia:
+                if cls._instancia is None:
+                    instancia = super().__new__(cls)
+                    instancia._inicializar()
+                    cls._instancia = instancia
+        return cls._instancia
+    
+    def _inicializar(self):
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._mongo_client = None
+        self._mongo_db = None
+        self._cassandra_cluster = None
+        self._cassandra_session = None
+        self._dgraph_stubs: List[Any] = []
+        self._dgraph_clientes: List[Any] = []
+        self._dgraph_siguiente = 0
+        self._ultima_verificacion: Dict[str, float] = {}
+    
+    def _verificar_proceso(self):
+        """Descarta (sin cerrar) las conexiones heredadas de un proceso padre."""
+        if self._pid != os.getpid():
+            self._inicializar()
+    
+    def _requiere_verificacion(self, backend: str) -> bool:
+        ultima = self._ultima_verificacion.get(backend, 0.0)
+        return time.monotonic() - ultima > INTERVALO_VERIFICACION
+    
+    def _marcar_sano(self, backend: str):
+        self._ultima_verificacion[backend] = time.monotonic()
+    
+    # -------------------------------------------------------------------------
+    # MongoDB
+    # -------------------------------------------------------------------------
+    
+    def mongodb(self) -> Any:
+        """Retorna la base de datos de MongoDB, conectando si es necesario."""
+        with self._lock:
+            self._verificar_proceso()
+            
+            if self._mongo_db is not None:
+                if not self._requiere_verificacion('mongodb'):
+                    return self._mongo_db
+                try:
+                    self._mongo_client.admin.command('ping')
+                    self._marcar_sano('mongodb')
+                    return self._mongo_db
+                except Exception:
+                    self.cerrar_mongodb()
+            
+            from pymongo import MongoClient
+            
+            connection_uri, MONGO_DATABASE = configuracion_mongodb()
+            
+            # Un único MongoClient por proceso: gestiona internamente el pool
+            client = MongoClient(
+                connection_uri,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE
+            )
+            
+            try:
+                # Verificar conexión (ping es más barato que server_info)
+                client.admin.command('ping')
+            except Exception:
+                client.close()
+                raise
+            
+            self._mongo_client = client
+            self._mongo_db = client[MONGO_DATABASE]
+            self._marcar_sano('mongodb')
+            
+            print(f"✓ Conexión exitosa a MongoDB: {MONGO_DATABASE} (pool máx. {MONGO_MAX_POOL_SIZE})")
+            return self._mongo_db
+    
+    def cerrar_mongodb(self) -> bool:
+        with self._lock:
+            if self._mongo_client is None:
+                return False
+            try:
+                self._mongo_client.close()
+            finally:
+                self._mongo_client = None
+                self._mongo_db = None
+                self._ultima_verificacion.pop('mongodb', None)
+            return True
+    
+    # -------------------------------------------------------------------------
+    # Cassandra
+    # -------------------------------------------------------------------------
+    
+    def cassandra(self) -> Any:
+        """Retorna la sesión de Cassandra, conectando si es necesario."""
+        with self._lock:
+            self._verificar_proceso()
+            
+            if self._cassandra_session is not None:
+                if not self._requiere_verificacion('cassandra'):
+                    return self._cassandra_session
+                try:
+                    self._cassandra_session.execute("SELECT release_version FROM system.local")
+                    self._marcar_sano('cassandra')
+                    return self._cassandra_session
+                except Exception:
+                    self.cerrar_cassandra()
+            
+            from cassandra.cluster import Cluster
+            from cassandra.policies import HostDistance
+            
+            # Configuración de conexión
+            CASSANDRA_HOST = os.getenv('CASSANDRA_HOST', 'localhost')
+            CASSANDRA_PORT = int(os.getenv('CASSANDRA_PORT', 9042))
+            
+            # Establecer conexión al cluster
+            cluster = Cluster(
+                [CASSANDRA_HOST],
+                port=CASSANDRA_PORT
+            )
+            
+            # Tamaño del pool por host (solo aplicable con protocolo v1/v2)
+            try:
+                cluster.set_max_connections_per_host(HostDistance.LOCAL, CASSANDRA_CONEXIONES_POR_HOST)
+                cluster.set_core_connections_per_host(HostDistance.LOCAL, CASSANDRA_CONEXIONES_POR_HOST)
+            except Exception:
+                pass
+            
+            try:
+                # El keyspace debe existir (preparar_cassandra)
+                session = cluster.connect(CASSANDRA_KEYSPACE)
+            except Exception:
+                cluster.shutdown()
+                raise
+            
+            self._cassandra_cluster = cluster
+            self._cassandra_session = session
+            self._marcar_sano('cassandra')
+            
+            print(f"✓ Conexión exitosa a Cassandra: {CASSANDRA_KEYSPACE}")
+            return self._cassandra_session
+    
+    def cerrar_cassandra(self) -> bool:
+        with self._lock:
+            if self._cassandra_cluster is None:
+                return False
+            try:
+                self._cassandra_cluster.shutdown()
+            finally:
+                self._cassandra_cluster = None
+                self._cassandra_session = None
+                self._ultima_verificacion.pop('cassandra', None)
+            return True
+    
+    # -------------------------------------------------------------------------
+    # Dgraph
+    # -------------------------------------------------------------------------
+    
+    def dgraph(self) -> Any:
+        """
+        Retorna un cliente de Dgraph del pool.
+        
+        Se abren DGRAPH_NUM_STUBS canales gRPC y cada llamada devuelve el
+        siguiente cliente en round-robin, de modo que las consultas
+        concurrentes se reparten entre canales.
+        """
+        with self._lock:
+            self._verificar_proceso()
+            
+            if self._dgraph_clientes and self._requiere_verificacion('dgraph'):
+                try:
+                    self._dgraph_clientes[0].check_version()
+                    self._marcar_sano('dgraph')
+                except Exception:
+                    self.cerrar_dgraph()
+            
+            if not self._dgraph_clientes:
+                import pydgraph
+                
+                # Configuración de conexión
+                DGRAPH_HOST = os.getenv('DGRAPH_HOST', 'localhost')
+                DGRAPH_PORT = os.getenv('DGRAPH_PORT', '9080')
+                
+                # Crear los stubs de conexión
+                stubs = [
+                    pydgraph.DgraphClientStub(f'{DGRAPH_HOST}:{DGRAPH_PORT}')
+                    for _ in range(max(1, DGRAPH_NUM_STUBS))
+                ]
+                clientes = [pydgraph.DgraphClient(stub) for stub in stubs]
+                
+                try:
+                    # Verificar conexión con una llamada ligera
+                    clientes[0].check_version()
+                except Exception:
+                    for stub in stubs:
+                        stub.close()
+                    raise
+                
+                self._dgraph_stubs = stubs
+                self._dgraph_clientes = clientes
+                self._dgraph_siguiente = 0
+                self._marcar_sano('dgraph')
+                
+                print(f"✓ Conexión exitosa a Dgraph en {DGRAPH_HOST}:{DGRAPH_PORT} ({len(stubs)} stubs)")
+            
+            cliente = self._dgraph_clientes[self._dgraph_siguiente]
+            self._dgraph_siguiente = (self._dgraph_siguiente + 1) % len(self._dgraph_clientes)
+            return cliente
+    
+    def cerrar_dgraph(self) -> bool:
+        with self._lock:
+            if not self._dgraph_stubs:
+                return False
+            try:
+                for stub in self._dgraph_stubs:
+                    stub.close()
+            finally:
+                self._dgraph_stubs = []
+                self._dgraph_clientes = []
+                self._dgraph_siguiente = 0
+                self._ultima_verificacion.pop('dgraph', None)
+            return True
+
+
+def obtener_registro() -> RegistroConexiones:
+    """Retorna el registro de conexiones del proceso."""
+    return RegistroConexiones()
+
 
 # =============================================================================
 # CONEXIÓN A MONGODB
@@ -27,33 +331,14 @@ def conectar_mongodb() -> Optional[Any]:
         -e MONGO_INITDB_ROOT_PASSWORD=password \
         mongo:latest
     
+    La conexión se obtiene del registro de conexiones, por lo que las
+    llamadas repetidas reutilizan el mismo MongoClient y su pool.
+    
     Returns:
-        Cliente de MongoDB o None si falla la conexión
+        Base de datos de MongoDB o None si falla la conexión
     """
     try:
-        from pymongo import MongoClient
-        
-        # Configuración de conexión
-        MONGO_HOST = os.getenv('MONGO_HOST', 'localhost')
-        MONGO_PORT = int(os.getenv('MONGO_PORT', 27017))
-        MONGO_USER = os.getenv('MONGO_USER', 'admin')
-        MONGO_PASSWORD = os.getenv('MONGO_PASSWORD', 'password')
-        MONGO_DATABASE = os.getenv('MONGO_DATABASE', 'plataforma_salud')
-        
-        # Crear URI de conexión
-        connection_uri = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/"
-        
-        # Establecer conexión
-        client = MongoClient(connection_uri, serverSelectionTimeoutMS=5000)
-        
-        # Verificar conexión
-        client.server_info()
-        
-        # Seleccionar base de datos
-        db = client[MONGO_DATABASE]
-        
-        print(f"✓ Conexión exitosa a MongoDB: {MONGO_DATABASE}")
-        return db
+        return obtener_registro().mongodb()
         
     except ImportError:
         print("✗ Error: pymongo no está instalado. Ejecute: pip install pymongo")
@@ -78,37 +363,14 @@ def conectar_cassandra() -> Optional[Any]:
     
     Nota: Cassandra tarda unos minutos en iniciar completamente.
     
+    La sesión es única por proceso (las sesiones del driver son seguras
+    entre hilos) y se reutiliza en cada llamada.
+    
     Returns:
         Sesión de Cassandra o None si falla la conexión
     """
     try:
-        from cassandra.cluster import Cluster
-        from cassandra.auth import PlainTextAuthProvider
-        
-        # Configuración de conexión
-        CASSANDRA_HOST = os.getenv('CASSANDRA_HOST', 'localhost')
-        CASSANDRA_PORT = int(os.getenv('CASSANDRA_PORT', 9042))
-        CASSANDRA_KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'plataforma_salud')
-        
-        # Establecer conexión al cluster
-        cluster = Cluster(
-            [CASSANDRA_HOST],
-            port=CASSANDRA_PORT
-        )
-        
-        session = cluster.connect()
-        
-        # Crear keyspace si no existe
-        session.execute(f"""
-            CREATE KEYSPACE IF NOT EXISTS {CASSANDRA_KEYSPACE}
-            WITH replication = {{'class': 'SimpleStrategy', 'replication_factor': 1}}
-        """)
-        
-        # Usar el keyspace
-        session.set_keyspace(CASSANDRA_KEYSPACE)
-        
-        print(f"✓ Conexión exitosa a Cassandra: {CASSANDRA_KEYSPACE}")
-        return session
+        return obtener_registro().cassandra()
         
     except ImportError:
         print("✗ Error: cassandra-driver no está instalado. Ejecute: pip install cassandra-driver")
@@ -116,6 +378,7 @@ def conectar_cassandra() -> Optional[Any]:
     except Exception as e:
         print(f"✗ Error al conectar con Cassandra: {e}")
         print("  Nota: Asegúrese de que el contenedor Docker esté en ejecución y completamente iniciado")
+        print(f"  y de que el keyspace {CASSANDRA_KEYSPACE} exista (python connect.py --preparar)")
         return None
 
 
@@ -147,31 +410,13 @@ def conectar_dgraph() -> Optional[Any]:
         depends_on:
           - dgraph-zero
     
+    Cada llamada retorna el siguiente cliente del pool de stubs (round-robin).
+    
     Returns:
         Cliente de Dgraph o None si falla la conexión
     """
     try:
-        import pydgraph
-        
-        # Configuración de conexión
-        DGRAPH_HOST = os.getenv('DGRAPH_HOST', 'localhost')
-        DGRAPH_PORT = os.getenv('DGRAPH_PORT', '9080')
-        
-        # Crear stub de conexión
-        client_stub = pydgraph.DgraphClientStub(f'{DGRAPH_HOST}:{DGRAPH_PORT}')
-        
-        # Crear cliente
-        client = pydgraph.DgraphClient(client_stub)
-        
-        # Verificar conexión ejecutando una consulta simple
-        query = "{ q(func: has(dgraph.type)) { count(uid) } }"
-        txn = client.txn(read_only=True)
-        try:
-            res = txn.query(query)
-            print(f"✓ Conexión exitosa a Dgraph en {DGRAPH_HOST}:{DGRAPH_PORT}")
-            return client
-        finally:
-            txn.discard()
+        return obtener_registro().dgraph()
             
     except ImportError:
         print("✗ Error: pydgraph no está instalado. Ejecute: pip install pydgraph")
@@ -182,6 +427,26 @@ def conectar_dgraph() -> Optional[Any]:
         return None
 
 
+def calentar_conexiones(mongodb: bool = True, cassandra: bool = True, dgraph: bool = True) -> Dict[str, bool]:
+    """
+    Abre por adelantado las conexiones indicadas.
+    
+    Útil al inicio de scripts de carga o servicios para que la primera
+    petición no pague el coste del handshake.
+    
+    Returns:
+        Diccionario backend -> True si quedó conectado
+    """
+    resultado = {}
+    if mongodb:
+        resultado['mongodb'] = conectar_mongodb() is not None
+    if cassandra:
+        resultado['cassandra'] = conectar_cassandra() is not None
+    if dgraph:
+        resultado['dgraph'] = conectar_dgraph() is not None
+    return resultado
+
+
 # =============================================================================
 # FUNCIÓN PARA APLICAR SCHEMA DE DGRAPH
 # =============================================================================
@@ -197,6 +462,8 @@ def aplicar_schema_dgraph(client: Any) -> bool:
         True si el schema se aplicó correctamente, False en caso contrario
     """
     try:
+        import pydgraph
+        
         # Leer el archivo de schema
         schema_path = os.path.join(os.path.dirname(__file__), 'Dgraph', 'schema.rdf')
         
@@ -218,6 +485,76 @@ def aplicar_schema_dgraph(client: Any) -> bool:
         return False
 
 
+# =============================================================================
+# PREPARACIÓN DE LAS BASES (UNA SOLA VEZ)
+# =============================================================================
+
+RUTA_SCHEMA_CQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cassandra', 'schema.cql')
+
+
+def preparar_cassandra() -> bool:
+    """
+    Crea el keyspace y las tablas de Cassandra/schema.cql si no existen.
+    
+    Es el único punto que ejecuta DDL en Cassandra: conectar_cassandra()
+    solo abre una sesión sobre el keyspace ya creado.
+    
+    Returns:
+        True si el keyspace y las tablas quedaron creados
+    """
+    try:
+        import re
+        from cassandra.cluster import Cluster
+        
+        with open(RUTA_SCHEMA_CQL, encoding='utf-8') as f:
+            texto = '\n'.join(linea.split('--', 1)[0].rstrip() for linea in f)
+        sentencias = [s.strip() for s in texto.split(';') if s.strip()]
+        
+        # El keyspace de schema.cql se crea con el nombre de CASSANDRA_KEYSPACE
+        cluster = Cluster([os.getenv('CASSANDRA_HOST', 'localhost')],
+                          port=int(os.getenv('CASSANDRA_PORT', 9042)))
+        try:
+            session = cluster.connect()
+            for sentencia in sentencias:
+                if re.match(r'CREATE\s+KEYSPACE', sentencia, re.IGNORECASE):
+                    session.execute(re.sub(r'(IF\s+NOT\s+EXISTS\s+)\w+', r'\g<1>' + CASSANDRA_KEYSPACE,
+                                           sentencia, count=1, flags=re.IGNORECASE))
+            session.set_keyspace(CASSANDRA_KEYSPACE)
+            for sentencia in sentencias:
+                if re.match(r'CREATE\s+TABLE', sentencia, re.IGNORECASE):
+                    session.execute(sentencia)
+        finally:
+            cluster.shutdown()
+        
+        print(f"✓ Keyspace {CASSANDRA_KEYSPACE} y tablas de Cassandra listos")
+        return True
+        
+    except ImportError:
+        print("✗ Error: cassandra-driver no está instalado. Ejecute: pip install cassandra-driver")
+        return False
+    except Exception as e:
+        print(f"✗ Error al preparar Cassandra: {e}")
+        return False
+
+
+def preparar_bases(cassandra: bool = True, dgraph: bool = True) -> Dict[str, bool]:
+    """
+    Crea el keyspace y las tablas de Cassandra y aplica el schema de Dgraph.
+    
+    MongoDB no necesita preparación: las colecciones se crean al insertar.
+    
+    Returns:
+        Diccionario backend -> True si quedó preparado
+    """
+    resultado = {}
+    if cassandra:
+        resultado['cassandra'] = preparar_cassandra()
+    if dgraph:
+        cliente = conectar_dgraph()
+        resultado['dgraph'] = cliente is not None and aplicar_schema_dgraph(cliente)
+    return resultado
+
+
 # =============================================================================
 # FUNCIÓN PARA CERRAR CONEXIONES
 # =============================================================================
@@ -226,28 +563,50 @@ def cerrar_conexiones(mongo_db=None, cassandra_session=None, dgraph_client=None)
     """
     Cierra todas las conexiones a las bases de datos.
     
+    Cierra las conexiones del registro (incluidos todos los stubs gRPC de
+    Dgraph). Los argumentos se mantienen por compatibilidad: si se pasa un
+    objeto que no pertenece al registro, también se cierra.
+    
     Args:
         mongo_db: Cliente de MongoDB
         cassandra_session: Sesión de Cassandra
         dgraph_client: Cliente de Dgraph
     """
+    registro = obtener_registro()
+    
+    # Identificar qué objetos recibidos no pertenecen al registro
+    mongo_externo = mongo_db is not None and mongo_db is not registro._mongo_db
+    cassandra_externa = cassandra_session is not None and cassandra_session is not registro._cassandra_session
+    dgraph_externo = dgraph_client is not None and dgraph_client not in registro._dgraph_clientes
+    
     try:
-        if mongo_db is not None:
+        cerrada = registro.cerrar_mongodb()
+        if mongo_externo:
             mongo_db.client.close()
+            cerrada = True
+        if cerrada:
             print("✓ Conexión a MongoDB cerrada")
     except Exception as e:
         print(f"✗ Error al cerrar MongoDB: {e}")
     
     try:
-        if cassandra_session is not None:
+        cerrada = registro.cerrar_cassandra()
+        if cassandra_externa:
             cassandra_session.cluster.shutdown()
+            cerrada = True
+        if cerrada:
             print("✓ Conexión a Cassandra cerrada")
     except Exception as e:
         print(f"✗ Error al cerrar Cassandra: {e}")
     
     try:
-        if dgraph_client is not None:
-            # Dgraph client stub se cierra automáticamente
+        cerrada = registro.cerrar_dgraph()
+        if dgraph_externo:
+            # DgraphClient no expone close(): se cierran sus stubs
+            for stub in getattr(dgraph_client, '_clients', []):
+                stub.close()
+            cerrada = True
+        if cerrada:
             print("✓ Conexión a Dgraph cerrada")
     except Exception as e:
         print(f"✗ Error al cerrar Dgraph: {e}")
@@ -260,12 +619,24 @@ def cerrar_conexiones(mongo_db=None, cassandra_session=None, dgraph_client=None)
 def main():
     """
     Función principal para probar las conexiones.
+    
+    Con --preparar crea antes el keyspace, las tablas y el schema de Dgraph.
     """
+    parser = argparse.ArgumentParser(description="Prueba las conexiones a las tres bases de datos")
+    parser.add_argument('--preparar', action='store_true',
+                        help="Crear keyspace y tablas de Cassandra y aplicar el schema de Dgraph")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("PRUEBA DE CONEXIONES - Plataforma de Integración de Datos de Salud")
     print("=" * 70)
     print()
     
+    if args.preparar:
+        print("0. Preparando keyspace, tablas y schema...")
+        preparar_bases()
+        print()
+    
     # Probar MongoDB
     print("1. Probando conexión a MongoDB...")
     mongo_db = conectar_mongodb()
@@ -281,12 +652,6 @@ def main():
     dgraph_client = conectar_dgraph()
     print()
     
-    # Aplicar schema de Dgraph si la conexión fue exitosa
-    if dgraph_client:
-        print("4. Aplicando schema de Dgraph...")
-        aplicar_schema_dgraph(dgraph_client)
-        print()
-    
     # Resumen
     print("=" * 70)
     print("RESUMEN DE CONEXIONES:")
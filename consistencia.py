@@ -0,0 +1,644 @@
+"""
+Verificación de Consistencia entre Bases de Datos
+Plataforma de Integración de Datos de Salud
+
+La PARTE 4 de populate.py exige que los mismos pacientes, doctores y citas
+existan con valores idénticos en MongoDB, Cassandra y Dgraph. Comparar
+registro a registro millones de entidades entre tres bases es inviable, así
+que cada réplica se resume en un árbol de huellas (estilo Merkle) por
+prefijo de ID:
+
+- Cada entidad se reduce a una huella de 64 bits (blake2b) de sus campos
+  comunes normalizados (CAMPOS_VERIFICADOS)
+- Una hoja agrupa los IDs que solo difieren en los últimos DIGITOS_HOJA
+  dígitos (1000 entidades con el valor por defecto) y guarda (número de
+  entidades, suma de huellas mod 2^64). La suma no depende del orden, así
+  que cada réplica se recorre en paralelo en el orden que le conviene
+  (rangos de _id en MongoDB, rangos de token en Cassandra, rangos de
+  <tipo>.id en Dgraph) y solo se guardan las hojas
+- Los nodos internos (cada prefijo más corto) suman a sus hijos. La
+  comparación empieza en la raíz y solo baja por los prefijos que difieren
+
+Las bases no pueden calcular huellas de contenido en el servidor, así que
+la primera fase lee los campos comparados de cada entidad (con proyección)
+pero solo conserva huellas por hoja. La segunda fase vuelve a leer
+únicamente las hojas distintas (por rango de ID en MongoDB, Dgraph y el
+generador; Cassandra no admite rangos de ID y repite el recorrido por
+tokens descartando el resto) y compara entidad a entidad para producir un
+plan de reparación: insertar, actualizar o eliminar en cada réplica.
+
+Cada tabla de Cassandra que guarda una entidad es una réplica propia
+(citas_por_paciente, citas_por_doctor y citas_por_fecha se comprueban por
+separado).
+
+Uso:
+    python consistencia.py
+    python consistencia.py --entidades citas --generador --citas 10000000
+    python consistencia.py --salida data/plan_reparacion.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Callable, Set, Tuple
+
+from catalogo_consultas import ConsultaParametrizada, cargar_schema
+from modelos import MODELOS
+from utils.data_generator import FORMATO_ID
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Campos comparados (además del ID): los que las réplicas de cada entidad
+# guardan todas (citas_por_fecha no tiene duracion_minutos, por ejemplo)
+CAMPOS_VERIFICADOS = {
+    'pacientes': ('nombre', 'apellido', 'fecha_nacimiento', 'email', 'telefono', 'tipo_sangre', 'ciudad'),
+    'doctores': ('nombre', 'apellido', 'especialidad', 'email', 'telefono', 'numero_licencia',
+                 'años_experiencia'),
+    'citas': ('fecha_hora', 'motivo', 'estado', 'tipo_consulta', 'paciente_id', 'doctor_id'),
+}
+
+# Tablas de Cassandra que guardan cada entidad
+TABLAS_CASSANDRA = {
+    'pacientes': ('pacientes_por_ciudad',),
+    'citas': ('citas_por_paciente', 'citas_por_doctor', 'citas_por_fecha'),
+}
+
+# Dígitos finales del ID que agrupa cada hoja (10^n entidades por hoja)
+DIGITOS_HOJA = int(os.getenv('DIGITOS_HOJA_CONSISTENCIA', 3))
+
+# Lecturas concurrentes (rangos de ID o de token) entre todas las réplicas
+ESCANEOS_EN_PARALELO = int(os.getenv('ESCANEOS_EN_PARALELO', 16))
+
+# Subrangos del anillo de tokens de Cassandra (Murmur3Partitioner)
+RANGOS_TOKEN = 256
+TOKEN_MIN = -2 ** 63
+TOKEN_MAX = 2 ** 63 - 1
+
+# Filas o nodos por página
+TAM_PAGINA_VERIFICACION = 5000
+
+# Con más hojas distintas que esto la segunda fase recorre la réplica
+# entera en lugar de leer hoja a hoja
+MAX_HOJAS_POR_RANGO = 256
+
+# Desempate del plan de reparación cuando no hay mayoría
+PRIORIDAD_REFERENCIA = ('generador', 'mongodb', 'dgraph')
+
+_MASCARA = 2 ** 64 - 1
+
+Valores = Tuple[Any, ...]
+Tarea = Callable[[], Iterable[Tuple[str, Valores]]]
+
+
+# =============================================================================
+# HUELLAS
+# =============================================================================
+
+def hoja_de(id: str, digitos: int = DIGITOS_HOJA) -> str:
+    """Prefijo de la hoja de un ID ('C000012345' -> 'C000012')."""
+    return id[:-digitos] if len(id) > digitos else ''
+
+
+def _fecha_canonica(valor: Any) -> str:
+    if isinstance(valor, str):
+        # Caso habitual (generador y Dgraph): 'AAAA-MM-DDTHH:MM:SSZ'
+        if len(valor) == 20 and valor[-1] == 'Z':
+            return valor[:19]
+        valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+        return valor.strftime('%Y-%m-%dT%H:%M:%S')
+    return '' if valor is None else str(valor)
+
+
+def normalizador(entidad: str) -> Callable[[Valores], Valores]:
+    """
+    Función valores leídos -> valores comparables.
+
+    Las fechas pasan a ISO sin zona ni fracciones (Cassandra guarda
+    milisegundos, MongoDB datetime y Dgraph cadenas) y los vacíos a ''
+    (Dgraph no guarda predicados vacíos).
+    """
+    fechas = set(MODELOS[entidad].campos_fecha)
+    conversiones = [_fecha_canonica if campo in fechas else None for campo in CAMPOS_VERIFICADOS[entidad]]
+
+    def normalizar(valores: Valores) -> Valores:
+        return tuple(
+            ('' if v is None else v) if convertir is None else convertir(v)
+            for v, convertir in zip(valores, conversiones)
+        )
+    return normalizar
+
+
+def huella(valores: Valores) -> int:
+    """Huella de 64 bits de los valores normalizados de una entidad."""
+    return int.from_bytes(hashlib.blake2b(repr(valores).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ArbolHuellas:
+    """
+    Hojas (prefijo de ID -> [entidades, suma de huellas]) de una réplica.
+
+    Los nodos internos se calculan al comparar sumando a sus hijos.
+    """
+
+    def __init__(self, digitos: int = DIGITOS_HOJA):
+        self.digitos = digitos
+        self.hojas: Dict[str, List[int]] = {}
+
+    def agregar(self, id: str, valor: int):
+        hoja = hoja_de(id, self.digitos)
+        acumulado = self.hojas.get(hoja)
+        if acumulado is None:
+            self.hojas[hoja] = [1, valor]
+        else:
+            acumulado[0] += 1
+            acumulado[1] = (acumulado[1] + valor) & _MASCARA
+
+    def fusionar(self, otro: 'ArbolHuellas'):
+        for hoja, (n, suma) in otro.hojas.items():
+            acumulado = self.hojas.get(hoja)
+            if acumulado is None:
+                self.hojas[hoja] = [n, suma]
+            else:
+                acumulado[0] += n
+                acumulado[1] = (acumulado[1] + suma) & _MASCARA
+
+    def nodos(self) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, Set[str]]]:
+        """
+        Todos los prefijos de las hojas con su (entidades, suma), y los
+        hijos de cada uno. La raíz es ''.
+        """
+        nodos: Dict[str, List[int]] = {}
+        hijos: Dict[str, Set[str]] = {}
+        for hoja, (n, suma) in self.hojas.items():
+            for largo in range(len(hoja), -1, -1):
+                prefijo = hoja[:largo]
+                acumulado = nodos.get(prefijo)
+                if acumulado is None:
+                    nodos[prefijo] = [n, suma]
+                else:
+                    acumulado[0] += n
+                    acumulado[1] = (acumulado[1] + suma) & _MASCARA
+                if largo < len(hoja):
+                    hijos.setdefault(prefijo, set()).add(hoja[:largo + 1])
+        return {p: (n, s) for p, (n, s) in nodos.items()}, hijos
+
+    @property
+    def total(self) -> int:
+        return sum(n for n, _ in self.hojas.values())
+
+
+def comparar_arboles(arboles: Dict[str, ArbolHuellas]) -> Dict[str, Any]:
+    """
+    Baja desde la raíz solo por los prefijos cuyo resumen difiere entre
+    réplicas.
+
+    Returns:
+        {'hojas_distintas': [...], 'nodos_comparados': n}
+    """
+    resumenes = {replica: arbol.nodos() for replica, arbol in arboles.items()}
+    hojas = set().union(*(arbol.hojas for arbol in arboles.values())) if arboles else set()
+    vacio = (0, 0)
+    pendientes = ['']
+    distintas = []
+    comparados = 0
+    while pendientes:
+        prefijo = pendientes.pop()
+        comparados += 1
+        if len({nodos.get(prefijo, vacio) for nodos, _ in resumenes.values()}) <= 1:
+            continue
+        if prefijo in hojas:
+            distintas.append(prefijo)
+        siguientes: Set[str] = set()
+        for _, hijos in resumenes.values():
+            siguientes.update(hijos.get(prefijo, ()))
+        pendientes.extend(siguientes)
+    return {'hojas_distintas': sorted(distintas), 'nodos_comparados': comparados}
+
+
+# =============================================================================
+# RÉPLICAS
+# =============================================================================
+
+def _rangos_id(entidad: str, hojas: Optional[Set[str]]) -> Optional[List[Tuple[str, str]]]:
+    """
+    Rangos [desde, hasta) de ID que cubren las hojas pedidas, o toda la
+    entidad repartida por el primer dígito. None si conviene leerlo todo.
+    """
+    letras = FORMATO_ID[entidad][0]
+    if hojas is None:
+        return [(letras + d, letras + d + '\uffff') for d in '0123456789']
+    if len(hojas) > MAX_HOJAS_POR_RANGO:
+        return None
+    return [(hoja, hoja + '\uffff') for hoja in sorted(hojas)]
+
+
+def _filtrar(filas: Iterable[Tuple[str, Valores]], hojas: Optional[Set[str]]) -> Iterator[Tuple[str, Valores]]:
+    if hojas is None:
+        yield from filas
+        return
+    for id, valores in filas:
+        if hoja_de(id) in hojas:
+            yield id, valores
+
+
+class ReplicaMongo:
+    """Colecciones de MongoDB, leídas por rangos de _id."""
+
+    nombre = 'mongodb'
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    def entidades(self) -> List[str]:
+        return list(CAMPOS_VERIFICADOS)
+
+    def tareas(self, entidad: str, hojas: Optional[Set[str]] = None) -> List[Tarea]:
+        campos = CAMPOS_VERIFICADOS[entidad]
+        proyeccion = {campo: 1 for campo in campos}
+        coleccion = self.db[entidad]
+
+        def leer(filtro):
+            cursor = coleccion.find(filtro, proyeccion).batch_size(TAM_PAGINA_VERIFICACION)
+            for documento in cursor:
+                yield documento['_id'], tuple(map(documento.get, campos))
+
+        rangos = _rangos_id(entidad, hojas)
+        if rangos is None:
+            return [lambda: _filtrar(leer({}), hojas)]
+        return [lambda d=d, h=h: leer({'_id': {'$gte': d, '$lt': h}}) for d, h in rangos]
+
+
+class ReplicaCassandra:
+    """Una tabla de Cassandra, leída por subrangos del anillo de tokens."""
+
+    def __init__(self, session: Any, tabla: str, entidad: str):
+        from populate_cassandra import TABLAS
+        self.session = session
+        self.tabla = tabla
+        self.entidad = entidad
+        self.nombre = f"cassandra.{tabla}"
+        definicion = TABLAS[tabla]
+        self.particion = ', '.join(definicion['columnas'][:definicion['particion']])
+        self.columna_id = f"{MODELOS[entidad].prefijo}_id"
+        self._sentencia = None
+
+    def entidades(self) -> List[str]:
+        return [self.entidad]
+
+    def _preparar(self) -> Any:
+        if self._sentencia is None:
+            columnas = ', '.join((self.columna_id,) + CAMPOS_VERIFICADOS[self.entidad])
+            sentencia = self.session.prepare(
+                f"SELECT {columnas} FROM {self.tabla} "
+                f"WHERE token({self.particion}) >= ? AND token({self.particion}) <= ?")
+            sentencia.fetch_size = TAM_PAGINA_VERIFICACION
+            self._sentencia = sentencia
+        return self._sentencia
+
+    def tareas(self, entidad: str, hojas: Optional[Set[str]] = None) -> List[Tarea]:
+        sentencia = self._preparar()
+        paso = (TOKEN_MAX - TOKEN_MIN) // RANGOS_TOKEN
+
+        def leer(desde: int, hasta: int):
+            for fila in self.session.execute(sentencia, (desde, hasta)):
+                yield fila[0], tuple(fila[1:])
+
+        limites = [TOKEN_MIN + i * paso for i in range(RANGOS_TOKEN)] + [TOKEN_MAX + 1]
+        return [
+            lambda d=limites[i], h=limites[i + 1] - 1: _filtrar(leer(d, h), hojas)
+            for i in range(RANGOS_TOKEN)
+        ]
+
+
+class ReplicaDgraph:
+    """Nodos de Dgraph, leídos por rangos de <tipo>.id y paginados por uid."""
+
+    nombre = 'dgraph'
+
+    def __init__(self, cliente: Any):
+        self.cliente = cliente
+        self._consultas: Dict[str, ConsultaParametrizada] = {}
+
+    def entidades(self) -> List[str]:
+        return list(CAMPOS_VERIFICADOS)
+
+    def consulta(self, entidad: str) -> ConsultaParametrizada:
+        """Consulta de la entidad, construida desde CAMPOS_VERIFICADOS y validada contra el schema."""
+        if entidad not in self._consultas:
+            prefijo = MODELOS[entidad].prefijo
+            lineas = ['uid', f"{prefijo}.id"]
+            for campo in CAMPOS_VERIFICADOS[entidad]:
+                if campo.endswith('_id'):
+                    referencia = campo[:-3]
+                    lineas.append(f"{prefijo}.{referencia} {{\n      {referencia}.id\n    }}")
+                else:
+                    lineas.append(f"{prefijo}.{campo}")
+            texto = (
+                f"query verificar_{entidad}($desde: string, $hasta: string, "
+                f"$limite: int = 1000, $despues: string = \"0x0\") {{\n"
+                f"  nodos(func: between({prefijo}.id, $desde, $hasta), first: $limite, after: $despues) {{\n"
+                + ''.join(f"    {linea}\n" for linea in lineas)
+                + "  }\n}\n"
+            )
+            consulta = ConsultaParametrizada(f"verificar_{entidad}", f"Verificación de {entidad}", texto,
+                                             {'desde': '', 'hasta': ''})
+            consulta.validar(cargar_schema())
+            self._consultas[entidad] = consulta
+        return self._consultas[entidad]
+
+    def tareas(self, entidad: str, hojas: Optional[Set[str]] = None) -> List[Tarea]:
+        consulta = self.consulta(entidad)
+        prefijo = MODELOS[entidad].prefijo
+        claves = []
+        for campo in CAMPOS_VERIFICADOS[entidad]:
+            if campo.endswith('_id'):
+                claves.append((f"{prefijo}.{campo[:-3]}", f"{campo[:-3]}.id"))
+            else:
+                claves.append((f"{prefijo}.{campo}", None))
+
+        def valor(nodo, predicado, anidado):
+            v = nodo.get(predicado)
+            if anidado is None:
+                return v
+            if isinstance(v, list):
+                v = v[0] if v else None
+            return v.get(anidado) if v else None
+
+        def leer(desde: str, hasta: str):
+            for nodo in consulta.paginar(self.cliente, TAM_PAGINA_VERIFICACION, desde=desde, hasta=hasta):
+                yield nodo[f"{prefijo}.id"], tuple(valor(nodo, p, a) for p, a in claves)
+
+        rangos = _rangos_id(entidad, hojas)
+        if rangos is None:
+            rangos = _rangos_id(entidad, None)
+        return [lambda d=d, h=h: _filtrar(leer(d, h), hojas) for d, h in rangos]
+
+
+class ReplicaGenerador:
+    """
+    Lo que deberían contener las bases según utils/data_generator.py.
+
+    Cada registro es función de (semilla, tipo, índice), así que la segunda
+    fase regenera solo los índices de las hojas distintas.
+    """
+
+    nombre = 'generador'
+
+    def __init__(self, semilla: int, volumen: Dict[str, int]):
+        from utils.data_generator import DataGenerator
+        self.generador = DataGenerator(semilla, volumen)
+        self.volumen = volumen
+
+    def entidades(self) -> List[str]:
+        return list(CAMPOS_VERIFICADOS)
+
+    def tareas(self, entidad: str, hojas: Optional[Set[str]] = None) -> List[Tarea]:
+        campos = CAMPOS_VERIFICADOS[entidad]
+        letras = FORMATO_ID[entidad][0]
+        total = self.volumen[entidad]
+
+        def leer(inicio: int, fin: int):
+            for registro in self.generador.generar(entidad, inicio, fin):
+                yield registro['id'], tuple(map(registro.get, campos))
+
+        if hojas is None:
+            paso = max(1, -(-total // ESCANEOS_EN_PARALELO))
+            return [lambda i=i: leer(i, i + paso) for i in range(0, total, paso)]
+        tamano = 10 ** DIGITOS_HOJA
+        tareas = []
+        for hoja in sorted(hojas):
+            numero = hoja[len(letras):]
+            if hoja.startswith(letras) and numero.isdigit():
+                # El ID del índice i es letras + (i + 1) con ceros
+                inicio = int(numero) * tamano
+                tareas.append(lambda i=max(0, inicio - 1), f=inicio + tamano - 1: leer(i, f))
+        return tareas
+
+
+# =============================================================================
+# VERIFICACIÓN
+# =============================================================================
+
+def _ejecutar(tareas: List[Tuple[str, Tarea]], consumir: Callable[[str, Iterable[Tuple[str, Valores]]], Any],
+              paralelo: int) -> List[Tuple[str, Any]]:
+    """Ejecuta las tareas de todas las réplicas intercaladas en un pool."""
+    por_replica: Dict[str, List[Tarea]] = {}
+    for replica, tarea in tareas:
+        por_replica.setdefault(replica, []).append(tarea)
+    intercaladas = []
+    while any(por_replica.values()):
+        for replica, pendientes in por_replica.items():
+            if pendientes:
+                intercaladas.append((replica, pendientes.pop(0)))
+    with ThreadPoolExecutor(max_workers=paralelo) as pool:
+        futuros = [(replica, pool.submit(consumir, replica, tarea)) for replica, tarea in intercaladas]
+        return [(replica, futuro.result()) for replica, futuro in futuros]
+
+
+def resumir_replicas(entidad: str, replicas: List[Any],
+                     paralelo: int = ESCANEOS_EN_PARALELO) -> Dict[str, ArbolHuellas]:
+    """Primera fase: árbol de huellas de cada réplica, todas a la vez."""
+    normalizar = normalizador(entidad)
+
+    def consumir(_, tarea):
+        arbol = ArbolHuellas()
+        for id, valores in tarea():
+            arbol.agregar(id, huella(normalizar(valores)))
+        return arbol
+
+    arboles = {replica.nombre: ArbolHuellas() for replica in replicas}
+    tareas = [(replica.nombre, tarea) for replica in replicas for tarea in replica.tareas(entidad)]
+    for nombre, parcial in _ejecutar(tareas, consumir, paralelo):
+        arboles[nombre].fusionar(parcial)
+    return arboles
+
+
+def huellas_de_hojas(entidad: str, replicas: List[Any], hojas: Set[str],
+                     paralelo: int = ESCANEOS_EN_PARALELO) -> Dict[str, Dict[str, Tuple[int, Valores]]]:
+    """Segunda fase: ID -> (huella, valores) de las hojas distintas en cada réplica."""
+    normalizar = normalizador(entidad)
+
+    def consumir(_, tarea):
+        resultado = {}
+        for id, valores in tarea():
+            valores = normalizar(valores)
+            resultado[id] = (huella(valores), valores)
+        return resultado
+
+    por_replica: Dict[str, Dict[str, Tuple[int, Valores]]] = {replica.nombre: {} for replica in replicas}
+    tareas = [(replica.nombre, tarea) for replica in replicas for tarea in replica.tareas(entidad, hojas)]
+    for nombre, parcial in _ejecutar(tareas, consumir, paralelo):
+        por_replica[nombre].update(parcial)
+    return por_replica
+
+
+def _prioridad(replica: str) -> int:
+    base = replica.split('.', 1)[0]
+    return PRIORIDAD_REFERENCIA.index(base) if base in PRIORIDAD_REFERENCIA else len(PRIORIDAD_REFERENCIA)
+
+
+def plan_reparacion(entidad: str, huellas: Dict[str, Dict[str, Tuple[int, Valores]]],
+                    referencia: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Acciones que igualan todas las réplicas.
+
+    El estado correcto de cada ID es el de `referencia` si se indica; si
+    no, el de la mayoría de réplicas (ausente cuenta como un estado más) y,
+    en caso de empate, el de la réplica con más prioridad.
+    """
+    campos = CAMPOS_VERIFICADOS[entidad]
+    orden = sorted(huellas, key=lambda r: (_prioridad(r), r))
+    acciones = []
+    for id in sorted(set().union(*(h.keys() for h in huellas.values()))):
+        estados = {replica: huellas[replica].get(id) for replica in orden}
+        if referencia is not None:
+            correcto = estados[referencia]
+            origen = referencia
+        else:
+            votos = Counter(e[0] if e else None for e in estados.values())
+            maximo = max(votos.values())
+            origen = next(r for r in orden if votos[estados[r][0] if estados[r] else None] == maximo)
+            correcto = estados[origen]
+        for replica, estado in estados.items():
+            if (estado and estado[0]) == (correcto and correcto[0]):
+                continue
+            if correcto is None:
+                acciones.append({'entidad': entidad, 'id': id, 'replica': replica, 'accion': 'eliminar'})
+            elif estado is None:
+                acciones.append({'entidad': entidad, 'id': id, 'replica': replica, 'accion': 'insertar',
+                                 'origen': origen})
+            else:
+                acciones.append({
+                    'entidad': entidad, 'id': id, 'replica': replica, 'accion': 'actualizar', 'origen': origen,
+                    'campos': {c: {'actual': a, 'correcto': b}
+                               for c, a, b in zip(campos, estado[1], correcto[1]) if a != b},
+                })
+    return acciones
+
+
+def verificar_entidad(entidad: str, replicas: List[Any], referencia: Optional[str] = None,
+                      paralelo: int = ESCANEOS_EN_PARALELO) -> Dict[str, Any]:
+    """Compara una entidad entre réplicas y devuelve el informe con el plan de reparación."""
+    replicas = [r for r in replicas if entidad in r.entidades()]
+    inicio = time.perf_counter()
+    arboles = resumir_replicas(entidad, replicas, paralelo)
+    fase_resumen = time.perf_counter() - inicio
+
+    comparacion = comparar_arboles(arboles)
+    hojas = set(comparacion['hojas_distintas'])
+    acciones: List[Dict[str, Any]] = []
+    inicio = time.perf_counter()
+    if hojas:
+        acciones = plan_reparacion(entidad, huellas_de_hojas(entidad, replicas, hojas, paralelo), referencia)
+    fase_detalle = time.perf_counter() - inicio
+
+    return {
+        'entidad': entidad,
+        'entidades_por_replica': {nombre: arbol.total for nombre, arbol in arboles.items()},
+        'hojas': len(set().union(*(a.hojas for a in arboles.values()))) if arboles else 0,
+        'nodos_comparados': comparacion['nodos_comparados'],
+        'hojas_distintas': len(hojas),
+        'segundos_resumen': round(fase_resumen, 3),
+        'segundos_detalle': round(fase_detalle, 3),
+        'acciones': acciones,
+    }
+
+
+def replicas_disponibles(entidades: Iterable[str]) -> List[Any]:
+    """Réplicas de las bases que responden."""
+    from connect import conectar_mongodb, conectar_cassandra, conectar_dgraph
+
+    replicas: List[Any] = []
+    db = conectar_mongodb()
+    if db is not None:
+        replicas.append(ReplicaMongo(db))
+    else:
+        print("⚠ Sin conexión con MongoDB: no se verifica")
+    session = conectar_cassandra()
+    if session is not None:
+        for entidad in entidades:
+            for tabla in TABLAS_CASSANDRA.get(entidad, ()):
+                replicas.append(ReplicaCassandra(session, tabla, entidad))
+    else:
+        print("⚠ Sin conexión con Cassandra: no se verifica")
+    cliente = conectar_dgraph()
+    if cliente is not None:
+        replicas.append(ReplicaDgraph(cliente))
+    else:
+        print("⚠ Sin conexión con Dgraph: no se verifica")
+    return replicas
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def imprimir_informe(informe: Dict[str, Any]):
+    print(f"\n▶ {informe['entidad']}: {informe['hojas']:,} hojas, "
+          f"{informe['nodos_comparados']:,} nodos comparados, {informe['hojas_distintas']:,} hojas distintas "
+          f"(resumen {informe['segundos_resumen']} s, detalle {informe['segundos_detalle']} s)")
+    for replica, total in informe['entidades_por_replica'].items():
+        print(f"  {replica:<32} {total:>12,}")
+    if not informe['acciones']:
+        print("  ✓ Réplicas idénticas")
+        return
+    por_tipo = Counter((a['replica'], a['accion']) for a in informe['acciones'])
+    for (replica, accion), total in sorted(por_tipo.items()):
+        print(f"  ✗ {replica:<30} {accion:<10} {total:>10,}")
+
+
+def main():
+    """Verifica que pacientes, doctores y citas coinciden en las tres bases."""
+    parser = argparse.ArgumentParser(description="Consistencia entre MongoDB, Cassandra y Dgraph por árboles de huellas")
+    parser.add_argument('--entidades', default=','.join(CAMPOS_VERIFICADOS), help="Entidades separadas por comas")
+    parser.add_argument('--generador', action='store_true',
+                        help="Comparar también con el generador y tomarlo como referencia")
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--paralelo', type=int, default=ESCANEOS_EN_PARALELO)
+    parser.add_argument('--salida', default=None, help="Archivo JSON del plan de reparación")
+    args = parser.parse_args()
+
+    entidades = [e.strip() for e in args.entidades.split(',') if e.strip()]
+    for entidad in entidades:
+        if entidad not in CAMPOS_VERIFICADOS:
+            parser.error(f"entidad desconocida: {entidad} ({', '.join(CAMPOS_VERIFICADOS)})")
+
+    replicas = replicas_disponibles(entidades)
+    referencia = None
+    if args.generador:
+        from utils.data_generator import SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen
+        volumen = calcular_volumen(args.citas) if args.citas else dict(VOLUMEN_BASE)
+        semilla = SEMILLA_POR_DEFECTO if args.semilla is None else args.semilla
+        replicas.append(ReplicaGenerador(semilla, volumen))
+        referencia = ReplicaGenerador.nombre
+    if len(replicas) < 2:
+        print("✗ Hacen falta al menos dos réplicas para comparar")
+        return
+
+    informes = []
+    for entidad in entidades:
+        informe = verificar_entidad(entidad, replicas, referencia, args.paralelo)
+        imprimir_informe(informe)
+        informes.append(informe)
+
+    total = sum(len(i['acciones']) for i in informes)
+    print(f"\n{'✓ Sin diferencias' if not total else f'✗ {total:,} acciones de reparación'}")
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informes, f, ensure_ascii=False, indent=2, default=str)
+        print(f"✓ Plan guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Consultas Asíncronas
+Plataforma de Integración de Datos de Salud
+
+Fachada asyncio sobre las tres bases de datos, para vistas compuestas que
+necesitan datos de todas ellas. Con las funciones síncronas de connect.py
+"Ver historial médico completo" espera a MongoDB, luego a Cassandra y luego
+a Dgraph; aquí las tres peticiones se lanzan a la vez en un mismo bucle de
+eventos y la vista tarda lo que la más lenta. main.py la usa a través de
+router_consultas.py (base 'vista' de menu_pacientes 6).
+
+- MongoDB: Motor (AsyncIOMotorClient). Si Motor no está instalado, el
+  cliente de pymongo de connect.py se usa desde el executor del bucle
+- Cassandra: session.execute_async() del driver; el ResponseFuture se
+  enlaza con un asyncio.Future mediante add_callbacks
+- Dgraph: txn.async_query() de pydgraph (futuro gRPC) con las consultas
+  parametrizadas de catalogo_consultas.py
+
+Uso:
+    import asyncio
+    from consultas_async import ConsultasAsync
+
+    async def vista():
+        consultas = ConsultasAsync()
+        return await consultas.historial_completo('P001')
+
+    asyncio.run(vista())
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional, Dict, Any, List
+
+from catalogo_consultas import obtener_consulta
+from connect import (conectar_mongodb, conectar_cassandra, conectar_dgraph, configuracion_mongodb,
+                     MONGO_MAX_POOL_SIZE)
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Segundos máximos de cada petición dentro de una vista compuesta
+TIEMPO_ESPERA_ASYNC_SEG = float(os.getenv('TIEMPO_ESPERA_ASYNC_SEG', 10))
+
+# Próximas citas mostradas en el historial completo
+LIMITE_PROXIMAS_CITAS = 20
+
+
+# =============================================================================
+# PUENTES ENTRE FUTUROS DE LOS DRIVERS Y ASYNCIO
+# =============================================================================
+
+def _resolver(futuro: asyncio.Future, resultado: Any = None, error: Optional[BaseException] = None):
+    """Completa un asyncio.Future desde el hilo del bucle (si sigue pendiente)."""
+    if futuro.done():
+        return
+    if error is not None:
+        futuro.set_exception(error)
+    else:
+        futuro.set_result(resultado)
+
+
+def cassandra_a_asyncio(respuesta: Any, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+    """
+    Enlaza un ResponseFuture de cassandra-driver con un asyncio.Future.
+
+    Los callbacks del driver se ejecutan en su hilo de eventos, por eso se
+    delega en el bucle con call_soon_threadsafe. Se devuelve solo la
+    primera página: las consultas de esta fachada llevan LIMIT.
+    """
+    futuro = loop.create_future()
+    respuesta.add_callbacks(
+        callback=lambda filas: loop.call_soon_threadsafe(_resolver, futuro, filas),
+        errback=lambda error: loop.call_soon_threadsafe(_resolver, futuro, None, error),
+    )
+    return futuro
+
+
+def grpc_a_asyncio(llamada: Any, loop: asyncio.AbstractEventLoop, convertir=None) -> asyncio.Future:
+    """Enlaza un futuro gRPC (txn.async_query de pydgraph) con un asyncio.Future."""
+    futuro = loop.create_future()
+
+    def terminado(llamada_grpc):
+        try:
+            resultado = convertir(llamada_grpc) if convertir else llamada_grpc.result()
+        except Exception as e:
+            loop.call_soon_threadsafe(_resolver, futuro, None, e)
+        else:
+            loop.call_soon_threadsafe(_resolver, futuro, resultado)
+
+    llamada.add_done_callback(terminado)
+    return futuro
+
+
+# =============================================================================
+# FACHADA
+# =============================================================================
+
+class ConsultasAsync:
+    """
+    Consultas asíncronas sobre MongoDB, Cassandra y Dgraph.
+
+    Las conexiones síncronas (sesión de Cassandra, clientes de Dgraph) se
+    toman del registro de connect.py desde el executor, para que un primer
+    handshake no bloquee el bucle; el cliente de Motor se crea en el primer
+    uso y queda ligado al bucle de eventos que lo creó. Se reutiliza mientras
+    el bucle sea el mismo y se cierra al cambiar de bucle o con cerrar().
+
+    Uso como contexto asíncrono:
+        async with ConsultasAsync() as consultas:
+            await consultas.historial_completo('P001')
+    """
+
+    def __init__(self, tiempo_espera: float = TIEMPO_ESPERA_ASYNC_SEG):
+        self.tiempo_espera = tiempo_espera
+        self._motor_cliente = None
+        self._motor = None
+        self._motor_loop = None
+
+    async def __aenter__(self) -> 'ConsultasAsync':
+        return self
+
+    async def __aexit__(self, *excepcion) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        """Cierra el cliente de Motor, si se llegó a crear."""
+        if self._motor_cliente is not None:
+            self._motor_cliente.close()
+        self._motor_cliente = None
+        self._motor = None
+        self._motor_loop = None
+
+    # -------------------------------------------------------------------------
+    # MongoDB
+    # -------------------------------------------------------------------------
+
+    def _mongodb_motor(self) -> Optional[Any]:
+        """Base de datos de Motor para el bucle actual, o None sin Motor."""
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self._motor is None or self._motor_loop is not loop:
+            # Un cliente de Motor no sirve en otro bucle: se cierra el anterior
+            self.cerrar()
+            uri, base_datos = configuracion_mongodb()
+            self._motor_cliente = AsyncIOMotorClient(
+                uri,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+            )
+            self._motor = self._motor_cliente[base_datos]
+            self._motor_loop = loop
+        return self._motor
+
+    async def _en_executor(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, partial(funcion, *args))
+
+    async def mongo_buscar_uno(self, coleccion: str, filtro: Dict[str, Any],
+                               proyeccion: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """find_one asíncrono."""
+        db = self._mongodb_motor()
+        if db is not None:
+            return await db[coleccion].find_one(filtro, proyeccion)
+
+        db = await self._en_executor(conectar_mongodb)
+        if db is None:
+            raise ConnectionError('MongoDB no disponible')
+        return await self._en_executor(db[coleccion].find_one, filtro, proyeccion)
+
+    async def mongo_buscar(self, coleccion: str, filtro: Dict[str, Any], limite: int = 100,
+                           orden: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """find asíncrono con límite y orden opcional."""
+        db = self._mongodb_motor()
+        if db is not None:
+            cursor = db[coleccion].find(filtro)
+            if orden:
+                cursor = cursor.sort(orden)
+            return await cursor.limit(limite).to_list(length=limite)
+
+        db = await self._en_executor(conectar_mongodb)
+        if db is None:
+            raise ConnectionError('MongoDB no disponible')
+
+        def buscar():
+            cursor = db[coleccion].find(filtro)
+            if orden:
+                cursor = cursor.sort(orden)
+            return list(cursor.limit(limite))
+        return await self._en_executor(buscar)
+
+    # -------------------------------------------------------------------------
+    # Cassandra
+    # -------------------------------------------------------------------------
+
+    async def cassandra(self, consulta: str, parametros: Any = None) -> List[Dict[str, Any]]:
+        """Ejecuta una sentencia CQL con execute_async y devuelve dicts."""
+        session = await self._en_executor(conectar_cassandra)
+        if session is None:
+            raise ConnectionError('Cassandra no disponible')
+        respuesta = session.execute_async(consulta, parametros)
+        filas = await cassandra_a_asyncio(respuesta, asyncio.get_running_loop())
+        return [dict(fila._asdict()) for fila in filas]
+
+    # -------------------------------------------------------------------------
+    # Dgraph
+    # -------------------------------------------------------------------------
+
+    async def dgraph(self, nombre: str, /, **valores) -> Dict[str, Any]:
+        """Ejecuta una consulta de catalogo_consultas.py con txn.async_query."""
+        import pydgraph
+
+        cliente = await self._en_executor(conectar_dgraph)
+        if cliente is None:
+            raise ConnectionError('Dgraph no disponible')
+        consulta = obtener_consulta(nombre)
+        txn = cliente.txn(read_only=True, best_effort=True)
+        try:
+            llamada = txn.async_query(consulta.texto, variables=consulta.preparar_variables(valores))
+            respuesta = await grpc_a_asyncio(llamada, asyncio.get_running_loop(),
+                                             pydgraph.Txn.handle_query_future)
+        finally:
+            txn.discard()
+        return json.loads(respuesta.json)
+
+    # -------------------------------------------------------------------------
+    # Vistas compuestas
+    # -------------------------------------------------------------------------
+
+    async def reunir(self, **peticiones) -> Dict[str, Any]:
+        """
+        Espera varias corrutinas a la vez, cada una con tiempo_espera.
+
+        Returns:
+            Nombre -> resultado, más 'errores' con las que fallaron (una base
+            caída no impide mostrar el resto de la vista)
+        """
+        nombres = list(peticiones)
+        resultados = await asyncio.gather(
+            *(asyncio.wait_for(peticiones[n], self.tiempo_espera) for n in nombres),
+            return_exceptions=True,
+        )
+        vista: Dict[str, Any] = {'errores': {}}
+        for nombre, resultado in zip(nombres, resultados):
+            if isinstance(resultado, BaseException):
+                vista['errores'][nombre] = str(resultado) or type(resultado).__name__
+                vista[nombre] = None
+            else:
+                vista[nombre] = resultado
+        return vista
+
+    async def historial_completo(self, paciente_id: str, limite_citas: int = LIMITE_PROXIMAS_CITAS) -> Dict[str, Any]:
+        """
+        "Ver historial médico completo de un paciente" (menu_pacientes 6).
+
+        - paciente: ficha de MongoDB
+        - proximas_citas: siguientes citas_por_paciente de Cassandra, en orden cronológico
+        - historial: alergias, diagnósticos, tratamientos y medicamentos de Dgraph
+        """
+        vista = await self.reunir(
+            paciente=self.mongo_buscar_uno('pacientes', {'_id': paciente_id}),
+            proximas_citas=self.cassandra(
+                "SELECT * FROM citas_por_paciente WHERE paciente_id = %s AND fecha_hora >= %s "
+                "ORDER BY fecha_hora ASC LIMIT %s",
+                (paciente_id, datetime.now(timezone.utc), limite_citas)),
+            historial=self.dgraph('historial_completo', paciente=paciente_id),
+        )
+        if vista['historial'] is not None:
+            nodos = vista['historial'].get('paciente', [])
+            vista['historial'] = nodos[0] if nodos else None
+        return vista
+
+
+# =============================================================================
+# FUNCIONES DE CONVENIENCIA
+# =============================================================================
+
+def historial_completo(paciente_id: str) -> Dict[str, Any]:
+    """Versión síncrona para código sin bucle de eventos (menús, scripts)."""
+    async def vista():
+        async with ConsultasAsync() as consultas:
+            return await consultas.historial_completo(paciente_id)
+    return asyncio.run(vista())
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Muestra el historial completo de un paciente consultando las tres bases a la vez."""
+    parser = argparse.ArgumentParser(description="Historial médico completo con consultas concurrentes")
+    parser.add_argument('--paciente', default='P001', help="ID del paciente")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    vista = historial_completo(args.paciente)
+    segundos = time.perf_counter() - inicio
+
+    print(json.dumps(vista, ensure_ascii=False, indent=2, default=str))
+    for nombre, error in vista['errores'].items():
+        print(f"✗ {nombre}: {error}")
+    print(f"✓ Vista compuesta en {segundos * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
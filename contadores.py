@@ -0,0 +1,523 @@
+"""
+Contadores Materializados
+Plataforma de Integración de Datos de Salud
+
+El "Dashboard general del sistema" (menu_analisis 15) y los rankings de
+especialidades, medicamentos, ciudades y diagnósticos no se recalculan
+sobre el grafo en cada lectura: se mantienen contadores en la colección
+`contadores` de MongoDB, un documento por (dimensión, clave):
+
+    {'_id': 'citas_por_especialidad|Cardiología', 'dimension': ...,
+     'clave': 'Cardiología', 'valor': 2054}
+
+- Cada escritura del menú CRUD aplica sus incrementos con aplicar_crud()
+  (un solo bulk_write con upsert). Con MODO_ESCRITURA=cdc los aplica
+  sincronizacion_cdc a partir de cada cambio de MongoDB (deltas_por_cambio),
+  de modo que también cuentan las escrituras que no pasan por el menú.
+  Cada incremento queda anotado en `recientes` con la hora del servidor
+  ($$NOW), hasta MAX_RECIENTES
+- Leer el dashboard es leer esta colección (decenas de documentos con
+  índice por dimensión), independiente del volumen de datos
+- reconciliar() recalcula todo (agregaciones de MongoDB y DQL de Dgraph)
+  entre las horas de servidor t0 y t1 y corrige las diferencias con $inc.
+  Los incrementos anotados después de t1 se descuentan del valor leído, así
+  que ni se pisan ni se cuentan dos veces. Una clave con incrementos entre
+  t0 y t1 (más MARGEN_RECONCILIACION_SEG a cada lado) puede estar o no en
+  el recálculo: no se corrige y queda para la siguiente pasada.
+  ReconciliadorContadores lo ejecuta cada INTERVALO_RECONCILIACION_SEG en
+  los procesos que escriben o leen contadores, y los scripts populate_*
+  lo ejecutan al terminar la carga masiva, que no pasa por los incrementos
+
+Los contadores se incrementan una vez por operación lógica, no por base de
+datos destino; si una escritura se repite (reintento manual del mismo ID)
+la deriva la corrige la siguiente reconciliación.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from datetime import timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from connect import conectar_mongodb, conectar_dgraph
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+COLECCION_CONTADORES = 'contadores'
+
+# Cada cuánto se reconcilian los contadores con un recálculo completo
+INTERVALO_RECONCILIACION_SEG = float(os.getenv('INTERVALO_RECONCILIACION_SEG', 3600))
+
+# Incrementos anotados por clave para la reconciliación
+MAX_RECIENTES = 64
+
+# Segundos entre la escritura de una entidad y su incremento (el
+# coordinador aplica los contadores tras esperar a las tres bases)
+MARGEN_RECONCILIACION_SEG = float(os.getenv('MARGEN_RECONCILIACION_SEG', 5))
+
+# doctor_id -> especialidad en memoria
+MAX_ESPECIALIDADES = 10000
+
+# Dimensión 'totales': clave = tipo de entidad
+DIMENSIONES = (
+    'totales',
+    'pacientes_por_ciudad',
+    'citas_por_estado',
+    'citas_por_especialidad',
+    'diagnosticos_por_icd10',
+    'recetas_por_medicamento',
+)
+
+# Opción de menu_crud -> (tipo de entidad, signo) para la dimensión 'totales'
+TOTALES_CRUD = {
+    '1': ('pacientes', 1),
+    '3': ('pacientes', -1),
+    '4': ('doctores', 1),
+    '6': ('hospitales', 1),
+    '7': ('citas', 1),
+    '9': ('diagnosticos', 1),
+    '10': ('tratamientos', 1),
+    '11': ('recetas', 1),
+    '12': ('alergias', 1),
+    '13': ('medicamentos', 1),
+}
+
+Delta = Tuple[str, str, int]
+
+
+# =============================================================================
+# INCREMENTOS POR OPERACIÓN CRUD
+# =============================================================================
+
+# doctor_id -> especialidad (solo las encontradas: un doctor aún no
+# replicado en MongoDB se vuelve a buscar en la siguiente cita). LRU acotada
+_especialidades: 'OrderedDict[str, str]' = OrderedDict()
+_especialidades_lock = threading.Lock()
+
+
+def _especialidad_de(doctor_id: Optional[str]) -> Optional[str]:
+    with _especialidades_lock:
+        if doctor_id in _especialidades:
+            _especialidades.move_to_end(doctor_id)
+            return _especialidades[doctor_id]
+    db = conectar_mongodb()
+    if db is None or not doctor_id:
+        return None
+    doctor = db.doctores.find_one({'_id': doctor_id}, {'especialidad': 1})
+    if doctor and doctor.get('especialidad'):
+        with _especialidades_lock:
+            _especialidades[doctor_id] = doctor['especialidad']
+            while len(_especialidades) > MAX_ESPECIALIDADES:
+                _especialidades.popitem(last=False)
+        return doctor['especialidad']
+    return None
+
+
+def _cambio(dimension: str, campo: str, registro: Dict[str, Any],
+            anterior: Optional[Dict[str, Any]]) -> List[Delta]:
+    """-1 al valor anterior y +1 al nuevo si el campo ha cambiado."""
+    if anterior is None or anterior.get(campo) == registro.get(campo) or campo not in registro:
+        return []
+    deltas = [(dimension, registro[campo], 1)]
+    if anterior.get(campo) is not None:
+        deltas.append((dimension, anterior[campo], -1))
+    return deltas
+
+
+def deltas_por_crud(opcion: str, registro: Dict[str, Any],
+                    anterior: Optional[Dict[str, Any]] = None) -> List[Delta]:
+    """
+    Incrementos que produce una operación de menu_crud.
+
+    Args:
+        opcion: Opción de menu_crud ('1'..'14')
+        registro: Registro escrito, con el formato de utils.data_generator
+        anterior: Estado previo en las actualizaciones (opciones 2 y 8)
+
+    Returns:
+        Lista de (dimensión, clave, incremento)
+    """
+    deltas: List[Delta] = []
+    if opcion in TOTALES_CRUD:
+        tipo, signo = TOTALES_CRUD[opcion]
+        deltas.append(('totales', tipo, signo))
+
+    if opcion in ('1', '3') and registro.get('ciudad'):
+        deltas.append(('pacientes_por_ciudad', registro['ciudad'], TOTALES_CRUD[opcion][1]))
+    elif opcion == '2':
+        deltas += _cambio('pacientes_por_ciudad', 'ciudad', registro, anterior)
+    elif opcion == '7':
+        if registro.get('estado'):
+            deltas.append(('citas_por_estado', registro['estado'], 1))
+        especialidad = registro.get('especialidad') or _especialidad_de(registro.get('doctor_id'))
+        if especialidad:
+            deltas.append(('citas_por_especialidad', especialidad, 1))
+    elif opcion == '8':
+        deltas += _cambio('citas_por_estado', 'estado', registro, anterior)
+    elif opcion == '9' and registro.get('codigo_icd10'):
+        deltas.append(('diagnosticos_por_icd10', registro['codigo_icd10'], 1))
+    elif opcion == '11':
+        deltas += [('recetas_por_medicamento', m, 1) for m in registro.get('medicamento_ids') or ()]
+    return deltas
+
+
+def _incremento(dimension: str, clave: str, delta: int, anotar: bool = True) -> Any:
+    """
+    UpdateOne que suma `delta` al contador. Con `anotar`, el incremento se
+    añade a `recientes` con la hora del servidor para la reconciliación.
+    """
+    from pymongo import UpdateOne
+
+    campos = {
+        'dimension': {'$literal': dimension},
+        'clave': {'$literal': clave},
+        'valor': {'$add': [{'$ifNull': ['$valor', 0]}, delta]},
+    }
+    if anotar:
+        campos['recientes'] = {'$slice': [
+            {'$concatArrays': [{'$ifNull': ['$recientes', []]}, [{'t': '$$NOW', 'd': delta}]]},
+            -MAX_RECIENTES,
+        ]}
+    return UpdateOne({'_id': f"{dimension}|{clave}"}, [{'$set': campos}], upsert=True)
+
+
+def incrementar(db: Any, deltas: List[Delta], anotar: bool = True) -> int:
+    """
+    Aplica los incrementos en un solo bulk_write. Retorna los aplicados.
+
+    Las correcciones de reconciliar() no se anotan: ya parten del recálculo.
+    """
+    agrupados = Counter()
+    for dimension, clave, delta in deltas:
+        agrupados[(dimension, clave)] += delta
+    operaciones = [
+        _incremento(dimension, clave, delta, anotar)
+        for (dimension, clave), delta in agrupados.items() if delta
+    ]
+    if operaciones:
+        db[COLECCION_CONTADORES].bulk_write(operaciones, ordered=False)
+    return len(operaciones)
+
+
+# Colección seguida por sincronizacion_cdc -> opciones de menu_crud de su
+# alta y de su actualización. Una baja deshace el alta del estado anterior
+OPCIONES_CDC = {
+    'pacientes': ('1', '2'),
+    'doctores': ('4', '5'),
+    'citas': ('7', '8'),
+}
+
+
+def deltas_por_cambio(coleccion: str, operacion: str, registro: Optional[Dict[str, Any]],
+                      anterior: Optional[Dict[str, Any]]) -> List[Delta]:
+    """
+    Incrementos de un cambio del change stream de MongoDB ('insert',
+    'update' o 'delete'). Sin estado anterior, las bajas y actualizaciones
+    no producen incrementos y las corrige la reconciliación.
+    """
+    alta, actualizacion = OPCIONES_CDC[coleccion]
+    if operacion == 'insert':
+        return deltas_por_crud(alta, registro)
+    if operacion == 'delete':
+        if anterior is None:
+            return []
+        return [(dimension, clave, -delta) for dimension, clave, delta in deltas_por_crud(alta, anterior)]
+    return deltas_por_crud(actualizacion, registro, anterior)
+
+
+def aplicar_deltas(deltas: List[Delta]) -> bool:
+    """
+    Aplica incrementos con la conexión compartida y arranca el
+    reconciliador periódico del proceso.
+
+    Los errores no interrumpen la escritura: el contador queda desfasado
+    hasta la siguiente reconciliación.
+    """
+    iniciar_reconciliador()
+    if not deltas:
+        return True
+    db = conectar_mongodb()
+    if db is None:
+        return False
+    try:
+        incrementar(db, deltas)
+        return True
+    except Exception as e:
+        print(f"✗ Error al actualizar contadores: {e}")
+        return False
+
+
+def aplicar_crud(opcion: str, registro: Dict[str, Any], anterior: Optional[Dict[str, Any]] = None) -> bool:
+    """Actualiza los contadores tras una escritura de menu_crud."""
+    return aplicar_deltas(deltas_por_crud(opcion, registro, anterior))
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+def crear_indices(db: Any):
+    db[COLECCION_CONTADORES].create_index([('dimension', 1), ('valor', -1)], name='dimension_valor')
+
+
+def leer_contadores(db: Any, dimension: Optional[str] = None, limite: int = 0) -> Dict[str, Dict[str, int]]:
+    """
+    Contadores por dimensión, de mayor a menor.
+
+    Args:
+        dimension: Solo esta dimensión (todas si None)
+        limite: Claves máximas por dimensión (0 = todas)
+    """
+    filtro = {'dimension': dimension} if dimension else {}
+    cursor = db[COLECCION_CONTADORES].find(filtro, {'dimension': 1, 'clave': 1, 'valor': 1}).sort(
+        [('dimension', 1), ('valor', -1)])
+    resultado: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for documento in cursor:
+        valores = resultado[documento['dimension']]
+        if documento['valor'] and (not limite or len(valores) < limite):
+            valores[documento['clave']] = documento['valor']
+    return dict(resultado)
+
+
+def ranking(db: Any, dimension: str, clave: str, limite: int = 10) -> List[Dict[str, Any]]:
+    """[{clave, total}] de una dimensión, con el formato de analitica.py."""
+    valores = leer_contadores(db, dimension, limite).get(dimension, {})
+    return [{clave: k, 'total': v} for k, v in valores.items()]
+
+
+def dashboard(db: Any, limite: int = 5) -> Dict[str, Any]:
+    """Dashboard general (menu_analisis 15) leído de los contadores."""
+    contadores = leer_contadores(db)
+    return {
+        'totales': contadores.get('totales', {}),
+        'citas_por_estado': contadores.get('citas_por_estado', {}),
+        **{dimension: dict(list(contadores.get(dimension, {}).items())[:limite])
+           for dimension in DIMENSIONES if dimension not in ('totales', 'citas_por_estado')},
+    }
+
+
+# =============================================================================
+# RECÁLCULO Y RECONCILIACIÓN
+# =============================================================================
+
+# Tipo -> colección de MongoDB; el resto de tipos se cuentan en Dgraph
+_COLECCIONES_TOTALES = {
+    'pacientes': 'pacientes', 'doctores': 'doctores', 'hospitales': 'hospitales', 'citas': 'citas',
+}
+
+_AGREGACIONES_MONGO = {
+    'pacientes_por_ciudad': ('pacientes', [{'$group': {'_id': '$ciudad', 'n': {'$sum': 1}}}]),
+    'citas_por_estado': ('citas', [{'$group': {'_id': '$estado', 'n': {'$sum': 1}}}]),
+    'citas_por_especialidad': ('citas', [
+        {'$group': {'_id': '$doctor_id', 'n': {'$sum': 1}}},
+        {'$lookup': {'from': 'doctores', 'localField': '_id', 'foreignField': '_id', 'as': 'doctor'}},
+        {'$unwind': '$doctor'},
+        {'$group': {'_id': '$doctor.especialidad', 'n': {'$sum': '$n'}}},
+    ]),
+}
+
+_CONSULTA_RECALCULO_DGRAPH = """
+{
+  diagnosticos(func: type(Diagnostico)) @groupby(diagnostico.codigo_icd10) {
+    count(uid)
+  }
+  medicamentos(func: type(Medicamento)) {
+    medicamento.id
+    recetas: count(medicamento.recetas)
+  }
+  tratamientos(func: type(Tratamiento)) { total: count(uid) }
+  recetas(func: type(Receta)) { total: count(uid) }
+  alergias(func: type(Alergia)) { total: count(uid) }
+  diagnosticos_total(func: type(Diagnostico)) { total: count(uid) }
+  medicamentos_total(func: type(Medicamento)) { total: count(uid) }
+}
+"""
+
+
+def recalcular(db: Any, cliente: Any) -> Dict[str, Dict[str, int]]:
+    """Calcula desde cero todas las dimensiones."""
+    valores: Dict[str, Dict[str, int]] = {dimension: {} for dimension in DIMENSIONES}
+    for tipo, coleccion in _COLECCIONES_TOTALES.items():
+        valores['totales'][tipo] = db[coleccion].estimated_document_count()
+    for dimension, (coleccion, tuberia) in _AGREGACIONES_MONGO.items():
+        for fila in db[coleccion].aggregate(tuberia, allowDiskUse=True):
+            if fila['_id'] is not None:
+                valores[dimension][fila['_id']] = fila['n']
+
+    if cliente is not None:
+        txn = cliente.txn(read_only=True, best_effort=True)
+        try:
+            datos = json.loads(txn.query(_CONSULTA_RECALCULO_DGRAPH).json)
+        finally:
+            txn.discard()
+        for grupo in datos.get('diagnosticos', []):
+            for fila in grupo.get('@groupby', []):
+                valores['diagnosticos_por_icd10'][fila['diagnostico.codigo_icd10']] = fila['count']
+        for medicamento in datos.get('medicamentos', []):
+            if medicamento.get('recetas'):
+                valores['recetas_por_medicamento'][medicamento['medicamento.id']] = medicamento['recetas']
+        for tipo, bloque in (('tratamientos', 'tratamientos'), ('recetas', 'recetas'), ('alergias', 'alergias'),
+                             ('diagnosticos', 'diagnosticos_total'), ('medicamentos', 'medicamentos_total')):
+            filas = datos.get(bloque) or [{}]
+            valores['totales'][tipo] = filas[0].get('total', 0)
+    return valores
+
+
+def _hora_servidor(db: Any) -> Any:
+    """Hora de MongoDB: la misma referencia que $$NOW en los incrementos."""
+    return db.command('hello')['localTime']
+
+
+def almacenados_en(db: Any, inicio: Any, fin: Any) -> Tuple[Dict[str, Dict[str, int]], int]:
+    """
+    Valor de cada contador tal como era en la ventana [inicio, fin]: el
+    leído menos los incrementos anotados después de `fin`.
+
+    Returns:
+        (dimensión -> clave -> valor, claves aplazadas). Una clave se aplaza
+        si tiene incrementos dentro de la ventana o si su anotación está
+        llena y puede haber perdido alguno de ellos
+    """
+    valores: Dict[str, Dict[str, int]] = defaultdict(dict)
+    aplazadas = 0
+    cursor = db[COLECCION_CONTADORES].find({}, {'dimension': 1, 'clave': 1, 'valor': 1, 'recientes': 1})
+    for documento in cursor:
+        recientes = documento.get('recientes') or []
+        if any(inicio <= r['t'] <= fin for r in recientes) or (
+                len(recientes) >= MAX_RECIENTES and recientes[0]['t'] >= inicio):
+            valores[documento['dimension']][documento['clave']] = None
+            aplazadas += 1
+            continue
+        posteriores = sum(r['d'] for r in recientes if r['t'] > fin)
+        valores[documento['dimension']][documento['clave']] = documento.get('valor', 0) - posteriores
+    return dict(valores), aplazadas
+
+
+def reconciliar(db: Any, cliente: Any) -> Dict[str, Dict[str, Tuple[int, int]]]:
+    """
+    Compara los contadores con un recálculo completo y corrige la deriva.
+
+    Las dimensiones de Dgraph solo se reconcilian si hay cliente. Las claves
+    que reciben incrementos durante el recálculo se dejan para la siguiente
+    pasada (ver el docstring del módulo).
+
+    Returns:
+        Dimensión -> clave -> (valor almacenado, valor real) de lo corregido
+    """
+    margen = timedelta(seconds=MARGEN_RECONCILIACION_SEG)
+    t0 = _hora_servidor(db)
+    reales = recalcular(db, cliente)
+    t1 = _hora_servidor(db)
+    almacenados, aplazadas = almacenados_en(db, t0 - margen, t1 + margen)
+    dimensiones = [d for d in DIMENSIONES
+                   if cliente is not None or d not in ('diagnosticos_por_icd10', 'recetas_por_medicamento')]
+
+    diferencias: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    deltas: List[Delta] = []
+    for dimension in dimensiones:
+        actuales = almacenados.get(dimension, {})
+        for clave in set(actuales) | set(reales[dimension]):
+            if dimension == 'totales' and clave not in reales[dimension]:
+                continue
+            almacenado, real = actuales.get(clave, 0), reales[dimension].get(clave, 0)
+            if almacenado is None:
+                continue
+            if almacenado != real:
+                diferencias.setdefault(dimension, {})[clave] = (almacenado, real)
+                deltas.append((dimension, clave, real - almacenado))
+    incrementar(db, deltas, anotar=False)
+    if aplazadas:
+        print(f"⚠ {aplazadas} contadores con escrituras durante el recálculo: se reconcilian en la siguiente pasada")
+    return diferencias
+
+
+def reconciliar_tras_carga(db: Any, cliente: Any) -> int:
+    """
+    Siembra o corrige los contadores al final de una carga masiva de los
+    scripts populate_*. Retorna las claves corregidas.
+    """
+    crear_indices(db)
+    if cliente is None:
+        print("⚠ Sin conexión con Dgraph: no se reconcilian diagnósticos ni recetas")
+    corregidas = sum(len(claves) for claves in reconciliar(db, cliente).values())
+    print(f"✓ Contadores del dashboard reconciliados ({corregidas:,} claves corregidas)")
+    return corregidas
+
+
+class ReconciliadorContadores(threading.Thread):
+    """Hilo en segundo plano que reconcilia los contadores periódicamente."""
+
+    def __init__(self, intervalo: float = INTERVALO_RECONCILIACION_SEG):
+        super().__init__(name='reconciliador-contadores', daemon=True)
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            db = conectar_mongodb()
+            if db is None:
+                continue
+            try:
+                diferencias = reconciliar(db, conectar_dgraph())
+                if diferencias:
+                    corregidas = sum(len(v) for v in diferencias.values())
+                    print(f"⚠ Contadores reconciliados: {corregidas} claves corregidas")
+            except Exception as e:
+                print(f"✗ Error al reconciliar contadores: {e}")
+
+    def detener(self):
+        self._detener.set()
+
+
+_reconciliador: Optional[ReconciliadorContadores] = None
+_reconciliador_lock = threading.Lock()
+
+
+def iniciar_reconciliador(intervalo: float = INTERVALO_RECONCILIACION_SEG) -> ReconciliadorContadores:
+    """Arranca (una sola vez por proceso) el reconciliador en segundo plano."""
+    global _reconciliador
+    with _reconciliador_lock:
+        if _reconciliador is None or not _reconciliador.is_alive():
+            _reconciliador = ReconciliadorContadores(intervalo)
+            _reconciliador.start()
+        return _reconciliador
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Muestra el dashboard o reconcilia los contadores (inicialización incluida)."""
+    parser = argparse.ArgumentParser(description="Contadores materializados del dashboard")
+    parser.add_argument('--reconciliar', action='store_true',
+                        help="Recalcular todo y corregir los contadores (usar tras una carga masiva)")
+    parser.add_argument('--limite', type=int, default=5, help="Claves por ranking en el dashboard")
+    args = parser.parse_args()
+
+    db = conectar_mongodb()
+    if db is None:
+        print("✗ No hay conexión con MongoDB")
+        return
+    crear_indices(db)
+
+    if args.reconciliar:
+        cliente = conectar_dgraph()
+        if cliente is None:
+            print("⚠ Sin conexión con Dgraph: no se reconcilian diagnósticos ni recetas")
+        inicio = time.perf_counter()
+        diferencias = reconciliar(db, cliente)
+        for dimension, claves in diferencias.items():
+            print(f"⚠ {dimension}: {len(claves)} claves corregidas")
+        print(f"✓ Contadores reconciliados en {time.perf_counter() - inicio:.2f} s")
+
+    print(json.dumps(dashboard(db, args.limite), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""
+Coordinador de Escrituras
+Plataforma de Integración de Datos de Salud
+
+Registra una cita en las tres bases de datos a la vez (menú CRUD, opción 7
+"Programar nueva cita"), siguiendo el "Flujo Completo" del README. Antes se
+reservan las franjas del doctor con una escritura condicional (LWT,
+disponibilidad.reservar_franjas) y, si otra cita las ocupa o el doctor no
+está en la plantilla, se lanza DoctorNoDisponible sin escribir nada más:
+- MongoDB: documento completo en la colección citas
+- Cassandra: filas en citas_por_fecha, citas_por_paciente y citas_por_doctor,
+  y las franjas ocupadas del doctor en ocupacion_por_especialidad
+- Dgraph: nodo Cita enlazado con su Paciente y su Doctor
+
+Las tres escrituras se lanzan en paralelo sobre un pool de hilos, así que la
+latencia de la operación es la de la base más lenta y no la suma de las
+tres. Si alguna falla (o no termina dentro de TIEMPO_ESPERA_SEG) no se
+bloquea la petición: la escritura pendiente se registra en un outbox
+persistente y un reparador en segundo plano la reintenta. Todas las
+escrituras son idempotentes (upsert por ID), por lo que repetirlas es
+seguro.
+
+Los contadores del dashboard, el índice de búsqueda y la caché de consultas
+se actualizan una vez por operación, cuando al menos una base la ha
+guardado. Si fallan todas, se actualizan cuando el reparador aplica la
+primera entrada del outbox de esa escritura.
+
+Con MODO_ESCRITURA=cdc solo se escribe en MongoDB; sincronizacion_cdc.py
+lleva después el cambio a Cassandra y Dgraph a partir del change stream.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, List
+
+from busqueda_texto import indexar_crud
+from cache_consultas import invalidar_por_crud
+from contadores import aplicar_crud
+from connect import conectar_mongodb, conectar_cassandra, conectar_dgraph
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Tiempo máximo que la petición espera a las tres escrituras
+TIEMPO_ESPERA_SEG = float(os.getenv('TIEMPO_ESPERA_ESCRITURA_SEG', 5))
+
+# Hilos compartidos por todas las escrituras coordinadas
+HILOS_ESCRITURA = int(os.getenv('HILOS_ESCRITURA', 16))
+
+# Cada cuánto revisa el reparador el outbox y cuántas veces reintenta
+INTERVALO_REPARACION_SEG = float(os.getenv('INTERVALO_REPARACION_SEG', 10))
+MAX_INTENTOS_REPARACION = int(os.getenv('MAX_INTENTOS_REPARACION', 20))
+
+# 'paralelo': la petición escribe en las tres bases; 'cdc': solo en MongoDB
+# y el resto lo replica sincronizacion_cdc.py
+MODO_ESCRITURA = os.getenv('MODO_ESCRITURA', 'paralelo')
+
+RUTA_OUTBOX = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'outbox.sqlite')
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=HILOS_ESCRITURA, thread_name_prefix='escritura')
+        return _pool
+
+
+# =============================================================================
+# ESCRITURAS POR BASE DE DATOS
+# =============================================================================
+
+def _escribir_cita_mongodb(cita: Dict[str, Any]):
+    from populate_mongodb import a_documento
+
+    db = conectar_mongodb()
+    if db is None:
+        raise ConnectionError("MongoDB no disponible")
+    documento = a_documento('citas', cita)
+    db.citas.replace_one({'_id': documento['_id']}, documento, upsert=True)
+
+
+_sentencias_cassandra: Dict[str, Any] = {}
+_sentencias_lock = threading.Lock()
+
+
+def _sentencia_cassandra(session: Any, tabla: str) -> Any:
+    from populate_cassandra import preparar_insert
+
+    with _sentencias_lock:
+        if tabla not in _sentencias_cassandra:
+            _sentencias_cassandra[tabla] = preparar_insert(session, tabla)
+        return _sentencias_cassandra[tabla]
+
+
+def _escribir_cita_cassandra(cita: Dict[str, Any]):
+    from disponibilidad import registrar_ocupacion
+    from populate_cassandra import TABLAS
+
+    session = conectar_cassandra()
+    if session is None:
+        raise ConnectionError("Cassandra no disponible")
+    futuros = [
+        session.execute_async(_sentencia_cassandra(session, nombre), definicion['fila'](cita))
+        for nombre, definicion in TABLAS.items()
+        if definicion['origen'] == 'citas'
+    ]
+    # Franjas ocupadas del doctor (ocupacion_por_especialidad)
+    futuros += registrar_ocupacion(session, cita)
+    for futuro in futuros:
+        futuro.result()
+
+
+_CONSULTA_UPSERT_CITA = """
+query cita($cita: string, $paciente: string, $doctor: string) {
+  c as var(func: eq(cita.id, $cita))
+  p as paciente(func: eq(paciente.id, $paciente)) { uid }
+  d as doctor(func: eq(doctor.id, $doctor)) { uid }
+}
+"""
+
+
+def _escribir_cita_dgraph(cita: Dict[str, Any]):
+    from populate_dgraph import literal_rdf
+
+    cliente = conectar_dgraph()
+    if cliente is None:
+        raise ConnectionError("Dgraph no disponible")
+
+    escalares = {
+        campo: valor for campo, valor in cita.items()
+        if not campo.endswith('_id') and not campo.endswith('_ids') and valor not in ('', None)
+    }
+    lineas = ['uid(c) <dgraph.type> "Cita" .']
+    for campo, valor in escalares.items():
+        lineas.append(f"uid(c) <cita.{campo}> {literal_rdf(valor)} .")
+    lineas += [
+        'uid(c) <cita.paciente> uid(p) .',
+        'uid(c) <cita.doctor> uid(d) .',
+        'uid(p) <paciente.citas> uid(c) .',
+        'uid(d) <doctor.citas> uid(c) .',
+    ]
+
+    txn = cliente.txn()
+    try:
+        mutacion = txn.create_mutation(
+            set_nquads='\n'.join(lineas),
+            cond='@if(eq(len(p), 1) AND eq(len(d), 1))'
+        )
+        peticion = txn.create_request(
+            query=_CONSULTA_UPSERT_CITA,
+            variables={'$cita': cita['id'], '$paciente': cita['paciente_id'], '$doctor': cita['doctor_id']},
+            mutations=[mutacion],
+            commit_now=True
+        )
+        respuesta = txn.do_request(peticion)
+    finally:
+        txn.discard()
+
+    # La mutación condicional no se aplica si falta el paciente o el doctor;
+    # se trata como fallo para que el outbox la reintente más tarde
+    encontrados = json.loads(respuesta.json)
+    if not encontrados.get('paciente') or not encontrados.get('doctor'):
+        raise LookupError(f"Paciente {cita['paciente_id']} o doctor {cita['doctor_id']} no existe en Dgraph")
+
+
+# operación -> destino -> función idempotente que aplica la escritura
+OPERACIONES: Dict[str, Dict[str, Callable[[Dict[str, Any]], None]]] = {
+    'registrar_cita': {
+        'mongodb': _escribir_cita_mongodb,
+        'cassandra': _escribir_cita_cassandra,
+        'dgraph': _escribir_cita_dgraph,
+    },
+}
+
+# Operación -> opción de menu_crud, para invalidar la caché de consultas y
+# actualizar los contadores del dashboard
+OPCION_CRUD = {
+    'registrar_cita': '7',
+}
+
+
+# =============================================================================
+# OUTBOX PERSISTENTE
+# =============================================================================
+
+class Outbox:
+    """
+    Registro persistente (SQLite) de escrituras pendientes de reparar.
+
+    Cada entrada guarda la operación, la base de datos destino y la carga
+    completa, de modo que basta con volver a aplicarla. `escritura` agrupa
+    las entradas de una misma operación y `ganchos` indica que aún no ha
+    actualizado contadores, índice ni caché.
+    """
+
+    def __init__(self, ruta: str = RUTA_OUTBOX):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                creado TEXT NOT NULL,
+                operacion TEXT NOT NULL,
+                destino TEXT NOT NULL,
+                carga TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                ultimo_error TEXT,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                escritura TEXT,
+                ganchos INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conexion.commit()
+
+    def registrar(self, operacion: str, destino: str, carga: Dict[str, Any], error: str = '',
+                  escritura: Optional[str] = None, ganchos: bool = False):
+        with self._lock:
+            self._conexion.execute(
+                "INSERT INTO outbox (creado, operacion, destino, carga, ultimo_error, escritura, ganchos) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (datetime.utcnow().isoformat(), operacion, destino, json.dumps(carga, ensure_ascii=False), error,
+                 escritura, int(ganchos))
+            )
+            self._conexion.commit()
+
+    def pendientes(self, limite: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id, operacion, destino, carga, intentos, escritura FROM outbox "
+                "WHERE estado = 'pendiente' ORDER BY id LIMIT ?", (limite,)
+            ).fetchall()
+        return [
+            {'id': f[0], 'operacion': f[1], 'destino': f[2], 'carga': json.loads(f[3]), 'intentos': f[4],
+             'escritura': f[5]}
+            for f in filas
+        ]
+
+    def tomar_ganchos(self, escritura: Optional[str]) -> bool:
+        """True solo para la primera entrada aplicada de una escritura con ganchos pendientes."""
+        if escritura is None:
+            return False
+        with self._lock:
+            cursor = self._conexion.execute(
+                "UPDATE outbox SET ganchos = 0 WHERE escritura = ? AND ganchos = 1", (escritura,))
+            self._conexion.commit()
+            return cursor.rowcount > 0
+
+    def marcar_aplicada(self, entrada_id: int):
+        with self._lock:
+            self._conexion.execute("UPDATE outbox SET estado = 'aplicada' WHERE id = ?", (entrada_id,))
+            self._conexion.commit()
+
+    def marcar_fallo(self, entrada_id: int, error: str, max_intentos: int = MAX_INTENTOS_REPARACION):
+        with self._lock:
+            self._conexion.execute(
+                "UPDATE outbox SET intentos = intentos + 1, ultimo_error = ?, "
+                "estado = CASE WHEN intentos + 1 >= ? THEN 'fallida' ELSE 'pendiente' END "
+                "WHERE id = ?", (error, max_intentos, entrada_id)
+            )
+            self._conexion.commit()
+
+    def contar(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conexion.execute("SELECT estado, COUNT(*) FROM outbox GROUP BY estado").fetchall())
+
+
+_outbox: Optional[Outbox] = None
+
+
+def obtener_outbox() -> Outbox:
+    global _outbox
+    with _pool_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+# =============================================================================
+# COORDINACIÓN
+# =============================================================================
+
+def _aplicar_ganchos(operacion: str, carga: Dict[str, Any]):
+    """
+    Contadores, índice de búsqueda y caché (una vez por operación, no por
+    destino). Con MODO_ESCRITURA=cdc los contadores los actualiza
+    sincronizacion_cdc a partir del cambio en MongoDB.
+    """
+    opcion = OPCION_CRUD[operacion]
+    if MODO_ESCRITURA != 'cdc':
+        aplicar_crud(opcion, carga)
+    indexar_crud(opcion, carga)
+    invalidar_por_crud(opcion, carga)
+
+
+def ejecutar_en_paralelo(operacion: str, carga: Dict[str, Any],
+                         tiempo_espera: float = TIEMPO_ESPERA_SEG) -> Dict[str, Any]:
+    """
+    Aplica una operación en todas sus bases de datos destino a la vez (solo
+    en MongoDB con MODO_ESCRITURA=cdc).
+
+    Las escrituras que fallan o no terminan a tiempo se registran en el
+    outbox y se marcan como 'pendiente'; el resto como 'ok'. La primera
+    llamada del proceso arranca el reparador en segundo plano.
+
+    Returns:
+        Diccionario con el estado por destino y los segundos empleados
+    """
+    inicio = time.perf_counter()
+    pool = _obtener_pool()
+    # El reparador también drena lo que quedó pendiente en sesiones anteriores
+    iniciar_reparador()
+    futuros = {
+        destino: pool.submit(funcion, carga)
+        for destino, funcion in OPERACIONES[operacion].items()
+        if MODO_ESCRITURA != 'cdc' or destino == 'mongodb'
+    }
+    wait(futuros.values(), timeout=tiempo_espera)
+
+    estados = {}
+    errores = {}
+    for destino, futuro in futuros.items():
+        if futuro.done() and futuro.exception() is None:
+            estados[destino] = 'ok'
+        else:
+            errores[destino] = str(futuro.exception()) if futuro.done() else 'tiempo de espera agotado'
+            estados[destino] = 'pendiente'
+
+    # Si ninguna base la ha guardado, los ganchos esperan a la reparación
+    guardada = 'ok' in estados.values()
+    escritura = uuid.uuid4().hex
+    for destino, error in errores.items():
+        obtener_outbox().registrar(operacion, destino, carga, error, escritura, ganchos=not guardada)
+    if guardada:
+        _aplicar_ganchos(operacion, carga)
+    return {'estados': estados, 'segundos': round(time.perf_counter() - inicio, 4)}
+
+
+class DoctorNoDisponible(ValueError):
+    """El doctor ya tiene otra cita en alguna franja de la nueva (o no se conoce)."""
+
+
+def _reservar_franjas(cita: Dict[str, Any]):
+    """
+    Reserva las franjas del doctor en ocupacion_por_especialidad con una
+    escritura condicional: dos citas simultáneas no pueden quedarse la misma
+    franja. Sin conexión con Cassandra no se puede reservar y la cita sigue
+    adelante (su escritura en Cassandra irá al outbox).
+    """
+    from disponibilidad import ESTADOS_LIBRES, especialidad_de, reservar_franjas
+
+    if cita.get('estado') in ESTADOS_LIBRES:
+        return
+    if especialidad_de(cita['doctor_id']) is None:
+        raise DoctorNoDisponible(f"El doctor {cita['doctor_id']} no está en la plantilla de doctores "
+                                 f"(o no se pudo leer de MongoDB)")
+    session = conectar_cassandra()
+    if session is None:
+        return
+    if not reservar_franjas(session, cita):
+        raise DoctorNoDisponible(f"El doctor {cita['doctor_id']} no está disponible el {cita['fecha_hora']}")
+
+
+def registrar_cita(cita: Dict[str, Any], tiempo_espera: float = TIEMPO_ESPERA_SEG) -> Dict[str, Any]:
+    """
+    Registra una cita en MongoDB, Cassandra y Dgraph concurrentemente,
+    tras reservar las franjas del doctor.
+
+    Args:
+        cita: Registro con el formato de utils.data_generator (id,
+            fecha_hora, motivo, estado, ..., paciente_id, doctor_id)
+        tiempo_espera: Segundos máximos de espera antes de delegar al outbox
+
+    Returns:
+        {'cita_id', 'estados': {destino: 'ok'|'pendiente'}, 'segundos'}
+
+    Raises:
+        DoctorNoDisponible: Si el doctor ya tiene cita en esas franjas o no
+            está en la plantilla
+    """
+    _reservar_franjas(cita)
+    resultado = ejecutar_en_paralelo('registrar_cita', cita, tiempo_espera)
+    resultado['cita_id'] = cita['id']
+    return resultado
+
+
+# =============================================================================
+# REPARACIÓN ASÍNCRONA
+# =============================================================================
+
+def reparar_pendientes(limite: int = 100) -> Dict[str, int]:
+    """
+    Reaplica las escrituras pendientes del outbox.
+
+    Returns:
+        Conteo de entradas aplicadas y fallidas en esta pasada
+    """
+    outbox = obtener_outbox()
+    resumen = {'aplicadas': 0, 'fallidas': 0}
+    for entrada in outbox.pendientes(limite):
+        funcion = OPERACIONES[entrada['operacion']][entrada['destino']]
+        try:
+            funcion(entrada['carga'])
+            outbox.marcar_aplicada(entrada['id'])
+            if outbox.tomar_ganchos(entrada['escritura']):
+                # Primera base que guarda una escritura que falló en todas
+                _aplicar_ganchos(entrada['operacion'], entrada['carga'])
+            else:
+                # La escritura tardía puede cambiar lo que ya estaba en caché
+                invalidar_por_crud(OPCION_CRUD[entrada['operacion']], entrada['carga'])
+            resumen['aplicadas'] += 1
+        except Exception as e:
+            outbox.marcar_fallo(entrada['id'], str(e))
+            resumen['fallidas'] += 1
+    return resumen
+
+
+class ReparadorOutbox(threading.Thread):
+    """Hilo en segundo plano que vacía el outbox periódicamente."""
+
+    def __init__(self, intervalo: float = INTERVALO_REPARACION_SEG):
+        super().__init__(name='reparador-outbox', daemon=True)
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                reparar_pendientes()
+            except Exception as e:
+                print(f"✗ Error al reparar escrituras pendientes: {e}")
+
+    def detener(self):
+        self._detener.set()
+
+
+_reparador: Optional[ReparadorOutbox] = None
+
+
+def iniciar_reparador(intervalo: float = INTERVALO_REPARACION_SEG) -> ReparadorOutbox:
+    """Arranca (una sola vez por proceso) el reparador en segundo plano."""
+    global _reparador
+    with _pool_lock:
+        if _reparador is None or not _reparador.is_alive():
+            _reparador = ReparadorOutbox(intervalo)
+            _reparador.start()
+        return _reparador
+
+
+def drenar_outbox(limite: int = 100) -> Dict[str, int]:
+    """
+    Reaplica pasadas de reparar_pendientes() hasta vaciar el outbox o hasta
+    que una pasada no consiga aplicar ninguna entrada (bases aún caídas).
+    """
+    total = {'aplicadas': 0, 'fallidas': 0}
+    while True:
+        resumen = reparar_pendientes(limite)
+        for clave, valor in resumen.items():
+            total[clave] += valor
+        if not resumen['aplicadas']:
+            return total
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Muestra el estado del outbox o lo drena."""
+    parser = argparse.ArgumentParser(description="Outbox de escrituras coordinadas")
+    parser.add_argument('--drenar', action='store_true',
+                        help="Reintentar ahora todas las escrituras pendientes")
+    args = parser.parse_args()
+
+    outbox = obtener_outbox()
+    if args.drenar:
+        inicio = time.perf_counter()
+        resumen = drenar_outbox()
+        print(f"✓ {resumen['aplicadas']:,} escrituras aplicadas en {time.perf_counter() - inicio:.2f} s")
+        if resumen['fallidas']:
+            print(f"⚠ {resumen['fallidas']:,} intentos fallidos")
+    for estado, total in sorted(outbox.contar().items()):
+        print(f"{'✓' if estado == 'aplicada' else '⚠'} {estado}: {total:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+"""
+Disponibilidad de Doctores
+Plataforma de Integración de Datos de Salud
+
+"Buscar doctores disponibles para una fecha" (menu_doctores 8) y la
+validación de disponibilidad del "Flujo Completo" no recorren las citas:
+la ocupación de cada doctor se guarda por franjas (slots) de
+MINUTOS_POR_SLOT minutos.
+
+- Cassandra: tabla ocupacion_por_especialidad (Cassandra/schema.cql), una
+  partición por (especialidad, fecha) y una fila por doctor y slot con el
+  conjunto de citas que lo ocupan. "¿Qué doctores de Cardiología están
+  libres el martes a las 10:00?" es una sola lectura de partición. Añadir o
+  quitar una cita de un set es conmutativo e idempotente, así que las
+  escrituras concurrentes y los reintentos del outbox no se pisan, y liberar
+  una cita no libera los slots que otra cita solapada sigue ocupando
+- Una cita que pasa de medianoche ocupa slots en la partición de cada día
+- Al programar una cita (coordinador_escrituras.py) las franjas se reservan
+  con escrituras condicionales (LWT, reservar_franjas): comprobar que están
+  libres y ocuparlas es una sola operación, así que dos citas simultáneas
+  no pueden quedarse la misma franja
+- En el proceso: cada partición leída se guarda como un mapa de bits por
+  doctor (un int de Python; comprobar una franja es un AND) junto con las
+  citas de cada slot. Para consultas de varios días de un doctor (próximo
+  hueco libre, citas que solapan) las franjas ocupadas se reúnen en un
+  árbol de intervalos. La caché es LRU (MAX_PARTICIONES_DISPONIBILIDAD y
+  MAX_ARBOLES_DISPONIBILIDAD)
+
+Uso:
+    from disponibilidad import doctores_disponibles
+    libres = doctores_disponibles(session, 'Cardiología', datetime(2024, 3, 5, 10, 0), 30)
+
+    python disponibilidad.py --poblar --citas 100000
+    python disponibilidad.py --especialidad Cardiología --fecha-hora 2024-03-05T10:00
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Tamaño de la franja; las citas se redondean a franjas completas
+MINUTOS_POR_SLOT = int(os.getenv('MINUTOS_POR_SLOT', 15))
+SLOTS_POR_DIA = 1440 // MINUTOS_POR_SLOT
+
+# Segundos que una partición leída se da por vigente (las escrituras de este
+# proceso la actualizan al momento; las de otros procesos tardan como mucho esto)
+TTL_DISPONIBILIDAD_SEG = float(os.getenv('TTL_DISPONIBILIDAD_SEG', 30))
+
+# Particiones (especialidad, fecha) y árboles por doctor que guarda la caché
+MAX_PARTICIONES_DISPONIBILIDAD = int(os.getenv('MAX_PARTICIONES_DISPONIBILIDAD', 4096))
+MAX_ARBOLES_DISPONIBILIDAD = int(os.getenv('MAX_ARBOLES_DISPONIBILIDAD', 1024))
+
+# Segundos entre recargas de la plantilla (doctor -> especialidad)
+TTL_PLANTILLA_SEG = 600
+
+# Segundos mínimos entre recargas por un doctor que no está en la plantilla
+RECARGA_MINIMA_PLANTILLA_SEG = 5
+
+# Estados de cita que no ocupan la agenda
+ESTADOS_LIBRES = ('cancelada',)
+
+
+# =============================================================================
+# FRANJAS Y MAPAS DE BITS
+# =============================================================================
+
+def franjas(inicio: datetime, duracion_minutos: int) -> List[Tuple[date, range]]:
+    """
+    Índices de slot que ocupa [inicio, inicio + duración), por día: una
+    cita que pasa de medianoche sigue en los slots del día siguiente.
+    """
+    minuto = inicio.hour * 60 + inicio.minute
+    primera = minuto // MINUTOS_POR_SLOT
+    ultima = -(-(minuto + max(duracion_minutos, 1)) // MINUTOS_POR_SLOT)
+    fecha = inicio.date()
+    resultado = []
+    while primera < ultima:
+        resultado.append((fecha, range(primera, min(ultima, SLOTS_POR_DIA))))
+        primera, ultima, fecha = 0, ultima - SLOTS_POR_DIA, fecha + timedelta(days=1)
+    return resultado
+
+
+def mascaras(inicio: datetime, duracion_minutos: int) -> List[Tuple[date, int]]:
+    """Mapa de bits de las franjas de [inicio, inicio + duración), por día."""
+    return [(fecha, ((1 << len(slots)) - 1) << slots.start) for fecha, slots in franjas(inicio, duracion_minutos)]
+
+
+def a_mapa(slots: Optional[Iterable[int]]) -> int:
+    bits = 0
+    for slot in slots or ():
+        bits |= 1 << slot
+    return bits
+
+
+def tramos(bits: int) -> List[Tuple[int, int]]:
+    """Tramos [primer slot, último + 1) de bits consecutivos a 1."""
+    resultado = []
+    slot = 0
+    while bits:
+        if bits & 1:
+            inicio = slot
+            while bits & 1:
+                bits >>= 1
+                slot += 1
+            resultado.append((inicio, slot))
+        else:
+            salto = (bits & -bits).bit_length() - 1
+            bits >>= salto
+            slot += salto
+    return resultado
+
+
+def _fecha_hora(valor: Any) -> datetime:
+    return datetime.fromisoformat(valor.rstrip('Z')) if isinstance(valor, str) else valor
+
+
+# =============================================================================
+# ÁRBOL DE INTERVALOS
+# =============================================================================
+
+class _Nodo:
+    __slots__ = ('centro', 'por_inicio', 'por_fin', 'izquierda', 'derecha')
+
+
+def _construir(intervalos: List[Tuple[int, int, Any]]) -> Optional[_Nodo]:
+    if not intervalos:
+        return None
+    extremos = sorted(x for inicio, fin, _ in intervalos for x in (inicio, fin))
+    centro = extremos[(len(extremos) - 1) // 2]
+    izquierda, derecha, aqui = [], [], []
+    for intervalo in intervalos:
+        if intervalo[1] <= centro:
+            izquierda.append(intervalo)
+        elif intervalo[0] > centro:
+            derecha.append(intervalo)
+        else:
+            aqui.append(intervalo)
+    nodo = _Nodo()
+    nodo.centro = centro
+    nodo.por_inicio = sorted(aqui, key=lambda i: i[0])
+    nodo.por_fin = sorted(aqui, key=lambda i: i[1], reverse=True)
+    nodo.izquierda = _construir(izquierda)
+    nodo.derecha = _construir(derecha)
+    return nodo
+
+
+class ArbolIntervalos:
+    """
+    Árbol de intervalos centrado (estático) sobre intervalos [inicio, fin).
+
+    Se construye de una vez con la lista completa; solapados() cuesta
+    O(log n + k) para k intervalos devueltos.
+    """
+
+    __slots__ = ('_raiz', 'total')
+
+    def __init__(self, intervalos: Iterable[Tuple[int, int, Any]] = ()):
+        validos = [i for i in intervalos if i[0] < i[1]]
+        self.total = len(validos)
+        self._raiz = _construir(validos)
+
+    def solapados(self, inicio: int, fin: int) -> List[Tuple[int, int, Any]]:
+        """Intervalos que se solapan con [inicio, fin)."""
+        resultado = []
+        pendientes = [self._raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo is None:
+                continue
+            if fin <= nodo.centro:
+                for intervalo in nodo.por_inicio:
+                    if intervalo[0] >= fin:
+                        break
+                    resultado.append(intervalo)
+                pendientes.append(nodo.izquierda)
+            elif inicio > nodo.centro:
+                for intervalo in nodo.por_fin:
+                    if intervalo[1] <= inicio:
+                        break
+                    resultado.append(intervalo)
+                pendientes.append(nodo.derecha)
+            else:
+                resultado.extend(nodo.por_inicio)
+                pendientes.append(nodo.izquierda)
+                pendientes.append(nodo.derecha)
+        return sorted(resultado)
+
+    def libre(self, inicio: int, fin: int) -> bool:
+        return not self.solapados(inicio, fin)
+
+    def huecos(self, inicio: int, fin: int, duracion: int) -> List[Tuple[int, int]]:
+        """Tramos libres de al menos `duracion` dentro de [inicio, fin)."""
+        resultado = []
+        cursor = inicio
+        for ocupado_inicio, ocupado_fin, _ in self.solapados(inicio, fin):
+            if ocupado_inicio - cursor >= duracion:
+                resultado.append((cursor, ocupado_inicio))
+            cursor = max(cursor, ocupado_fin)
+        if fin - cursor >= duracion:
+            resultado.append((cursor, fin))
+        return resultado
+
+
+# =============================================================================
+# PLANTILLA DE DOCTORES
+# =============================================================================
+
+class Plantilla:
+    """Doctor -> especialidad y especialidad -> doctores."""
+
+    def __init__(self, doctores: Iterable[Dict[str, Any]] = ()):
+        self.especialidad: Dict[str, str] = {}
+        self.por_especialidad: Dict[str, List[str]] = defaultdict(list)
+        for doctor in doctores:
+            self.agregar(doctor.get('id') or doctor.get('_id'), doctor.get('especialidad'))
+
+    def agregar(self, doctor_id: str, especialidad: Optional[str]):
+        if doctor_id and especialidad and doctor_id not in self.especialidad:
+            self.especialidad[doctor_id] = especialidad
+            self.por_especialidad[especialidad].append(doctor_id)
+
+
+_plantilla: Optional[Plantilla] = None
+_plantilla_expira = 0.0
+_plantilla_leida = float('-inf')
+_plantilla_lock = threading.Lock()
+
+
+def obtener_plantilla(recargar: bool = False) -> Plantilla:
+    """
+    Plantilla leída de la colección doctores de MongoDB (vacía si no hay
+    conexión). Con recargar se vuelve a leer antes de caducar (un doctor
+    dado de alta después), como mucho cada RECARGA_MINIMA_PLANTILLA_SEG.
+    """
+    global _plantilla, _plantilla_expira, _plantilla_leida
+    with _plantilla_lock:
+        ahora = time.monotonic()
+        if (_plantilla is None or ahora >= _plantilla_expira
+                or (recargar and ahora - _plantilla_leida >= RECARGA_MINIMA_PLANTILLA_SEG)):
+            from connect import conectar_mongodb
+            db = conectar_mongodb()
+            _plantilla_leida = ahora
+            if db is not None:
+                _plantilla = Plantilla(db.doctores.find({}, {'especialidad': 1}))
+                _plantilla_expira = ahora + TTL_PLANTILLA_SEG
+            elif _plantilla is None:
+                return Plantilla()
+        return _plantilla
+
+
+def fijar_plantilla(plantilla: Plantilla):
+    """Sustituye la plantilla (carga desde el generador, pruebas manuales)."""
+    global _plantilla, _plantilla_expira, _plantilla_leida
+    with _plantilla_lock:
+        _plantilla = plantilla
+        _plantilla_expira = _plantilla_leida = float('inf')
+
+
+def especialidad_de(doctor_id: str) -> Optional[str]:
+    """Especialidad de un doctor; si no está en la plantilla se relee (alta reciente)."""
+    especialidad = obtener_plantilla().especialidad.get(doctor_id)
+    if especialidad is None:
+        especialidad = obtener_plantilla(recargar=True).especialidad.get(doctor_id)
+    return especialidad
+
+
+# =============================================================================
+# CASSANDRA
+# =============================================================================
+
+_sentencias: Dict[Tuple[int, str], Any] = {}
+
+
+def _preparar(session: Any, consulta: str) -> Any:
+    clave = (id(session), consulta)
+    if clave not in _sentencias:
+        sentencia = session.prepare(consulta)
+        sentencia.is_idempotent = True
+        _sentencias[clave] = sentencia
+    return _sentencias[clave]
+
+
+# doctor_id -> slot -> citas que lo ocupan
+Titulares = Dict[str, Dict[int, set]]
+
+
+def _leer_particion(session: Any, especialidad: str, fecha: date) -> Titulares:
+    sentencia = _preparar(session, "SELECT doctor_id, slot, citas FROM ocupacion_por_especialidad "
+                                   "WHERE especialidad = ? AND fecha = ?")
+    titulares: Titulares = defaultdict(dict)
+    for fila in session.execute(sentencia, (especialidad, fecha)):
+        # Un slot cuyo set de citas se ha vaciado deja de existir (o llega vacío)
+        if fila.citas:
+            titulares[fila.doctor_id][fila.slot] = set(fila.citas)
+    return dict(titulares)
+
+
+def sentencia_ocupacion(session: Any, cita: Dict[str, Any], liberar: bool = False,
+                        plantilla: Optional[Plantilla] = None) -> List[Tuple[Any, Tuple]]:
+    """
+    UPDATE que añade (o quita) la cita del set de cada franja que ocupa, uno
+    por día; vacío si el doctor no está en la plantilla o la cita no ocupa
+    la agenda.
+    """
+    especialidad = (plantilla or obtener_plantilla()).especialidad.get(cita['doctor_id'])
+    if especialidad is None or (cita.get('estado') in ESTADOS_LIBRES and not liberar):
+        return []
+    operador = '-' if liberar else '+'
+    sentencia = _preparar(session, f"UPDATE ocupacion_por_especialidad SET citas = citas {operador} ? "
+                                   "WHERE especialidad = ? AND fecha = ? AND doctor_id = ? AND slot IN ?")
+    return [
+        (sentencia, ({cita['id']}, especialidad, fecha, cita['doctor_id'], list(slots)))
+        for fecha, slots in franjas(_fecha_hora(cita['fecha_hora']), cita.get('duracion_minutos') or MINUTOS_POR_SLOT)
+    ]
+
+
+def registrar_ocupacion(session: Any, cita: Dict[str, Any], liberar: bool = False) -> List[Any]:
+    """
+    Marca (o libera) las franjas de una cita en Cassandra y en la caché.
+
+    Returns:
+        ResponseFuture de cada escritura (una por día que ocupa la cita)
+    """
+    futuros = []
+    for sentencia, parametros in sentencia_ocupacion(session, cita, liberar):
+        _, especialidad, fecha, doctor_id, slots = parametros
+        obtener_cache().aplicar(especialidad, fecha, doctor_id, cita['id'], slots, liberar)
+        futuros.append(session.execute_async(sentencia, parametros))
+    return futuros
+
+
+def poblar_ocupacion(session: Any, citas: Iterable[Dict[str, Any]], plantilla: Plantilla,
+                     en_vuelo: int = 256) -> Dict[str, Any]:
+    """
+    Carga masiva: añade cada cita a sus franjas con las mismas escrituras
+    que registrar_ocupacion (una por cita y día), sin pasar por la caché.
+    """
+    from populate_cassandra import EscritorConcurrente
+    from utils.metricas import MedidorThroughput
+
+    escritor = EscritorConcurrente(session, en_vuelo=en_vuelo)
+    medidor = MedidorThroughput('ocupacion_por_especialidad').iniciar()
+    for cita in citas:
+        for sentencia, parametros in sentencia_ocupacion(session, cita, plantilla=plantilla):
+            escritor.enviar(sentencia, parametros, len(parametros[-1]), medidor)
+    escritor.esperar()
+    medidor.detener()
+    return medidor.resumen()
+
+
+# =============================================================================
+# CACHÉ EN PROCESO
+# =============================================================================
+
+class CacheDisponibilidad:
+    """
+    Particiones (especialidad, fecha) leídas de Cassandra como mapas de bits
+    por doctor (con las citas de cada slot), y árboles de intervalos por
+    doctor construidos sobre ellas.
+
+    Las escrituras de este proceso se aplican al momento (registrar_ocupacion);
+    las de otros procesos se ven al caducar la partición. Particiones y
+    árboles se desalojan por LRU al pasar de max_particiones / max_arboles.
+    """
+
+    def __init__(self, ttl: float = TTL_DISPONIBILIDAD_SEG,
+                 max_particiones: int = MAX_PARTICIONES_DISPONIBILIDAD,
+                 max_arboles: int = MAX_ARBOLES_DISPONIBILIDAD):
+        self.ttl = ttl
+        self.max_particiones = max_particiones
+        self.max_arboles = max_arboles
+        self._dias: 'OrderedDict[Tuple[str, date], Tuple[float, int, Dict[str, int], Titulares]]' = OrderedDict()
+        self._arboles: 'OrderedDict[Tuple[str, date, int], Tuple[Tuple[int, ...], ArbolIntervalos]]' = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def dia(self, session: Any, especialidad: str, fecha: date) -> Dict[str, int]:
+        """Doctor -> mapa de bits de franjas ocupadas (una lectura de partición si no está)."""
+        return self._entrada(session, especialidad, fecha)[2]
+
+    def titulares(self, session: Any, especialidad: str, fecha: date) -> Titulares:
+        """Doctor -> slot -> citas que lo ocupan."""
+        return self._entrada(session, especialidad, fecha)[3]
+
+    def _entrada(self, session: Any, especialidad: str,
+                 fecha: date) -> Tuple[float, int, Dict[str, int], Titulares]:
+        clave = (especialidad, fecha)
+        with self._lock:
+            entrada = self._dias.get(clave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._dias.move_to_end(clave)
+                return entrada
+        titulares = _leer_particion(session, especialidad, fecha)
+        ocupacion = {doctor_id: a_mapa(slots) for doctor_id, slots in titulares.items()}
+        with self._lock:
+            self._version += 1
+            entrada = (time.monotonic() + self.ttl, self._version, ocupacion, titulares)
+            self._dias[clave] = entrada
+            self._dias.move_to_end(clave)
+            while len(self._dias) > self.max_particiones:
+                self._dias.popitem(last=False)
+            return entrada
+
+    def aplicar(self, especialidad: str, fecha: date, doctor_id: str, cita_id: str,
+                slots: Iterable[int], liberar: bool = False):
+        """Refleja una escritura local en la partición en caché (si está)."""
+        with self._lock:
+            entrada = self._dias.get((especialidad, fecha))
+            if entrada is None:
+                return
+            expira, _, ocupacion, titulares = entrada
+            del_doctor = titulares.setdefault(doctor_id, {})
+            for slot in slots:
+                citas = del_doctor.setdefault(slot, set())
+                if liberar:
+                    citas.discard(cita_id)
+                    if not citas:
+                        del del_doctor[slot]
+                else:
+                    citas.add(cita_id)
+            ocupacion[doctor_id] = a_mapa(del_doctor)
+            self._version += 1
+            self._dias[(especialidad, fecha)] = (expira, self._version, ocupacion, titulares)
+
+    def arbol(self, session: Any, especialidad: str, doctor_id: str, desde: date, dias: int) -> ArbolIntervalos:
+        """
+        Árbol de los tramos ocupados de un doctor en [desde, desde + dias),
+        en minutos desde el inicio de `desde`. Se reconstruye solo si alguna
+        de las particiones ha cambiado.
+        """
+        entradas = [self._entrada(session, especialidad, desde + timedelta(days=d)) for d in range(dias)]
+        versiones = tuple(entrada[1] for entrada in entradas)
+        clave = (doctor_id, desde, dias)
+        with self._lock:
+            guardado = self._arboles.get(clave)
+            if guardado is not None and guardado[0] == versiones:
+                self._arboles.move_to_end(clave)
+                return guardado[1]
+        intervalos = [
+            (d * 1440 + inicio * MINUTOS_POR_SLOT, d * 1440 + fin * MINUTOS_POR_SLOT, desde + timedelta(days=d))
+            for d, entrada in enumerate(entradas)
+            for inicio, fin in tramos(entrada[2].get(doctor_id, 0))
+        ]
+        arbol = ArbolIntervalos(intervalos)
+        with self._lock:
+            self._arboles[clave] = (versiones, arbol)
+            self._arboles.move_to_end(clave)
+            while len(self._arboles) > self.max_arboles:
+                self._arboles.popitem(last=False)
+        return arbol
+
+    def limpiar(self):
+        with self._lock:
+            self._dias.clear()
+            self._arboles.clear()
+
+
+_cache: Optional[CacheDisponibilidad] = None
+
+
+def obtener_cache() -> CacheDisponibilidad:
+    global _cache
+    if _cache is None:
+        _cache = CacheDisponibilidad()
+    return _cache
+
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+
+def doctores_disponibles(session: Any, especialidad: str, fecha_hora: datetime,
+                         duracion: int = 30) -> List[str]:
+    """Doctores de una especialidad sin citas en [fecha_hora, fecha_hora + duración)."""
+    dias = [(obtener_cache().dia(session, especialidad, fecha), bits) for fecha, bits in mascaras(fecha_hora, duracion)]
+    return [doctor_id for doctor_id in obtener_plantilla().por_especialidad.get(especialidad, [])
+            if not any(ocupacion.get(doctor_id, 0) & bits for ocupacion, bits in dias)]
+
+
+def doctor_disponible(session: Any, doctor_id: str, fecha_hora: Any, duracion: int = 30,
+                      excluir: Optional[str] = None) -> bool:
+    """
+    ¿Tiene el doctor libre [fecha_hora, fecha_hora + duración)? Lectura de
+    la caché: para programar una cita se usa reservar_franjas.
+
+    `fecha_hora` admite un datetime o el texto ISO de las citas; `excluir`
+    es el ID de la propia cita, para que reintentarla o moverla no choque
+    con las franjas que ya ocupa. Un doctor que no está en la plantilla (o
+    la plantilla vacía, sin MongoDB) no está disponible.
+    """
+    especialidad = especialidad_de(doctor_id)
+    if especialidad is None:
+        return False
+    for fecha, slots in franjas(_fecha_hora(fecha_hora), duracion):
+        del_doctor = obtener_cache().titulares(session, especialidad, fecha).get(doctor_id, {})
+        if any(del_doctor.get(slot, set()) - {excluir} for slot in slots):
+            return False
+    return True
+
+
+def reservar_franjas(session: Any, cita: Dict[str, Any]) -> bool:
+    """
+    Reserva las franjas de una cita con escrituras condicionales (LWT).
+
+    Cada día que ocupa la cita (una partición) es una BATCH condicional con
+    una fila por franja e IF citas = null: comprobar y ocupar es una sola
+    operación, así que de dos citas que compiten por una franja solo se
+    aplica una. Si no se aplica se leen las franjas con consistencia SERIAL:
+    las que ya tiene la propia cita (un reintento) no cuentan. Si algún día
+    no se puede reservar se liberan los días ya reservados.
+
+    Returns:
+        True si las franjas quedan reservadas para la cita; False si otra
+        cita ocupa alguna o el doctor no está en la plantilla
+    """
+    especialidad = especialidad_de(cita['doctor_id'])
+    if especialidad is None:
+        return False
+    if cita.get('estado') in ESTADOS_LIBRES:
+        return True
+    doctor_id, propia = cita['doctor_id'], {cita['id']}
+    reservados = []
+    for fecha, slots in franjas(_fecha_hora(cita['fecha_hora']), cita.get('duracion_minutos') or MINUTOS_POR_SLOT):
+        if not _cambiar_franjas(session, especialidad, fecha, doctor_id, {slot: (None, propia) for slot in slots}):
+            actuales = _leer_franjas(session, especialidad, fecha, doctor_id, slots)
+            libres = [slot for slot in slots if slot not in actuales]
+            if (any(citas != propia for citas in actuales.values())
+                    or (libres and not _cambiar_franjas(session, especialidad, fecha, doctor_id,
+                                                        {slot: (None, propia) for slot in libres}))):
+                for dia, reservadas in reservados:
+                    _cambiar_franjas(session, especialidad, dia, doctor_id,
+                                     {slot: (propia, None) for slot in reservadas})
+                return False
+        reservados.append((fecha, slots))
+
+    for fecha, slots in reservados:
+        obtener_cache().aplicar(especialidad, fecha, doctor_id, cita['id'], slots)
+    return True
+
+
+def _cambiar_franjas(session: Any, especialidad: str, fecha: date, doctor_id: str,
+                     cambios: Dict[int, Tuple[Optional[set], Optional[set]]]) -> bool:
+    """BATCH condicional de una partición: slot -> (citas esperadas, citas nuevas)."""
+    sentencia = _preparar(session, "UPDATE ocupacion_por_especialidad SET citas = ? "
+                                   "WHERE especialidad = ? AND fecha = ? AND doctor_id = ? AND slot = ? "
+                                   "IF citas = ?")
+    lote = _lote_condicional(sentencia, [
+        (nuevas, especialidad, fecha, doctor_id, slot, esperadas)
+        for slot, (esperadas, nuevas) in cambios.items()
+    ])
+    return session.execute(lote).was_applied
+
+
+def _lote_condicional(sentencia: Any, filas: List[Tuple]) -> Any:
+    from cassandra.query import BatchStatement
+
+    lote = BatchStatement()
+    for parametros in filas:
+        lote.add(sentencia, parametros)
+    return lote
+
+
+def _leer_franjas(session: Any, especialidad: str, fecha: date, doctor_id: str,
+                  slots: Iterable[int]) -> Dict[int, set]:
+    """Slot -> citas de unas franjas de un doctor, con consistencia SERIAL (ve las LWT confirmadas)."""
+    from cassandra import ConsistencyLevel
+
+    sentencia = _preparar(session, "SELECT slot, citas FROM ocupacion_por_especialidad "
+                                   "WHERE especialidad = ? AND fecha = ? AND doctor_id = ? AND slot IN ?")
+    consulta = sentencia.bind((especialidad, fecha, doctor_id, list(slots)))
+    consulta.consistency_level = ConsistencyLevel.SERIAL
+    return {fila.slot: set(fila.citas) for fila in session.execute(consulta) if fila.citas}
+
+
+def proximos_huecos(session: Any, doctor_id: str, desde: datetime, duracion: int = 30, dias: int = 7,
+                    hora_inicio: int = 8, hora_fin: int = 18, limite: int = 10) -> List[datetime]:
+    """
+    Próximos inicios libres de un doctor dentro del horario de consulta.
+
+    Returns:
+        Hasta `limite` fechas de inicio de huecos de al menos `duracion` minutos
+    """
+    especialidad = obtener_plantilla().especialidad.get(doctor_id)
+    if especialidad is None:
+        return []
+    dia_inicial = desde.date()
+    arbol = obtener_cache().arbol(session, especialidad, doctor_id, dia_inicial, dias)
+    origen = datetime.combine(dia_inicial, datetime.min.time())
+    resultado = []
+    for d in range(dias):
+        apertura = max(d * 1440 + hora_inicio * 60, int((desde - origen).total_seconds() // 60))
+        cierre = d * 1440 + hora_fin * 60
+        for inicio, _ in arbol.huecos(apertura, cierre, duracion):
+            resultado.append(origen + timedelta(minutes=inicio))
+            if len(resultado) >= limite:
+                return resultado
+    return resultado
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Carga la tabla de ocupación o consulta doctores disponibles."""
+    parser = argparse.ArgumentParser(description="Disponibilidad de doctores por franjas")
+    parser.add_argument('--poblar', action='store_true', help="Cargar la ocupación desde el generador")
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--especialidad', default=None)
+    parser.add_argument('--fecha-hora', default=None, help="Inicio (AAAA-MM-DDTHH:MM)")
+    parser.add_argument('--duracion', type=int, default=30)
+    args = parser.parse_args()
+
+    from connect import conectar_cassandra
+    session = conectar_cassandra()
+    if session is None:
+        print("✗ No hay conexión con Cassandra")
+        return
+
+    if args.poblar:
+        from populate_cassandra import verificar_tablas
+        if not verificar_tablas(session, ['ocupacion_por_especialidad']):
+            return
+        from utils.data_generator import SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen, generar_en_paralelo
+        volumen = calcular_volumen(args.citas) if args.citas else dict(VOLUMEN_BASE)
+        plantilla = Plantilla(d for bloque in generar_en_paralelo('doctores', SEMILLA_POR_DEFECTO, volumen)
+                              for d in bloque)
+        citas = (c for bloque in generar_en_paralelo('citas', SEMILLA_POR_DEFECTO, volumen) for c in bloque)
+        resumen = poblar_ocupacion(session, citas, plantilla)
+        print(f"✓ {resumen['filas']:,} filas de ocupación ({resumen['filas_por_segundo']:,.0f} filas/s)")
+
+    if args.especialidad and args.fecha_hora:
+        fecha_hora = datetime.fromisoformat(args.fecha_hora)
+        inicio = time.perf_counter()
+        libres = doctores_disponibles(session, args.especialidad, fecha_hora, args.duracion)
+        segundos = time.perf_counter() - inicio
+        print(f"✓ {len(libres)} doctores de {args.especialidad} libres el {fecha_hora:%Y-%m-%d %H:%M} "
+              f"({args.duracion} min) en {segundos * 1000:.1f} ms")
+        for doctor_id in libres[:20]:
+            print(f"  {doctor_id}")
+
+
+if __name__ == "__main__":
+    main()
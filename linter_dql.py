@@ -0,0 +1,170 @@
+"""
+Linter de Consultas DQL
+Plataforma de Integración de Datos de Salud
+
+Revisa las consultas de Dgraph contra Dgraph/schema.rdf antes de
+desplegarlas, para detectar las que obligan al servidor a recorrer un
+predicado completo:
+
+| Regla                 | Severidad | Qué detecta                                          |
+|-----------------------|-----------|------------------------------------------------------|
+| raiz-has              | error     | Bloque raíz con func: has(...) (escaneo completo)    |
+| indice-faltante       | error     | eq/ge/between/alloftext... sobre un predicado sin el |
+|                       |           | índice que la función necesita (raíz o @filter)      |
+| orden-sin-indice      | error     | orderasc/orderdesc sobre un predicado no ordenable   |
+| predicado-desconocido | error     | Predicado que no existe en schema.rdf                |
+| raiz-type-sin-first   | aviso     | func: type(...) sin first: (recorre todo el tipo)    |
+
+Revisa las constantes CONSULTA_* de Dgraph/queries_examples.py (leídas
+con ast, sin importar el archivo) y el catálogo de catalogo_consultas.
+
+Uso:
+    python linter_dql.py                     # ejemplos + catálogo
+    python linter_dql.py otro_archivo.py     # constantes CONSULTA_* de otro archivo
+
+Termina con código 1 si hay errores, para usarlo en CI.
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+from typing import Optional, Dict, Any, List, NamedTuple
+
+from catalogo_consultas import CATALOGO, INDICES_REQUERIDOS, cargar_schema
+
+RUTA_EJEMPLOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dgraph', 'queries_examples.py')
+
+# Índices que permiten ordenar por un predicado
+INDICES_ORDENABLES = {'exact', 'int', 'float', 'year', 'month', 'day', 'hour'}
+
+# Predicados internos de Dgraph
+PREDICADOS_INTERNOS = {'dgraph.type', 'uid'}
+
+_PATRON_CADENA = re.compile(r'"(?:[^"\\]|\\.)*"')
+_PATRON_COMENTARIO = re.compile(r'#[^\n]*')
+_PATRON_RAIZ = re.compile(r'\(\s*func\s*:\s*(\w+)\(\s*([\w.]*)[^)]*\)([^)]*)\)')
+_PATRON_FUNCION = re.compile(r'\b(' + '|'.join(INDICES_REQUERIDOS) + r')\(\s*([\w.]+)\s*,')
+_PATRON_ORDEN = re.compile(r'\border(?:asc|desc)\s*:\s*([\w.]+)')
+_PATRON_PREDICADO = re.compile(r'(?<![\w$.])([a-z_]+\.[\wñ]+)(?![\w.])(\s*:)?')
+
+
+class Hallazgo(NamedTuple):
+    consulta: str
+    linea: int
+    regla: str
+    severidad: str
+    mensaje: str
+
+    def __str__(self) -> str:
+        marca = '✗' if self.severidad == 'error' else '⚠'
+        return f"{marca} {self.consulta}:{self.linea} [{self.regla}] {self.mensaje}"
+
+
+def _limpiar(texto: str) -> str:
+    """Sustituye cadenas y comentarios por espacios conservando posiciones."""
+    texto = _PATRON_CADENA.sub(lambda m: '"' + ' ' * (len(m.group()) - 2) + '"', texto)
+    return _PATRON_COMENTARIO.sub(lambda m: ' ' * len(m.group()), texto)
+
+
+def revisar_consulta(nombre: str, texto: str, schema: Dict[str, Dict[str, Any]]) -> List[Hallazgo]:
+    """Aplica todas las reglas a una consulta DQL."""
+    limpio = _limpiar(texto)
+    hallazgos = []
+
+    def agregar(posicion, regla, severidad, mensaje):
+        linea = limpio.count('\n', 0, posicion) + 1
+        hallazgos.append(Hallazgo(nombre, linea, regla, severidad, mensaje))
+
+    for raiz in _PATRON_RAIZ.finditer(limpio):
+        funcion, predicado, argumentos = raiz.groups()
+        if funcion == 'has':
+            agregar(raiz.start(), 'raiz-has', 'error',
+                    f"la raíz has({predicado}) recorre el predicado completo; "
+                    f"usar eq() sobre un predicado indexado y dejar has() en @filter")
+        elif funcion == 'type' and 'first' not in argumentos:
+            agregar(raiz.start(), 'raiz-type-sin-first', 'aviso',
+                    f"type({predicado}) sin first: devuelve todos los nodos del tipo")
+
+    for llamada in _PATRON_FUNCION.finditer(limpio):
+        funcion, predicado = llamada.groups()
+        definicion = schema.get(predicado)
+        if definicion is None:
+            continue  # lo informa predicado-desconocido
+        if not definicion['indices'] & INDICES_REQUERIDOS[funcion]:
+            agregar(llamada.start(), 'indice-faltante', 'error',
+                    f"{funcion}({predicado}) necesita un índice {sorted(INDICES_REQUERIDOS[funcion])}; "
+                    f"el schema tiene {sorted(definicion['indices']) or 'ninguno'}")
+
+    for orden in _PATRON_ORDEN.finditer(limpio):
+        predicado = orden.group(1)
+        definicion = schema.get(predicado)
+        if definicion is not None and not definicion['indices'] & INDICES_ORDENABLES:
+            agregar(orden.start(), 'orden-sin-indice', 'error',
+                    f"no se puede ordenar por {predicado} sin un índice {sorted(INDICES_ORDENABLES)}")
+
+    for referencia in _PATRON_PREDICADO.finditer(limpio):
+        predicado, es_alias = referencia.groups()
+        if es_alias or predicado in PREDICADOS_INTERNOS or predicado in schema:
+            continue
+        agregar(referencia.start(), 'predicado-desconocido', 'error',
+                f"{predicado} no está definido en schema.rdf")
+
+    return hallazgos
+
+
+def consultas_de_archivo(ruta: str) -> Dict[str, str]:
+    """Constantes CONSULTA_* de un archivo Python, sin ejecutarlo."""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        arbol = ast.parse(f.read(), filename=ruta)
+    consultas = {}
+    for nodo in arbol.body:
+        if (isinstance(nodo, ast.Assign) and len(nodo.targets) == 1
+                and isinstance(nodo.targets[0], ast.Name)
+                and nodo.targets[0].id.startswith('CONSULTA_')
+                and isinstance(nodo.value, ast.Constant) and isinstance(nodo.value.value, str)):
+            consultas[nodo.targets[0].id] = nodo.value.value
+    return consultas
+
+
+def revisar(consultas: Dict[str, str], schema: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Hallazgo]:
+    """Revisa un conjunto nombre -> texto DQL."""
+    schema = schema if schema is not None else cargar_schema()
+    hallazgos = []
+    for nombre, texto in consultas.items():
+        hallazgos.extend(revisar_consulta(nombre, texto, schema))
+    return hallazgos
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main() -> int:
+    """Revisa las consultas y retorna el código de salida."""
+    parser = argparse.ArgumentParser(description="Linter de consultas DQL contra schema.rdf")
+    parser.add_argument('archivos', nargs='*', help="Archivos .py con constantes CONSULTA_*")
+    parser.add_argument('--sin-catalogo', action='store_true', help="No revisar catalogo_consultas")
+    args = parser.parse_args()
+
+    consultas = {}
+    for ruta in args.archivos or [RUTA_EJEMPLOS]:
+        for nombre, texto in consultas_de_archivo(ruta).items():
+            consultas[f"{os.path.basename(ruta)}:{nombre}"] = texto
+    if not args.sin_catalogo:
+        for nombre, consulta in CATALOGO.items():
+            consultas[f"catalogo:{nombre}"] = consulta.texto
+
+    hallazgos = revisar(consultas)
+    for hallazgo in hallazgos:
+        print(hallazgo)
+
+    errores = sum(1 for h in hallazgos if h.severidad == 'error')
+    avisos = len(hallazgos) - errores
+    print(f"\n{len(consultas)} consultas revisadas: {errores} errores, {avisos} avisos")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
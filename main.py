@@ -4,6 +4,12 @@ Este módulo presenta el menú de consultas planeadas para el proyecto.
 
 IMPORTANTE: Este menú muestra las opciones de consulta, pero la lógica 
 funcional se implementará en fases posteriores del proyecto.
+
+El arranque solo importa la biblioteca estándar: los módulos que usan las
+bases de datos (connect, router_consultas y los drivers) se importan dentro
+de la opción que los necesita, y la conexión se abre la primera vez que se
+usa. El menú se muestra en unas decenas de milisegundos aunque las bases no
+estén disponibles (python benchmark.py --arranque).
 """
 
 import sys
@@ -39,6 +45,61 @@ def mostrar_menu_principal():
     print("─" * 80)
 
 
+# Líneas del resultado que se muestran por pantalla
+LINEAS_RESULTADO = 40
+
+# Parámetros que se leen como fecha ('AAAA-MM-DD' o 'AAAA-MM-DD HH:MM')
+PARAMETROS_FECHA = ('desde', 'hasta', 'fecha_hora')
+
+
+def _leer_parametro(nombre, opcional=False):
+    """
+    Pide un parámetro de consulta y lo convierte según su nombre. Un
+    parámetro opcional que se deja vacío devuelve None.
+    """
+    valor = input(f"{nombre} (opcional, Enter para omitir): " if opcional else f"{nombre}: ").strip()
+    if opcional and not valor:
+        return None
+    if nombre in PARAMETROS_FECHA:
+        from datetime import datetime
+        return datetime.fromisoformat(valor)
+    return int(valor) if valor.isdigit() else valor
+
+
+def consultar_opcion(menu):
+    """
+    Lee una opción de un menú de consultas y la resuelve con el router
+    (router_consultas.py), que elige la base de datos según el patrón de
+    acceso. El router se importa y conecta aquí, no al arrancar.
+    """
+    opcion = input("\nSeleccione una opción: ").strip()
+    if opcion == "0":
+        return
+    
+    import json
+    from router_consultas import RUTAS, obtener_router
+    
+    if opcion not in RUTAS[menu]:
+        print("\n⚠ Opción no válida. Por favor, seleccione una opción del menú.")
+        return
+    router = obtener_router()
+    if not router.candidatos(menu, opcion):
+        print("\n[Funcionalidad pendiente de implementación]")
+        return
+    
+    parametros = {nombre: _leer_parametro(nombre) for nombre in router.parametros(menu, opcion)}
+    for nombre in router.opcionales(menu, opcion):
+        valor = _leer_parametro(nombre, opcional=True)
+        if valor is not None:
+            parametros[nombre] = valor
+    respuesta = router.ejecutar(menu, opcion, **parametros)
+    print(f"\n✓ {RUTAS[menu][opcion][0]} ({respuesta['backend']}, {respuesta['segundos'] * 1000:.1f} ms)")
+    lineas = json.dumps(respuesta['resultado'], ensure_ascii=False, indent=2, default=str).splitlines()
+    print("\n".join(lineas[:LINEAS_RESULTADO]))
+    if len(lineas) > LINEAS_RESULTADO:
+        print(f"... ({len(lineas) - LINEAS_RESULTADO} líneas más)")
+
+
 def menu_pacientes():
     """Menú de consultas sobre pacientes."""
     print("\n" + "─" * 80)
@@ -56,7 +117,7 @@ def menu_pacientes():
     print("10. Buscar pacientes con condiciones crónicas")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_pacientes")
 
 
 def menu_doctores():
@@ -76,7 +137,7 @@ def menu_doctores():
     print("10. Ranking de doctores por número de citas")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_doctores")
 
 
 def menu_hospitales():
@@ -96,7 +157,7 @@ def menu_hospitales():
     print("10. Comparar hospitales por ciudad")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_hospitales")
 
 
 def menu_citas():
@@ -116,7 +177,7 @@ def menu_citas():
     print("10. Estadísticas de citas por período")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_citas")
 
 
 def menu_diagnosticos():
@@ -136,7 +197,7 @@ def menu_diagnosticos():
     print("10. Buscar diagnósticos con descripción específica")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_diagnosticos")
 
 
 def menu_tratamientos():
@@ -156,7 +217,7 @@ def menu_tratamientos():
     print("10. Ver tratamientos por efectividad")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_tratamientos")
 
 
 def menu_medicamentos():
@@ -176,7 +237,7 @@ def menu_medicamentos():
     print("10. Buscar interacciones entre medicamentos")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_medicamentos")
 
 
 def menu_recetas():
@@ -196,7 +257,7 @@ def menu_recetas():
     print("10. Buscar recetas por duración")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_recetas")
 
 
 def menu_alergias():
@@ -216,7 +277,7 @@ def menu_alergias():
     print("10. Alertas de alergias para prescripción")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_alergias")
 
 
 def menu_analisis():
@@ -241,7 +302,7 @@ def menu_analisis():
     print("15. Dashboard general del sistema")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    consultar_opcion("menu_analisis")
 
 
 def menu_crud():
@@ -266,7 +327,67 @@ def menu_crud():
     print("15. Operaciones por lotes (batch)")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    
+    opcion = input("\nSeleccione una opción: ").strip()
+    if opcion == "7":
+        programar_cita()
+    elif opcion != "0":
+        print("\n[Funcionalidad pendiente de implementación]")
+
+
+def programar_cita():
+    """Pide los datos de una cita y la registra en las tres bases (CRUD 7)."""
+    import re
+    import secrets
+    from datetime import datetime
+    from utils.data_generator import FORMATO_ID
+    
+    # Mismo formato que el generador (prefijo + dígitos), que es el que
+    # recorren los rangos de ID de consistencia.py
+    prefijo, ancho = FORMATO_ID['citas']
+    cita_id = input(f"ID de la cita (p. ej. {prefijo}{50001:0{ancho}d}, vacío para generarlo): ").strip().upper()
+    if not cita_id:
+        cita_id = f"{prefijo}{secrets.randbelow(10 ** ancho):0{ancho}d}"
+        print(f"ID generado: {cita_id}")
+    elif not re.fullmatch(rf"{prefijo}\d{{{ancho}}}", cita_id):
+        print(f"\n⚠ ID de cita no válido: se espera {prefijo} seguido de {ancho} dígitos.")
+        return
+    # La escritura es un upsert por ID: no debe pisar una cita existente
+    from connect import conectar_mongodb
+    db = conectar_mongodb()
+    if db is not None and db.citas.count_documents({'_id': cita_id}, limit=1):
+        print(f"\n⚠ Ya existe una cita con ID {cita_id}.")
+        return
+    paciente_id = input("ID del paciente: ").strip()
+    doctor_id = input("ID del doctor: ").strip()
+    try:
+        fecha_hora = datetime.strptime(input("Fecha y hora (AAAA-MM-DD HH:MM): ").strip(), "%Y-%m-%d %H:%M")
+        duracion = int(input("Duración en minutos [30]: ").strip() or 30)
+    except ValueError:
+        print("\n⚠ Fecha u hora no válida.")
+        return
+    cita = {
+        'id': cita_id,
+        'fecha_hora': fecha_hora.isoformat() + 'Z',
+        'motivo': input("Motivo: ").strip(),
+        'estado': 'programada',
+        'duracion_minutos': duracion,
+        'tipo_consulta': input("Tipo de consulta [presencial]: ").strip() or 'presencial',
+        'notas': '',
+        'paciente_id': paciente_id,
+        'doctor_id': doctor_id,
+        'diagnostico_ids': [],
+    }
+    
+    from coordinador_escrituras import DoctorNoDisponible, registrar_cita
+    try:
+        resultado = registrar_cita(cita)
+    except DoctorNoDisponible as e:
+        print(f"\n⚠ {e}")
+        return
+    for base, estado in resultado['estados'].items():
+        print(f"{'✓' if estado == 'ok' else '⚠'} {base}: {estado}")
+    print(f"Cita {resultado['cita_id']} registrada en {resultado['segundos']} s")
 
 
 def menu_configuracion():
@@ -286,7 +407,21 @@ def menu_configuracion():
     print("10. Ver logs del sistema")
     print("0. Volver al menú principal")
     print("─" * 80)
-    print("\n[Funcionalidad pendiente de implementación]")
+    
+    opcion = input("\nSeleccione una opción: ").strip()
+    if opcion == "1":
+        from connect import calentar_conexiones
+        estado = calentar_conexiones()
+    elif opcion == "2":
+        from connect import preparar_bases
+        estado = preparar_bases()
+    elif opcion == "0":
+        return
+    else:
+        print("\n[Funcionalidad pendiente de implementación]")
+        return
+    for base, correcto in estado.items():
+        print(f"{'✓' if correcto else '✗'} {base}")
 
 
 def mostrar_informacion_bases():
@@ -0,0 +1,357 @@
+"""
+Modelo de Entidades
+Plataforma de Integración de Datos de Salud
+
+Una clase por cada tipo de Dgraph/schema.rdf (Paciente, Doctor, Hospital,
+Cita, HistorialMedico, Diagnostico, Tratamiento, Medicamento, Receta,
+Alergia, Departamento) con los campos de los registros del generador.
+
+Las clases son dataclasses con __slots__ (sin __dict__ por objeto) y cada
+una trae sus conversiones, precalculadas al definir la clase:
+
+| Formato             | Salida            | Entrada             |
+|---------------------|-------------------|---------------------|
+| Registro generador  | a_registro()      | desde_registro()    |
+| Documento MongoDB   | a_documento()     | desde_documento()   |
+| Fila de Cassandra   | a_fila(columnas)  | -                   |
+| Nodo JSON de Dgraph | a_nodo()          | desde_nodo()        |
+
+Las fechas se guardan como cadenas ISO con 'Z' (igual que el generador y
+Dgraph) y se convierten a datetime solo para MongoDB y Cassandra.
+
+Uso:
+    from modelos import Paciente, entidades
+    paciente = Paciente.desde_nodo(respuesta['pacientes'][0])
+    print(paciente.nombre, paciente.a_documento()['_id'])
+    for cita in entidades('citas', registros):
+        ...
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, Any, Iterable, Iterator, List, NewType, Tuple
+
+# Fecha ISO 8601 en UTC con sufijo 'Z' ('2024-11-09T11:00:00Z')
+FechaISO = NewType('FechaISO', str)
+
+
+def _a_datetime(valor: Any) -> Any:
+    return datetime.fromisoformat(valor.rstrip('Z')) if isinstance(valor, str) else valor
+
+
+def _a_iso(valor: Any) -> Any:
+    return valor.isoformat() + 'Z' if isinstance(valor, datetime) else valor
+
+
+def _es_referencia(campo: str) -> bool:
+    return campo.endswith('_id') or campo.endswith('_ids')
+
+
+# Tipo del generador -> clase, en el orden de utils.data_generator.TIPOS
+MODELOS: Dict[str, type] = {}
+
+
+# =============================================================================
+# BASE
+# =============================================================================
+
+class Entidad:
+    """Base de las entidades. Los atributos de clase los completa _entidad()."""
+
+    __slots__ = ()
+
+    tipo_registro: str = ''  # tipo del generador ('pacientes')
+    prefijo: str = ''        # prefijo de predicados en Dgraph ('paciente')
+    campos: Tuple[str, ...] = ()
+    campos_fecha: Tuple[str, ...] = ()
+    _leer: Any = None
+    _claves_documento: Tuple[str, ...] = ()
+    _posiciones_fecha: Tuple[int, ...] = ()
+    _posiciones_lista: Tuple[int, ...] = ()
+    _predicados: Tuple[Tuple[str, str], ...] = ()
+    _extractores: Dict[Tuple[str, ...], Any] = {}
+
+    # -------------------------------------------------------------------------
+    # Registro del generador
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def desde_registro(cls, registro: Dict[str, Any]):
+        return cls(*map(registro.get, cls.campos))
+
+    def a_registro(self) -> Dict[str, Any]:
+        return dict(zip(self.campos, self._leer(self)))
+
+    # -------------------------------------------------------------------------
+    # MongoDB
+    # -------------------------------------------------------------------------
+
+    def a_documento(self) -> Dict[str, Any]:
+        """Documento con el ID estable como _id y fechas BSON."""
+        valores = list(self._leer(self))
+        for i in self._posiciones_fecha:
+            valores[i] = _a_datetime(valores[i])
+        return dict(zip(self._claves_documento, valores))
+
+    @classmethod
+    def desde_documento(cls, documento: Dict[str, Any]):
+        valores = list(map(documento.get, cls._claves_documento))
+        for i in cls._posiciones_fecha:
+            valores[i] = _a_iso(valores[i])
+        return cls(*valores)
+
+    # -------------------------------------------------------------------------
+    # Cassandra
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def _extractor(cls, columnas: Tuple[str, ...]):
+        """
+        Función entidad -> tupla para unas columnas de Cassandra.
+
+        '<prefijo>_id' es el propio ID, 'fecha' es el día de fecha_hora,
+        'cubeta' la de citas_por_fecha y las columnas de fecha se convierten
+        a datetime.
+        """
+        from particiones_cassandra import cubeta_de
+
+        atributos = []
+        conversiones = []
+        for posicion, columna in enumerate(columnas):
+            if columna == f"{cls.prefijo}_id":
+                atributos.append('id')
+            elif columna == 'cubeta':
+                atributos.append('id')
+                conversiones.append((posicion, cubeta_de))
+            elif columna == 'fecha':
+                atributos.append('fecha_hora')
+                conversiones.append((posicion, lambda v: _a_datetime(v).date()))
+            elif columna in cls.campos:
+                atributos.append(columna)
+                if columna in cls.campos_fecha:
+                    conversiones.append((posicion, _a_datetime))
+            else:
+                raise KeyError(f"{cls.__name__} no tiene la columna {columna}")
+        leer = attrgetter(*atributos)
+
+        def extraer(entidad):
+            valores = list(leer(entidad))
+            for posicion, convertir in conversiones:
+                valores[posicion] = convertir(valores[posicion])
+            return tuple(valores)
+        return extraer
+
+    def a_fila(self, columnas: Tuple[str, ...]) -> Tuple:
+        """Valores de una fila de Cassandra en el orden de `columnas`."""
+        extractor = self._extractores.get(columnas)
+        if extractor is None:
+            extractor = self._extractores[columnas] = self._extractor(columnas)
+        return extractor(self)
+
+    # -------------------------------------------------------------------------
+    # Dgraph
+    # -------------------------------------------------------------------------
+
+    def a_nodo(self, uid: str = '') -> Dict[str, Any]:
+        """Nodo JSON de Dgraph con los predicados escalares no vacíos."""
+        nodo = {'uid': uid or f"_:{self.id}", 'dgraph.type': type(self).__name__}
+        for (_, predicado), valor in zip(self._predicados, self._leer(self)):
+            if predicado and valor not in ('', [], None):
+                nodo[predicado] = valor
+        return nodo
+
+    @classmethod
+    def desde_nodo(cls, nodo: Dict[str, Any]):
+        """Entidad desde un nodo de una respuesta de Dgraph (referencias vacías)."""
+        valores = [nodo.get(predicado) if predicado else None for _, predicado in cls._predicados]
+        for i in cls._posiciones_lista:
+            if valores[i] is None:
+                valores[i] = []
+        return cls(*valores)
+
+
+def _entidad(tipo: str, prefijo: str):
+    """
+    Convierte una clase con anotaciones en dataclass con __slots__.
+
+    Equivale a @dataclass(slots=True) (Python 3.10+) y además precalcula lo
+    que usan las conversiones.
+    """
+    def decorar(cls):
+        campos = tuple(cls.__annotations__)
+        espacio = {k: v for k, v in cls.__dict__.items() if k not in ('__dict__', '__weakref__')}
+        espacio['__slots__'] = campos
+        clase = dataclass(type(cls.__name__, cls.__bases__, espacio))
+
+        clase.tipo_registro = tipo
+        clase.prefijo = prefijo
+        clase.campos = campos
+        clase.campos_fecha = tuple(c for c in campos if cls.__annotations__[c] is FechaISO)
+        clase._leer = attrgetter(*campos)
+        clase._claves_documento = tuple('_id' if c == 'id' else c for c in campos)
+        clase._posiciones_fecha = tuple(campos.index(c) for c in clase.campos_fecha)
+        clase._posiciones_lista = tuple(
+            i for i, c in enumerate(campos) if getattr(cls.__annotations__[c], '__origin__', None) is list)
+        clase._predicados = tuple(
+            (c, '' if _es_referencia(c) else f"{prefijo}.{c}") for c in campos)
+        clase._extractores = {}
+        MODELOS[tipo] = clase
+        return clase
+    return decorar
+
+
+# =============================================================================
+# ENTIDADES
+# =============================================================================
+
+@_entidad('hospitales', 'hospital')
+class Hospital(Entidad):
+    id: str
+    nombre: str
+    direccion: str
+    ciudad: str
+    telefono: str
+    nivel_atencion: str
+    capacidad_camas: int
+    tiene_urgencias: bool
+
+
+@_entidad('departamentos', 'departamento')
+class Departamento(Entidad):
+    id: str
+    nombre: str
+    especialidad: str
+    extension: str
+    hospital_id: str
+
+
+@_entidad('doctores', 'doctor')
+class Doctor(Entidad):
+    id: str
+    nombre: str
+    apellido: str
+    especialidad: str
+    email: str
+    telefono: str
+    numero_licencia: str
+    años_experiencia: int
+    hospital_id: str
+    departamento_id: str
+
+
+@_entidad('pacientes', 'paciente')
+class Paciente(Entidad):
+    id: str
+    nombre: str
+    apellido: str
+    fecha_nacimiento: FechaISO
+    genero: str
+    tipo_sangre: str
+    email: str
+    telefono: str
+    direccion: str
+    ciudad: str
+    codigo_postal: str
+
+
+@_entidad('historiales', 'historial')
+class HistorialMedico(Entidad):
+    id: str
+    fecha_creacion: FechaISO
+    condiciones_cronicas: List[str]
+    cirugias_previas: List[str]
+    hospitalizaciones: List[str]
+    vacunas: List[str]
+    paciente_id: str
+
+
+@_entidad('alergias', 'alergia')
+class Alergia(Entidad):
+    id: str
+    nombre: str
+    tipo: str
+    gravedad: str
+    fecha_deteccion: FechaISO
+    reaccion: str
+    paciente_id: str
+
+
+@_entidad('medicamentos', 'medicamento')
+class Medicamento(Entidad):
+    id: str
+    nombre_comercial: str
+    principio_activo: str
+    dosis: str
+    via_administracion: str
+    frecuencia: str
+    contraindicaciones: List[str]
+
+
+@_entidad('citas', 'cita')
+class Cita(Entidad):
+    id: str
+    fecha_hora: FechaISO
+    motivo: str
+    estado: str
+    duracion_minutos: int
+    tipo_consulta: str
+    notas: str
+    paciente_id: str
+    doctor_id: str
+    diagnostico_ids: List[str]
+
+
+@_entidad('diagnosticos', 'diagnostico')
+class Diagnostico(Entidad):
+    id: str
+    codigo_icd10: str
+    nombre: str
+    descripcion: str
+    fecha_diagnostico: FechaISO
+    gravedad: str
+    paciente_id: str
+    doctor_id: str
+    cita_id: str
+    historial_id: str
+    tratamiento_ids: List[str]
+
+
+@_entidad('tratamientos', 'tratamiento')
+class Tratamiento(Entidad):
+    id: str
+    nombre: str
+    descripcion: str
+    fecha_inicio: FechaISO
+    fecha_fin: FechaISO
+    estado: str
+    diagnostico_id: str
+    medicamento_ids: List[str]
+
+
+@_entidad('recetas', 'receta')
+class Receta(Entidad):
+    id: str
+    fecha_emision: FechaISO
+    duracion_dias: int
+    instrucciones: str
+    estado: str
+    paciente_id: str
+    doctor_id: str
+    medicamento_ids: List[str]
+
+
+# =============================================================================
+# FUNCIONES DE CONVENIENCIA
+# =============================================================================
+
+def entidad(tipo: str, registro: Dict[str, Any]) -> Entidad:
+    """Entidad de un registro del generador."""
+    return MODELOS[tipo].desde_registro(registro)
+
+
+def entidades(tipo: str, registros: Iterable[Dict[str, Any]]) -> Iterator[Entidad]:
+    """Convierte un flujo de registros del generador en entidades."""
+    desde_registro = MODELOS[tipo].desde_registro
+    for registro in registros:
+        yield desde_registro(registro)
@@ -0,0 +1,247 @@
+"""
+Particiones de citas_por_fecha
+Plataforma de Integración de Datos de Salud
+
+citas_por_fecha se particionaba solo por día: todas las citas de una fecha
+(y todas las escrituras de hoy) caían en una misma partición, que crece con
+el volumen de la red de hospitales y vive en las mismas réplicas. Ahora la
+clave de partición es (fecha, cubeta), con
+
+    cubeta = crc32(cita_id) mod CUBETAS_CITAS_POR_FECHA
+
+(ver Cassandra/schema.cql). Este módulo reúne lo que depende de esa clave:
+
+- cubeta_de(): cubeta de una cita (la usa populate_cassandra.TABLAS)
+- leer_citas_por_fecha(): consulta en paralelo todas las particiones
+  (fecha, cubeta) de un rango y mezcla los resultados por fecha_hora
+- informe_particiones(): filas por partición (en Cassandra o simuladas con
+  el generador) comparando el diseño por día con el diseño por cubetas, para
+  comprobar que la distribución es uniforme (PASO 2.5 de populate.py)
+
+Uso:
+    python particiones_cassandra.py --fuente generador --citas 1000000
+    python particiones_cassandra.py --fuente cassandra --desde 2024-01-01 --dias 30
+"""
+
+import argparse
+import heapq
+import os
+import zlib
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Iterable, Tuple
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Particiones por día de citas_por_fecha. Cambiarlo exige recargar la tabla:
+# las filas ya escritas conservan su cubeta
+CUBETAS_CITAS_POR_FECHA = int(os.getenv('CUBETAS_CITAS_POR_FECHA', 16))
+
+# Consultas por partición lanzadas a la vez como máximo al leer un rango
+PARTICIONES_EN_VUELO = 128
+
+Particion = Tuple[date, int]
+
+
+# =============================================================================
+# CLAVE DE PARTICIÓN
+# =============================================================================
+
+def cubeta_de(cita_id: str, cubetas: int = CUBETAS_CITAS_POR_FECHA) -> int:
+    """Cubeta de una cita: estable entre procesos (hash() no lo es)."""
+    return zlib.crc32(cita_id.encode('utf-8')) % cubetas
+
+
+def particiones_rango(desde: datetime, hasta: datetime,
+                      cubetas: int = CUBETAS_CITAS_POR_FECHA) -> List[Particion]:
+    """Particiones (fecha, cubeta) que cubren [desde, hasta)."""
+    particiones = []
+    dia = desde.date()
+    while dia <= hasta.date():
+        particiones.extend((dia, cubeta) for cubeta in range(cubetas))
+        dia += timedelta(days=1)
+    return particiones
+
+
+# =============================================================================
+# LECTURA EN PARALELO
+# =============================================================================
+
+_sentencias: Dict[Tuple[int, str], Any] = {}
+
+
+def _preparar(session: Any, consulta: str) -> Any:
+    clave = (id(session), consulta)
+    if clave not in _sentencias:
+        _sentencias[clave] = session.prepare(consulta)
+    return _sentencias[clave]
+
+
+def _en_paralelo(session: Any, sentencia: Any, parametros: List[Tuple]) -> List[List[Any]]:
+    """Ejecuta una sentencia por cada juego de parámetros, PARTICIONES_EN_VUELO a la vez."""
+    resultados: List[List[Any]] = []
+    for inicio in range(0, len(parametros), PARTICIONES_EN_VUELO):
+        futuros = [session.execute_async(sentencia, p) for p in parametros[inicio:inicio + PARTICIONES_EN_VUELO]]
+        resultados.extend(list(futuro.result()) for futuro in futuros)
+    return resultados
+
+
+def leer_citas_por_fecha(session: Any, desde: datetime, hasta: datetime, limite: int = 1000,
+                         cubetas: int = CUBETAS_CITAS_POR_FECHA) -> List[Dict[str, Any]]:
+    """
+    Citas con fecha_hora en [desde, hasta), en orden cronológico.
+
+    Cada partición ya devuelve sus filas ordenadas por fecha_hora (clave de
+    clustering), así que basta una mezcla de k listas ordenadas.
+    """
+    sentencia = _preparar(session, (
+        "SELECT * FROM citas_por_fecha WHERE fecha = ? AND cubeta = ? "
+        "AND fecha_hora >= ? AND fecha_hora < ? LIMIT ?"))
+    parametros = [(dia, cubeta, desde, hasta, limite) for dia, cubeta in particiones_rango(desde, hasta, cubetas)]
+    por_particion = _en_paralelo(session, sentencia, parametros)
+
+    filas = []
+    for fila in heapq.merge(*por_particion, key=lambda f: (f.fecha_hora, f.cita_id)):
+        filas.append(dict(fila._asdict()))
+        if len(filas) >= limite:
+            break
+    return filas
+
+
+# =============================================================================
+# INFORME DE TAMAÑO DE PARTICIONES
+# =============================================================================
+
+def tamanos_generador(registros: Iterable[Dict[str, Any]],
+                      cubetas: int = CUBETAS_CITAS_POR_FECHA) -> Dict[str, Counter]:
+    """Filas por partición que produciría cada diseño para unas citas."""
+    por_dia: Counter = Counter()
+    por_cubeta: Counter = Counter()
+    for cita in registros:
+        dia = datetime.fromisoformat(cita['fecha_hora'].rstrip('Z')).date()
+        por_dia[(dia,)] += 1
+        por_cubeta[(dia, cubeta_de(cita['id'], cubetas))] += 1
+    return {'fecha': por_dia, 'fecha_cubeta': por_cubeta}
+
+
+def tamanos_cassandra(session: Any, desde: datetime, hasta: datetime,
+                      cubetas: int = CUBETAS_CITAS_POR_FECHA) -> Dict[str, Counter]:
+    """Filas por partición de citas_por_fecha medidas en Cassandra."""
+    sentencia = _preparar(session, "SELECT COUNT(*) FROM citas_por_fecha WHERE fecha = ? AND cubeta = ?")
+    particiones = particiones_rango(desde, hasta, cubetas)
+    conteos = _en_paralelo(session, sentencia, particiones)
+
+    por_dia: Counter = Counter()
+    por_cubeta: Counter = Counter()
+    for (dia, cubeta), filas in zip(particiones, conteos):
+        total = filas[0][0] if filas else 0
+        if total:
+            por_cubeta[(dia, cubeta)] = total
+            por_dia[(dia,)] += total
+    return {'fecha': por_dia, 'fecha_cubeta': por_cubeta}
+
+
+def resumir(conteos: Counter) -> Dict[str, Any]:
+    """Estadísticas de tamaño de un conjunto de particiones."""
+    tamanos = sorted(conteos.values())
+    if not tamanos:
+        return {'particiones': 0, 'filas': 0}
+    n = len(tamanos)
+    media = sum(tamanos) / n
+    desviacion = (sum((t - media) ** 2 for t in tamanos) / n) ** 0.5
+    return {
+        'particiones': n,
+        'filas': sum(tamanos),
+        'media': round(media, 1),
+        'p50': tamanos[n // 2],
+        'p99': tamanos[min(n - 1, int(n * 0.99))],
+        'max': tamanos[-1],
+        'max_sobre_media': round(tamanos[-1] / media, 2),
+        'coef_variacion': round(desviacion / media, 3),
+    }
+
+
+def desequilibrio_diario(por_cubeta: Counter) -> Dict[str, Any]:
+    """
+    Reparto entre cubetas dentro de cada día.
+
+    Returns:
+        El día con peor relación cubeta mayor / media de sus cubetas
+    """
+    por_dia: Dict[date, List[int]] = defaultdict(list)
+    for (dia, _), filas in por_cubeta.items():
+        por_dia[dia].append(filas)
+    peor: Dict[str, Any] = {'fecha': None, 'max_sobre_media': 0.0}
+    for dia, filas in por_dia.items():
+        relacion = max(filas) / (sum(filas) / len(filas))
+        if relacion > peor['max_sobre_media']:
+            peor = {'fecha': dia.isoformat(), 'max_sobre_media': round(relacion, 2), 'filas_dia': sum(filas)}
+    return peor
+
+
+def informe_particiones(tamanos: Dict[str, Counter]) -> Dict[str, Any]:
+    """Compara el diseño por día con el diseño por (día, cubeta)."""
+    return {
+        'fecha': resumir(tamanos['fecha']),
+        'fecha_cubeta': resumir(tamanos['fecha_cubeta']),
+        'peor_dia': desequilibrio_diario(tamanos['fecha_cubeta']),
+    }
+
+
+def imprimir_informe(informe: Dict[str, Any], cubetas: int = CUBETAS_CITAS_POR_FECHA):
+    print("=" * 70)
+    print(f"PARTICIONES DE citas_por_fecha ({cubetas} cubetas por día)")
+    print("=" * 70)
+    print(f"{'Clave':<16} {'Particiones':>11} {'Media':>9} {'p50':>7} {'p99':>7} {'Máx':>7} {'Máx/media':>10} {'CV':>7}")
+    for clave, etiqueta in (('fecha', '(fecha)'), ('fecha_cubeta', '(fecha, cubeta)')):
+        r = informe[clave]
+        if not r['particiones']:
+            print(f"{etiqueta:<16} {0:>11}")
+            continue
+        print(f"{etiqueta:<16} {r['particiones']:>11,} {r['media']:>9,.1f} {r['p50']:>7,} {r['p99']:>7,} "
+              f"{r['max']:>7,} {r['max_sobre_media']:>10} {r['coef_variacion']:>7}")
+    peor = informe['peor_dia']
+    if peor['fecha']:
+        print(f"\nDía menos equilibrado: {peor['fecha']} ({peor['filas_dia']:,} citas), "
+              f"cubeta mayor = {peor['max_sobre_media']}× la media del día")
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Informe de tamaño de particiones de citas_por_fecha."""
+    parser = argparse.ArgumentParser(description="Distribución de las particiones de citas_por_fecha")
+    parser.add_argument('--fuente', choices=('generador', 'cassandra'), default='generador')
+    parser.add_argument('--citas', type=int, default=None, help="Escala del generador (citas)")
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--desde', default=None, help="Primer día (AAAA-MM-DD) a medir en Cassandra")
+    parser.add_argument('--dias', type=int, default=30, help="Días a medir en Cassandra")
+    parser.add_argument('--cubetas', type=int, default=CUBETAS_CITAS_POR_FECHA)
+    args = parser.parse_args()
+
+    if args.fuente == 'generador':
+        from utils.data_generator import SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen, generar_en_paralelo
+        volumen = calcular_volumen(args.citas) if args.citas else dict(VOLUMEN_BASE)
+        semilla = SEMILLA_POR_DEFECTO if args.semilla is None else args.semilla
+        bloques = generar_en_paralelo('citas', semilla, volumen)
+        tamanos = tamanos_generador((c for bloque in bloques for c in bloque), args.cubetas)
+    else:
+        from connect import conectar_cassandra
+        session = conectar_cassandra()
+        if session is None:
+            print("✗ No hay conexión con Cassandra")
+            return
+        desde = datetime.fromisoformat(args.desde) if args.desde else \
+            datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        hasta = desde + timedelta(days=args.dias) - timedelta(microseconds=1)
+        tamanos = tamanos_cassandra(session, desde, hasta, args.cubetas)
+
+    imprimir_informe(informe_particiones(tamanos), args.cubetas)
+
+
+if __name__ == "__main__":
+    main()
@@ -59,13 +59,16 @@ La implementación real se realizará en fases posteriores del proyecto.
 # - Considerar la desnormalización necesaria para consultas específicas
 
 # PASO 2.4: Insertar datos por tabla
-# - Utilizar batch statements para inserciones múltiples
-# - Respetar el tamaño máximo de batch (no más de 100 filas)
+# - Enviar cada INSERT preparado con execute_async() y una ventana acotada
+#   de peticiones en vuelo (los batches logged multipartición son lentos)
+# - Agrupar en batches UNLOGGED solo filas de la misma partición
 # - Insertar datos en orden lógico (primero tablas base, luego referencias)
 
 # PASO 2.5: Verificar distribución de datos
 # - Comprobar que las particiones estén balanceadas
-# - Validar que no haya hot spots en el cluster
+#   (python particiones_cassandra.py --fuente cassandra)
+# - Validar que no haya hot spots en el cluster: citas_por_fecha reparte
+#   cada día en cubetas (Cassandra/schema.cql)
 # - Ejecutar consultas de prueba para cada tabla
 
 # =============================================================================
@@ -112,6 +115,8 @@ La implementación real se realizará en fases posteriores del proyecto.
 # - Los mismos pacientes, doctores y citas deben existir en las tres bases
 # - Los valores de atributos comunes deben ser idénticos
 # - Las fechas y timestamps deben estar sincronizados
+# - Verificación: python consistencia.py compara las tres bases por árboles
+#   de huellas (prefijo de ID) y genera un plan de reparación
 
 # PASO 4.3: Documentar mapeo de datos
 # - Crear tabla de correspondencia entre esquemas
@@ -132,6 +137,7 @@ La implementación real se realizará en fases posteriores del proyecto.
 # - Direcciones y ciudades reales
 # - Códigos ICD-10 válidos para diagnósticos
 # - Nombres comerciales de medicamentos reales
+#   (ambos compilados en catalogos_referencia.py para consultas O(1) con mmap)
 # - Especialidades médicas estándar
 
 # PASO 5.3: Establecer relaciones lógicas
@@ -177,28 +183,34 @@ La implementación real se realizará en fases posteriores del proyecto.
 
 # NOTA: Los siguientes scripts serán implementados en la siguiente fase:
 
-# populate_mongodb.py
-# - Función para generar datos con Faker
-# - Función para insertar en colecciones de MongoDB
-# - Función para crear índices
+# populate_mongodb.py  ✓ Implementado
+# - Toma los datos de utils/data_generator.py
+# - insert_many() desordenado por lotes, varias colecciones en paralelo
+# - Elimina los índices secundarios antes de cargar y los crea al final
 # - Main para ejecutar el proceso completo
 
-# populate_cassandra.py
-# - Función para generar datos con Faker
+# populate_cassandra.py  ✓ Implementado
+# - Toma los datos de utils/data_generator.py
 # - Función para crear tablas de Cassandra
-# - Función para insertar datos en lotes
+# - INSERT preparados con execute_async() concurrente y reintentos con espera
 # - Main para ejecutar el proceso completo
 
-# populate_dgraph.py
-# - Función para generar datos con Faker
-# - Función para crear mutaciones RDF
-# - Función para insertar nodos y aristas
+# populate_dgraph.py  ✓ Implementado
+# - Toma los datos de utils/data_generator.py
+# - Fase de nodos en mutaciones de tamaño fijo con mapa xid -> uid persistente
+# - Fase de aristas entre UIDs resueltos, con transacciones concurrentes
+#   y reintento de las abortadas
+# - Exportación opcional a N-Quads para dgraph live / dgraph bulk
 # - Main para ejecutar el proceso completo
 
-# utils/data_generator.py
+# utils/data_generator.py  ✓ Implementado
 # - Clase DataGenerator con métodos para cada entidad
-# - Funciones helper para mantener consistencia
-# - Validadores de datos generados
+# - Cada registro es función pura de (semilla, tipo, índice): los IDs y
+#   valores son idénticos en MongoDB, Cassandra y Dgraph (PASO 4.1)
+# - Genera como flujo (generadores) y reparte bloques entre procesos
+#   (generar_en_paralelo / exportar_jsonl), informando filas/segundo
+# - Usa catálogos locales en lugar de Faker, que es lento y de un solo hilo
+# - Uso: python -m utils.data_generator --citas 10000000 --procesos 8
 
 # =============================================================================
 # COMANDOS DE DOCKER NECESARIOS
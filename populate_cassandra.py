@@ -0,0 +1,466 @@
+"""
+Población de Cassandra
+Plataforma de Integración de Datos de Salud
+
+Carga masiva de las tablas citas_por_paciente, citas_por_doctor,
+citas_por_fecha y pacientes_por_ciudad (PARTE 2 de populate.py).
+
+El PASO 2.4 planteaba batches logged de hasta 100 filas. Con datos que caen
+en particiones distintas eso obliga al coordinador a escribir el batchlog y
+repartir las filas él mismo, que es la forma más lenta de escribir en
+Cassandra. En su lugar:
+- Cada INSERT se prepara una sola vez (session.prepare)
+- Las filas se envían con execute_async() manteniendo una ventana acotada
+  de peticiones en vuelo
+- Solo se agrupan en batches UNLOGGED las filas que comparten clave de
+  partición (una única réplica recibe el batch completo)
+- Los timeouts se reintentan con espera exponencial; los INSERT son
+  idempotentes, así que repetirlos es seguro
+- Se informa de las escrituras/segundo logradas por tabla
+
+Uso:
+    python populate_cassandra.py --citas 1000000 --en-vuelo 512
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable, Tuple, Callable
+
+from connect import conectar_cassandra, preparar_cassandra
+from modelos import MODELOS
+from utils.data_generator import (
+    SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen, generar_en_paralelo
+)
+from utils.metricas import MedidorThroughput
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Peticiones asíncronas simultáneas como máximo
+EN_VUELO = 256
+
+# Filas máximas por batch UNLOGGED de una misma partición
+TAM_BATCH_PARTICION = 25
+
+# Filas retenidas a la espera de completar batches de una misma partición
+FILAS_EN_BUFFER = 5000
+
+# Reintentos ante timeouts y espera inicial (se duplica en cada intento)
+REINTENTOS = 5
+ESPERA_BASE_SEG = 0.1
+
+
+# =============================================================================
+# MODELO DE TABLAS (PASO 2.2)
+# =============================================================================
+
+RUTA_SCHEMA_CQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cassandra', 'schema.cql')
+
+_PATRON_TABLA = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.IGNORECASE)
+
+
+def cargar_ddl(ruta: str = RUTA_SCHEMA_CQL) -> Dict[str, str]:
+    """CREATE TABLE de cada tabla de Cassandra/schema.cql."""
+    with open(ruta, encoding='utf-8') as f:
+        texto = '\n'.join(linea.split('--', 1)[0].rstrip() for linea in f)
+    ddl = {}
+    for sentencia in texto.split(';'):
+        coincidencia = _PATRON_TABLA.search(sentencia)
+        if coincidencia:
+            ddl[coincidencia.group(1)] = sentencia.strip()
+    return ddl
+
+
+def _codificador_fila(origen: str, columnas: Tuple[str, ...]) -> Callable[[Dict[str, Any]], Tuple]:
+    """Registro del generador -> valores de la fila, con la entidad de modelos.py."""
+    desde_registro = MODELOS[origen].desde_registro
+    return lambda registro: desde_registro(registro).a_fila(columnas)
+
+
+DDL = cargar_ddl()
+
+# nombre -> definición. Las primeras `particion` columnas forman la clave de
+# partición; `fila` (añadida debajo) extrae los valores desde un registro del
+# generador con Entidad.a_fila(). El DDL de cada tabla está en
+# Cassandra/schema.cql.
+TABLAS: Dict[str, Dict[str, Any]] = OrderedDict([
+    ('pacientes_por_ciudad', {
+        'origen': 'pacientes',
+        'ddl': DDL['pacientes_por_ciudad'],
+        'columnas': ('ciudad', 'apellido', 'nombre', 'paciente_id', 'email',
+                     'telefono', 'tipo_sangre', 'fecha_nacimiento'),
+        'particion': 1,
+    }),
+    ('citas_por_paciente', {
+        'origen': 'citas',
+        'ddl': DDL['citas_por_paciente'],
+        'columnas': ('paciente_id', 'fecha_hora', 'cita_id', 'doctor_id', 'motivo',
+                     'estado', 'tipo_consulta', 'duracion_minutos'),
+        'particion': 1,
+    }),
+    ('citas_por_doctor', {
+        'origen': 'citas',
+        'ddl': DDL['citas_por_doctor'],
+        'columnas': ('doctor_id', 'fecha_hora', 'cita_id', 'paciente_id', 'motivo',
+                     'estado', 'tipo_consulta', 'duracion_minutos'),
+        'particion': 1,
+    }),
+    ('citas_por_fecha', {
+        'origen': 'citas',
+        'ddl': DDL['citas_por_fecha'],
+        'columnas': ('fecha', 'cubeta', 'fecha_hora', 'cita_id', 'paciente_id', 'doctor_id',
+                     'motivo', 'estado', 'tipo_consulta'),
+        'particion': 2,
+    }),
+])
+for _definicion in TABLAS.values():
+    _definicion['fila'] = _codificador_fila(_definicion['origen'], _definicion['columnas'])
+
+
+def verificar_tablas(session: Any, tablas: Iterable[str] = tuple(TABLAS)) -> bool:
+    """
+    Comprueba que las tablas existen con la partición de schema.cql (PASO 2.2).
+
+    La carga no ejecuta DDL: el schema lo crea preparar_cassandra()
+    (python connect.py --preparar).
+    """
+    existentes = {f.table_name for f in session.execute(
+        "SELECT table_name FROM system_schema.tables WHERE keyspace_name = %s",
+        (session.keyspace,))}
+    correctas = True
+    for nombre in tablas:
+        if nombre not in existentes:
+            print(f"✗ Falta la tabla {nombre}: ejecute python connect.py --preparar")
+            correctas = False
+        elif nombre in TABLAS and not verificar_particion(session, nombre):
+            correctas = False
+        else:
+            print(f"✓ Tabla {nombre} lista")
+    return correctas
+
+
+def verificar_particion(session: Any, nombre: str) -> bool:
+    """
+    Comprueba que la clave de partición de la tabla coincide con schema.cql.
+
+    CREATE TABLE IF NOT EXISTS no modifica una tabla creada con un diseño
+    anterior (p. ej. citas_por_fecha particionada solo por fecha), que
+    rechazaría después las escrituras.
+    """
+    definicion = TABLAS[nombre]
+    esperada = list(definicion['columnas'][:definicion['particion']])
+    filas = session.execute(
+        "SELECT column_name, kind, position FROM system_schema.columns "
+        "WHERE keyspace_name = %s AND table_name = %s",
+        (session.keyspace, nombre))
+    actual = [f.column_name for f in sorted(filas, key=lambda f: f.position) if f.kind == 'partition_key']
+    if actual and actual != esperada:
+        print(f"✗ Tabla {nombre} particionada por {tuple(actual)}; schema.cql espera {tuple(esperada)}.")
+        print(f"  Elimínela (DROP TABLE {nombre}) y vuelva a cargarla")
+        return False
+    return True
+
+
+def preparar_insert(session: Any, nombre: str) -> Any:
+    """Prepara una sola vez el INSERT de una tabla."""
+    columnas = TABLAS[nombre]['columnas']
+    consulta = (f"INSERT INTO {nombre} ({', '.join(columnas)}) "
+                f"VALUES ({', '.join('?' for _ in columnas)})")
+    sentencia = session.prepare(consulta)
+    sentencia.is_idempotent = True
+    return sentencia
+
+
+# =============================================================================
+# ESCRITOR CONCURRENTE
+# =============================================================================
+
+class EscritorConcurrente:
+    """
+    Envía sentencias con execute_async() con un límite de peticiones en vuelo.
+
+    Las peticiones que fallan por timeout o indisponibilidad se reprograman
+    con espera exponencial; los reintentos se reenvían desde el hilo que
+    llama a enviar()/esperar(), nunca desde los callbacks del driver.
+    """
+
+    def __init__(self, session: Any,
+                 en_vuelo: int = EN_VUELO,
+                 reintentos: int = REINTENTOS,
+                 espera_base: float = ESPERA_BASE_SEG):
+        self.session = session
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.errores: List[BaseException] = []
+        self.total_reintentos = 0
+        self._ventana = threading.BoundedSemaphore(en_vuelo)
+        self._cond = threading.Condition()
+        self._pendientes = 0
+        self._por_reintentar: List[Tuple[float, Any, Any, int, int, MedidorThroughput]] = []
+
+    @staticmethod
+    def _es_reintentable(error: BaseException) -> bool:
+        from cassandra import OperationTimedOut, WriteTimeout, Unavailable
+        return isinstance(error, (OperationTimedOut, WriteTimeout, Unavailable))
+
+    def enviar(self, sentencia: Any, parametros: Any, filas: int, medidor: MedidorThroughput, intento: int = 0):
+        """Envía una sentencia (o batch) que escribe `filas` filas."""
+        self._reenviar_vencidos()
+        self._ventana.acquire()
+        with self._cond:
+            self._pendientes += 1
+        try:
+            futuro = self.session.execute_async(sentencia, parametros)
+        except Exception as e:
+            self._al_fallar(e, sentencia, parametros, filas, medidor, intento)
+            return
+        futuro.add_callbacks(
+            self._al_completar, self._al_fallar,
+            callback_args=(filas, medidor),
+            errback_args=(sentencia, parametros, filas, medidor, intento)
+        )
+
+    def _terminar(self):
+        self._ventana.release()
+        with self._cond:
+            self._pendientes -= 1
+            self._cond.notify_all()
+
+    def _al_completar(self, _resultado, filas, medidor):
+        medidor.sumar(filas)
+        self._terminar()
+
+    def _al_fallar(self, error, sentencia, parametros, filas, medidor, intento):
+        if intento < self.reintentos and self._es_reintentable(error):
+            espera = self.espera_base * (2 ** intento)
+            with self._cond:
+                self._por_reintentar.append(
+                    (time.monotonic() + espera, sentencia, parametros, filas, intento + 1, medidor))
+                self.total_reintentos += 1
+        else:
+            medidor.sumar(0, filas)
+            with self._cond:
+                if len(self.errores) < 100:
+                    self.errores.append(error)
+        self._terminar()
+
+    def _reenviar_vencidos(self):
+        ahora = time.monotonic()
+        with self._cond:
+            vencidos = [r for r in self._por_reintentar if r[0] <= ahora]
+            self._por_reintentar = [r for r in self._por_reintentar if r[0] > ahora]
+        for _, sentencia, parametros, filas, intento, medidor in vencidos:
+            self.enviar(sentencia, parametros, filas, medidor, intento)
+
+    def esperar(self):
+        """Bloquea hasta que no queden peticiones en vuelo ni reintentos."""
+        while True:
+            self._reenviar_vencidos()
+            with self._cond:
+                if self._pendientes == 0 and not self._por_reintentar:
+                    return
+                if self._por_reintentar:
+                    proximo = min(r[0] for r in self._por_reintentar)
+                    timeout = max(0.0, proximo - time.monotonic())
+                else:
+                    timeout = None
+                if self._pendientes or timeout:
+                    self._cond.wait(timeout)
+
+
+# =============================================================================
+# AGRUPACIÓN POR PARTICIÓN
+# =============================================================================
+
+class AgrupadorParticiones:
+    """
+    Retiene filas por clave de partición y decide cómo enviarlas.
+
+    Una partición que reúne `tam_batch` filas se envía como un batch
+    UNLOGGED. Al vaciar el buffer, las particiones con una sola fila se
+    envían como sentencias simples.
+    """
+
+    def __init__(self, sentencia: Any, particion: int, enviar: Callable[[Any, Any, int], None],
+                 tam_batch: int = TAM_BATCH_PARTICION, max_filas: int = FILAS_EN_BUFFER):
+        self.sentencia = sentencia
+        self.particion = particion
+        self.tam_batch = tam_batch
+        self.max_filas = max_filas
+        self._enviar = enviar
+        self._grupos: Dict[Tuple, List[Tuple]] = {}
+        self._filas = 0
+
+    def agregar(self, fila: Tuple):
+        clave = fila[:self.particion]
+        grupo = self._grupos.setdefault(clave, [])
+        grupo.append(fila)
+        self._filas += 1
+        if len(grupo) >= self.tam_batch:
+            del self._grupos[clave]
+            self._filas -= len(grupo)
+            self._enviar_grupo(grupo)
+        elif self._filas >= self.max_filas:
+            self.vaciar()
+
+    def _enviar_grupo(self, grupo: List[Tuple]):
+        if len(grupo) == 1:
+            self._enviar(self.sentencia, grupo[0], 1)
+            return
+        from cassandra.query import BatchStatement, BatchType
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for fila in grupo:
+            batch.add(self.sentencia, fila)
+        batch.is_idempotent = True
+        self._enviar(batch, None, len(grupo))
+
+    def vaciar(self):
+        grupos = self._grupos
+        self._grupos = {}
+        self._filas = 0
+        for grupo in grupos.values():
+            self._enviar_grupo(grupo)
+
+
+# =============================================================================
+# CARGA
+# =============================================================================
+
+def cargar_tablas(session: Any,
+                  registros: Iterable[Dict[str, Any]],
+                  tablas: Iterable[str],
+                  escritor: EscritorConcurrente,
+                  agrupar: bool = True) -> Dict[str, MedidorThroughput]:
+    """
+    Escribe un flujo de registros en las tablas que se alimentan de él.
+
+    Todas las tablas comparten la misma ventana de peticiones en vuelo.
+
+    Returns:
+        Diccionario tabla -> MedidorThroughput
+    """
+    tablas = list(tablas)
+    medidores = {nombre: MedidorThroughput(nombre).iniciar() for nombre in tablas}
+    destinos = []
+    for nombre in tablas:
+        definicion = TABLAS[nombre]
+        sentencia = preparar_insert(session, nombre)
+        medidor = medidores[nombre]
+
+        def enviar(sentencia_o_batch, parametros, filas, medidor=medidor):
+            escritor.enviar(sentencia_o_batch, parametros, filas, medidor)
+
+        if agrupar:
+            agrupador = AgrupadorParticiones(sentencia, definicion['particion'], enviar)
+            destinos.append((definicion['fila'], agrupador.agregar, agrupador.vaciar))
+        else:
+            individual = (lambda fila, sentencia=sentencia, enviar=enviar: enviar(sentencia, fila, 1))
+            destinos.append((definicion['fila'], individual, None))
+
+    for registro in registros:
+        for extraer, destino, _ in destinos:
+            destino(extraer(registro))
+
+    for _, _, vaciar in destinos:
+        if vaciar is not None:
+            vaciar()
+    escritor.esperar()
+
+    for medidor in medidores.values():
+        medidor.detener()
+    return medidores
+
+
+def poblar_cassandra(session: Any,
+                     semilla: int = SEMILLA_POR_DEFECTO,
+                     volumen: Optional[Dict[str, int]] = None,
+                     tablas: Iterable[str] = tuple(TABLAS),
+                     en_vuelo: int = EN_VUELO,
+                     agrupar: bool = True,
+                     procesos: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Puebla las tablas de Cassandra con datos del generador.
+
+    Los registros de cada origen (pacientes, citas) se leen una sola vez y
+    alimentan a la vez todas las tablas que dependen de él.
+
+    Returns:
+        Diccionario tabla -> resumen de throughput
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    tablas = list(tablas)
+    if not verificar_tablas(session, tablas):
+        raise RuntimeError("El schema de Cassandra no está preparado: ejecute python connect.py --preparar")
+
+    escritor = EscritorConcurrente(session, en_vuelo=en_vuelo)
+    resumen = {}
+
+    origenes = OrderedDict()
+    for nombre in tablas:
+        origenes.setdefault(TABLAS[nombre]['origen'], []).append(nombre)
+
+    for origen, destino in origenes.items():
+        bloques = generar_en_paralelo(origen, semilla, volumen, procesos)
+        registros = (registro for bloque in bloques for registro in bloque)
+        medidores = cargar_tablas(session, registros, destino, escritor, agrupar)
+        for nombre, medidor in medidores.items():
+            print(f"✓ {medidor}")
+            resumen[nombre] = medidor.resumen()
+
+    if escritor.total_reintentos:
+        print(f"  Reintentos por timeout: {escritor.total_reintentos:,}")
+    for error in escritor.errores[:5]:
+        print(f"✗ Error de escritura: {error}")
+
+    return resumen
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Ejecuta la población completa de Cassandra."""
+    parser = argparse.ArgumentParser(description="Carga masiva de Cassandra")
+    parser.add_argument('--citas', type=int, default=VOLUMEN_BASE['citas'])
+    parser.add_argument('--en-vuelo', type=int, default=EN_VUELO, help="Peticiones asíncronas simultáneas")
+    parser.add_argument('--sin-agrupar', action='store_true', help="No agrupar filas de una misma partición")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del generador")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("POBLACIÓN DE CASSANDRA")
+    print("=" * 70)
+
+    # Paso único de DDL: keyspace y tablas (conectar no los crea)
+    session = conectar_cassandra() if preparar_cassandra() else None
+    if session is None:
+        print("\n❌ No se pudo conectar a Cassandra. Abortando...")
+        return
+
+    total = MedidorThroughput('total').iniciar()
+    resumen = poblar_cassandra(
+        session,
+        semilla=args.semilla,
+        volumen=calcular_volumen(args.citas),
+        en_vuelo=args.en_vuelo,
+        agrupar=not args.sin_agrupar,
+        procesos=args.procesos
+    )
+    for datos in resumen.values():
+        total.sumar(datos['filas'], datos['errores'])
+    total.detener()
+
+    print("=" * 70)
+    print(f"✓ {total} (escrituras)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+Población de Dgraph
+Plataforma de Integración de Datos de Salud
+
+Carga masiva del grafo definido en Dgraph/schema.rdf (PARTE 3 de
+populate.py): Paciente → Cita → Diagnostico → Tratamiento → Medicamento y el
+resto de tipos.
+
+La carga se hace en dos fases:
+1. Nodos: los predicados escalares de cada entidad se envían en mutaciones
+   JSON de tamaño fijo. Cada nodo usa un blank node con su ID estable
+   (`_:P00000001`) y el UID que asigna Dgraph se guarda en un mapa
+   xid → uid persistente (SQLite), de modo que una carga interrumpida se
+   puede reanudar sin duplicar nodos.
+2. Aristas: una vez creados todos los nodos, las relaciones se envían como
+   N-Quads entre UIDs ya resueltos, por lo que un bloque puede referenciar
+   nodos creados en cualquier bloque anterior.
+
+Cada fase ejecuta varias transacciones concurrentes (commit_now) sobre el
+pool de clientes de connect.py y reintenta con espera las transacciones
+abortadas por conflicto.
+
+Opcionalmente se generan archivos RDF compatibles con `dgraph live` y
+`dgraph bulk` para cargas offline.
+
+Uso:
+    python populate_dgraph.py --citas 1000000 --transacciones 8
+    python populate_dgraph.py --citas 10000000 --rdf data/salud.rdf.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+from connect import conectar_dgraph, aplicar_schema_dgraph
+from modelos import MODELOS
+from utils.data_generator import (
+    SEMILLA_POR_DEFECTO, VOLUMEN_BASE, TIPOS, calcular_volumen, generar_en_paralelo
+)
+from utils.metricas import MedidorThroughput
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Nodos por mutación en la fase de nodos
+NODOS_POR_MUTACION = 1000
+
+# N-Quads por mutación en la fase de aristas
+ARISTAS_POR_MUTACION = 5000
+
+# Transacciones concurrentes
+TRANSACCIONES = 8
+
+# Reintentos ante transacciones abortadas y espera inicial
+REINTENTOS = 5
+ESPERA_BASE_SEG = 0.05
+
+RUTA_MAPA_UIDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'dgraph_uids.sqlite')
+
+# Campos de referencia de cada tipo -> lista de (sujeto, predicado, objeto)
+# donde sujeto/objeto es 'self' o el nombre del campo con el ID referenciado.
+# Se emiten ambos sentidos porque schema.rdf define predicados separados
+# para cada dirección (p. ej. cita.paciente y paciente.citas).
+ARISTAS = {
+    'departamentos': [
+        ('self', 'departamento.hospital', 'hospital_id'),
+        ('hospital_id', 'hospital.departamentos', 'self'),
+    ],
+    'doctores': [
+        ('self', 'doctor.hospital', 'hospital_id'),
+        ('hospital_id', 'hospital.doctores', 'self'),
+        ('departamento_id', 'departamento.doctores', 'self'),
+    ],
+    'historiales': [
+        ('self', 'historial.paciente', 'paciente_id'),
+        ('paciente_id', 'paciente.historial_medico', 'self'),
+    ],
+    'alergias': [
+        ('self', 'alergia.paciente', 'paciente_id'),
+        ('paciente_id', 'paciente.alergias', 'self'),
+    ],
+    'citas': [
+        ('self', 'cita.paciente', 'paciente_id'),
+        ('self', 'cita.doctor', 'doctor_id'),
+        ('paciente_id', 'paciente.citas', 'self'),
+        ('doctor_id', 'doctor.citas', 'self'),
+        ('self', 'cita.diagnosticos', 'diagnostico_ids'),
+    ],
+    'diagnosticos': [
+        ('self', 'diagnostico.paciente', 'paciente_id'),
+        ('self', 'diagnostico.doctor', 'doctor_id'),
+        ('self', 'diagnostico.cita', 'cita_id'),
+        ('self', 'diagnostico.tratamientos', 'tratamiento_ids'),
+        ('historial_id', 'historial.diagnosticos', 'self'),
+        ('doctor_id', 'doctor.pacientes_tratados', 'paciente_id'),
+    ],
+    'tratamientos': [
+        ('self', 'tratamiento.diagnostico', 'diagnostico_id'),
+        ('self', 'tratamiento.medicamentos', 'medicamento_ids'),
+    ],
+    'recetas': [
+        ('self', 'receta.paciente', 'paciente_id'),
+        ('self', 'receta.doctor', 'doctor_id'),
+        ('self', 'receta.medicamentos', 'medicamento_ids'),
+        ('paciente_id', 'paciente.recetas', 'self'),
+        ('medicamento_ids', 'medicamento.recetas', 'self'),
+    ],
+}
+
+
+def a_nodo(tipo: str, registro: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte un registro en un nodo JSON de Dgraph (solo escalares) con la entidad de modelos.py."""
+    return MODELOS[tipo].desde_registro(registro).a_nodo()
+
+
+def aristas_de(tipo: str, registro: Dict[str, Any]) -> Iterator[Tuple[str, str, str]]:
+    """Genera las aristas (xid_sujeto, predicado, xid_objeto) de un registro."""
+    for sujeto, predicado, objeto in ARISTAS.get(tipo, ()):
+        sujetos = [registro['id']] if sujeto == 'self' else registro.get(sujeto)
+        objetos = [registro['id']] if objeto == 'self' else registro.get(objeto)
+        if isinstance(sujetos, str):
+            sujetos = [sujetos]
+        if isinstance(objetos, str):
+            objetos = [objetos]
+        for s in sujetos or ():
+            for o in objetos or ():
+                yield s, predicado, o
+
+
+# =============================================================================
+# MAPA PERSISTENTE XID -> UID
+# =============================================================================
+
+class MapaUids:
+    """
+    Mapa persistente de IDs estables (xid) a UIDs de Dgraph.
+
+    Se guarda en SQLite para sobrevivir entre ejecuciones: permite reanudar
+    una carga y resolver aristas sin mantener millones de UIDs en memoria.
+    Solo debe usarse desde un hilo (el que coordina la carga).
+    """
+
+    def __init__(self, ruta: str = RUTA_MAPA_UIDS):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("CREATE TABLE IF NOT EXISTS uids (xid TEXT PRIMARY KEY, uid TEXT NOT NULL)")
+
+    def guardar(self, pares: Dict[str, str]):
+        self._conexion.executemany("INSERT OR REPLACE INTO uids (xid, uid) VALUES (?, ?)", pares.items())
+        self._conexion.commit()
+
+    def obtener(self, xids: Iterable[str]) -> Dict[str, str]:
+        """Resuelve en bloque los xids conocidos (los desconocidos se omiten)."""
+        xids = list(dict.fromkeys(xids))
+        resultado = {}
+        for inicio in range(0, len(xids), 500):
+            grupo = xids[inicio:inicio + 500]
+            marcadores = ','.join('?' for _ in grupo)
+            filas = self._conexion.execute(
+                f"SELECT xid, uid FROM uids WHERE xid IN ({marcadores})", grupo)
+            resultado.update(filas)
+        return resultado
+
+    def __len__(self) -> int:
+        return self._conexion.execute("SELECT COUNT(*) FROM uids").fetchone()[0]
+
+    def limpiar(self):
+        self._conexion.execute("DELETE FROM uids")
+        self._conexion.commit()
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+# =============================================================================
+# MUTACIONES CONCURRENTES
+# =============================================================================
+
+def _mutar(set_obj: Optional[List[Dict[str, Any]]] = None,
+           set_nquads: Optional[str] = None,
+           reintentos: int = REINTENTOS) -> Dict[str, str]:
+    """
+    Ejecuta una mutación en su propia transacción con commit inmediato.
+
+    Reintenta con espera exponencial si Dgraph aborta la transacción por
+    conflicto con otra concurrente.
+
+    Returns:
+        Blank nodes asignados (nombre sin `_:` -> uid)
+    """
+    import pydgraph
+
+    intento = 0
+    while True:
+        cliente = conectar_dgraph()
+        if cliente is None:
+            raise ConnectionError("No hay conexión con Dgraph")
+        txn = cliente.txn()
+        try:
+            if set_obj is not None:
+                respuesta = txn.mutate(set_obj=set_obj, commit_now=True)
+            else:
+                respuesta = txn.mutate(set_nquads=set_nquads, commit_now=True)
+            return dict(respuesta.uids)
+        except pydgraph.errors.AbortedError:
+            if intento >= reintentos:
+                raise
+            time.sleep(ESPERA_BASE_SEG * (2 ** intento))
+            intento += 1
+        finally:
+            txn.discard()
+
+
+def _bloques(iterable: Iterable[Any], tam: int) -> Iterator[List[Any]]:
+    bloque = []
+    for elemento in iterable:
+        bloque.append(elemento)
+        if len(bloque) >= tam:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def _registros(tipo: str, semilla: int, volumen: Dict[str, int], procesos: Optional[int]) -> Iterator[Dict[str, Any]]:
+    for bloque in generar_en_paralelo(tipo, semilla, volumen, procesos):
+        yield from bloque
+
+
+def cargar_nodos(tipo: str,
+                 registros: Iterable[Dict[str, Any]],
+                 mapa: MapaUids,
+                 transacciones: int = TRANSACCIONES,
+                 tam_mutacion: int = NODOS_POR_MUTACION) -> MedidorThroughput:
+    """
+    Fase 1: crea los nodos de un tipo y registra sus UIDs.
+
+    Los registros cuyo xid ya está en el mapa se omiten (reanudación).
+    """
+    medidor = MedidorThroughput(f"nodos {tipo}").iniciar()
+
+    def procesar(resultado):
+        asignados = resultado.result()
+        mapa.guardar(asignados)
+        medidor.sumar(len(asignados))
+
+    with ThreadPoolExecutor(max_workers=transacciones) as pool:
+        pendientes = deque()
+        for bloque in _bloques(registros, tam_mutacion):
+            existentes = mapa.obtener(r['id'] for r in bloque)
+            nodos = [a_nodo(tipo, r) for r in bloque if r['id'] not in existentes]
+            if not nodos:
+                continue
+            pendientes.append(pool.submit(_mutar, set_obj=nodos))
+            if len(pendientes) >= transacciones:
+                procesar(pendientes.popleft())
+        while pendientes:
+            procesar(pendientes.popleft())
+
+    return medidor.detener()
+
+
+def cargar_aristas(tipo: str,
+                   registros: Iterable[Dict[str, Any]],
+                   mapa: MapaUids,
+                   transacciones: int = TRANSACCIONES,
+                   tam_mutacion: int = ARISTAS_POR_MUTACION) -> MedidorThroughput:
+    """
+    Fase 2: crea las aristas de un tipo entre UIDs ya resueltos.
+
+    Las aristas cuyo extremo no está en el mapa se cuentan como errores.
+    """
+    medidor = MedidorThroughput(f"aristas {tipo}").iniciar()
+
+    with ThreadPoolExecutor(max_workers=transacciones) as pool:
+        pendientes = deque()
+        for bloque in _bloques((a for r in registros for a in aristas_de(tipo, r)), tam_mutacion):
+            uids = mapa.obtener(x for s, _, o in bloque for x in (s, o))
+            lineas = [
+                f"<{uids[s]}> <{predicado}> <{uids[o]}> ."
+                for s, predicado, o in bloque
+                if s in uids and o in uids
+            ]
+            faltantes = len(bloque) - len(lineas)
+            if lineas:
+                futuro = pool.submit(_mutar, set_nquads='\n'.join(lineas))
+                pendientes.append((futuro, len(lineas), faltantes))
+            else:
+                medidor.sumar(0, faltantes)
+            if len(pendientes) >= transacciones:
+                futuro, filas, errores = pendientes.popleft()
+                futuro.result()
+                medidor.sumar(filas, errores)
+        while pendientes:
+            futuro, filas, errores = pendientes.popleft()
+            futuro.result()
+            medidor.sumar(filas, errores)
+
+    return medidor.detener()
+
+
+def poblar_dgraph(semilla: int = SEMILLA_POR_DEFECTO,
+                  volumen: Optional[Dict[str, int]] = None,
+                  tipos: Iterable[str] = TIPOS,
+                  transacciones: int = TRANSACCIONES,
+                  mapa: Optional[MapaUids] = None,
+                  procesos: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Puebla Dgraph: primero todos los nodos, después todas las aristas.
+
+    Returns:
+        Diccionario fase/tipo -> resumen de throughput
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    tipos = list(tipos)
+    mapa = mapa or MapaUids()
+    resumen = {}
+
+    for tipo in tipos:
+        medidor = cargar_nodos(tipo, _registros(tipo, semilla, volumen, procesos), mapa, transacciones)
+        print(f"✓ {medidor}")
+        resumen[medidor.nombre] = medidor.resumen()
+
+    for tipo in tipos:
+        if tipo not in ARISTAS:
+            continue
+        medidor = cargar_aristas(tipo, _registros(tipo, semilla, volumen, procesos), mapa, transacciones)
+        print(f"✓ {medidor}")
+        resumen[medidor.nombre] = medidor.resumen()
+
+    return resumen
+
+
+# =============================================================================
+# EXPORTACIÓN RDF PARA CARGA OFFLINE
+# =============================================================================
+
+def literal_rdf(valor: Any) -> str:
+    if isinstance(valor, bool):
+        return f'"{str(valor).lower()}"^^<xs:boolean>'
+    if isinstance(valor, int):
+        return f'"{valor}"^^<xs:int>'
+    if isinstance(valor, float):
+        return f'"{valor}"^^<xs:float>'
+    texto = json.dumps(str(valor), ensure_ascii=False)
+    if len(valor) >= 20 and valor[4:5] == '-' and valor[10:11] == 'T':
+        return f'{texto}^^<xs:dateTime>'
+    return texto
+
+
+def nquads_de(tipo: str, registro: Dict[str, Any]) -> Iterator[str]:
+    """N-Quads de un registro con blank nodes (nodo y aristas)."""
+    nodo = a_nodo(tipo, registro)
+    sujeto = nodo.pop('uid')
+    yield f'{sujeto} <dgraph.type> "{nodo.pop("dgraph.type")}" .'
+    for predicado, valor in nodo.items():
+        for elemento in (valor if isinstance(valor, list) else [valor]):
+            yield f"{sujeto} <{predicado}> {literal_rdf(elemento)} ."
+    for s, predicado, o in aristas_de(tipo, registro):
+        yield f"_:{s} <{predicado}> _:{o} ."
+
+
+def exportar_rdf(ruta: str,
+                 semilla: int = SEMILLA_POR_DEFECTO,
+                 volumen: Optional[Dict[str, int]] = None,
+                 tipos: Iterable[str] = TIPOS,
+                 procesos: Optional[int] = None) -> MedidorThroughput:
+    """
+    Escribe el grafo completo como N-Quads (gzip si la ruta termina en .gz).
+
+    Los blank nodes usan los IDs estables, así que `dgraph live` o
+    `dgraph bulk` resuelven las aristas entre archivos con su propio xidmap:
+        dgraph live -f salud.rdf.gz -s Dgraph/schema.rdf -x xidmap
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    abrir = gzip.open if ruta.endswith('.gz') else open
+    medidor = MedidorThroughput('N-Quads').iniciar()
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+
+    with abrir(ruta, 'wt', encoding='utf-8') as f:
+        for tipo in tipos:
+            for registro in _registros(tipo, semilla, volumen, procesos):
+                lineas = list(nquads_de(tipo, registro))
+                f.write('\n'.join(lineas))
+                f.write('\n')
+                medidor.sumar(len(lineas))
+
+    return medidor.detener()
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Ejecuta la población completa de Dgraph."""
+    parser = argparse.ArgumentParser(description="Carga masiva de Dgraph")
+    parser.add_argument('--citas', type=int, default=VOLUMEN_BASE['citas'])
+    parser.add_argument('--transacciones', type=int, default=TRANSACCIONES, help="Transacciones concurrentes")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del generador")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--rdf', default=None, help="Solo exportar N-Quads a este archivo (carga offline)")
+    parser.add_argument('--reiniciar-mapa', action='store_true', help="Vaciar el mapa xid -> uid antes de cargar")
+    args = parser.parse_args()
+
+    volumen = calcular_volumen(args.citas)
+
+    print("=" * 70)
+    print("POBLACIÓN DE DGRAPH")
+    print("=" * 70)
+
+    if args.rdf:
+        medidor = exportar_rdf(args.rdf, args.semilla, volumen, procesos=args.procesos)
+        print(f"✓ {medidor}")
+        print(f"  Archivo: {args.rdf}")
+        print(f"  Cargar con: dgraph live -f {args.rdf} -s Dgraph/schema.rdf")
+        return
+
+    cliente = conectar_dgraph()
+    if cliente is None:
+        print("\n❌ No se pudo conectar a Dgraph. Abortando...")
+        return
+    aplicar_schema_dgraph(cliente)
+
+    mapa = MapaUids()
+    if args.reiniciar_mapa:
+        mapa.limpiar()
+
+    total = MedidorThroughput('total').iniciar()
+    try:
+        resumen = poblar_dgraph(args.semilla, volumen, transacciones=args.transacciones,
+                                mapa=mapa, procesos=args.procesos)
+    finally:
+        mapa.cerrar()
+    for datos in resumen.values():
+        total.sumar(datos['filas'], datos['errores'])
+    total.detener()
+
+    print("=" * 70)
+    print(f"✓ {total}")
+    print("=" * 70)
+
+    # La carga masiva no pasa por los incrementos de los contadores
+    from connect import conectar_mongodb
+    from contadores import reconciliar_tras_carga
+    db = conectar_mongodb()
+    if db is None:
+        print("⚠ Sin conexión con MongoDB: los contadores se reconcilian al cargar MongoDB")
+    else:
+        reconciliar_tras_carga(db, cliente)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Población de MongoDB
+Plataforma de Integración de Datos de Salud
+
+Carga masiva de las colecciones pacientes, doctores, hospitales, citas e
+historiales (PASOS 1.3 y 1.4 de populate.py).
+
+Estrategia:
+- insert_many() desordenado (ordered=False) en lotes de tamaño configurable,
+  de modo que el servidor aplica cada lote sin detenerse en el primer error
+- Varias inserciones en vuelo por colección y varias colecciones en
+  paralelo, todas sobre el MongoClient compartido de connect.py
+- Los índices secundarios se eliminan antes de la carga y se construyen al
+  final, una sola vez, en lugar de mantenerlos documento a documento
+- Cada colección informa filas/segundo con MedidorThroughput
+
+Uso:
+    python populate_mongodb.py --citas 1000000 --lote 5000 --hilos 4
+"""
+
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+from connect import conectar_mongodb
+from modelos import MODELOS
+from utils.data_generator import (
+    SEMILLA_POR_DEFECTO, VOLUMEN_BASE, calcular_volumen, generar_en_paralelo
+)
+from utils.metricas import MedidorThroughput
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Documentos por llamada a insert_many()
+TAM_LOTE = 5000
+
+# Inserciones simultáneas por colección
+HILOS_POR_COLECCION = 4
+
+# Colecciones cargadas a la vez
+COLECCIONES_EN_PARALELO = 3
+
+# Colección de MongoDB -> tipo de entidad del generador
+COLECCIONES = {
+    'hospitales': 'hospitales',
+    'doctores': 'doctores',
+    'pacientes': 'pacientes',
+    'historiales': 'historiales',
+    'citas': 'citas',
+}
+
+# Índices secundarios (PASO 1.4): (campos, opciones)
+INDICES = {
+    'pacientes': [
+        ([('email', 1)], {'unique': True, 'name': 'email_unico'}),
+        ([('nombre', 'text'), ('apellido', 'text')], {'name': 'nombre_texto', 'default_language': 'spanish'}),
+        ([('ciudad', 1)], {'name': 'ciudad'}),
+        ([('tipo_sangre', 1)], {'name': 'tipo_sangre'}),
+    ],
+    'doctores': [
+        ([('email', 1)], {'unique': True, 'name': 'email_unico'}),
+        ([('numero_licencia', 1)], {'unique': True, 'name': 'licencia_unica'}),
+        ([('especialidad', 1), ('años_experiencia', -1)], {'name': 'especialidad_experiencia'}),
+        ([('hospital_id', 1)], {'name': 'hospital'}),
+    ],
+    'hospitales': [
+        ([('ciudad', 1), ('tiene_urgencias', 1)], {'name': 'ciudad_urgencias'}),
+    ],
+    'historiales': [
+        ([('paciente_id', 1)], {'name': 'paciente'}),
+    ],
+    'citas': [
+        ([('fecha_hora', 1)], {'name': 'fecha_hora'}),
+        ([('paciente_id', 1), ('fecha_hora', -1)], {'name': 'paciente_fecha'}),
+        ([('doctor_id', 1), ('fecha_hora', 1)], {'name': 'doctor_fecha'}),
+        ([('estado', 1), ('fecha_hora', 1)], {'name': 'estado_fecha'}),
+    ],
+}
+
+
+# =============================================================================
+# CONVERSIÓN DE REGISTROS
+# =============================================================================
+
+def a_documento(tipo: str, registro: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convierte un registro del generador en documento de MongoDB con la
+    entidad de modelos.py (ID estable como _id y fechas BSON), de modo que
+    coincide con el de Cassandra y Dgraph y no hace falta un índice
+    adicional para buscarlo.
+    """
+    return MODELOS[tipo].desde_registro(registro).a_documento()
+
+
+def _en_lotes(tipo: str, registros: Iterable[Dict[str, Any]], tam_lote: int) -> Iterator[List[Dict[str, Any]]]:
+    desde_registro = MODELOS[tipo].desde_registro
+    lote = []
+    for registro in registros:
+        lote.append(desde_registro(registro).a_documento())
+        if len(lote) >= tam_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# =============================================================================
+# ÍNDICES
+# =============================================================================
+
+def eliminar_indices(db: Any, colecciones: Iterable[str]):
+    """Elimina los índices secundarios (se conserva el de _id)."""
+    for nombre in colecciones:
+        db[nombre].drop_indexes()
+
+
+def crear_indices(db: Any, colecciones: Iterable[str]) -> Dict[str, float]:
+    """
+    Construye los índices secundarios definidos en INDICES.
+
+    Returns:
+        Diccionario colección -> segundos que tardó la construcción
+    """
+    from pymongo import IndexModel
+
+    tiempos = {}
+    for nombre in colecciones:
+        modelos = [IndexModel(campos, **opciones) for campos, opciones in INDICES.get(nombre, [])]
+        if not modelos:
+            continue
+        medidor = MedidorThroughput(f"índices {nombre}").iniciar()
+        db[nombre].create_indexes(modelos)
+        tiempos[nombre] = medidor.detener().segundos
+        print(f"✓ Índices de {nombre} creados en {tiempos[nombre]:.2f} s")
+    return tiempos
+
+
+# =============================================================================
+# CARGA
+# =============================================================================
+
+def _insertar_lote(coleccion: Any, lote: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Inserta un lote desordenado. Retorna (insertados, errores)."""
+    from pymongo.errors import BulkWriteError
+
+    try:
+        resultado = coleccion.insert_many(lote, ordered=False)
+        return len(resultado.inserted_ids), 0
+    except BulkWriteError as e:
+        # Con ordered=False el resto del lote se aplica igualmente;
+        # los errores típicos son _id duplicados al recargar
+        insertados = e.details.get('nInserted', 0)
+        return insertados, len(lote) - insertados
+
+
+def cargar_coleccion(db: Any,
+                     nombre: str,
+                     registros: Iterable[Dict[str, Any]],
+                     tam_lote: int = TAM_LOTE,
+                     hilos: int = HILOS_POR_COLECCION) -> MedidorThroughput:
+    """
+    Inserta un flujo de registros en una colección.
+
+    Mantiene como máximo `hilos` llamadas a insert_many() en vuelo; el
+    siguiente lote se prepara mientras el servidor procesa los anteriores.
+
+    Returns:
+        MedidorThroughput con los documentos insertados y los errores
+    """
+    coleccion = db[nombre]
+    medidor = MedidorThroughput(nombre).iniciar()
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        pendientes = deque()
+        for lote in _en_lotes(COLECCIONES[nombre], registros, tam_lote):
+            pendientes.append(pool.submit(_insertar_lote, coleccion, lote))
+            if len(pendientes) >= hilos:
+                medidor.sumar(*pendientes.popleft().result())
+        while pendientes:
+            medidor.sumar(*pendientes.popleft().result())
+
+    return medidor.detener()
+
+
+def poblar_mongodb(db: Any,
+                   semilla: int = SEMILLA_POR_DEFECTO,
+                   volumen: Optional[Dict[str, int]] = None,
+                   colecciones: Iterable[str] = tuple(COLECCIONES),
+                   tam_lote: int = TAM_LOTE,
+                   hilos: int = HILOS_POR_COLECCION,
+                   en_paralelo: int = COLECCIONES_EN_PARALELO,
+                   procesos: Optional[int] = None,
+                   limpiar: bool = False,
+                   diferir_indices: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Puebla las colecciones de MongoDB con datos del generador.
+
+    Args:
+        db: Base de datos de MongoDB (conectar_mongodb())
+        semilla: Semilla del generador
+        volumen: Cantidad por tipo (por defecto VOLUMEN_BASE)
+        colecciones: Colecciones a cargar
+        tam_lote: Documentos por insert_many()
+        hilos: Inserciones simultáneas por colección
+        en_paralelo: Colecciones cargadas a la vez
+        procesos: Procesos del generador de datos
+        limpiar: Vaciar las colecciones antes de cargar
+        diferir_indices: Eliminar índices secundarios y crearlos al final
+
+    Returns:
+        Diccionario colección -> resumen de throughput
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    colecciones = list(colecciones)
+    # Los generadores de cada colección comparten los núcleos disponibles
+    procesos = procesos or max(1, (os.cpu_count() or 1) // max(1, en_paralelo))
+
+    if limpiar:
+        for nombre in colecciones:
+            db[nombre].drop()
+    if diferir_indices:
+        eliminar_indices(db, colecciones)
+
+    def cargar(nombre):
+        bloques = generar_en_paralelo(COLECCIONES[nombre], semilla, volumen, procesos)
+        registros = (registro for bloque in bloques for registro in bloque)
+        medidor = cargar_coleccion(db, nombre, registros, tam_lote, hilos)
+        print(f"✓ {medidor}")
+        return medidor
+
+    with ThreadPoolExecutor(max_workers=max(1, en_paralelo)) as pool:
+        medidores = list(pool.map(cargar, colecciones))
+
+    resumen = {medidor.nombre: medidor.resumen() for medidor in medidores}
+
+    tiempos_indices = crear_indices(db, colecciones)
+    for nombre, segundos in tiempos_indices.items():
+        resumen[nombre]['segundos_indices'] = round(segundos, 3)
+
+    return resumen
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Ejecuta la población completa de MongoDB."""
+    parser = argparse.ArgumentParser(description="Carga masiva de MongoDB")
+    parser.add_argument('--citas', type=int, default=VOLUMEN_BASE['citas'])
+    parser.add_argument('--lote', type=int, default=TAM_LOTE, help="Documentos por insert_many()")
+    parser.add_argument('--hilos', type=int, default=HILOS_POR_COLECCION, help="Inserciones en vuelo por colección")
+    parser.add_argument('--paralelo', type=int, default=COLECCIONES_EN_PARALELO, help="Colecciones cargadas a la vez")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del generador")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--limpiar', action='store_true', help="Vaciar las colecciones antes de cargar")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("POBLACIÓN DE MONGODB")
+    print("=" * 70)
+
+    db = conectar_mongodb()
+    if db is None:
+        print("\n❌ No se pudo conectar a MongoDB. Abortando...")
+        return
+
+    total = MedidorThroughput('total').iniciar()
+    resumen = poblar_mongodb(
+        db,
+        semilla=args.semilla,
+        volumen=calcular_volumen(args.citas),
+        tam_lote=args.lote,
+        hilos=args.hilos,
+        en_paralelo=args.paralelo,
+        procesos=args.procesos,
+        limpiar=args.limpiar
+    )
+    for datos in resumen.values():
+        total.sumar(datos['filas'], datos['errores'])
+    total.detener()
+
+    print("=" * 70)
+    print(f"✓ {total}")
+    print("=" * 70)
+
+    # La carga masiva no pasa por los incrementos de los contadores
+    from connect import conectar_dgraph
+    from contadores import reconciliar_tras_carga
+    reconciliar_tras_carga(db, conectar_dgraph())
+
+
+if __name__ == "__main__":
+    main()
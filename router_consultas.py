@@ -0,0 +1,843 @@
+"""
+Router de Consultas
+Plataforma de Integración de Datos de Salud
+
+Implementa el "Selector de BD" del README: cada opción de los menús de
+main.py se clasifica por patrón de acceso y se envía a la base de datos que
+mejor lo resuelve.
+
+| Patrón          | Preferencia                 |
+|-----------------|-----------------------------|
+| clave           | MongoDB → Dgraph            |
+| busqueda        | Texto → MongoDB → Dgraph    |
+| rango_temporal  | Cassandra → MongoDB         |
+| particion       | Cassandra → MongoDB         |
+| relaciones      | Dgraph → MongoDB            |
+| agregacion      | Columnar → MongoDB → Dgraph |
+| materializado   | MongoDB → Columnar          |
+| descubrimiento  | Dgraph                      |
+
+Si la base preferida no responde (sin conexión, error de red o tiempo de
+espera agotado) se usa la siguiente que tenga implementación para esa
+opción, y la caída se recuerda durante ESPERA_BACKEND_CAIDO_SEG para no
+pagar el timeout en cada petición. Cualquier otro error (parámetros, una
+consulta mal formada) se propaga sin cambiar la salud de la base.
+
+main.py resuelve con el router las opciones de los menús de consulta que
+tienen implementación registrada; parametros() indica qué datos pedir.
+
+'columnar' es el extracto de analitica.py: los informes de menu_analisis
+se calculan sobre él mientras exista y, si no, en las bases de datos.
+'texto' es el índice invertido de busqueda_texto.py: las búsquedas por
+nombre y descripción van a él (sin acentos, por prefijo y con erratas)
+cuando se ha construido.
+'vista' son las vistas compuestas de consultas_async.py: el historial
+completo (menu_pacientes 6) pide a la vez la ficha a MongoDB, las próximas
+citas a Cassandra y el historial clínico a Dgraph.
+'materializado' son los informes que contadores.py mantiene incrementalmente
+en MongoDB: leerlos no depende del volumen de datos y siempre están al día.
+Mientras no se han sembrado (dimensión vacía) lanzan SinDatos y el router
+resuelve la opción con la siguiente base, sin marcar MongoDB como caída.
+
+Cada ejecución registra su latencia por ruta y base de datos; con
+ajustar_por_latencia=True el router ordena las bases candidatas según la
+mediana medida, de modo que las decisiones se pueden ajustar con datos.
+"""
+
+import inspect
+import json
+import os
+import re
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from cache_consultas import consultar, consultar_generada
+from catalogo_consultas import obtener_consulta
+from connect import conectar_mongodb, conectar_cassandra, conectar_dgraph
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Segundos que una base de datos caída queda fuera de la rotación
+ESPERA_BACKEND_CAIDO_SEG = float(os.getenv('ESPERA_BACKEND_CAIDO_SEG', 30))
+
+# Muestras de latencia conservadas por ruta y base de datos
+MUESTRAS_LATENCIA = 512
+
+# Muestras mínimas antes de reordenar por latencia medida
+MUESTRAS_MINIMAS_AJUSTE = 20
+
+PATRONES = {
+    'clave': ('mongodb', 'dgraph'),
+    'busqueda': ('texto', 'mongodb', 'dgraph'),
+    'rango_temporal': ('cassandra', 'mongodb'),
+    'particion': ('cassandra', 'mongodb'),
+    'relaciones': ('vista', 'dgraph', 'mongodb'),
+    'agregacion': ('columnar', 'mongodb', 'dgraph'),
+    'materializado': ('mongodb', 'columnar'),
+    'descubrimiento': ('dgraph',),
+}
+
+
+def _conectar_columnar() -> Optional[Any]:
+    """Extracto vigente de analitica.py, o None si no hay (o falta NumPy)."""
+    try:
+        from analitica import obtener_extracto
+    except ImportError:
+        return None
+    return obtener_extracto()
+
+
+def _conectar_vista() -> Optional[Any]:
+    """Vistas compuestas de consultas_async.py (abren sus propias conexiones)."""
+    import consultas_async
+    return consultas_async
+
+
+def _conectar_texto() -> Optional[Any]:
+    """Índices de busqueda_texto.py, o None si no se han construido."""
+    from busqueda_texto import obtener_indices
+    return obtener_indices()
+
+
+# Excepciones de los drivers que indican una base caída o lenta. Se comparan
+# por nombre de clase para no importar los drivers: pymongo, cassandra-driver
+# y pydgraph, en ese orden
+ERRORES_CONEXION = frozenset({
+    'ConnectionFailure', 'AutoReconnect', 'ServerSelectionTimeoutError', 'NetworkTimeout', 'ExecutionTimeout',
+    'NoHostAvailable', 'OperationTimedOut', 'ConnectionException', 'Unavailable', 'ReadTimeout', 'WriteTimeout',
+    'RetriableError',
+})
+
+# Códigos gRPC (Dgraph) que indican lo mismo
+CODIGOS_GRPC_CONEXION = frozenset({'UNAVAILABLE', 'DEADLINE_EXCEEDED'})
+
+
+class SinDatos(Exception):
+    """
+    La base responde pero aún no tiene datos para la opción (p. ej. los
+    contadores antes de sembrarlos): se prueba la siguiente candidata sin
+    marcarla como caída.
+    """
+
+
+def es_error_de_conexion(error: BaseException) -> bool:
+    """True si el error indica que la base no responde (no que la consulta falle)."""
+    if isinstance(error, (ConnectionError, TimeoutError, socket.timeout)):
+        return True
+    if any(clase.__name__ in ERRORES_CONEXION for clase in type(error).__mro__):
+        return True
+    codigo = getattr(error, 'code', None)
+    if callable(codigo):
+        try:
+            return getattr(codigo(), 'name', None) in CODIGOS_GRPC_CONEXION
+        except Exception:
+            return False
+    return False
+
+
+CONECTORES: Dict[str, Callable[[], Optional[Any]]] = {
+    'mongodb': conectar_mongodb,
+    'cassandra': conectar_cassandra,
+    'dgraph': conectar_dgraph,
+    'columnar': _conectar_columnar,
+    'texto': _conectar_texto,
+    'vista': _conectar_vista,
+}
+
+# menú -> opción -> (descripción, patrón de acceso)
+RUTAS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    'menu_pacientes': {
+        '1': ('Buscar paciente por ID', 'clave'),
+        '2': ('Buscar paciente por nombre', 'busqueda'),
+        '3': ('Buscar paciente por email', 'clave'),
+        '4': ('Listar pacientes por ciudad', 'particion'),
+        '5': ('Listar pacientes por tipo de sangre', 'busqueda'),
+        '6': ('Ver historial médico completo de un paciente', 'relaciones'),
+        '7': ('Ver citas de un paciente', 'particion'),
+        '8': ('Ver recetas activas de un paciente', 'relaciones'),
+        '9': ('Ver alergias de un paciente', 'relaciones'),
+        '10': ('Buscar pacientes con condiciones crónicas', 'relaciones'),
+    },
+    'menu_doctores': {
+        '1': ('Buscar doctor por ID', 'clave'),
+        '2': ('Buscar doctor por nombre', 'busqueda'),
+        '3': ('Buscar doctores por especialidad', 'busqueda'),
+        '4': ('Buscar doctores con experiencia mínima', 'busqueda'),
+        '5': ('Ver agenda de un doctor (citas del día)', 'particion'),
+        '6': ('Ver estadísticas de un doctor', 'agregacion'),
+        '7': ('Listar doctores de un hospital específico', 'relaciones'),
+        '8': ('Buscar doctores disponibles para una fecha', 'rango_temporal'),
+        '9': ('Ver pacientes tratados por un doctor', 'relaciones'),
+        '10': ('Ranking de doctores por número de citas', 'agregacion'),
+    },
+    'menu_hospitales': {
+        '1': ('Buscar hospital por ID', 'clave'),
+        '2': ('Buscar hospital por nombre', 'busqueda'),
+        '3': ('Listar hospitales por ciudad', 'busqueda'),
+        '4': ('Buscar hospitales con servicio de urgencias', 'busqueda'),
+        '5': ('Buscar hospitales por nivel de atención', 'busqueda'),
+        '6': ('Ver departamentos de un hospital', 'relaciones'),
+        '7': ('Ver doctores de un hospital', 'relaciones'),
+        '8': ('Ver capacidad y ocupación de un hospital', 'agregacion'),
+        '9': ('Estadísticas de un hospital', 'agregacion'),
+        '10': ('Comparar hospitales por ciudad', 'agregacion'),
+    },
+    'menu_citas': {
+        '1': ('Buscar cita por ID', 'clave'),
+        '2': ('Ver citas de un paciente específico', 'particion'),
+        '3': ('Ver citas de un doctor específico', 'particion'),
+        '4': ('Buscar citas por rango de fechas', 'rango_temporal'),
+        '5': ('Buscar citas por estado', 'busqueda'),
+        '6': ('Ver citas del día actual', 'rango_temporal'),
+        '7': ('Ver próximas citas (próximos 7 días)', 'rango_temporal'),
+        '8': ('Buscar citas por tipo de consulta', 'busqueda'),
+        '9': ('Ver citas con diagnósticos asociados', 'relaciones'),
+        '10': ('Estadísticas de citas por período', 'agregacion'),
+    },
+    'menu_diagnosticos': {
+        '1': ('Buscar diagnóstico por ID', 'clave'),
+        '2': ('Buscar diagnósticos por código ICD-10', 'busqueda'),
+        '3': ('Buscar diagnósticos por nombre (fulltext)', 'busqueda'),
+        '4': ('Ver diagnósticos de un paciente', 'relaciones'),
+        '5': ('Ver diagnósticos realizados por un doctor', 'relaciones'),
+        '6': ('Buscar diagnósticos por nivel de gravedad', 'busqueda'),
+        '7': ('Ver diagnósticos por rango de fechas', 'rango_temporal'),
+        '8': ('Ver tratamientos asociados a un diagnóstico', 'relaciones'),
+        '9': ('Estadísticas de diagnósticos más comunes', 'agregacion'),
+        '10': ('Buscar diagnósticos con descripción específica', 'busqueda'),
+    },
+    'menu_tratamientos': {
+        '1': ('Buscar tratamiento por ID', 'clave'),
+        '2': ('Buscar tratamientos por nombre', 'busqueda'),
+        '3': ('Ver tratamientos activos', 'busqueda'),
+        '4': ('Ver tratamientos completados', 'busqueda'),
+        '5': ('Buscar tratamientos por rango de fechas', 'rango_temporal'),
+        '6': ('Ver medicamentos de un tratamiento', 'relaciones'),
+        '7': ('Ver tratamientos de un diagnóstico específico', 'relaciones'),
+        '8': ('Buscar tratamientos por descripción (fulltext)', 'busqueda'),
+        '9': ('Estadísticas de duración de tratamientos', 'agregacion'),
+        '10': ('Ver tratamientos por efectividad', 'agregacion'),
+    },
+    'menu_medicamentos': {
+        '1': ('Buscar medicamento por ID', 'clave'),
+        '2': ('Buscar medicamento por nombre comercial', 'busqueda'),
+        '3': ('Buscar medicamento por principio activo', 'busqueda'),
+        '4': ('Ver medicamentos por vía de administración', 'busqueda'),
+        '5': ('Ver contraindicaciones de un medicamento', 'clave'),
+        '6': ('Buscar medicamentos compatibles con alergias de un paciente', 'descubrimiento'),
+        '7': ('Top 10 medicamentos más recetados', 'agregacion'),
+        '8': ('Buscar medicamentos en recetas activas', 'relaciones'),
+        '9': ('Ver medicamentos por frecuencia de uso', 'agregacion'),
+        '10': ('Buscar interacciones entre medicamentos', 'descubrimiento'),
+    },
+    'menu_recetas': {
+        '1': ('Buscar receta por ID', 'clave'),
+        '2': ('Ver recetas de un paciente', 'relaciones'),
+        '3': ('Ver recetas emitidas por un doctor', 'relaciones'),
+        '4': ('Buscar recetas por estado', 'busqueda'),
+        '5': ('Buscar recetas por rango de fechas', 'rango_temporal'),
+        '6': ('Ver medicamentos de una receta', 'relaciones'),
+        '7': ('Ver recetas próximas a vencer', 'rango_temporal'),
+        '8': ('Estadísticas de recetas por período', 'agregacion'),
+        '9': ('Ver recetas con medicamentos específicos', 'relaciones'),
+        '10': ('Buscar recetas por duración', 'busqueda'),
+    },
+    'menu_alergias': {
+        '1': ('Buscar alergia por ID', 'clave'),
+        '2': ('Ver alergias de un paciente', 'relaciones'),
+        '3': ('Buscar pacientes con una alergia específica', 'relaciones'),
+        '4': ('Buscar alergias por tipo', 'busqueda'),
+        '5': ('Buscar alergias por nivel de gravedad', 'busqueda'),
+        '6': ('Ver alergias detectadas en un período', 'rango_temporal'),
+        '7': ('Estadísticas de alergias más comunes', 'agregacion'),
+        '8': ('Buscar alergias por reacción', 'busqueda'),
+        '9': ('Verificar compatibilidad medicamento-paciente', 'descubrimiento'),
+        '10': ('Alertas de alergias para prescripción', 'descubrimiento'),
+    },
+    'menu_analisis': {
+        '1': ('Distribución de pacientes por ciudad', 'materializado'),
+        '2': ('Distribución de pacientes por tipo de sangre', 'agregacion'),
+        '3': ('Especialidades médicas más demandadas', 'materializado'),
+        '4': ('Diagnósticos más frecuentes', 'materializado'),
+        '5': ('Medicamentos más recetados', 'materializado'),
+        '6': ('Tasa de ocupación de hospitales', 'agregacion'),
+        '7': ('Análisis de citas por período', 'rango_temporal'),
+        '8': ('Tiempo promedio de tratamientos', 'agregacion'),
+        '9': ('Alergias más comunes por grupo de edad', 'agregacion'),
+        '10': ('Tendencias de diagnósticos por mes/año', 'agregacion'),
+        '11': ('Análisis de efectividad de tratamientos', 'agregacion'),
+        '12': ('Comparativa de hospitales por métricas', 'agregacion'),
+        '13': ('Análisis de carga de trabajo por doctor', 'agregacion'),
+        '14': ('Reporte de pacientes con condiciones crónicas', 'relaciones'),
+        '15': ('Dashboard general del sistema', 'materializado'),
+    },
+}
+
+
+# =============================================================================
+# ESTADÍSTICAS DE LATENCIA
+# =============================================================================
+
+class EstadisticasRuta:
+    """Latencias recientes y contadores de una ruta en una base de datos."""
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self._muestras = deque(maxlen=MUESTRAS_LATENCIA)
+
+    def registrar(self, segundos: float, error: bool = False):
+        self.llamadas += 1
+        if error:
+            self.errores += 1
+        else:
+            self._muestras.append(segundos)
+
+    def percentil(self, p: float) -> Optional[float]:
+        if not self._muestras:
+            return None
+        ordenadas = sorted(self._muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+    @property
+    def muestras(self) -> int:
+        return len(self._muestras)
+
+    def resumen(self) -> Dict[str, Any]:
+        p50, p95 = self.percentil(0.50), self.percentil(0.95)
+        return {
+            'llamadas': self.llamadas,
+            'errores': self.errores,
+            'p50_ms': round(p50 * 1000, 3) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 3) if p95 is not None else None,
+        }
+
+
+# =============================================================================
+# ROUTER
+# =============================================================================
+
+class RouterConsultas:
+    """
+    Envía cada opción de menú a la base de datos adecuada.
+
+    Las implementaciones se registran por (menú, opción, base de datos) con
+    `registrar`; una misma opción puede tener varias para permitir el
+    respaldo cuando la preferida está caída.
+    """
+
+    def __init__(self, ajustar_por_latencia: bool = False):
+        self.ajustar_por_latencia = ajustar_por_latencia
+        self._implementaciones: Dict[Tuple[str, str], Dict[str, Callable[..., Any]]] = {}
+        self._estadisticas: Dict[Tuple[str, str, str], EstadisticasRuta] = {}
+        self._caidos: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, menu: str, opcion: str, backend: str, funcion: Callable[..., Any]):
+        """Registra `funcion(conexion, **parametros)` para una opción y base."""
+        if opcion not in RUTAS.get(menu, {}):
+            raise KeyError(f"Opción {opcion} no existe en {menu}")
+        if backend not in CONECTORES:
+            raise KeyError(f"Base de datos desconocida: {backend}")
+        self._implementaciones.setdefault((menu, opcion), {})[backend] = funcion
+
+    def implementacion(self, menu: str, opcion: str, backend: str) -> Callable[..., Any]:
+        """Implementación registrada para una opción y base de datos."""
+        return self._implementaciones[(menu, opcion)][backend]
+
+    def parametros(self, menu: str, opcion: str) -> List[str]:
+        """
+        Parámetros obligatorios de una opción (los de todas sus
+        implementaciones, ya que el respaldo recibe la misma llamada).
+        """
+        nombres = []
+        for funcion in self._implementaciones.get((menu, opcion), {}).values():
+            declarados = getattr(funcion, 'parametros', None)
+            if declarados is None:
+                declarados = [
+                    p.name for p in list(inspect.signature(funcion).parameters.values())[1:]
+                    if p.default is p.empty and p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+                ]
+            nombres += [n for n in declarados if n not in nombres]
+        return nombres
+
+    def opcionales(self, menu: str, opcion: str) -> List[str]:
+        """Parámetros opcionales que declaran las implementaciones de una opción."""
+        nombres = []
+        for funcion in self._implementaciones.get((menu, opcion), {}).values():
+            nombres += [n for n in getattr(funcion, 'opcionales', ()) if n not in nombres]
+        return nombres
+
+    def candidatos(self, menu: str, opcion: str) -> List[str]:
+        """Bases de datos a intentar, en orden, para una opción."""
+        _, patron = RUTAS[menu][opcion]
+        implementadas = self._implementaciones.get((menu, opcion), {})
+        orden = [b for b in PATRONES[patron] if b in implementadas]
+        # Bases con implementación aunque el patrón no las prefiera, al final
+        orden += [b for b in implementadas if b not in orden]
+
+        if self.ajustar_por_latencia:
+            def mediana(backend):
+                estadisticas = self._estadisticas.get((menu, opcion, backend))
+                if estadisticas is None or estadisticas.muestras < MUESTRAS_MINIMAS_AJUSTE:
+                    return float('inf')
+                return estadisticas.percentil(0.5)
+            posicion = {b: i for i, b in enumerate(orden)}
+            orden.sort(key=lambda b: (mediana(b), posicion[b]))
+
+        ahora = time.monotonic()
+        disponibles = [b for b in orden if self._caidos.get(b, 0) <= ahora]
+        # Si todas figuran como caídas se intentan igualmente
+        return disponibles or orden
+
+    def _marcar_caido(self, backend: str):
+        with self._lock:
+            self._caidos[backend] = time.monotonic() + ESPERA_BACKEND_CAIDO_SEG
+
+    def _registrar_latencia(self, menu: str, opcion: str, backend: str, segundos: float, error: bool):
+        with self._lock:
+            clave = (menu, opcion, backend)
+            if clave not in self._estadisticas:
+                self._estadisticas[clave] = EstadisticasRuta()
+            self._estadisticas[clave].registrar(segundos, error)
+
+    def ejecutar(self, menu: str, opcion: str, **parametros) -> Dict[str, Any]:
+        """
+        Ejecuta una opción de menú en la primera base de datos disponible.
+
+        Returns:
+            {'backend', 'resultado', 'segundos'}
+
+        Raises:
+            NotImplementedError: Si la opción no tiene implementaciones
+            RuntimeError: Si todas las bases candidatas están caídas o sin datos
+            Exception: El error de la implementación si no es de conexión
+        """
+        candidatos = self.candidatos(menu, opcion)
+        if not candidatos:
+            raise NotImplementedError(f"{menu} opción {opcion} no tiene implementación registrada")
+
+        errores = []
+        for backend in candidatos:
+            conexion = CONECTORES[backend]()
+            if conexion is None:
+                self._marcar_caido(backend)
+                errores.append(f"{backend}: sin conexión")
+                continue
+
+            funcion = self.implementacion(menu, opcion, backend)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion(conexion, **parametros)
+            except SinDatos as e:
+                self._registrar_latencia(menu, opcion, backend, time.perf_counter() - inicio, error=False)
+                errores.append(f"{backend}: {e}")
+                continue
+            except Exception as e:
+                self._registrar_latencia(menu, opcion, backend, time.perf_counter() - inicio, error=True)
+                if not es_error_de_conexion(e):
+                    # Fallo de la consulta o de sus parámetros: la base está
+                    # sana y otra base no lo resolvería mejor
+                    raise
+                self._marcar_caido(backend)
+                errores.append(f"{backend}: {e}")
+                continue
+
+            segundos = time.perf_counter() - inicio
+            self._registrar_latencia(menu, opcion, backend, segundos, error=False)
+            return {'backend': backend, 'resultado': resultado, 'segundos': segundos}
+
+        raise RuntimeError(f"Ninguna base de datos pudo resolver {menu} opción {opcion}: " + '; '.join(errores))
+
+    def estadisticas(self) -> List[Dict[str, Any]]:
+        """Latencias medidas por ruta y base de datos."""
+        with self._lock:
+            filas = []
+            for (menu, opcion, backend), estadisticas in sorted(self._estadisticas.items()):
+                fila = {'menu': menu, 'opcion': opcion, 'descripcion': RUTAS[menu][opcion][0], 'backend': backend}
+                fila.update(estadisticas.resumen())
+                filas.append(fila)
+            return filas
+
+    def exportar_estadisticas(self, ruta: str):
+        """Guarda las latencias medidas en JSON para comparar ejecuciones."""
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.estadisticas(), f, ensure_ascii=False, indent=2)
+
+
+# =============================================================================
+# IMPLEMENTACIONES POR BASE DE DATOS
+# =============================================================================
+
+def _sin_id_mongo(documento: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if documento is None:
+        return None
+    documento = dict(documento)
+    documento['id'] = documento.pop('_id')
+    return documento
+
+
+def _mongo_por_id(coleccion: str) -> Callable[..., Any]:
+    def buscar(db, id: str):
+        return _sin_id_mongo(db[coleccion].find_one({'_id': id}))
+    return buscar
+
+
+def _mongo_paciente_por_email(db, email: str):
+    return _sin_id_mongo(db.pacientes.find_one({'email': email}))
+
+
+def _mongo_paciente_por_nombre(db, nombre: str, limite: int = 50):
+    cursor = db.pacientes.find({'$text': {'$search': nombre}}).limit(limite)
+    return [_sin_id_mongo(d) for d in cursor]
+
+
+def _mongo_pacientes_por_ciudad(db, ciudad: str, limite: int = 100):
+    return [_sin_id_mongo(d) for d in db.pacientes.find({'ciudad': ciudad}).limit(limite)]
+
+
+def _mongo_citas_de(campo: str) -> Callable[..., Any]:
+    def buscar(db, id: str, limite: int = 100):
+        cursor = db.citas.find({campo: id}).sort('fecha_hora', -1).limit(limite)
+        return [_sin_id_mongo(d) for d in cursor]
+    return buscar
+
+
+def _mongo_citas_por_rango(db, desde: datetime, hasta: datetime, limite: int = 1000):
+    cursor = db.citas.find({'fecha_hora': {'$gte': desde, '$lt': hasta}}).sort('fecha_hora', 1).limit(limite)
+    return [_sin_id_mongo(d) for d in cursor]
+
+
+def _cassandra_filas(resultado) -> List[Dict[str, Any]]:
+    return [dict(fila._asdict()) for fila in resultado]
+
+
+def _cassandra_citas_de(tabla: str, columna: str) -> Callable[..., Any]:
+    def buscar(session, id: str, limite: int = 100):
+        consulta = f"SELECT * FROM {tabla} WHERE {columna} = %s LIMIT %s"
+        return _cassandra_filas(session.execute(consulta, (id, limite)))
+    return buscar
+
+
+def _cassandra_pacientes_por_ciudad(session, ciudad: str, limite: int = 100):
+    consulta = "SELECT * FROM pacientes_por_ciudad WHERE ciudad = %s LIMIT %s"
+    return _cassandra_filas(session.execute(consulta, (ciudad, limite)))
+
+
+def _cassandra_citas_por_rango(session, desde: datetime, hasta: datetime, limite: int = 1000):
+    # citas_por_fecha está particionada por (día, cubeta): se consultan todas
+    # las particiones del rango en paralelo
+    from particiones_cassandra import leer_citas_por_fecha
+    return leer_citas_por_fecha(session, desde, hasta, limite)
+
+
+def _cassandra_doctores_disponibles(session, especialidad: str, fecha_hora: datetime, duracion: int = 30):
+    from disponibilidad import doctores_disponibles
+    return doctores_disponibles(session, especialidad, fecha_hora, duracion)
+
+
+def _cassandra_citas_del_dia(session, dias: int = 1, limite: int = 1000):
+    hoy = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    return _cassandra_citas_por_rango(session, hoy, hoy + timedelta(days=dias), limite)
+
+
+def _mongo_citas_del_dia(db, dias: int = 1, limite: int = 1000):
+    hoy = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    return _mongo_citas_por_rango(db, hoy, hoy + timedelta(days=dias), limite)
+
+
+def _dgraph(nombre: str, renombrar: Optional[Dict[str, str]] = None, **fijos) -> Callable[..., Any]:
+    """
+    Adapta una consulta de catalogo_consultas a la firma del router.
+
+    Las consultas pasan por la caché de cache_consultas.
+
+    `renombrar` traduce parámetros del menú (p. ej. id) a variables de la
+    consulta; los parámetros que la consulta no declara (p. ej. limite en
+    una consulta sin paginación) se ignoran para que el respaldo acepte la
+    misma llamada que la base preferida.
+    """
+    consulta = obtener_consulta(nombre)
+    renombrar = renombrar or {}
+    desde_menu = {variable: parametro for parametro, variable in renombrar.items()}
+
+    def ejecutar(cliente, **parametros):
+        valores = dict(fijos)
+        for clave, valor in parametros.items():
+            clave = renombrar.get(clave, clave)
+            if clave in consulta.variables:
+                valores[clave] = valor
+        return consultar(cliente, nombre, **valores)
+    ejecutar.parametros = [
+        desde_menu.get(variable, variable) for variable in consulta.variables
+        if variable not in consulta.opcionales and variable not in fijos
+    ]
+    return ejecutar
+
+
+# Parámetros opcionales que se piden por menú para cada informe de analitica.py
+OPCIONALES_ANALISIS = {
+    '7': ('desde', 'hasta'),
+}
+
+
+def _columnar(opcion: str) -> Callable[..., Any]:
+    """
+    Adapta un informe de analitica.py a la firma del router.
+
+    Como en _dgraph, los parámetros que el informe no acepta se ignoran.
+    """
+    def ejecutar(extracto, **parametros):
+        from analitica import INFORMES
+        funcion = INFORMES[opcion][1]
+        aceptados = inspect.signature(funcion).parameters
+        return funcion(extracto, **{k: v for k, v in parametros.items() if k in aceptados})
+    ejecutar.opcionales = OPCIONALES_ANALISIS.get(opcion, ())
+    return ejecutar
+
+
+_CONSULTA_NOMBRES_MEDICAMENTOS = """
+{
+  medicamentos(func: eq(medicamento.id, [%s])) {
+    medicamento.id
+    medicamento.nombre_comercial
+  }
+}
+"""
+
+_PATRON_ID_MEDICAMENTO = re.compile(r'M\d+')
+
+
+def _nombres_medicamentos(ids: List[str]) -> Dict[str, Optional[str]]:
+    """id -> nombre comercial, de Dgraph en una consulta (None si no responde)."""
+    from catalogo_consultas import ConsultaParametrizada
+
+    ids = [i for i in ids if _PATRON_ID_MEDICAMENTO.fullmatch(i)]
+    cliente = conectar_dgraph()
+    if not ids or cliente is None:
+        return {}
+    texto = _CONSULTA_NOMBRES_MEDICAMENTOS % ', '.join(json.dumps(i) for i in ids)
+    consulta = ConsultaParametrizada('medicamentos_nombres', 'Nombres comerciales de varios medicamentos', texto, {})
+    try:
+        datos = consultar_generada(cliente, 'medicamentos_nombres', consulta, {'ids': ids})
+    except Exception as e:
+        if not es_error_de_conexion(e):
+            raise
+        return {}
+    return {m['medicamento.id']: m.get('medicamento.nombre_comercial') for m in datos.get('medicamentos', [])}
+
+
+def _con_nombres(dimension: str, filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Añade a los rankings de contadores los nombres que incluye analitica.py."""
+    if dimension == 'diagnosticos_por_icd10':
+        from catalogos_referencia import icd10
+        catalogo = icd10()
+        for fila in filas:
+            registro = catalogo.obtener(fila['codigo_icd10'])
+            fila['nombre'] = registro['nombre'] if registro else None
+    elif dimension == 'recetas_por_medicamento':
+        nombres = _nombres_medicamentos([fila['id'] for fila in filas])
+        filas = [{'id': f['id'], 'nombre_comercial': nombres.get(f['id']), 'total': f['total']} for f in filas]
+    return filas
+
+
+def _contadores(opcion: str, dimension: str, clave: str) -> Callable[..., Any]:
+    """
+    Ranking de menu_analisis leído de los contadores de contadores.py.
+
+    Los contadores son acumulados sin fecha: si se pide un período
+    (desde/hasta) el informe se calcula sobre el extracto columnar. Una
+    dimensión vacía (contadores sin sembrar) no es un resultado: el router
+    pasa a la siguiente base.
+    """
+    def ejecutar(db, limite: int = 10, desde: Optional[str] = None, hasta: Optional[str] = None):
+        if desde or hasta:
+            extracto = _conectar_columnar()
+            if extracto is None:
+                raise RuntimeError('los contadores no admiten período y no hay extracto columnar')
+            return _columnar(opcion)(extracto, limite=limite, desde=desde, hasta=hasta)
+        from contadores import iniciar_reconciliador, ranking
+        iniciar_reconciliador()
+        filas = ranking(db, dimension, clave, limite)
+        if not filas:
+            raise SinDatos(f"contadores de {dimension} vacíos")
+        return _con_nombres(dimension, filas)
+    return ejecutar
+
+
+def _contadores_dashboard(db, limite: int = 5):
+    from contadores import dashboard, iniciar_reconciliador
+    iniciar_reconciliador()
+    resultado = dashboard(db, limite)
+    if not resultado['totales']:
+        raise SinDatos("contadores vacíos")
+    return resultado
+
+
+def _vista_historial(vistas, id: str):
+    """
+    Historial completo con las tres bases a la vez (consultas_async). Si
+    fallan todas, es un error de conexión y el router recurre a Dgraph.
+    """
+    vista = vistas.historial_completo(id)
+    if len(vista['errores']) == len(vista) - 1:
+        raise ConnectionError('; '.join(f"{n}: {e}" for n, e in vista['errores'].items()))
+    return vista
+
+
+def _texto(entidad: str, campo: str, parametro: str) -> Callable[..., Any]:
+    """Búsqueda en un índice de busqueda_texto con el parámetro del menú."""
+    def ejecutar(indices, limite: int = 10, **parametros):
+        return indices.buscar(entidad, campo, parametros[parametro], limite)
+    ejecutar.parametros = [parametro]
+    return ejecutar
+
+
+# Las variables DQL no admiten listas en eq(): los códigos van literales en
+# el texto, por eso solo se aceptan con la forma de un código ICD-10
+_PATRON_CODIGO_ICD10 = re.compile(r'[A-Z0-9][A-Z0-9.\-]*')
+
+_CONSULTA_ICD10_LISTA = """
+{
+  diagnosticos(func: eq(diagnostico.codigo_icd10, [%s]), first: %d) {
+    diagnostico.codigo_icd10
+    diagnostico.nombre
+    diagnostico.descripcion
+    diagnostico.fecha_diagnostico
+    diagnostico.gravedad
+    diagnostico.paciente {
+      paciente.nombre
+      fecha_nacimiento: paciente.fecha_nacimiento
+    }
+    diagnostico.cita {
+      cita.fecha_hora
+      cita.motivo
+    }
+  }
+}
+"""
+
+
+def _dgraph_icd10(cliente, codigo: str, limite: int = 1000):
+    """
+    Diagnósticos de un código ICD-10 y de su jerarquía en el catálogo de
+    catalogos_referencia ('E11' o 'E11.*' incluyen E11.0, E11.9...), en
+    una sola consulta eq(diagnostico.codigo_icd10, [...]).
+    """
+    from catalogo_consultas import ConsultaParametrizada
+    from catalogos_referencia import codigos_icd10
+
+    codigos = [c for c in codigos_icd10(codigo) if _PATRON_CODIGO_ICD10.fullmatch(c)]
+    if not codigos:
+        return {'diagnosticos': []}
+    texto = _CONSULTA_ICD10_LISTA % (', '.join(json.dumps(c) for c in codigos), int(limite))
+    consulta = ConsultaParametrizada('diagnosticos_icd10_lista', 'Diagnósticos de varios códigos ICD-10', texto, {})
+    return consultar_generada(cliente, 'diagnosticos_icd10', consulta, {'codigos': codigos, 'limite': int(limite)})
+
+
+def _dgraph_compatibilidad(cliente, paciente: str, medicamento):
+    """Comprobación contra el índice en memoria de compatibilidad_alergias."""
+    from compatibilidad_alergias import obtener_indice
+    medicamentos = [medicamento] if isinstance(medicamento, str) else list(medicamento)
+    return obtener_indice(cliente).verificar_receta(paciente, medicamentos)
+
+
+def _dgraph_alertas_prescripcion(cliente, paciente: str, limite: int = 100):
+    from compatibilidad_alergias import obtener_indice
+    return obtener_indice(cliente).alertas(paciente)[:limite]
+
+
+def crear_router(ajustar_por_latencia: bool = False) -> RouterConsultas:
+    """Crea un router con las implementaciones disponibles registradas."""
+    router = RouterConsultas(ajustar_por_latencia)
+
+    router.registrar('menu_pacientes', '1', 'mongodb', _mongo_por_id('pacientes'))
+    router.registrar('menu_pacientes', '2', 'mongodb', _mongo_paciente_por_nombre)
+    router.registrar('menu_pacientes', '3', 'mongodb', _mongo_paciente_por_email)
+    router.registrar('menu_pacientes', '4', 'cassandra', _cassandra_pacientes_por_ciudad)
+    router.registrar('menu_pacientes', '4', 'mongodb', _mongo_pacientes_por_ciudad)
+    router.registrar('menu_pacientes', '7', 'cassandra', _cassandra_citas_de('citas_por_paciente', 'paciente_id'))
+    router.registrar('menu_pacientes', '7', 'mongodb', _mongo_citas_de('paciente_id'))
+
+    router.registrar('menu_doctores', '1', 'mongodb', _mongo_por_id('doctores'))
+    router.registrar('menu_doctores', '8', 'cassandra', _cassandra_doctores_disponibles)
+    router.registrar('menu_hospitales', '1', 'mongodb', _mongo_por_id('hospitales'))
+
+    router.registrar('menu_citas', '1', 'mongodb', _mongo_por_id('citas'))
+    router.registrar('menu_citas', '2', 'cassandra', _cassandra_citas_de('citas_por_paciente', 'paciente_id'))
+    router.registrar('menu_citas', '2', 'mongodb', _mongo_citas_de('paciente_id'))
+    router.registrar('menu_citas', '3', 'cassandra', _cassandra_citas_de('citas_por_doctor', 'doctor_id'))
+    router.registrar('menu_citas', '3', 'mongodb', _mongo_citas_de('doctor_id'))
+    router.registrar('menu_citas', '4', 'cassandra', _cassandra_citas_por_rango)
+    router.registrar('menu_citas', '4', 'mongodb', _mongo_citas_por_rango)
+    router.registrar('menu_citas', '6', 'cassandra', _cassandra_citas_del_dia)
+    router.registrar('menu_citas', '6', 'mongodb', _mongo_citas_del_dia)
+    router.registrar('menu_citas', '7', 'cassandra', lambda s, limite=1000: _cassandra_citas_del_dia(s, 7, limite))
+    router.registrar('menu_citas', '7', 'mongodb', lambda db, limite=1000: _mongo_citas_del_dia(db, 7, limite))
+
+    router.registrar('menu_pacientes', '2', 'dgraph', _dgraph('buscar_paciente_nombre'))
+    router.registrar('menu_pacientes', '3', 'dgraph', _dgraph('paciente_por_email'))
+    router.registrar('menu_pacientes', '5', 'dgraph', _dgraph('pacientes_tipo_sangre'))
+    router.registrar('menu_pacientes', '6', 'dgraph', _dgraph('historial_completo', {'id': 'paciente'}))
+    router.registrar('menu_pacientes', '8', 'dgraph', _dgraph('recetas_paciente', {'id': 'paciente'}, estado='activa'))
+    router.registrar('menu_pacientes', '10', 'dgraph', _dgraph('pacientes_condiciones_cronicas'))
+
+    router.registrar('menu_doctores', '3', 'dgraph', _dgraph('doctores_por_especialidad'))
+    router.registrar('menu_doctores', '4', 'dgraph', _dgraph('doctores_experiencia'))
+    router.registrar('menu_doctores', '7', 'dgraph', _dgraph('doctores_hospital', {'id': 'hospital'}))
+
+    router.registrar('menu_hospitales', '4', 'dgraph', _dgraph('hospitales_urgencias', urgencias=True))
+    router.registrar('menu_hospitales', '6', 'dgraph', _dgraph('doctores_hospital', {'id': 'hospital'}))
+    router.registrar('menu_hospitales', '7', 'dgraph', _dgraph('doctores_hospital', {'id': 'hospital'}))
+    router.registrar('menu_hospitales', '9', 'dgraph', _dgraph('estadisticas_hospital', {'id': 'hospital'}))
+
+    router.registrar('menu_citas', '9', 'dgraph', _dgraph('citas_con_diagnosticos'))
+
+    router.registrar('menu_diagnosticos', '2', 'dgraph', _dgraph_icd10)
+    router.registrar('menu_diagnosticos', '3', 'dgraph', _dgraph('diagnosticos_fulltext'))
+
+    router.registrar('menu_tratamientos', '3', 'dgraph', _dgraph('tratamientos_por_estado', estado='activo'))
+    router.registrar('menu_tratamientos', '4', 'dgraph', _dgraph('tratamientos_por_estado', estado='completado'))
+
+    router.registrar('menu_medicamentos', '7', 'dgraph', _dgraph('medicamentos_top'))
+    router.registrar('menu_alergias', '3', 'dgraph', _dgraph('pacientes_alergia'))
+    router.registrar('menu_alergias', '9', 'dgraph', _dgraph_compatibilidad)
+    router.registrar('menu_alergias', '10', 'dgraph', _dgraph_alertas_prescripcion)
+
+    router.registrar('menu_analisis', '3', 'dgraph', _dgraph('especialidades_demandadas'))
+    router.registrar('menu_analisis', '5', 'dgraph', _dgraph('medicamentos_top'))
+    router.registrar('menu_analisis', '14', 'dgraph', _dgraph('pacientes_condiciones_cronicas'))
+    for opcion in RUTAS['menu_analisis']:
+        router.registrar('menu_analisis', opcion, 'columnar', _columnar(opcion))
+
+    router.registrar('menu_analisis', '1', 'mongodb', _contadores('1', 'pacientes_por_ciudad', 'ciudad'))
+    router.registrar('menu_analisis', '3', 'mongodb', _contadores('3', 'citas_por_especialidad', 'especialidad'))
+    router.registrar('menu_analisis', '4', 'mongodb', _contadores('4', 'diagnosticos_por_icd10', 'codigo_icd10'))
+    router.registrar('menu_analisis', '5', 'mongodb', _contadores('5', 'recetas_por_medicamento', 'id'))
+    router.registrar('menu_analisis', '15', 'mongodb', _contadores_dashboard)
+
+    router.registrar('menu_pacientes', '6', 'vista', _vista_historial)
+    router.registrar('menu_pacientes', '2', 'texto', _texto('pacientes', 'nombre', 'nombre'))
+    router.registrar('menu_diagnosticos', '3', 'texto', _texto('diagnosticos', 'descripcion', 'texto'))
+    router.registrar('menu_diagnosticos', '10', 'texto', _texto('diagnosticos', 'descripcion', 'texto'))
+    router.registrar('menu_medicamentos', '2', 'texto', _texto('medicamentos', 'nombre_comercial', 'nombre'))
+    router.registrar('menu_medicamentos', '3', 'texto', _texto('medicamentos', 'principio_activo', 'principio_activo'))
+
+    return router
+
+
+_router: Optional[RouterConsultas] = None
+
+
+def obtener_router() -> RouterConsultas:
+    """Retorna el router compartido del proceso."""
+    global _router
+    if _router is None:
+        _router = crear_router()
+    return _router
@@ -0,0 +1,1115 @@
+"""
+Sincronización por Captura de Cambios (CDC)
+Plataforma de Integración de Datos de Salud
+
+Alternativa a las tres escrituras independientes de coordinador_escrituras:
+MongoDB es el sistema de registro y este servicio sigue sus change streams
+de pacientes, doctores y citas para llevar los cambios a las tablas de
+consulta de Cassandra y a los nodos de Dgraph.
+
+- Los eventos se agrupan en lotes: una ventana de VENTANA_CDC_SEG desde el
+  primer evento, o MAX_LOTE_CDC entidades distintas. Dentro de un lote los
+  cambios de una misma entidad se fusionan y solo se aplica su último
+  estado (un alta seguida de tres cambios de estado es una sola escritura)
+- Las escrituras son idempotentes: INSERT por clave primaria y DELETE de
+  las filas cuya clave cambió en Cassandra, upsert por <tipo>.id en Dgraph.
+  Un lote se puede repetir entero sin efectos
+- El token de reanudación del change stream se guarda en SQLite
+  (data/cdc.sqlite) solo cuando el lote se ha aplicado en todos los
+  destinos, así que tras una caída se retoma desde el último lote completo
+  (entrega al menos una vez). Si un destino falla el lote se reintenta con
+  espera exponencial y el token no avanza
+- Cambiar el apellido de un paciente o la fecha de una cita cambia la clave
+  primaria de sus filas en Cassandra y mueve sus franjas. Para borrar las
+  filas antiguas el servicio guarda en el mismo SQLite los campos de clave
+  de lo último que replicó. Lo cargado en masa no ha pasado por el servicio:
+  en el primer arranque (sin checkpoint) se siembra ese estado desde
+  MongoDB, y además se pide la imagen previa de cada evento
+  (changeStreamPreAndPostImages, MongoDB 6.0+), que se usa cuando no hay
+  estado replicado de la entidad
+- Las métricas de retraso miden, por entidad aplicada, el tiempo desde su
+  primer evento del lote (wallTime del change stream) hasta que queda
+  escrita en todos los destinos
+
+Los change streams exigen un replica set (basta uno de un solo nodo:
+mongod --replSet rs0 y rs.initiate()). FuenteCambiosMemoria imita un change
+stream en memoria para pruebas locales sin MongoDB.
+
+Uso:
+    python sincronizacion_cdc.py                  # MongoDB -> Cassandra y Dgraph
+    python sincronizacion_cdc.py --simular 50000  # fuente y destino en memoria
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from cache_consultas import invalidar_por_crud
+from contadores import aplicar_deltas, deltas_por_cambio
+from modelos import MODELOS
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Colecciones seguidas, en el orden en que se aplica cada lote (las citas
+# enlazan pacientes y doctores que pueden llegar en el mismo lote)
+COLECCIONES_CDC = ('pacientes', 'doctores', 'citas')
+
+# Ventana de agrupación desde el primer evento de un lote y tamaño máximo
+VENTANA_CDC_SEG = float(os.getenv('VENTANA_CDC_SEG', 0.5))
+MAX_LOTE_CDC = int(os.getenv('MAX_LOTE_CDC', 500))
+
+# Espera máxima entre reintentos de un lote fallido
+ESPERA_MAX_CDC_SEG = 30.0
+
+# Retrasos recientes con los que se calculan p50 y p99
+MUESTRAS_RETRASO = 10000
+
+# Escrituras de Cassandra en vuelo por fase de un lote
+EN_VUELO_CASSANDRA = 256
+
+RUTA_CDC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cdc.sqlite')
+
+# (colección, operación) -> opción de menu_crud, para invalidar la caché de
+# consultas. Los contadores del dashboard se actualizan aparte, con
+# contadores.deltas_por_cambio
+OPCION_CRUD_CDC = {
+    ('pacientes', 'insert'): '1',
+    ('pacientes', 'update'): '2',
+    ('pacientes', 'delete'): '3',
+    ('doctores', 'insert'): '4',
+    ('doctores', 'update'): '5',
+    ('doctores', 'delete'): '5',
+    ('citas', 'insert'): '7',
+    ('citas', 'update'): '8',
+    ('citas', 'delete'): '8',
+}
+
+# Campos de una cita que determinan sus franjas en ocupacion_por_especialidad
+CAMPOS_OCUPACION = ('doctor_id', 'fecha_hora', 'duracion_minutos', 'estado')
+
+
+# =============================================================================
+# EVENTOS
+# =============================================================================
+
+class Cambio:
+    """
+    Cambio de una entidad: el documento completo tras el cambio (None si se
+    eliminó), el token del evento y su marca de tiempo (epoch).
+    """
+
+    __slots__ = ('token', 'coleccion', 'operacion', 'id', 'documento', 'marca', 'previo')
+
+    def __init__(self, token: str, coleccion: str, operacion: str, id: str,
+                 documento: Optional[Dict[str, Any]], marca: float,
+                 previo: Optional[Dict[str, Any]] = None):
+        self.token = token
+        self.coleccion = coleccion
+        # 'replace' equivale a 'update'; un update cuyo documento ya no
+        # existe (fullDocument nulo) equivale a 'delete'
+        if documento is None:
+            operacion = 'delete'
+        elif operacion == 'replace':
+            operacion = 'update'
+        self.operacion = operacion
+        self.id = id
+        self.documento = documento
+        self.marca = marca
+        # Documento antes del cambio (fullDocumentBeforeChange), si lo hay
+        self.previo = previo
+
+    @property
+    def clave(self) -> Tuple[str, str]:
+        return self.coleccion, self.id
+
+    @property
+    def registro(self) -> Optional[Dict[str, Any]]:
+        """Registro con el formato del generador, o None si se eliminó."""
+        if self.documento is None:
+            return None
+        return MODELOS[self.coleccion].desde_documento(self.documento).a_registro()
+
+    @property
+    def anterior(self) -> Optional[Dict[str, Any]]:
+        """Registro de la imagen previa, o None si el evento no la trae."""
+        if self.previo is None:
+            return None
+        return MODELOS[self.coleccion].desde_documento(self.previo).a_registro()
+
+    def fusionar(self, siguiente: 'Cambio') -> 'Cambio':
+        """
+        Cambio equivalente a aplicar self y después siguiente.
+
+        Conserva la marca más antigua (el retraso cuenta desde el primer
+        cambio sin replicar) y la imagen previa del primero, y un alta
+        seguida de cambios sigue siendo alta.
+        """
+        operacion = siguiente.operacion
+        if self.operacion == 'insert' and operacion == 'update':
+            operacion = 'insert'
+        return Cambio(siguiente.token, siguiente.coleccion, operacion, siguiente.id,
+                      siguiente.documento, min(self.marca, siguiente.marca), self.previo)
+
+
+class FuenteCambiosMongo:
+    """Change stream de la base de MongoDB filtrado a COLECCIONES_CDC."""
+
+    nombre = 'mongodb'
+
+    def __init__(self, db: Any, colecciones: Iterable[str] = COLECCIONES_CDC):
+        self.db = db
+        self.colecciones = list(colecciones)
+
+    def habilitar_preimagenes(self) -> bool:
+        """
+        Activa changeStreamPreAndPostImages en las colecciones seguidas
+        (MongoDB 6.0+). Sin ellas el servicio depende del estado sembrado.
+        """
+        try:
+            for coleccion in self.colecciones:
+                self.db.command('collMod', coleccion, changeStreamPreAndPostImages={'enabled': True})
+        except Exception as e:
+            print(f"⚠ Sin imágenes previas en el change stream: {e}")
+            return False
+        return True
+
+    def abrir(self, token: Optional[str] = None, espera: float = VENTANA_CDC_SEG) -> '_LectorMongo':
+        from bson import json_util
+
+        flujo = self.db.watch(
+            [{'$match': {
+                'ns.coll': {'$in': self.colecciones},
+                'operationType': {'$in': ['insert', 'update', 'replace', 'delete']},
+            }}],
+            full_document='updateLookup',
+            full_document_before_change='whenAvailable',
+            resume_after=json_util.loads(token) if token else None,
+            max_await_time_ms=max(1, int(espera * 1000)),
+        )
+        return _LectorMongo(flujo)
+
+
+class _LectorMongo:
+    def __init__(self, flujo: Any):
+        self._flujo = flujo
+
+    def siguiente(self, espera: float) -> Optional[Cambio]:
+        # try_next() espera como mucho max_await_time_ms en el servidor
+        from bson import json_util
+
+        evento = self._flujo.try_next()
+        if evento is None:
+            return None
+        if evento.get('wallTime') is not None:
+            marca = evento['wallTime'].replace(tzinfo=timezone.utc).timestamp()
+        elif evento.get('clusterTime') is not None:
+            marca = float(evento['clusterTime'].time)
+        else:
+            marca = time.time()
+        return Cambio(json_util.dumps(evento['_id']), evento['ns']['coll'], evento['operationType'],
+                      evento['documentKey']['_id'], evento.get('fullDocument'), marca,
+                      evento.get('fullDocumentBeforeChange'))
+
+    def cerrar(self):
+        self._flujo.close()
+
+
+class FuenteCambiosMemoria:
+    """
+    Colecciones en memoria que emiten eventos como un change stream.
+
+    Los tokens son números de secuencia, de modo que abrir(token) reanuda
+    justo después de un evento igual que resume_after en MongoDB. Con
+    `preimagenes` cada update y delete lleva el documento anterior, como
+    con changeStreamPreAndPostImages.
+    """
+
+    nombre = 'memoria'
+
+    def __init__(self, colecciones: Iterable[str] = COLECCIONES_CDC, preimagenes: bool = True):
+        self.colecciones: Dict[str, Dict[str, Dict[str, Any]]] = {c: {} for c in colecciones}
+        self.preimagenes = preimagenes
+        self._eventos: List[Cambio] = []
+        self._condicion = threading.Condition()
+
+    def _emitir(self, coleccion: str, operacion: str, id: str, documento: Optional[Dict[str, Any]],
+                previo: Optional[Dict[str, Any]] = None):
+        with self._condicion:
+            token = str(len(self._eventos) + 1)
+            self._eventos.append(Cambio(token, coleccion, operacion, id, documento, time.time(),
+                                        previo if self.preimagenes else None))
+            self._condicion.notify_all()
+
+    def cargar(self, coleccion: str, documentos: Iterable[Dict[str, Any]]):
+        """Carga masiva sin eventos (como populate_mongodb antes de arrancar el servicio)."""
+        with self._condicion:
+            for documento in documentos:
+                self.colecciones[coleccion][documento['_id']] = dict(documento)
+
+    def insertar(self, coleccion: str, documento: Dict[str, Any]):
+        with self._condicion:
+            self.colecciones[coleccion][documento['_id']] = dict(documento)
+            self._emitir(coleccion, 'insert', documento['_id'], dict(documento))
+
+    def actualizar(self, coleccion: str, id: str, cambios: Dict[str, Any]):
+        """Equivale a update_one({'_id': id}, {'$set': cambios})."""
+        with self._condicion:
+            documento = self.colecciones[coleccion].get(id)
+            if documento is None:
+                return
+            previo = dict(documento)
+            documento.update(cambios)
+            self._emitir(coleccion, 'update', id, dict(documento), previo)
+
+    def eliminar(self, coleccion: str, id: str):
+        with self._condicion:
+            previo = self.colecciones[coleccion].pop(id, None)
+            if previo is not None:
+                self._emitir(coleccion, 'delete', id, None, previo)
+
+    def abrir(self, token: Optional[str] = None, espera: float = VENTANA_CDC_SEG) -> '_LectorMemoria':
+        return _LectorMemoria(self, int(token or 0))
+
+    def __len__(self) -> int:
+        return len(self._eventos)
+
+
+class _LectorMemoria:
+    def __init__(self, fuente: FuenteCambiosMemoria, posicion: int):
+        self._fuente = fuente
+        self._posicion = posicion
+
+    def siguiente(self, espera: float) -> Optional[Cambio]:
+        fuente = self._fuente
+        with fuente._condicion:
+            if not fuente._condicion.wait_for(lambda: self._posicion < len(fuente._eventos), timeout=espera):
+                return None
+            cambio = fuente._eventos[self._posicion]
+            self._posicion += 1
+            return cambio
+
+    def cerrar(self):
+        pass
+
+
+# =============================================================================
+# CHECKPOINT Y ÚLTIMO ESTADO REPLICADO
+# =============================================================================
+
+def _clave_primaria(ddl: str) -> Tuple[str, ...]:
+    """Columnas de PRIMARY KEY ((a, b), c, d) de un CREATE TABLE."""
+    texto = re.search(r'PRIMARY KEY\s*\((.+)\)', ddl).group(1)
+    return tuple(c.strip() for c in texto.replace('(', '').replace(')', '').split(','))
+
+
+def tablas_de(coleccion: str) -> Dict[str, Dict[str, Any]]:
+    """Tablas de Cassandra con filas de una colección, con su clave primaria."""
+    from populate_cassandra import TABLAS
+
+    return {
+        nombre: dict(definicion, clave=_clave_primaria(definicion['ddl']))
+        for nombre, definicion in TABLAS.items()
+        if definicion['origen'] == coleccion
+    }
+
+
+def campos_replicados(coleccion: str) -> Tuple[str, ...]:
+    """
+    Campos que hay que recordar de una entidad para borrar sus filas
+    antiguas: los de las claves primarias de sus tablas (más las franjas
+    ocupadas en el caso de las citas).
+    """
+    modelo = MODELOS[coleccion]
+    campos = []
+    for definicion in tablas_de(coleccion).values():
+        for columna in definicion['clave']:
+            if columna in (f"{modelo.prefijo}_id", 'cubeta'):
+                continue
+            campos.append('fecha_hora' if columna == 'fecha' else columna)
+    if coleccion == 'citas':
+        campos += CAMPOS_OCUPACION
+    return tuple(dict.fromkeys(campos))
+
+
+class EstadoReplicacion:
+    """
+    Token del último lote aplicado y campos de clave de cada entidad
+    replicada, en SQLite. Ambos se actualizan en la misma transacción.
+    """
+
+    def __init__(self, ruta: str = RUTA_CDC, nombre: str = 'mongodb'):
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                nombre TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                actualizado TEXT NOT NULL
+            )
+        """)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS replicado (
+                coleccion TEXT NOT NULL,
+                id TEXT NOT NULL,
+                campos TEXT NOT NULL,
+                PRIMARY KEY (coleccion, id)
+            )
+        """)
+        self._conexion.commit()
+        self._campos = {c: campos_replicados(c) for c in COLECCIONES_CDC}
+
+    def token(self) -> Optional[str]:
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT token FROM checkpoint WHERE nombre = ?", (self.nombre,)).fetchone()
+        return fila[0] if fila else None
+
+    def campos_de(self, coleccion: str, registro: Dict[str, Any]) -> Dict[str, Any]:
+        return {c: registro.get(c) for c in self._campos.get(coleccion, ())}
+
+    def sembrar(self, coleccion: str, registros: Iterable[Dict[str, Any]], lote: int = 10000) -> int:
+        """
+        Registra como replicadas entidades cargadas sin pasar por el servicio
+        (carga masiva). No sustituye lo que ya hubiera replicado.
+
+        Returns:
+            Entidades leídas
+        """
+        total = 0
+        filas = []
+        for registro in registros:
+            filas.append((coleccion, registro['id'],
+                          json.dumps(self.campos_de(coleccion, registro), ensure_ascii=False, default=str)))
+            if len(filas) >= lote:
+                total += self._sembrar_filas(filas)
+                filas = []
+        return total + self._sembrar_filas(filas)
+
+    def _sembrar_filas(self, filas: List[Tuple[str, str, str]]) -> int:
+        with self._lock, self._conexion:
+            self._conexion.executemany("INSERT OR IGNORE INTO replicado VALUES (?, ?, ?)", filas)
+        return len(filas)
+
+    def anteriores(self, claves: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Último registro replicado (solo campos de clave) de cada entidad."""
+        resultado = {}
+        with self._lock:
+            for coleccion, id in claves:
+                fila = self._conexion.execute(
+                    "SELECT campos FROM replicado WHERE coleccion = ? AND id = ?", (coleccion, id)).fetchone()
+                if fila:
+                    resultado[(coleccion, id)] = dict(json.loads(fila[0]), id=id)
+        return resultado
+
+    def confirmar(self, token: str, lote: List[Cambio]):
+        """Avanza el checkpoint y guarda el estado replicado del lote."""
+        altas = []
+        bajas = []
+        for cambio in lote:
+            registro = cambio.registro
+            if registro is None:
+                bajas.append(cambio.clave)
+                continue
+            campos = self.campos_de(cambio.coleccion, registro)
+            altas.append((cambio.coleccion, cambio.id, json.dumps(campos, ensure_ascii=False, default=str)))
+        with self._lock, self._conexion:
+            self._conexion.executemany("DELETE FROM replicado WHERE coleccion = ? AND id = ?", bajas)
+            self._conexion.executemany("INSERT OR REPLACE INTO replicado VALUES (?, ?, ?)", altas)
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO checkpoint VALUES (?, ?, ?)",
+                (self.nombre, token, datetime.utcnow().isoformat()))
+
+
+# =============================================================================
+# DESTINOS
+# =============================================================================
+
+def _ejecutar_fase(session: Any, escrituras: List[Any], en_vuelo: int):
+    # Cada escritura es una función que lanza execute_async (o devuelve None,
+    # o una lista de futuros como registrar_ocupacion)
+    for i in range(0, len(escrituras), en_vuelo):
+        futuros = [escribir() for escribir in escrituras[i:i + en_vuelo]]
+        for futuro in futuros:
+            for pendiente in (futuro if isinstance(futuro, list) else [futuro]):
+                if pendiente is not None:
+                    pendiente.result()
+
+
+def _cambian_franjas(anterior: Optional[Dict[str, Any]], nuevo: Optional[Dict[str, Any]]) -> bool:
+    if anterior is None or nuevo is None:
+        return anterior is not nuevo
+    return any(anterior.get(c) != nuevo.get(c) for c in CAMPOS_OCUPACION)
+
+
+class DestinoCassandra:
+    """
+    Tablas de consulta de Cassandra y ocupacion_por_especialidad.
+
+    Cada lote se aplica en dos fases: primero se borran las filas cuya clave
+    primaria cambió (o cuya entidad se eliminó) y se liberan las franjas
+    antiguas; después se insertan las filas nuevas y se marcan las franjas.
+    """
+
+    nombre = 'cassandra'
+
+    def __init__(self, session: Any, en_vuelo: int = EN_VUELO_CASSANDRA):
+        self.session = session
+        self.en_vuelo = en_vuelo
+        self._tablas = {c: tablas_de(c) for c in COLECCIONES_CDC}
+        self._sentencias: Dict[str, Any] = {}
+
+    def _sentencia(self, clave: str, consulta: str) -> Any:
+        if clave not in self._sentencias:
+            sentencia = self.session.prepare(consulta)
+            sentencia.is_idempotent = True
+            self._sentencias[clave] = sentencia
+        return self._sentencias[clave]
+
+    def _insert(self, tabla: str) -> Any:
+        from populate_cassandra import preparar_insert
+
+        if 'insert:' + tabla not in self._sentencias:
+            self._sentencias['insert:' + tabla] = preparar_insert(self.session, tabla)
+        return self._sentencias['insert:' + tabla]
+
+    def _delete(self, tabla: str, clave: Tuple[str, ...]) -> Any:
+        condiciones = ' AND '.join(f"{columna} = ?" for columna in clave)
+        return self._sentencia('delete:' + tabla, f"DELETE FROM {tabla} WHERE {condiciones}")
+
+    def aplicar(self, lote: List[Cambio], anteriores: Dict[Tuple[str, str], Dict[str, Any]]) -> int:
+        from disponibilidad import ESTADOS_LIBRES, obtener_plantilla, registrar_ocupacion
+
+        session = self.session
+        borrados: List[Any] = []
+        escrituras: List[Any] = []
+        for cambio in lote:
+            modelo = MODELOS[cambio.coleccion]
+            nuevo = cambio.registro
+            anterior = anteriores.get(cambio.clave)
+            entidad = modelo.desde_registro(nuevo) if nuevo is not None else None
+            entidad_anterior = modelo.desde_registro(anterior) if anterior is not None else None
+
+            for tabla, definicion in self._tablas[cambio.coleccion].items():
+                clave = definicion['clave']
+                clave_nueva = entidad.a_fila(clave) if entidad is not None else None
+                if entidad_anterior is not None:
+                    clave_anterior = entidad_anterior.a_fila(clave)
+                    if clave_anterior != clave_nueva and None not in clave_anterior:
+                        borrados.append(partial(session.execute_async, self._delete(tabla, clave), clave_anterior))
+                # Sin valor en la clave de partición o de clustering no hay fila
+                if clave_nueva is not None and None not in clave_nueva:
+                    escrituras.append(partial(session.execute_async, self._insert(tabla),
+                                              entidad.a_fila(definicion['columnas'])))
+
+            if cambio.coleccion == 'doctores' and nuevo is not None:
+                obtener_plantilla().agregar(nuevo['id'], nuevo.get('especialidad'))
+            elif cambio.coleccion == 'citas' and _cambian_franjas(anterior, nuevo):
+                if anterior is not None and anterior.get('estado') not in ESTADOS_LIBRES:
+                    borrados.append(partial(registrar_ocupacion, session, anterior, True))
+                if nuevo is not None:
+                    escrituras.append(partial(registrar_ocupacion, session, nuevo))
+
+        _ejecutar_fase(session, borrados, self.en_vuelo)
+        _ejecutar_fase(session, escrituras, self.en_vuelo)
+        return 0
+
+
+def _aristas_cdc(coleccion: str) -> List[Tuple[str, str, bool]]:
+    """
+    Aristas de ARISTAS en las que participa la propia entidad, como
+    (campo de referencia, predicado, True si sale de la entidad).
+    """
+    from populate_dgraph import ARISTAS
+
+    aristas = []
+    for sujeto, predicado, objeto in ARISTAS.get(coleccion, []):
+        if sujeto == 'self':
+            aristas.append((objeto, predicado, True))
+        elif objeto == 'self':
+            aristas.append((sujeto, predicado, False))
+    return aristas
+
+
+class DestinoDgraph:
+    """
+    Nodos de Dgraph, con un bloque upsert por colección y lote.
+
+    La consulta localiza cada entidad por <tipo>.id, los nodos que le
+    apuntan (con los predicados inversos ~) y los nodos referenciados. Una
+    primera mutación borra las aristas y los escalares anteriores; la
+    segunda escribe el estado nuevo. Las entidades nuevas se crean porque
+    uid(v) de una variable vacía se comporta como un blank node.
+    """
+
+    nombre = 'dgraph'
+
+    def __init__(self, cliente: Any):
+        self.cliente = cliente
+        self._aristas = {c: _aristas_cdc(c) for c in COLECCIONES_CDC}
+
+    def peticion(self, coleccion: str, lote: List[Cambio]) -> Tuple[str, Dict[str, str], str, str]:
+        """Consulta, variables y N-Quads (borrar, escribir) del upsert de un lote."""
+        from populate_dgraph import literal_rdf
+
+        modelo = MODELOS[coleccion]
+        prefijo = modelo.prefijo
+        aristas = self._aristas[coleccion]
+        escalares = [predicado for _, predicado in modelo._predicados if predicado]
+
+        bloques = []
+        variables: Dict[str, str] = {}
+        referencias: Dict[Tuple[str, str], str] = {}
+        borrar = []
+        escribir = []
+
+        def referencia(campo: str, id: str) -> str:
+            objetivo = campo.rsplit('_', 1)[0]
+            if (objetivo, id) not in referencias:
+                k = len(referencias)
+                referencias[(objetivo, id)] = f"r{k}"
+                variables[f"$r{k}"] = id
+                bloques.append(f"r{k} as ref{k}(func: eq({objetivo}.id, $r{k})) {{ uid }}")
+            return referencias[(objetivo, id)]
+
+        for i, cambio in enumerate(lote):
+            e = f"e{i}"
+            variables[f"$i{i}"] = cambio.id
+            bloques.append(f"{e} as var(func: eq({prefijo}.id, $i{i}))")
+            inversas = [(f"a{i}_{j}", predicado) for j, (_, predicado, sale) in enumerate(aristas) if not sale]
+            if inversas:
+                bloques.append(f"var(func: uid({e})) {{ "
+                               + ' '.join(f"{v} as ~{p}" for v, p in inversas) + " }")
+            borrar += [f"uid({v}) <{p}> uid({e}) ." for v, p in inversas]
+
+            registro = cambio.registro
+            if registro is None:
+                borrar.append(f"uid({e}) * * .")
+                continue
+
+            nodo = modelo.desde_registro(registro).a_nodo()
+            escribir.append(f'uid({e}) <dgraph.type> "{nodo["dgraph.type"]}" .')
+            for predicado in escalares:
+                if predicado in nodo:
+                    escribir.append(f"uid({e}) <{predicado}> {literal_rdf(nodo[predicado])} .")
+                else:
+                    borrar.append(f"uid({e}) <{predicado}> * .")
+            for campo, predicado, sale in aristas:
+                if sale:
+                    borrar.append(f"uid({e}) <{predicado}> * .")
+                valor = registro.get(campo)
+                for id in (valor if isinstance(valor, list) else [valor]):
+                    if not id:
+                        continue
+                    r = referencia(campo, id)
+                    escribir.append(f"uid({e}) <{predicado}> uid({r}) ." if sale
+                                    else f"uid({r}) <{predicado}> uid({e}) .")
+
+        firma = ', '.join(f"{nombre}: string" for nombre in variables)
+        consulta = f"query cdc({firma}) {{\n  " + '\n  '.join(bloques) + "\n}"
+        return consulta, variables, '\n'.join(borrar), '\n'.join(escribir)
+
+    def aplicar(self, lote: List[Cambio], anteriores: Dict[Tuple[str, str], Dict[str, Any]]) -> int:
+        """Aplica el lote. Retorna cuántas referencias no existen aún en Dgraph."""
+        pendientes = 0
+        for coleccion in COLECCIONES_CDC:
+            cambios = [c for c in lote if c.coleccion == coleccion]
+            if not cambios:
+                continue
+            consulta, variables, borrar, escribir = self.peticion(coleccion, cambios)
+            txn = self.cliente.txn()
+            try:
+                mutaciones = [txn.create_mutation(del_nquads=borrar)] if borrar else []
+                if escribir:
+                    mutaciones.append(txn.create_mutation(set_nquads=escribir))
+                peticion = txn.create_request(query=consulta, variables=variables,
+                                              mutations=mutaciones, commit_now=True)
+                respuesta = txn.do_request(peticion)
+            finally:
+                txn.discard()
+            # Las aristas hacia nodos que no existen se omiten; la verificación
+            # de consistencia (consistencia.py) las detecta después
+            encontrados = json.loads(respuesta.json or b'{}')
+            pendientes += sum(1 for variable in variables
+                              if variable.startswith('$r') and not encontrados.get(f"ref{variable[2:]}"))
+        return pendientes
+
+
+class DestinoMemoria:
+    """
+    Último registro de cada entidad, en memoria (pruebas y --simular).
+
+    Además imita lo que DestinoCassandra deja en Cassandra: las filas de cada
+    tabla de consulta por clave primaria y las citas de cada franja. Como
+    allí, una fila o franja antigua solo desaparece si `anteriores` trae su
+    clave, así que la simulación detecta las filas huérfanas.
+    """
+
+    nombre = 'memoria'
+
+    def __init__(self):
+        self.entidades: Dict[str, Dict[str, Dict[str, Any]]] = {c: {} for c in COLECCIONES_CDC}
+        self._tablas = {c: tablas_de(c) for c in COLECCIONES_CDC}
+        # tabla -> clave primaria -> id de la entidad
+        self.filas: Dict[str, Dict[Tuple, str]] = {t: {} for c in COLECCIONES_CDC for t in self._tablas[c]}
+        # (doctor_id, fecha, slot) -> citas que ocupan la franja
+        self.ocupacion: Dict[Tuple[str, Any, int], set] = {}
+        self.escrituras = 0
+
+    def _franjas(self, cita: Dict[str, Any], liberar: bool = False):
+        from disponibilidad import ESTADOS_LIBRES, MINUTOS_POR_SLOT, franjas
+
+        if cita.get('estado') in ESTADOS_LIBRES:
+            return
+        inicio, _ = MODELOS['citas'].desde_registro(cita).a_fila(('fecha_hora', 'cita_id'))
+        for fecha, slots in franjas(inicio,
+                                    cita.get('duracion_minutos') or MINUTOS_POR_SLOT):
+            for slot in slots:
+                clave = (cita['doctor_id'], fecha, slot)
+                if liberar:
+                    self.ocupacion.get(clave, set()).discard(cita['id'])
+                    if not self.ocupacion.get(clave, True):
+                        del self.ocupacion[clave]
+                else:
+                    self.ocupacion.setdefault(clave, set()).add(cita['id'])
+
+    def cargar(self, coleccion: str, registros: Iterable[Dict[str, Any]]):
+        """Carga masiva sin pasar por el servicio (populate_cassandra)."""
+        for registro in registros:
+            self.entidades[coleccion][registro['id']] = registro
+            entidad = MODELOS[coleccion].desde_registro(registro)
+            for tabla, definicion in self._tablas[coleccion].items():
+                clave = entidad.a_fila(definicion['clave'])
+                if None not in clave:
+                    self.filas[tabla][clave] = registro['id']
+            if coleccion == 'citas':
+                self._franjas(registro)
+
+    def aplicar(self, lote: List[Cambio], anteriores: Dict[Tuple[str, str], Dict[str, Any]]) -> int:
+        for cambio in lote:
+            modelo = MODELOS[cambio.coleccion]
+            registro = cambio.registro
+            anterior = anteriores.get(cambio.clave)
+            if anterior is not None:
+                entidad_anterior = modelo.desde_registro(anterior)
+                entidad = modelo.desde_registro(registro) if registro is not None else None
+                for tabla, definicion in self._tablas[cambio.coleccion].items():
+                    clave_anterior = entidad_anterior.a_fila(definicion['clave'])
+                    if entidad is None or clave_anterior != entidad.a_fila(definicion['clave']):
+                        self.filas[tabla].pop(clave_anterior, None)
+            if cambio.coleccion == 'citas' and _cambian_franjas(anterior, registro) and anterior is not None:
+                self._franjas(anterior, liberar=True)
+            if registro is None:
+                self.entidades[cambio.coleccion].pop(cambio.id, None)
+            else:
+                self.cargar(cambio.coleccion, [registro])
+            self.escrituras += 1
+        return 0
+
+
+# =============================================================================
+# MÉTRICAS
+# =============================================================================
+
+class MetricasReplicacion:
+    """Contadores y retraso de replicación (segundos desde el evento)."""
+
+    def __init__(self, muestras: int = MUESTRAS_RETRASO):
+        self._lock = threading.Lock()
+        self.contadores: Counter = Counter()
+        self.por_coleccion: Counter = Counter()
+        self._retrasos = deque(maxlen=muestras)
+        self._pendiente_desde: Optional[float] = None
+        self.ultimo_token: Optional[str] = None
+
+    def recibido(self, cambio: Cambio, fusionado: bool):
+        with self._lock:
+            self.contadores['eventos'] += 1
+            self.contadores['coalescidos'] += fusionado
+            self.por_coleccion[cambio.coleccion] += 1
+            if self._pendiente_desde is None or cambio.marca < self._pendiente_desde:
+                self._pendiente_desde = cambio.marca
+
+    def aplicado(self, lote: List[Cambio], token: str, referencias_pendientes: int):
+        ahora = time.time()
+        with self._lock:
+            self.contadores['lotes'] += 1
+            self.contadores['aplicados'] += len(lote)
+            self._retrasos.extend(ahora - c.marca for c in lote)
+            self.contadores['referencias_pendientes'] += referencias_pendientes
+            self._pendiente_desde = None
+            self.ultimo_token = token
+
+    def error(self):
+        with self._lock:
+            self.contadores['errores'] += 1
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            retrasos = sorted(self._retrasos)
+            pendiente_desde = self._pendiente_desde
+
+        def percentil(q: float) -> float:
+            return round(retrasos[int(q * (len(retrasos) - 1))], 4) if retrasos else 0.0
+
+        return {
+            'eventos': self.contadores['eventos'],
+            'coalescidos': self.contadores['coalescidos'],
+            'aplicados': self.contadores['aplicados'],
+            'lotes': self.contadores['lotes'],
+            'errores': self.contadores['errores'],
+            'referencias_pendientes': self.contadores['referencias_pendientes'],
+            'retraso_seg': round(time.time() - pendiente_desde, 4) if pendiente_desde else 0.0,
+            'retraso_p50_seg': percentil(0.50),
+            'retraso_p99_seg': percentil(0.99),
+            'retraso_max_seg': round(retrasos[-1], 4) if retrasos else 0.0,
+            'por_coleccion': dict(self.por_coleccion),
+            'ultimo_token': self.ultimo_token,
+        }
+
+
+# =============================================================================
+# SERVICIO
+# =============================================================================
+
+class SincronizadorCDC(threading.Thread):
+    """Hilo que sigue una fuente de cambios y aplica lotes en los destinos."""
+
+    def __init__(self, fuente: Any, destinos: List[Any], estado: Optional[EstadoReplicacion] = None,
+                 ventana: float = VENTANA_CDC_SEG, max_lote: int = MAX_LOTE_CDC, invalidar: bool = True,
+                 contar: bool = True):
+        super().__init__(name='sincronizador-cdc', daemon=True)
+        self.fuente = fuente
+        self.destinos = list(destinos)
+        self.estado = estado or EstadoReplicacion()
+        self.ventana = ventana
+        self.max_lote = max_lote
+        self.invalidar = invalidar
+        self.contar = contar
+        self.metricas = MetricasReplicacion()
+        self._detener = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.destinos)), thread_name_prefix='cdc')
+
+    def recoger(self, lector: Any) -> Tuple[List[Cambio], Optional[str]]:
+        """
+        Lee un lote: espera como mucho una ventana al primer evento y desde
+        él una ventana más (o hasta max_lote entidades distintas).
+
+        Returns:
+            (cambios fusionados por entidad, token del último evento leído)
+        """
+        pendientes: 'OrderedDict[Tuple[str, str], Cambio]' = OrderedDict()
+        token = None
+        limite = time.monotonic() + self.ventana
+        while len(pendientes) < self.max_lote and not self._detener.is_set():
+            espera = limite - time.monotonic()
+            if espera <= 0:
+                break
+            cambio = lector.siguiente(espera)
+            if cambio is None:
+                if not pendientes:
+                    break
+                continue
+            if not pendientes:
+                limite = time.monotonic() + self.ventana
+            anterior = pendientes.get(cambio.clave)
+            pendientes[cambio.clave] = anterior.fusionar(cambio) if anterior else cambio
+            self.metricas.recibido(cambio, anterior is not None)
+            token = cambio.token
+        # Orden de aplicación: pacientes y doctores antes que las citas
+        orden = {c: i for i, c in enumerate(COLECCIONES_CDC)}
+        return sorted(pendientes.values(), key=lambda c: orden[c.coleccion]), token
+
+    def aplicar(self, lote: List[Cambio], token: str):
+        """
+        Aplica un lote en todos los destinos a la vez y avanza el checkpoint.
+
+        El estado anterior de cada entidad es el último replicado o, si no
+        lo hay (p. ej. cargada en masa sin sembrar), la imagen previa del
+        evento.
+        """
+        anteriores = {c.clave: c.anterior for c in lote if c.previo is not None}
+        anteriores.update(self.estado.anteriores(c.clave for c in lote))
+        futuros = [self._pool.submit(destino.aplicar, lote, anteriores) for destino in self.destinos]
+        referencias_pendientes = sum(futuro.result() for futuro in futuros)
+        self.estado.confirmar(token, lote)
+        self.metricas.aplicado(lote, token, referencias_pendientes)
+        if self.invalidar:
+            for cambio in lote:
+                registro = cambio.registro or dict(anteriores.get(cambio.clave, {}), id=cambio.id)
+                invalidar_por_crud(OPCION_CRUD_CDC[(cambio.coleccion, cambio.operacion)], registro)
+        if self.contar:
+            # Una vez por lote confirmado; si el lote se repite tras una
+            # caída, la deriva la corrige la reconciliación
+            aplicar_deltas([delta for cambio in lote for delta in deltas_por_cambio(
+                cambio.coleccion, cambio.operacion, cambio.registro, anteriores.get(cambio.clave))])
+
+    def _aplicar_con_reintentos(self, lote: List[Cambio], token: str) -> bool:
+        espera = 0.5
+        while not self._detener.is_set():
+            try:
+                self.aplicar(lote, token)
+                return True
+            except Exception as e:
+                # El lote se repite entero: las escrituras son idempotentes
+                self.metricas.error()
+                print(f"✗ Error al aplicar un lote de {len(lote)} cambios: {e}")
+                self._detener.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX_CDC_SEG)
+        return False
+
+    def drenar(self) -> Dict[str, Any]:
+        """Aplica lo que haya en la fuente desde el checkpoint y vuelve."""
+        lector = self.fuente.abrir(self.estado.token(), self.ventana)
+        try:
+            while True:
+                lote, token = self.recoger(lector)
+                if not lote or not self._aplicar_con_reintentos(lote, token):
+                    break
+        finally:
+            lector.cerrar()
+        return self.metricas.resumen()
+
+    def run(self):
+        espera = 0.5
+        while not self._detener.is_set():
+            # Si se pierde el change stream se reabre desde el checkpoint; lo
+            # leído y no confirmado se vuelve a recibir
+            try:
+                lector = self.fuente.abrir(self.estado.token(), self.ventana)
+            except Exception as e:
+                self.metricas.error()
+                print(f"✗ No se pudo abrir el flujo de cambios: {e}")
+                self._detener.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX_CDC_SEG)
+                continue
+            try:
+                while not self._detener.is_set():
+                    lote, token = self.recoger(lector)
+                    if lote:
+                        self._aplicar_con_reintentos(lote, token)
+                espera = 0.5
+            except Exception as e:
+                self.metricas.error()
+                print(f"✗ Error en el flujo de cambios: {e}")
+                self._detener.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX_CDC_SEG)
+            finally:
+                lector.cerrar()
+
+    def detener(self):
+        self._detener.set()
+
+
+_sincronizador: Optional[SincronizadorCDC] = None
+_sincronizador_lock = threading.Lock()
+
+
+def destinos_disponibles() -> List[Any]:
+    """DestinoCassandra y DestinoDgraph de las bases con conexión."""
+    from connect import conectar_cassandra, conectar_dgraph
+
+    destinos = []
+    session = conectar_cassandra()
+    if session is not None:
+        destinos.append(DestinoCassandra(session))
+    cliente = conectar_dgraph()
+    if cliente is not None:
+        destinos.append(DestinoDgraph(cliente))
+    return destinos
+
+
+def sembrar_desde_mongodb(db: Any, estado: EstadoReplicacion) -> Dict[str, int]:
+    """
+    Siembra el estado replicado con lo que hay en MongoDB, para que el
+    primer cambio de clave de una entidad cargada en masa borre sus filas.
+
+    Returns:
+        Entidades leídas por colección
+    """
+    sembradas = {}
+    for coleccion in COLECCIONES_CDC:
+        if not campos_replicados(coleccion):
+            continue
+        modelo = MODELOS[coleccion]
+        sembradas[coleccion] = estado.sembrar(
+            coleccion, (modelo.desde_documento(d).a_registro() for d in db[coleccion].find()))
+    return sembradas
+
+
+def iniciar_sincronizador() -> Optional[SincronizadorCDC]:
+    """
+    Arranca (una sola vez por proceso) el servicio MongoDB -> Cassandra y
+    Dgraph. Sin checkpoint (primer arranque tras la carga masiva) siembra
+    antes el estado replicado.
+    """
+    global _sincronizador
+    from connect import conectar_mongodb
+
+    with _sincronizador_lock:
+        if _sincronizador is None or not _sincronizador.is_alive():
+            db = conectar_mongodb()
+            if db is None:
+                print("✗ MongoDB no disponible: no se inicia la sincronización")
+                return None
+            fuente = FuenteCambiosMongo(db)
+            fuente.habilitar_preimagenes()
+            estado = EstadoReplicacion()
+            if estado.token() is None:
+                sembradas = sembrar_desde_mongodb(db, estado)
+                print(f"✓ Estado replicado sembrado: {sembradas}")
+            _sincronizador = SincronizadorCDC(fuente, destinos_disponibles(), estado)
+            _sincronizador.start()
+        return _sincronizador
+
+
+# =============================================================================
+# SIMULACIÓN LOCAL
+# =============================================================================
+
+def simular(operaciones: int, semilla: int = 42, ventana: float = 0.05,
+            max_lote: int = MAX_LOTE_CDC, preimagenes: bool = True, sembrar: bool = True) -> Dict[str, Any]:
+    """
+    Carga en masa la fuente y el destino (sin eventos, como populate_*) y
+    aplica una carga de altas, cambios y bajas sobre FuenteCambiosMemoria
+    mientras un SincronizadorCDC la replica en un DestinoMemoria.
+
+    Los cambios de fecha de las citas y de ciudad y apellido de los pacientes
+    cambian claves primarias: el destino solo coincide si el servicio conoce
+    el estado anterior por el estado sembrado o por las imágenes previas.
+
+    Returns:
+        Métricas del sincronizador y si el destino coincide con la fuente
+    """
+    from populate_mongodb import a_documento
+    from utils.data_generator import DataGenerator
+
+    fuente = FuenteCambiosMemoria(preimagenes=preimagenes)
+    destino = DestinoMemoria()
+    estado = EstadoReplicacion(':memory:')
+    generador = DataGenerator(semilla)
+    for tipo in COLECCIONES_CDC:
+        registros = list(generador.generar(tipo))
+        fuente.cargar(tipo, (a_documento(tipo, r) for r in registros))
+        destino.cargar(tipo, (MODELOS[tipo].desde_documento(a_documento(tipo, r)).a_registro() for r in registros))
+        if sembrar:
+            estado.sembrar(tipo, (MODELOS[tipo].desde_documento(d).a_registro()
+                                  for d in fuente.colecciones[tipo].values()))
+
+    sincronizador = SincronizadorCDC(fuente, [destino], estado,
+                                     ventana=ventana, max_lote=max_lote, invalidar=False, contar=False)
+    sincronizador.start()
+
+    aleatorio = random.Random(semilla)
+    citas = list(fuente.colecciones['citas'])
+    pacientes = list(fuente.colecciones['pacientes'])
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        tirada = aleatorio.random()
+        if tirada < 0.6:
+            fuente.actualizar('citas', aleatorio.choice(citas),
+                              {'estado': aleatorio.choice(['programada', 'confirmada', 'completada', 'cancelada'])})
+        elif tirada < 0.75:
+            fuente.actualizar('pacientes', aleatorio.choice(pacientes),
+                              {'telefono': f"+52 55 {aleatorio.randrange(10**8):08d}"})
+        elif tirada < 0.8:
+            fuente.actualizar('pacientes', aleatorio.choice(pacientes),
+                              {'ciudad': aleatorio.choice(['Guadalajara', 'Monterrey', 'Puebla', 'Mérida'])})
+        elif tirada < 0.9:
+            fuente.eliminar('citas', aleatorio.choice(citas))
+        else:
+            fuente.actualizar('citas', aleatorio.choice(citas),
+                              {'fecha_hora': datetime(2025, 1, 1, aleatorio.randrange(8, 18))})
+
+    # Espera a que el servicio alcance el último evento emitido
+    while len(fuente) and sincronizador.metricas.ultimo_token != str(len(fuente)):
+        time.sleep(0.01)
+    segundos = time.perf_counter() - inicio
+    sincronizador.detener()
+    sincronizador.join()
+
+    # Lo que habría dejado una carga masiva del estado final de la fuente
+    esperado = DestinoMemoria()
+    for coleccion, documentos in fuente.colecciones.items():
+        esperado.cargar(coleccion, (MODELOS[coleccion].desde_documento(d).a_registro() for d in documentos.values()))
+    filas_huerfanas = sum(len(set(destino.filas[t]) - set(esperado.filas[t])) for t in destino.filas)
+    franjas_huerfanas = sum(len(citas - esperado.ocupacion.get(clave, set()))
+                            for clave, citas in destino.ocupacion.items())
+    coincide = (destino.entidades == esperado.entidades and destino.filas == esperado.filas
+                and destino.ocupacion == esperado.ocupacion)
+    resumen = sincronizador.metricas.resumen()
+    resumen.update(segundos=round(segundos, 3), escrituras_destino=destino.escrituras, coincide=coincide,
+                   filas_huerfanas=filas_huerfanas, franjas_huerfanas=franjas_huerfanas)
+    return resumen
+
+
+def imprimir_metricas(metricas: Dict[str, Any]):
+    print(f"  Eventos: {metricas['eventos']:,} ({metricas['coalescidos']:,} fusionados) | "
+          f"entidades aplicadas: {metricas['aplicados']:,} en {metricas['lotes']:,} lotes | "
+          f"errores: {metricas['errores']}")
+    print(f"  Retraso actual: {metricas['retraso_seg']:.3f}s | p50: {metricas['retraso_p50_seg']:.3f}s | "
+          f"p99: {metricas['retraso_p99_seg']:.3f}s | máx: {metricas['retraso_max_seg']:.3f}s")
+    if metricas['referencias_pendientes']:
+        print(f"  ⚠ {metricas['referencias_pendientes']:,} aristas hacia nodos que aún no existen en Dgraph")
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    """Sincroniza MongoDB con Cassandra y Dgraph por change streams."""
+    parser = argparse.ArgumentParser(description="Sincronización por change streams de MongoDB")
+    parser.add_argument('--simular', type=int, default=None, metavar='OPERACIONES',
+                        help="Prueba local con fuente y destino en memoria")
+    parser.add_argument('--sin-preimagenes', action='store_true',
+                        help="Simular sin imágenes previas en los eventos")
+    parser.add_argument('--sin-sembrar', action='store_true',
+                        help="Simular sin sembrar el estado replicado tras la carga masiva")
+    parser.add_argument('--intervalo', type=float, default=10.0, help="Segundos entre informes de métricas")
+    args = parser.parse_args()
+
+    if args.simular is not None:
+        print(f"Simulación: {args.simular:,} operaciones sobre la fuente en memoria...")
+        metricas = simular(args.simular, preimagenes=not args.sin_preimagenes, sembrar=not args.sin_sembrar)
+        imprimir_metricas(metricas)
+        print(f"  {metricas['segundos']}s | escrituras en destino: {metricas['escrituras_destino']:,}")
+        if metricas['filas_huerfanas'] or metricas['franjas_huerfanas']:
+            print(f"  ⚠ {metricas['filas_huerfanas']:,} filas y {metricas['franjas_huerfanas']:,} "
+                  f"franjas con una clave antigua")
+        print("✓ El destino coincide con la fuente" if metricas['coincide']
+              else "✗ El destino no coincide con la fuente")
+        return
+
+    sincronizador = iniciar_sincronizador()
+    if sincronizador is None:
+        return
+    print(f"✓ Sincronizando {', '.join(COLECCIONES_CDC)} hacia "
+          f"{', '.join(d.nombre for d in sincronizador.destinos) or 'ningún destino'} (Ctrl+C para salir)")
+    try:
+        while sincronizador.is_alive():
+            time.sleep(args.intervalo)
+            imprimir_metricas(sincronizador.metricas.resumen())
+    except KeyboardInterrupt:
+        sincronizador.detener()
+        sincronizador.join()
+        print("✓ Sincronización detenida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Configuración de pytest.
+
+Las pruebas no necesitan las bases de datos: usan los sustitutos en memoria
+(FuenteCambiosMemoria, DestinoMemoria, los índices en proceso) y archivos en
+tmp_path. Los módulos del proyecto están en la raíz del repositorio.
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+# Volumen pequeño del generador para las pruebas (las referencias entre
+# tipos siguen siendo válidas)
+VOLUMEN_PRUEBAS = {
+    'hospitales': 3,
+    'departamentos': 10,
+    'doctores': 12,
+    'pacientes': 60,
+    'historiales': 60,
+    'alergias': 40,
+    'medicamentos': 30,
+    'citas': 150,
+    'diagnosticos': 80,
+    'tratamientos': 60,
+    'recetas': 60,
+}
+
+
+@pytest.fixture
+def volumen():
+    return dict(VOLUMEN_PRUEBAS)
+
+
+@pytest.fixture
+def generador(volumen):
+    from utils.data_generator import DataGenerator
+    return DataGenerator(7, volumen)
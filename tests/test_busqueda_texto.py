@@ -0,0 +1,82 @@
+"""Pruebas de busqueda_texto.py: normalización, búsqueda, instantánea y diario."""
+
+import pytest
+
+from busqueda_texto import IndicesBusqueda, a_una_edicion, indexar_crud, normalizar
+
+PACIENTES = [
+    {'id': 'P001', 'nombre': 'María', 'apellido': 'González'},
+    {'id': 'P002', 'nombre': 'José', 'apellido': 'Gómez'},
+    {'id': 'P003', 'nombre': 'Mario', 'apellido': 'Gonzalo'},
+    {'id': 'P004', 'nombre': 'María', 'apellido': 'González'},
+]
+MEDICAMENTOS = [
+    {'id': 'M001', 'nombre_comercial': 'Advil', 'principio_activo': 'Ibuprofeno'},
+    {'id': 'M002', 'nombre_comercial': 'Tempra', 'principio_activo': 'Paracetamol'},
+]
+
+
+@pytest.fixture
+def indices(tmp_path):
+    return IndicesBusqueda.desde_registros({'pacientes': PACIENTES, 'medicamentos': MEDICAMENTOS},
+                                           str(tmp_path))
+
+
+def _ids(resultados):
+    return [r['id'] for r in resultados]
+
+
+def test_normalizar():
+    assert normalizar('María de la Cruz González') == ['maria', 'cruz', 'gonzalez']
+    assert normalizar('Arritmias cardíacas', singular=True) == ['arritmia', 'cardiaca']
+    assert a_una_edicion('gonzales', 'gonzalez')
+    assert not a_una_edicion('gomez', 'gonzalez')
+
+
+def test_buscar_sin_acentos_por_prefijo_y_con_errata(indices):
+    assert set(_ids(indices.buscar('pacientes', 'nombre', 'maria gonzalez'))) == {'P001', 'P004'}
+    assert set(_ids(indices.buscar('pacientes', 'nombre', 'gonz'))) == {'P001', 'P003', 'P004'}
+    assert set(_ids(indices.buscar('pacientes', 'nombre', 'Gonzales'))) >= {'P001', 'P004'}
+    assert _ids(indices.buscar('medicamentos', 'principio_activo', 'ibuprofno')) == ['M001']
+    assert indices.buscar('pacientes', 'nombre', 'inexistente') == []
+    assert len(indices.buscar('pacientes', 'nombre', 'gonz', limite=2)) == 2
+
+
+def test_instantanea_y_diario(indices, tmp_path):
+    directorio = str(tmp_path)
+    indices.guardar(reiniciar_diario=True)
+
+    indexar_crud('1', {'id': 'P005', 'nombre': 'Lucía', 'apellido': 'Fernández'}, directorio)
+    indexar_crud('3', {'id': 'P002'}, directorio)
+
+    cargados = IndicesBusqueda.cargar(directorio)
+    assert _ids(cargados.buscar('pacientes', 'nombre', 'lucia')) == ['P005']
+    assert cargados.buscar('pacientes', 'nombre', 'jose gomez') == []
+
+    # Otro proceso ve las escrituras posteriores al cargar
+    indexar_crud('2', {'id': 'P001', 'nombre': 'Marta', 'apellido': 'González'}, directorio)
+    assert _ids(cargados.buscar('pacientes', 'nombre', 'marta')) == ['P001']
+
+
+def test_reconstruccion_de_otro_proceso_recarga_la_instantanea(indices, tmp_path):
+    directorio = str(tmp_path)
+    indices.guardar(reiniciar_diario=True)
+    indexar_crud('1', {'id': 'P005', 'nombre': 'Lucía', 'apellido': 'Fernández'}, directorio)
+    lector = IndicesBusqueda.cargar(directorio)
+    generacion = lector.generacion
+
+    # Otro proceso reconstruye (diario nuevo y más corto) y registra una alta
+    nuevo = IndicesBusqueda.desde_registros({'pacientes': PACIENTES[:1]}, directorio)
+    nuevo.guardar(reiniciar_diario=True)
+    indexar_crud('1', {'id': 'P006', 'nombre': 'Andrés', 'apellido': 'Ruiz'}, directorio)
+
+    assert _ids(lector.buscar('pacientes', 'nombre', 'andres')) == ['P006']
+    assert lector.buscar('pacientes', 'nombre', 'lucia') == []
+    assert lector.generacion != generacion
+
+
+def test_sin_indice_construido(tmp_path):
+    assert IndicesBusqueda.cargar(str(tmp_path)) is None
+    # Sin diario no se registra nada
+    indexar_crud('1', {'id': 'P001', 'nombre': 'Ana', 'apellido': 'Pérez'}, str(tmp_path))
+    assert not list(tmp_path.iterdir())
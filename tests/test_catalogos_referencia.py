@@ -0,0 +1,86 @@
+"""Pruebas de catalogos_referencia.py sobre catálogos compilados en tmp_path."""
+
+import os
+import threading
+
+import pytest
+
+from catalogos_referencia import CATALOGOS, CatalogoMapeado, abrir_catalogo, compilar, ruta_catalogo
+
+CODIGOS = [
+    {'codigo': 'E11', 'nombre': 'Diabetes mellitus tipo 2', 'descripcion': 'DM2'},
+    {'codigo': 'E11.9', 'nombre': 'DM2 sin complicaciones', 'descripcion': ''},
+    {'codigo': 'E11.0', 'nombre': 'DM2 con coma', 'descripcion': ''},
+    {'codigo': 'E10', 'nombre': 'Diabetes mellitus tipo 1', 'descripcion': ''},
+    {'codigo': 'I10', 'nombre': 'Hipertensión esencial', 'descripcion': 'HTA'},
+]
+
+
+def _compilar_icd10(ruta, registros=CODIGOS):
+    definicion = CATALOGOS['icd10']
+    return compilar(ruta, definicion['campos'], registros, definicion['clave'], definicion['normalizacion'])
+
+
+@pytest.fixture
+def catalogo(tmp_path):
+    ruta = str(tmp_path / 'icd10.cat')
+    _compilar_icd10(ruta)
+    catalogo = CatalogoMapeado(ruta)
+    yield catalogo
+    catalogo.cerrar()
+
+
+def test_obtener_normaliza_la_clave(catalogo):
+    assert catalogo.obtener(' e11.9 ')['nombre'] == 'DM2 sin complicaciones'
+    assert 'I10' in catalogo
+    assert catalogo.obtener('Z99') is None
+    assert len(list(catalogo)) == len(CODIGOS)
+
+
+def test_prefijo_devuelve_la_jerarquia_en_orden(catalogo):
+    assert catalogo.claves('E11') == ['E11', 'E11.0', 'E11.9']
+    assert catalogo.claves('E11.*') == catalogo.claves('E11*') == catalogo.claves('E11')
+    assert catalogo.claves('E1') == ['E10', 'E11', 'E11.0', 'E11.9']
+    assert [r['codigo'] for r in catalogo.prefijo('E11', limite=2)] == ['E11', 'E11.0']
+    assert catalogo.claves('X') == []
+
+
+def test_listas_y_texto(tmp_path):
+    definicion = CATALOGOS['medicamentos']
+    ruta = str(tmp_path / 'medicamentos.cat')
+    compilar(ruta, definicion['campos'], [
+        {'nombre_comercial': 'Amoxil', 'principio_activo': 'Amoxicilina', 'dosis': '500 mg',
+         'via_administracion': 'Oral', 'frecuencia': 'Cada 8 horas',
+         'contraindicaciones': ['Alergia a penicilinas', 'Mononucleosis']},
+    ], definicion['clave'], definicion['normalizacion'], definicion['listas'])
+    catalogo = CatalogoMapeado(ruta)
+    try:
+        registro = catalogo.obtener('  AMOXIL ')
+        assert registro['contraindicaciones'] == ['Alergia a penicilinas', 'Mononucleosis']
+    finally:
+        catalogo.cerrar()
+
+
+def test_compilaciones_concurrentes_no_se_pisan(tmp_path):
+    ruta = str(tmp_path / 'icd10.cat')
+    hilos = [threading.Thread(target=_compilar_icd10, args=(ruta,)) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert os.listdir(tmp_path) == ['icd10.cat']
+    catalogo = CatalogoMapeado(ruta)
+    try:
+        assert catalogo.claves('E11') == ['E11', 'E11.0', 'E11.9']
+    finally:
+        catalogo.cerrar()
+
+
+def test_abrir_catalogo_ve_la_recompilacion(tmp_path):
+    directorio = str(tmp_path)
+    _compilar_icd10(ruta_catalogo('icd10', directorio), CODIGOS[:1])
+    assert abrir_catalogo('icd10', directorio).claves('E11') == ['E11']
+
+    _compilar_icd10(ruta_catalogo('icd10', directorio))
+    assert abrir_catalogo('icd10', directorio).claves('E11') == ['E11', 'E11.0', 'E11.9']
@@ -0,0 +1,70 @@
+"""Pruebas de compatibilidad_alergias.py sobre registros en memoria."""
+
+import pytest
+
+from compatibilidad_alergias import IndiceAlergias, normalizar_termino, terminos_medicamento
+
+
+@pytest.fixture
+def indice():
+    return IndiceAlergias.desde_registros(
+        medicamentos=[
+            {'id': 'M001', 'nombre_comercial': 'Amoxil', 'principio_activo': 'Amoxicilina',
+             'contraindicaciones': ['Alergia a penicilinas']},
+            {'id': 'M002', 'nombre_comercial': 'Advil', 'principio_activo': 'Ibuprofeno',
+             'contraindicaciones': ['Úlcera péptica']},
+            {'id': 'M003', 'nombre_comercial': 'Tempra', 'principio_activo': 'Paracetamol',
+             'contraindicaciones': []},
+            {'id': 'M004', 'nombre_comercial': 'Augmentin', 'principio_activo': 'Amoxicilina/Ácido clavulánico',
+             'contraindicaciones': []},
+        ],
+        alergias=[
+            {'id': 'A001', 'paciente_id': 'P001', 'nombre': 'Penicilina', 'gravedad': 'severa'},
+            {'id': 'A002', 'paciente_id': 'P001', 'nombre': 'Alergia a AINEs', 'gravedad': 'moderada'},
+            {'id': 'A003', 'paciente_id': 'P002', 'nombre': 'Látex', 'gravedad': 'leve'},
+            {'id': 'A004', 'paciente_id': None, 'nombre': 'Polen'},
+        ],
+    )
+
+
+def test_normalizar_termino():
+    assert normalizar_termino('Alergia a AINEs') == 'aine'
+    assert normalizar_termino('Macrólidos') == 'macrolido'
+    assert normalizar_termino('  Ácido Acetilsalicílico ') == 'acido acetilsalicilico'
+
+
+def test_terminos_incluyen_la_familia_y_cada_componente():
+    assert terminos_medicamento('Amoxicilina/Ácido clavulánico') == {'amoxicilina', 'penicilina', 'acido clavulanico'}
+    # Solo las contraindicaciones con forma de alergia cuentan
+    assert terminos_medicamento('Ibuprofeno', ['Úlcera péptica']) == {'ibuprofeno', 'aine'}
+
+
+def test_verificar_receta(indice):
+    resultado = indice.verificar_receta('P001', ['M001', 'M002', 'M003', 'M999'])
+    assert not resultado['compatible']
+    assert {c['medicamento_id'] for c in resultado['conflictos']} == {'M001', 'M002'}
+    assert resultado['desconocidos'] == ['M999']
+    assert indice.verificar_receta('P002', ['M001', 'M002'])['compatible']
+    assert indice.verificar_receta('P404', ['M001'])['compatible']
+
+
+def test_verificar_recetas_solo_devuelve_las_que_chocan(indice):
+    recetas = [
+        {'id': 'R001', 'paciente_id': 'P001', 'medicamento_ids': ['M003']},
+        {'id': 'R002', 'paciente_id': 'P001', 'medicamento_ids': ['M003', 'M004']},
+        {'id': 'R003', 'paciente_id': 'P002', 'medicamento_ids': ['M001']},
+    ]
+    resultado = indice.verificar_recetas(recetas)
+    assert [r['receta_id'] for r in resultado] == ['R002']
+    assert resultado[0]['conflictos'][0]['alergias'][0]['alergia_id'] == 'A001'
+
+
+def test_alertas_y_mantenimiento(indice):
+    assert [a['medicamento_id'] for a in indice.alertas('P001')] == ['M001', 'M002', 'M004']
+
+    indice.quitar_alergia('A001')
+    assert [a['medicamento_id'] for a in indice.alertas('P001')] == ['M002']
+
+    indice.agregar_medicamento('M003', 'Paracetamol', ['Alergia a AINEs'], 'Tempra')
+    assert [a['medicamento_id'] for a in indice.alertas('P001')] == ['M002', 'M003']
+    assert indice.resumen()['alergias'] == 2
@@ -0,0 +1,78 @@
+"""Pruebas de consistencia.py con réplicas en memoria frente al generador."""
+
+from datetime import datetime
+
+from consistencia import (
+    CAMPOS_VERIFICADOS, ArbolHuellas, ReplicaGenerador, comparar_arboles, hoja_de, verificar_entidad
+)
+
+
+class ReplicaMemoria:
+    """Réplica con las filas (id -> valores de CAMPOS_VERIFICADOS) de una entidad."""
+
+    def __init__(self, nombre, entidad, filas):
+        self.nombre = nombre
+        self.entidad = entidad
+        self.filas = filas
+
+    def entidades(self):
+        return [self.entidad]
+
+    def tareas(self, entidad, hojas=None):
+        def leer():
+            for id, valores in sorted(self.filas.items()):
+                if hojas is None or hoja_de(id) in hojas:
+                    yield id, valores
+        return [leer]
+
+
+def _filas(generador, entidad):
+    campos = CAMPOS_VERIFICADOS[entidad]
+    return {r['id']: tuple(map(r.get, campos)) for r in generador.generar(entidad)}
+
+
+def test_arboles_iguales_no_bajan_de_la_raiz():
+    a, b = ArbolHuellas(), ArbolHuellas()
+    for arbol in (a, b):
+        for i in range(50):
+            arbol.agregar(f"P{i:06d}", i * 7919)
+    assert comparar_arboles({'a': a, 'b': b}) == {'hojas_distintas': [], 'nodos_comparados': 1}
+
+    b.agregar('P001500', 1)
+    assert comparar_arboles({'a': a, 'b': b})['hojas_distintas'] == ['P001']
+
+
+def test_replicas_coincidentes(generador, volumen):
+    filas = _filas(generador, 'citas')
+    # Las fechas como datetime (MongoDB, Cassandra) equivalen a las cadenas ISO
+    mongodb = {id: (datetime.fromisoformat(v[0].rstrip('Z')),) + v[1:] for id, v in filas.items()}
+    informe = verificar_entidad('citas', [
+        ReplicaGenerador(7, volumen),
+        ReplicaMemoria('mongodb', 'citas', mongodb),
+    ])
+    assert informe['entidades_por_replica'] == {'generador': len(filas), 'mongodb': len(filas)}
+    assert informe['hojas_distintas'] == 0
+    assert informe['acciones'] == []
+
+
+def test_plan_de_reparacion_por_mayoria(generador, volumen):
+    filas = _filas(generador, 'pacientes')
+    ids = sorted(filas)
+    mongodb = dict(filas)
+    mongodb[ids[0]] = mongodb[ids[0]][:6] + ('Ciudad Errónea',)
+    del mongodb[ids[1]]
+    mongodb['P999999'] = filas[ids[2]]
+
+    informe = verificar_entidad('pacientes', [
+        ReplicaGenerador(7, volumen),
+        ReplicaMemoria('mongodb', 'pacientes', mongodb),
+        ReplicaMemoria('dgraph', 'pacientes', dict(filas)),
+    ])
+
+    acciones = {(a['id'], a['replica']): a for a in informe['acciones']}
+    assert set(acciones) == {(ids[0], 'mongodb'), (ids[1], 'mongodb'), ('P999999', 'mongodb')}
+    assert acciones[(ids[0], 'mongodb')]['accion'] == 'actualizar'
+    assert acciones[(ids[0], 'mongodb')]['campos'] == {
+        'ciudad': {'actual': 'Ciudad Errónea', 'correcto': filas[ids[0]][6]}}
+    assert acciones[(ids[1], 'mongodb')]['accion'] == 'insertar'
+    assert acciones[('P999999', 'mongodb')]['accion'] == 'eliminar'
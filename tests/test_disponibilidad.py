@@ -0,0 +1,194 @@
+"""
+Pruebas de disponibilidad.py: franjas y mapas de bits, árbol de intervalos
+y las consultas sobre una sesión de Cassandra simulada.
+"""
+
+from collections import namedtuple
+from types import SimpleNamespace
+from datetime import date, datetime
+
+import pytest
+
+import disponibilidad
+from disponibilidad import (
+    ArbolIntervalos, CacheDisponibilidad, Plantilla, a_mapa, doctor_disponible, doctores_disponibles,
+    franjas, mascaras, proximos_huecos, reservar_franjas, tramos
+)
+
+Fila = namedtuple('Fila', 'doctor_id slot citas')
+
+
+class SesionOcupacion:
+    """Sesión con la tabla ocupacion_por_especialidad en memoria."""
+
+    def __init__(self):
+        # (especialidad, fecha) -> doctor -> slot -> citas
+        self.particiones = {}
+        self.lecturas = 0
+
+    def ocupar(self, especialidad, doctor_id, cita_id, inicio, duracion):
+        for fecha, slots in franjas(inicio, duracion):
+            del_doctor = self.particiones.setdefault((especialidad, fecha), {}).setdefault(doctor_id, {})
+            for slot in slots:
+                del_doctor.setdefault(slot, set()).add(cita_id)
+
+    def prepare(self, consulta):
+        return type('Sentencia', (), {'consulta': consulta})()
+
+    def citas(self, especialidad, fecha, doctor_id, slot):
+        return self.particiones.get((especialidad, fecha), {}).get(doctor_id, {}).get(slot)
+
+    def execute(self, sentencia, parametros=None):
+        if isinstance(sentencia, list):
+            return self._lote_condicional(sentencia)
+        self.lecturas += 1
+        particion = self.particiones.get(tuple(parametros), {})
+        return [Fila(doctor, slot, citas) for doctor, slots in particion.items() for slot, citas in slots.items()]
+
+    def _lote_condicional(self, lote):
+        # Se aplica todo o nada: cada fila exige que sus citas sean las esperadas
+        aplicado = all(self.citas(e, f, d, s) == esperadas for _, (_, e, f, d, s, esperadas) in lote)
+        if aplicado:
+            for _, (nuevas, e, f, d, s, _) in lote:
+                del_doctor = self.particiones.setdefault((e, f), {}).setdefault(d, {})
+                if nuevas is None:
+                    del_doctor.pop(s, None)
+                else:
+                    del_doctor[s] = set(nuevas)
+        return SimpleNamespace(was_applied=aplicado)
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    monkeypatch.setattr(disponibilidad, '_cache', CacheDisponibilidad())
+    monkeypatch.setattr(disponibilidad, '_sentencias', {})
+    # Como fijar_plantilla(), pero monkeypatch la restaura al terminar
+    monkeypatch.setattr(disponibilidad, '_plantilla', Plantilla([
+        {'id': 'D001', 'especialidad': 'Cardiología'},
+        {'id': 'D002', 'especialidad': 'Cardiología'},
+        {'id': 'D003', 'especialidad': 'Pediatría'},
+    ]))
+    monkeypatch.setattr(disponibilidad, '_plantilla_expira', float('inf'))
+    monkeypatch.setattr(disponibilidad, '_plantilla_leida', float('inf'))
+    # Sin el driver: la BATCH condicional es la lista de (sentencia, parámetros)
+    # y la lectura SERIAL lee directamente de la sesión
+    monkeypatch.setattr(disponibilidad, '_lote_condicional', lambda sentencia, filas: [(sentencia, f) for f in filas])
+    monkeypatch.setattr(disponibilidad, '_leer_franjas', lambda sesion, e, f, d, slots: {
+        slot: set(sesion.citas(e, f, d, slot)) for slot in slots if sesion.citas(e, f, d, slot)})
+    sesion = SesionOcupacion()
+    sesion.ocupar('Cardiología', 'D001', 'C001', datetime(2025, 3, 10, 9, 0), 30)
+    sesion.ocupar('Cardiología', 'D001', 'C002', datetime(2025, 3, 10, 11, 0), 60)
+    return sesion
+
+
+def test_franjas_cruzan_medianoche():
+    dias = franjas(datetime(2025, 3, 10, 23, 45), 30)
+    assert [fecha for fecha, _ in dias] == [date(2025, 3, 10), date(2025, 3, 11)]
+    assert dias[0][1].stop == disponibilidad.SLOTS_POR_DIA
+    assert dias[1][1].start == 0
+    minutos = sum(len(slots) for _, slots in dias) * disponibilidad.MINUTOS_POR_SLOT
+    assert minutos == 30
+
+
+def test_mascaras_y_tramos_son_inversas():
+    inicio = datetime(2025, 3, 10, 9, 0)
+    (fecha, bits), = mascaras(inicio, 45)
+    slots = franjas(inicio, 45)[0][1]
+    assert bits == a_mapa(slots)
+    assert tramos(bits) == [(slots.start, slots.stop)]
+    assert tramos(a_mapa([1, 2, 5])) == [(1, 3), (5, 6)]
+
+
+def test_arbol_intervalos_solapados_y_huecos():
+    arbol = ArbolIntervalos([(10, 20, 'a'), (30, 40, 'b'), (35, 50, 'c'), (5, 5, 'vacío')])
+    assert arbol.total == 3
+    assert [i[2] for i in arbol.solapados(15, 36)] == ['a', 'b', 'c']
+    assert arbol.libre(20, 30)
+    assert arbol.huecos(0, 60, 10) == [(0, 10), (20, 30), (50, 60)]
+
+
+def test_doctor_disponible(sesion):
+    assert not doctor_disponible(sesion, 'D001', datetime(2025, 3, 10, 9, 0))
+    assert not doctor_disponible(sesion, 'D001', '2025-03-10T11:30:00Z')
+    assert doctor_disponible(sesion, 'D001', datetime(2025, 3, 10, 10, 0))
+    assert doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 9, 0))
+    # Reintentar o mover la propia cita no choca con sus franjas
+    assert doctor_disponible(sesion, 'D001', datetime(2025, 3, 10, 9, 0), excluir='C001')
+
+
+def test_doctor_desconocido_no_esta_disponible(sesion, monkeypatch):
+    assert not doctor_disponible(sesion, 'D999', datetime(2025, 3, 10, 10, 0))
+    assert not reservar_franjas(sesion, {'id': 'C010', 'doctor_id': 'D999',
+                                         'fecha_hora': '2025-03-10T10:00:00Z', 'duracion_minutos': 30})
+    # Sin plantilla (MongoDB no responde) nadie está disponible
+    monkeypatch.setattr(disponibilidad, '_plantilla', Plantilla())
+    assert not doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 10, 0))
+
+
+def _cita(id, doctor_id, fecha_hora, duracion=30):
+    return {'id': id, 'doctor_id': doctor_id, 'fecha_hora': fecha_hora, 'duracion_minutos': duracion,
+            'estado': 'programada'}
+
+
+def test_reservar_franjas(sesion):
+    fecha = date(2025, 3, 10)
+    doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 9, 0))
+    assert reservar_franjas(sesion, _cita('C010', 'D002', '2025-03-10T09:00:00Z'))
+    assert sesion.citas('Cardiología', fecha, 'D002', 36) == {'C010'}
+    # La caché ve la reserva sin volver a leer la partición
+    assert not doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 9, 0))
+    assert sesion.lecturas == 1
+
+    # Reintentar la misma cita no choca con sus franjas
+    assert reservar_franjas(sesion, _cita('C010', 'D002', '2025-03-10T09:00:00Z'))
+    # Otra cita que solapa no se aplica y no deja nada escrito
+    assert not reservar_franjas(sesion, _cita('C011', 'D002', '2025-03-10T09:15:00Z'))
+    assert not reservar_franjas(sesion, _cita('C012', 'D001', '2025-03-10T11:45:00Z'))
+    assert sesion.citas('Cardiología', fecha, 'D002', 38) is None
+    assert reservar_franjas(sesion, _cita('C013', 'D001', '2025-03-10T12:00:00Z'))
+
+
+def test_reserva_que_cruza_medianoche_libera_el_primer_dia(sesion):
+    sesion.ocupar('Pediatría', 'D003', 'C020', datetime(2025, 3, 11, 0, 0), 15)
+    assert not reservar_franjas(sesion, _cita('C021', 'D003', '2025-03-10T23:45:00Z'))
+    ultimo = disponibilidad.SLOTS_POR_DIA - 1
+    assert sesion.citas('Pediatría', date(2025, 3, 10), 'D003', ultimo) is None
+    assert reservar_franjas(sesion, _cita('C021', 'D003', '2025-03-10T23:30:00Z'))
+
+
+def test_cache_lru(sesion, monkeypatch):
+    monkeypatch.setattr(disponibilidad, '_cache', CacheDisponibilidad(max_particiones=2, max_arboles=1))
+    cache = disponibilidad.obtener_cache()
+    for dia in (10, 11, 10, 12):
+        cache.dia(sesion, 'Cardiología', date(2025, 3, dia))
+    assert sesion.lecturas == 3
+    assert list(cache._dias) == [('Cardiología', date(2025, 3, 10)), ('Cardiología', date(2025, 3, 12))]
+
+    proximos_huecos(sesion, 'D001', datetime(2025, 3, 10, 8, 0), dias=1)
+    proximos_huecos(sesion, 'D002', datetime(2025, 3, 10, 8, 0), dias=1)
+    assert len(cache._arboles) == 1
+
+
+def test_doctores_disponibles(sesion):
+    assert doctores_disponibles(sesion, 'Cardiología', datetime(2025, 3, 10, 9, 0)) == ['D002']
+    assert doctores_disponibles(sesion, 'Cardiología', datetime(2025, 3, 10, 10, 0)) == ['D001', 'D002']
+
+
+def test_cache_lee_cada_particion_una_vez_y_aplica_escrituras(sesion):
+    cache = disponibilidad.obtener_cache()
+    fecha = date(2025, 3, 10)
+    doctor_disponible(sesion, 'D001', datetime(2025, 3, 10, 9, 0))
+    doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 15, 0))
+    assert sesion.lecturas == 1
+
+    slots = franjas(datetime(2025, 3, 10, 15, 0), 30)[0][1]
+    cache.aplicar('Cardiología', fecha, 'D002', 'C003', slots)
+    assert not doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 15, 0))
+    cache.aplicar('Cardiología', fecha, 'D002', 'C003', slots, liberar=True)
+    assert doctor_disponible(sesion, 'D002', datetime(2025, 3, 10, 15, 0))
+    assert sesion.lecturas == 1
+
+
+def test_proximos_huecos(sesion):
+    huecos = proximos_huecos(sesion, 'D001', datetime(2025, 3, 10, 8, 0), duracion=60, dias=1)
+    assert huecos == [datetime(2025, 3, 10, 8, 0), datetime(2025, 3, 10, 9, 30), datetime(2025, 3, 10, 12, 0)]
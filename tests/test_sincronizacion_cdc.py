@@ -0,0 +1,138 @@
+"""
+Pruebas de sincronizacion_cdc.py con FuenteCambiosMemoria y DestinoMemoria:
+carga masiva sembrada o con imágenes previas, cambios de clave primaria y
+reanudación desde el checkpoint.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from modelos import MODELOS
+from populate_mongodb import a_documento
+from sincronizacion_cdc import (
+    COLECCIONES_CDC, DestinoMemoria, EstadoReplicacion, FuenteCambiosMemoria, SincronizadorCDC
+)
+
+
+def _cargar(generador, preimagenes=True, sembrar=True, ruta=':memory:'):
+    """Fuente y destino con la misma carga masiva, y el estado (sembrado o no)."""
+    fuente = FuenteCambiosMemoria(preimagenes=preimagenes)
+    destino = DestinoMemoria()
+    estado = EstadoReplicacion(ruta)
+    for tipo in COLECCIONES_CDC:
+        registros = list(generador.generar(tipo))
+        fuente.cargar(tipo, (a_documento(tipo, r) for r in registros))
+        destino.cargar(tipo, (MODELOS[tipo].desde_documento(a_documento(tipo, r)).a_registro() for r in registros))
+        if sembrar:
+            estado.sembrar(tipo, (MODELOS[tipo].desde_documento(d).a_registro()
+                                  for d in fuente.colecciones[tipo].values()))
+    return fuente, destino, estado
+
+
+def _drenar(fuente, destino, estado):
+    sincronizador = SincronizadorCDC(fuente, [destino], estado, ventana=0.01, invalidar=False, contar=False)
+    return sincronizador.drenar()
+
+
+def _esperado(fuente) -> DestinoMemoria:
+    """Lo que dejaría una carga masiva del estado actual de la fuente."""
+    esperado = DestinoMemoria()
+    for coleccion, documentos in fuente.colecciones.items():
+        esperado.cargar(coleccion, (MODELOS[coleccion].desde_documento(d).a_registro() for d in documentos.values()))
+    return esperado
+
+
+def _cambiar_claves(fuente):
+    """Cambios que mueven filas de partición: fecha de citas, ciudad y apellido de pacientes."""
+    citas = sorted(fuente.colecciones['citas'])
+    pacientes = sorted(fuente.colecciones['pacientes'])
+    fuente.actualizar('citas', citas[0], {'fecha_hora': datetime(2025, 1, 2, 9, 0)})
+    fuente.actualizar('citas', citas[1], {'fecha_hora': datetime(2025, 1, 3, 23, 45), 'duracion_minutos': 60})
+    fuente.actualizar('citas', citas[2], {'estado': 'cancelada'})
+    fuente.eliminar('citas', citas[3])
+    fuente.actualizar('pacientes', pacientes[0], {'ciudad': 'Mérida'})
+    fuente.actualizar('pacientes', pacientes[1], {'apellido': 'Zúñiga'})
+    fuente.actualizar('pacientes', pacientes[2], {'telefono': '+52 55 00000000'})
+
+
+def _coincide(destino, esperado) -> bool:
+    return (destino.entidades == esperado.entidades and destino.filas == esperado.filas
+            and destino.ocupacion == esperado.ocupacion)
+
+
+@pytest.mark.parametrize('preimagenes, sembrar', [(False, True), (True, False), (True, True)])
+def test_cambio_de_clave_no_deja_filas_huerfanas(generador, preimagenes, sembrar):
+    fuente, destino, estado = _cargar(generador, preimagenes=preimagenes, sembrar=sembrar)
+    _cambiar_claves(fuente)
+
+    metricas = _drenar(fuente, destino, estado)
+
+    assert metricas['eventos'] == len(fuente)
+    assert metricas['ultimo_token'] == str(len(fuente))
+    assert _coincide(destino, _esperado(fuente))
+
+
+def test_sin_estado_anterior_quedan_filas_huerfanas(generador):
+    # Sin sembrar ni imágenes previas el servicio no conoce la clave antigua:
+    # la prueba anterior solo pasa gracias a una de las dos
+    fuente, destino, estado = _cargar(generador, preimagenes=False, sembrar=False)
+    _cambiar_claves(fuente)
+
+    _drenar(fuente, destino, estado)
+
+    esperado = _esperado(fuente)
+    assert destino.entidades == esperado.entidades
+    assert any(set(destino.filas[t]) - set(esperado.filas[t]) for t in destino.filas)
+
+
+def test_sembrar_no_sustituye_lo_replicado(generador):
+    fuente, destino, estado = _cargar(generador, preimagenes=False)
+    cita = sorted(fuente.colecciones['citas'])[0]
+    fuente.actualizar('citas', cita, {'fecha_hora': datetime(2025, 2, 1, 10, 0)})
+    _drenar(fuente, destino, estado)
+
+    # Volver a sembrar con la carga original no pisa el estado replicado
+    estado.sembrar('citas', generador.generar('citas'))
+
+    fuente.actualizar('citas', cita, {'fecha_hora': datetime(2025, 3, 1, 10, 0)})
+    _drenar(fuente, destino, estado)
+    assert _coincide(destino, _esperado(fuente))
+
+
+def test_reanuda_desde_el_checkpoint(generador, tmp_path):
+    ruta = str(tmp_path / 'cdc.sqlite')
+    fuente, destino, estado = _cargar(generador, preimagenes=False, ruta=ruta)
+    _cambiar_claves(fuente)
+    primera = _drenar(fuente, destino, estado)
+    leidos = len(fuente)
+    assert primera['ultimo_token'] == str(leidos)
+
+    # Cambios mientras el servicio está parado
+    citas = sorted(fuente.colecciones['citas'])
+    fuente.actualizar('citas', citas[4], {'fecha_hora': datetime(2025, 4, 1, 8, 30)})
+    fuente.actualizar('citas', citas[5], {'estado': 'completada'})
+    fuente.eliminar('pacientes', sorted(fuente.colecciones['pacientes'])[3])
+
+    # Un proceso nuevo con el mismo archivo de estado sigue donde se quedó
+    reanudado = EstadoReplicacion(ruta)
+    assert reanudado.token() == str(leidos)
+    segunda = _drenar(fuente, destino, reanudado)
+
+    assert segunda['eventos'] == len(fuente) - leidos
+    assert segunda['ultimo_token'] == str(len(fuente))
+    assert _coincide(destino, _esperado(fuente))
+
+
+def test_lote_fusiona_cambios_de_la_misma_entidad(generador):
+    fuente, destino, estado = _cargar(generador)
+    cita = sorted(fuente.colecciones['citas'])[0]
+    for hora in (9, 10, 11):
+        fuente.actualizar('citas', cita, {'fecha_hora': datetime(2025, 5, 1, hora, 0)})
+
+    metricas = _drenar(fuente, destino, estado)
+
+    assert metricas['eventos'] == 3
+    assert metricas['coalescidos'] == 2
+    assert metricas['aplicados'] == 1
+    assert _coincide(destino, _esperado(fuente))
@@ -0,0 +1,3 @@
+"""
+Utilidades compartidas de la Plataforma de Integración de Datos de Salud.
+"""
@@ -0,0 +1,358 @@
+"""
+Almacén en Memoria
+Plataforma de Integración de Datos de Salud
+
+Sustituto en proceso de las tres bases de datos para ejecutar el benchmark
+(y cualquier prueba) sin contenedores. Guarda los registros con la misma
+forma que les dan los cargadores reales:
+
+- MongoDB: documentos de populate_mongodb.a_documento() con índices por
+  campo equivalentes a INDICES
+- Cassandra: filas de populate_cassandra.TABLAS agrupadas por partición y
+  ordenadas por las columnas de clustering
+- Dgraph: registros por ID y aristas de populate_dgraph.aristas_de() en
+  ambos sentidos
+
+Sobre ese modelo resuelve las 20 consultas de catalogo_consultas y sus
+equivalentes de MongoDB y Cassandra. No pretende reproducir el
+rendimiento de un servidor, sino dar una referencia estable y sin red para
+comparar cambios en los datos, el generador o los cargadores.
+"""
+
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from populate_cassandra import TABLAS
+from populate_dgraph import aristas_de
+from populate_mongodb import COLECCIONES, a_documento
+
+
+def _terminos(texto: str) -> List[str]:
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r'\w+', texto)
+
+
+class AlmacenMemoria:
+    """Las tres bases de datos modeladas con diccionarios y listas ordenadas."""
+
+    def __init__(self):
+        self.registros: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.aristas: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        self.documentos: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.particiones: Dict[str, Dict[Tuple, List[Tuple]]] = {t: defaultdict(list) for t in TABLAS}
+        self._indices: Dict[Tuple[str, str], Dict[Any, List[str]]] = {}
+        self._texto: Dict[Tuple[str, str], Dict[str, set]] = {}
+        self._citas_por_fecha: List[Tuple[str, str]] = []
+
+    # -------------------------------------------------------------------------
+    # Carga
+    # -------------------------------------------------------------------------
+
+    def cargar_dgraph(self, tipo: str, registros: Iterable[Dict[str, Any]]) -> int:
+        cantidad = 0
+        for registro in registros:
+            self.registros[tipo][registro['id']] = registro
+            for sujeto, predicado, objeto in aristas_de(tipo, registro):
+                self.aristas[(sujeto, predicado)].append(objeto)
+            cantidad += 1
+        return cantidad
+
+    def cargar_mongodb(self, coleccion: str, registros: Iterable[Dict[str, Any]]) -> int:
+        documentos = self.documentos[coleccion]
+        tipo = COLECCIONES[coleccion]
+        cantidad = 0
+        for registro in registros:
+            documento = a_documento(tipo, registro)
+            documentos[documento['_id']] = documento
+            cantidad += 1
+        return cantidad
+
+    def cargar_cassandra(self, tabla: str, registros: Iterable[Dict[str, Any]]) -> int:
+        definicion = TABLAS[tabla]
+        particiones = self.particiones[tabla]
+        corte = definicion['particion']
+        cantidad = 0
+        for registro in registros:
+            fila = definicion['fila'](registro)
+            particiones[fila[:corte]].append(fila)
+            cantidad += 1
+        return cantidad
+
+    def finalizar(self):
+        """Ordena particiones e índices tras la carga (como un compactado)."""
+        for tabla, particiones in self.particiones.items():
+            corte = TABLAS[tabla]['particion']
+            descendente = 'DESC' in TABLAS[tabla]['ddl']
+            for filas in particiones.values():
+                filas.sort(key=lambda f: f[corte:], reverse=descendente)
+        self._citas_por_fecha = sorted((c['fecha_hora'], c['id']) for c in self.registros['citas'].values())
+        self._indices.clear()
+        self._texto.clear()
+
+    # -------------------------------------------------------------------------
+    # Acceso
+    # -------------------------------------------------------------------------
+
+    def _indice(self, tipo: str, campo: str) -> Dict[Any, List[str]]:
+        clave = (tipo, campo)
+        if clave not in self._indices:
+            indice = defaultdict(list)
+            for id, registro in self.registros[tipo].items():
+                valor = registro.get(campo)
+                if isinstance(valor, list):
+                    for v in valor:
+                        indice[v].append(id)
+                elif valor not in (None, ''):
+                    indice[valor].append(id)
+            self._indices[clave] = indice
+        return self._indices[clave]
+
+    def _texto_completo(self, tipo: str, campo: str, texto: str) -> List[str]:
+        clave = (tipo, campo)
+        if clave not in self._texto:
+            invertido = defaultdict(set)
+            for id, registro in self.registros[tipo].items():
+                for termino in _terminos(registro.get(campo, '')):
+                    invertido[termino].add(id)
+            self._texto[clave] = invertido
+        conjuntos = [self._texto[clave].get(t, set()) for t in _terminos(texto)]
+        return sorted(set.intersection(*conjuntos)) if conjuntos else []
+
+    def buscar(self, tipo: str, campo: str, valor: Any) -> List[Dict[str, Any]]:
+        return [self.registros[tipo][id] for id in self._indice(tipo, campo).get(valor, ())]
+
+    def vecinos(self, id: str, predicado: str) -> List[Dict[str, Any]]:
+        tipo = _TIPO_DE_PREDICADO[predicado]
+        return [self.registros[tipo][o] for o in self.aristas.get((id, predicado), ()) if o in self.registros[tipo]]
+
+    def citas_entre(self, desde: str, hasta: str) -> List[Dict[str, Any]]:
+        inicio = bisect.bisect_left(self._citas_por_fecha, (desde, ''))
+        fin = bisect.bisect_right(self._citas_por_fecha, (hasta, '￿'))
+        return [self.registros['citas'][id] for _, id in self._citas_por_fecha[inicio:fin]]
+
+    # -------------------------------------------------------------------------
+    # Equivalentes de MongoDB y Cassandra
+    # -------------------------------------------------------------------------
+
+    def mongo_por_id(self, coleccion: str, id: str) -> Optional[Dict[str, Any]]:
+        return self.documentos[coleccion].get(id)
+
+    def mongo_por_campo(self, coleccion: str, campo: str, valor: Any, limite: int = 100) -> List[Dict[str, Any]]:
+        ids = self._indice(COLECCIONES[coleccion], campo).get(valor, ())
+        return [self.documentos[coleccion][id] for id in ids[:limite]]
+
+    def mongo_citas_entre(self, desde: str, hasta: str, limite: int = 1000) -> List[Dict[str, Any]]:
+        return [self.documentos['citas'][c['id']] for c in self.citas_entre(desde, hasta)[:limite]]
+
+    def cassandra_particion(self, tabla: str, clave: Tuple, limite: int = 100) -> List[Tuple]:
+        return self.particiones[tabla].get(clave, [])[:limite]
+
+
+# Predicado -> tipo del generador del objeto
+_TIPO_DE_PREDICADO: Dict[str, str] = {
+    'hospital.departamentos': 'departamentos', 'hospital.doctores': 'doctores',
+    'departamento.hospital': 'hospitales', 'departamento.doctores': 'doctores',
+    'doctor.hospital': 'hospitales', 'doctor.citas': 'citas', 'doctor.pacientes_tratados': 'pacientes',
+    'paciente.historial_medico': 'historiales', 'paciente.alergias': 'alergias',
+    'paciente.citas': 'citas', 'paciente.recetas': 'recetas',
+    'historial.paciente': 'pacientes', 'historial.diagnosticos': 'diagnosticos',
+    'alergia.paciente': 'pacientes',
+    'cita.paciente': 'pacientes', 'cita.doctor': 'doctores', 'cita.diagnosticos': 'diagnosticos',
+    'diagnostico.paciente': 'pacientes', 'diagnostico.doctor': 'doctores',
+    'diagnostico.cita': 'citas', 'diagnostico.tratamientos': 'tratamientos',
+    'tratamiento.diagnostico': 'diagnosticos', 'tratamiento.medicamentos': 'medicamentos',
+    'receta.paciente': 'pacientes', 'receta.doctor': 'doctores', 'receta.medicamentos': 'medicamentos',
+    'medicamento.recetas': 'recetas',
+}
+
+
+# =============================================================================
+# CONSULTAS DEL CATÁLOGO
+# =============================================================================
+
+def _paciente_por_email(a: AlmacenMemoria, email: str):
+    return [dict(p, alergias=a.vecinos(p['id'], 'paciente.alergias')) for p in a.buscar('pacientes', 'email', email)]
+
+
+def _doctores_por_especialidad(a: AlmacenMemoria, especialidad: str, experiencia: int = 0):
+    return [
+        dict(d, hospital=a.vecinos(d['id'], 'doctor.hospital'), total_citas=len(a.aristas.get((d['id'], 'doctor.citas'), ())))
+        for d in a.buscar('doctores', 'especialidad', especialidad) if d['años_experiencia'] >= experiencia
+    ]
+
+
+def _doctores_experiencia(a: AlmacenMemoria, experiencia: int, limite: int = 100):
+    return [
+        dict(d, hospital=a.vecinos(d['id'], 'doctor.hospital'))
+        for d in a.registros['doctores'].values() if d['años_experiencia'] >= experiencia
+    ][:limite]
+
+
+def _historial_completo(a: AlmacenMemoria, paciente: str):
+    resultado = []
+    for p in filter(None, [a.registros['pacientes'].get(paciente)]):
+        historiales = []
+        for h in a.vecinos(p['id'], 'paciente.historial_medico'):
+            diagnosticos = []
+            for d in a.vecinos(h['id'], 'historial.diagnosticos'):
+                tratamientos = [
+                    dict(t, medicamentos=a.vecinos(t['id'], 'tratamiento.medicamentos'))
+                    for t in a.vecinos(d['id'], 'diagnostico.tratamientos')
+                ]
+                diagnosticos.append(dict(d, tratamientos=tratamientos))
+            historiales.append(dict(h, diagnosticos=diagnosticos))
+        resultado.append(dict(p, alergias=a.vecinos(p['id'], 'paciente.alergias'), historial_medico=historiales))
+    return resultado
+
+
+def _citas_por_fecha(a: AlmacenMemoria, desde: str, hasta: str, estado: str = 'programada'):
+    return [
+        dict(c, paciente=a.vecinos(c['id'], 'cita.paciente'), doctor=a.vecinos(c['id'], 'cita.doctor'))
+        for c in a.citas_entre(desde, hasta) if c['estado'] == estado
+    ]
+
+
+def _diagnosticos_fulltext(a: AlmacenMemoria, texto: str):
+    return [
+        dict(a.registros['diagnosticos'][id],
+             paciente=a.vecinos(id, 'diagnostico.paciente'), doctor=a.vecinos(id, 'diagnostico.doctor'))
+        for id in a._texto_completo('diagnosticos', 'descripcion', texto)
+    ]
+
+
+def _medicamentos_top(a: AlmacenMemoria, limite: int = 10):
+    totales = [(len(a.aristas.get((id, 'medicamento.recetas'), ())), id) for id in a.registros['medicamentos']]
+    totales.sort(reverse=True)
+    return [dict(a.registros['medicamentos'][id], total_recetas=n) for n, id in totales[:limite]]
+
+
+def _hospitales_urgencias(a: AlmacenMemoria, ciudad: str, urgencias: bool = True):
+    return [
+        dict(h, departamentos=a.vecinos(h['id'], 'hospital.departamentos'),
+             total_doctores=len(a.aristas.get((h['id'], 'hospital.doctores'), ())))
+        for h in a.buscar('hospitales', 'ciudad', ciudad) if h['tiene_urgencias'] == urgencias
+    ]
+
+
+def _recetas_paciente(a: AlmacenMemoria, paciente: str, estado: str = 'activa'):
+    return [
+        dict(r, doctor=a.vecinos(r['id'], 'receta.doctor'), medicamentos=a.vecinos(r['id'], 'receta.medicamentos'))
+        for r in a.vecinos(paciente, 'paciente.recetas') if r['estado'] == estado
+    ]
+
+
+def _agenda_doctor(a: AlmacenMemoria, doctor: str, desde: str, hasta: str):
+    citas = [c for c in a.vecinos(doctor, 'doctor.citas') if desde <= c['fecha_hora'] <= hasta]
+    citas.sort(key=lambda c: c['fecha_hora'])
+    return [dict(c, paciente=a.vecinos(c['id'], 'cita.paciente')) for c in citas]
+
+
+def _pacientes_alergia(a: AlmacenMemoria, alergia: str):
+    pacientes = {}
+    for al in a.buscar('alergias', 'nombre', alergia):
+        for p in a.vecinos(al['id'], 'alergia.paciente'):
+            pacientes[p['id']] = p
+    return list(pacientes.values())
+
+
+def _tratamientos_por_estado(a: AlmacenMemoria, estado: str = 'activo', limite: int = 100):
+    return [
+        dict(t, diagnostico=a.vecinos(t['id'], 'tratamiento.diagnostico'),
+             medicamentos=a.vecinos(t['id'], 'tratamiento.medicamentos'))
+        for t in a.buscar('tratamientos', 'estado', estado)[:limite]
+    ]
+
+
+def _doctores_hospital(a: AlmacenMemoria, hospital: str):
+    return [
+        dict(dep, doctores=a.vecinos(dep['id'], 'departamento.doctores'))
+        for dep in a.vecinos(hospital, 'hospital.departamentos')
+    ]
+
+
+def _pacientes_tipo_sangre(a: AlmacenMemoria, tipo_sangre: str, limite: int = 100):
+    return a.buscar('pacientes', 'tipo_sangre', tipo_sangre)[:limite]
+
+
+def _diagnosticos_icd10(a: AlmacenMemoria, codigo: str):
+    return [
+        dict(d, paciente=a.vecinos(d['id'], 'diagnostico.paciente'), cita=a.vecinos(d['id'], 'diagnostico.cita'))
+        for d in a.buscar('diagnosticos', 'codigo_icd10', codigo)
+    ]
+
+
+def _buscar_paciente_nombre(a: AlmacenMemoria, nombre: str):
+    return [
+        dict(a.registros['pacientes'][id], total_citas=len(a.aristas.get((id, 'paciente.citas'), ())))
+        for id in a._texto_completo('pacientes', 'nombre', nombre)
+    ]
+
+
+def _estadisticas_hospital(a: AlmacenMemoria, hospital: str):
+    doctores = a.vecinos(hospital, 'hospital.doctores')
+    return {
+        'total_doctores': len(doctores),
+        'total_departamentos': len(a.aristas.get((hospital, 'hospital.departamentos'), ())),
+        'citas_por_doctor': [len(a.aristas.get((d['id'], 'doctor.citas'), ())) for d in doctores],
+    }
+
+
+def _citas_con_diagnosticos(a: AlmacenMemoria, estado: str = 'completada', limite: int = 100):
+    citas = [c for c in a.buscar('citas', 'estado', estado) if c['diagnostico_ids']][:limite]
+    return [dict(c, diagnosticos=a.vecinos(c['id'], 'cita.diagnosticos')) for c in citas]
+
+
+def _medicamentos_contraindicaciones(a: AlmacenMemoria, limite: int = 100):
+    return [m for m in a.registros['medicamentos'].values() if m['contraindicaciones']][:limite]
+
+
+def _pacientes_condiciones_cronicas(a: AlmacenMemoria, limite: int = 100):
+    pacientes = {}
+    for h in a.registros['historiales'].values():
+        if h['condiciones_cronicas']:
+            for p in a.vecinos(h['id'], 'historial.paciente'):
+                pacientes[p['id']] = p
+                if len(pacientes) >= limite:
+                    return list(pacientes.values())
+    return list(pacientes.values())
+
+
+def _especialidades_demandadas(a: AlmacenMemoria):
+    totales = defaultdict(int)
+    for d in a.registros['doctores'].values():
+        totales[d['especialidad']] += len(a.aristas.get((d['id'], 'doctor.citas'), ()))
+    return dict(totales)
+
+
+CONSULTAS = {
+    'paciente_por_email': _paciente_por_email,
+    'doctores_por_especialidad': _doctores_por_especialidad,
+    'doctores_experiencia': _doctores_experiencia,
+    'historial_completo': _historial_completo,
+    'citas_por_fecha': _citas_por_fecha,
+    'diagnosticos_fulltext': _diagnosticos_fulltext,
+    'medicamentos_top': _medicamentos_top,
+    'hospitales_urgencias': _hospitales_urgencias,
+    'recetas_paciente': _recetas_paciente,
+    'agenda_doctor': _agenda_doctor,
+    'pacientes_alergia': _pacientes_alergia,
+    'tratamientos_por_estado': _tratamientos_por_estado,
+    'doctores_hospital': _doctores_hospital,
+    'pacientes_tipo_sangre': _pacientes_tipo_sangre,
+    'diagnosticos_icd10': _diagnosticos_icd10,
+    'buscar_paciente_nombre': _buscar_paciente_nombre,
+    'estadisticas_hospital': _estadisticas_hospital,
+    'citas_con_diagnosticos': _citas_con_diagnosticos,
+    'medicamentos_contraindicaciones': _medicamentos_contraindicaciones,
+    'pacientes_condiciones_cronicas': _pacientes_condiciones_cronicas,
+    'especialidades_demandadas': _especialidades_demandadas,
+}
+
+
+def ejecutar_consulta(almacen: AlmacenMemoria, nombre: str, /, **valores) -> Any:
+    """Resuelve una consulta del catálogo sobre el almacén en memoria."""
+    return CONSULTAS[nombre](almacen, **valores)
@@ -0,0 +1,774 @@
+"""
+Generador de Datos Sintéticos
+Plataforma de Integración de Datos de Salud
+
+Genera las entidades del schema.rdf (pacientes, doctores, hospitales, citas,
+diagnósticos, etc.) como flujos: cada método devuelve un generador y nunca se
+materializa el conjunto completo en memoria.
+
+Cada registro es una función pura de (semilla, tipo, índice). El registro i
+de un tipo es idéntico en cualquier ejecución, sin importar cuántos procesos
+lo generen ni cómo se repartan los shards, de modo que los mismos IDs y
+valores llegan a MongoDB, Cassandra y Dgraph (PASO 4.1 de populate.py).
+
+En lugar de Faker (lento y de un solo hilo) se usan catálogos locales y un
+hash splitmix64, y la generación se reparte en bloques entre procesos.
+
+Uso:
+    python -m utils.data_generator --citas 10000000 --procesos 8 --salida data
+"""
+
+import argparse
+import json
+import os
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterator, Iterable, Tuple
+
+from utils.metricas import MedidorThroughput
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+SEMILLA_POR_DEFECTO = 42
+
+# Filas por bloque de trabajo enviado a cada proceso
+TAM_BLOQUE = 50_000
+
+# Orden de generación: primero entidades base, luego las que las referencian
+TIPOS = (
+    'hospitales', 'departamentos', 'doctores', 'pacientes', 'historiales',
+    'alergias', 'medicamentos', 'citas', 'diagnosticos', 'tratamientos', 'recetas'
+)
+
+# Volumen mínimo descrito en el PASO 5.4 de populate.py
+VOLUMEN_BASE = {
+    'hospitales': 20,
+    'departamentos': 100,
+    'doctores': 100,
+    'pacientes': 1000,
+    'historiales': 1000,
+    'alergias': 400,
+    'medicamentos': 500,
+    'citas': 5000,
+    'diagnosticos': 3000,
+    'tratamientos': 2000,
+    'recetas': 2500,
+}
+
+# Prefijo y ancho numérico de los IDs de cada tipo
+FORMATO_ID = {
+    'hospitales': ('H', 5),
+    'departamentos': ('DEP', 6),
+    'doctores': ('D', 6),
+    'pacientes': ('P', 8),
+    'historiales': ('HM', 8),
+    'alergias': ('AL', 8),
+    'medicamentos': ('M', 5),
+    'citas': ('C', 9),
+    'diagnosticos': ('DX', 9),
+    'tratamientos': ('T', 9),
+    'recetas': ('R', 9),
+}
+
+
+def formatear_id(tipo: str, indice: int) -> str:
+    """Retorna el ID estable del registro `indice` (base 0) de un tipo."""
+    prefijo, ancho = FORMATO_ID[tipo]
+    return f"{prefijo}{indice + 1:0{ancho}d}"
+
+
+def calcular_volumen(citas: int) -> Dict[str, int]:
+    """
+    Escala VOLUMEN_BASE manteniendo sus proporciones para un número de citas.
+
+    El catálogo de medicamentos no se escala: es un catálogo de referencia,
+    no datos transaccionales.
+    """
+    factor = citas / VOLUMEN_BASE['citas']
+    volumen = {
+        tipo: max(1, int(cantidad * factor))
+        for tipo, cantidad in VOLUMEN_BASE.items()
+    }
+    volumen['medicamentos'] = VOLUMEN_BASE['medicamentos']
+    volumen['historiales'] = volumen['pacientes']
+    volumen['citas'] = citas
+    return volumen
+
+
+# =============================================================================
+# CATÁLOGOS
+# =============================================================================
+
+NOMBRES_MASCULINOS = [
+    'Juan', 'Carlos', 'José', 'Antonio', 'Manuel', 'Francisco', 'David',
+    'Javier', 'Daniel', 'Miguel', 'Alejandro', 'Rafael', 'Pablo', 'Sergio',
+    'Fernando', 'Jorge', 'Luis', 'Alberto', 'Álvaro', 'Diego', 'Adrián',
+    'Raúl', 'Enrique', 'Ramón', 'Andrés', 'Iván', 'Rubén', 'Óscar'
+]
+
+NOMBRES_FEMENINOS = [
+    'María', 'Carmen', 'Ana', 'Isabel', 'Laura', 'Lucía', 'Cristina',
+    'Marta', 'Elena', 'Pilar', 'Sara', 'Paula', 'Raquel', 'Rosa', 'Beatriz',
+    'Silvia', 'Patricia', 'Andrea', 'Irene', 'Sofía', 'Nuria', 'Mónica',
+    'Claudia', 'Julia', 'Teresa', 'Alicia', 'Inés', 'Verónica'
+]
+
+APELLIDOS = [
+    'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez',
+    'Sánchez', 'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández',
+    'Díaz', 'Moreno', 'Muñoz', 'Álvarez', 'Romero', 'Alonso', 'Gutiérrez',
+    'Navarro', 'Torres', 'Domínguez', 'Vázquez', 'Ramos', 'Gil', 'Ramírez',
+    'Serrano', 'Blanco', 'Molina', 'Morales', 'Suárez', 'Ortega', 'Delgado',
+    'Castro', 'Ortiz', 'Rubio', 'Marín', 'Sanz', 'Núñez'
+]
+
+CIUDADES = [
+    ('Madrid', '28'), ('Barcelona', '08'), ('Valencia', '46'), ('Sevilla', '41'),
+    ('Zaragoza', '50'), ('Málaga', '29'), ('Murcia', '30'), ('Palma', '07'),
+    ('Bilbao', '48'), ('Alicante', '03'), ('Córdoba', '14'), ('Valladolid', '47'),
+    ('Vigo', '36'), ('Gijón', '33'), ('Granada', '18'), ('Vitoria', '01'),
+    ('A Coruña', '15'), ('Santander', '39'), ('Pamplona', '31'), ('Salamanca', '37')
+]
+
+CALLES = [
+    'Calle Mayor', 'Calle Real', 'Avenida de la Constitución', 'Calle del Sol',
+    'Gran Vía', 'Paseo de la Castellana', 'Calle de Alcalá', 'Avenida Diagonal',
+    'Calle San Juan', 'Calle de la Paz', 'Plaza de España', 'Calle Nueva'
+]
+
+TIPOS_SANGRE = ['O+', 'O+', 'O+', 'A+', 'A+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-']
+
+GENEROS = ['Masculino', 'Femenino']
+
+ESPECIALIDADES = [
+    'Medicina General', 'Cardiología', 'Pediatría', 'Dermatología', 'Neurología',
+    'Traumatología', 'Ginecología', 'Oftalmología', 'Psiquiatría', 'Endocrinología',
+    'Neumología', 'Oncología', 'Urología', 'Gastroenterología', 'Otorrinolaringología'
+]
+
+NIVELES_ATENCION = ['Primario', 'Secundario', 'Terciario']
+
+TIPOS_HOSPITAL = ['Hospital General', 'Hospital Universitario', 'Clínica', 'Hospital Regional']
+
+MOTIVOS_CITA = [
+    'Chequeo general', 'Dolor de cabeza', 'Dolor torácico', 'Control de tensión',
+    'Fiebre persistente', 'Revisión de resultados', 'Dolor abdominal', 'Tos crónica',
+    'Control de glucosa', 'Dolor articular', 'Erupción cutánea', 'Mareos',
+    'Seguimiento de tratamiento', 'Renovación de receta', 'Fatiga', 'Insomnio'
+]
+
+TIPOS_CONSULTA = ['presencial', 'presencial', 'presencial', 'telemedicina', 'urgencia', 'seguimiento']
+
+ESTADOS_CITA_SIN_DIAGNOSTICO = ['programada', 'programada', 'cancelada', 'completada']
+
+DURACIONES_CITA = [15, 20, 30, 30, 30, 45, 60]
+
+GRAVEDADES = ['Leve', 'Moderada', 'Alta', 'Crítica']
+
+# (código ICD-10, nombre, descripción)
+DIAGNOSTICOS_ICD10 = [
+    ('E11', 'Diabetes mellitus tipo 2', 'Diabetes tipo 2 con control glucémico irregular'),
+    ('E10', 'Diabetes mellitus tipo 1', 'Diabetes tipo 1 insulinodependiente'),
+    ('I10', 'Hipertensión esencial', 'Hipertensión arterial primaria sin complicaciones'),
+    ('I25.1', 'Cardiopatía isquémica', 'Enfermedad aterosclerótica del corazón'),
+    ('I48', 'Fibrilación auricular', 'Arritmia con fibrilación y aleteo auricular'),
+    ('J45', 'Asma', 'Asma bronquial con episodios de disnea'),
+    ('J44', 'EPOC', 'Enfermedad pulmonar obstructiva crónica'),
+    ('J06.9', 'Infección respiratoria aguda', 'Infección aguda de las vías respiratorias superiores'),
+    ('J18.9', 'Neumonía', 'Neumonía no especificada'),
+    ('K21.0', 'Reflujo gastroesofágico', 'Enfermedad por reflujo gastroesofágico con esofagitis'),
+    ('K29.7', 'Gastritis', 'Gastritis no especificada'),
+    ('M54.5', 'Lumbalgia', 'Dolor lumbar bajo de origen mecánico'),
+    ('M17', 'Artrosis de rodilla', 'Gonartrosis primaria bilateral'),
+    ('F32', 'Episodio depresivo', 'Episodio depresivo moderado'),
+    ('F41.1', 'Ansiedad generalizada', 'Trastorno de ansiedad generalizada'),
+    ('G43', 'Migraña', 'Migraña sin aura con episodios recurrentes'),
+    ('E78.5', 'Hiperlipidemia', 'Hiperlipidemia no especificada'),
+    ('E03.9', 'Hipotiroidismo', 'Hipotiroidismo no especificado'),
+    ('E66', 'Obesidad', 'Obesidad debida a exceso de calorías'),
+    ('N39.0', 'Infección urinaria', 'Infección de vías urinarias de sitio no especificado'),
+    ('L20', 'Dermatitis atópica', 'Dermatitis atópica con brotes estacionales'),
+    ('H10', 'Conjuntivitis', 'Conjuntivitis aguda'),
+    ('N18', 'Enfermedad renal crónica', 'Enfermedad renal crónica estadio 3'),
+    ('D50', 'Anemia ferropénica', 'Anemia por deficiencia de hierro'),
+]
+
+# (nombre comercial, principio activo, dosis, vía, frecuencia, contraindicaciones)
+MEDICAMENTOS = [
+    ('Aspirina', 'Ácido acetilsalicílico', '500mg', 'Oral', 'Cada 8 horas', ['Úlcera péptica', 'Alergia a AINEs']),
+    ('Ibuprofeno Cinfa', 'Ibuprofeno', '600mg', 'Oral', 'Cada 8 horas', ['Úlcera péptica', 'Alergia a AINEs', 'Insuficiencia renal']),
+    ('Gelocatil', 'Paracetamol', '1g', 'Oral', 'Cada 8 horas', ['Insuficiencia hepática']),
+    ('Nolotil', 'Metamizol', '575mg', 'Oral', 'Cada 8 horas', ['Alergia a pirazolonas', 'Agranulocitosis']),
+    ('Amoxicilina Normon', 'Amoxicilina', '500mg', 'Oral', 'Cada 8 horas', ['Alergia a penicilina']),
+    ('Augmentine', 'Amoxicilina/Ácido clavulánico', '875/125mg', 'Oral', 'Cada 12 horas', ['Alergia a penicilina', 'Insuficiencia hepática']),
+    ('Zitromax', 'Azitromicina', '500mg', 'Oral', 'Cada 24 horas', ['Alergia a macrólidos']),
+    ('Ciprofloxacino Kern', 'Ciprofloxacino', '500mg', 'Oral', 'Cada 12 horas', ['Alergia a quinolonas', 'Embarazo']),
+    ('Omeprazol Cinfa', 'Omeprazol', '20mg', 'Oral', 'Cada 24 horas', []),
+    ('Dianben', 'Metformina', '850mg', 'Oral', 'Cada 12 horas', ['Insuficiencia renal', 'Acidosis metabólica']),
+    ('Lantus', 'Insulina glargina', '100UI/ml', 'Subcutánea', 'Cada 24 horas', ['Hipoglucemia']),
+    ('Enalapril Normon', 'Enalapril', '10mg', 'Oral', 'Cada 24 horas', ['Embarazo', 'Angioedema']),
+    ('Cozaar', 'Losartán', '50mg', 'Oral', 'Cada 24 horas', ['Embarazo']),
+    ('Norvas', 'Amlodipino', '5mg', 'Oral', 'Cada 24 horas', ['Hipotensión severa']),
+    ('Sintrom', 'Acenocumarol', '4mg', 'Oral', 'Cada 24 horas', ['Hemorragia activa', 'Embarazo']),
+    ('Zarator', 'Atorvastatina', '20mg', 'Oral', 'Cada 24 horas', ['Insuficiencia hepática', 'Embarazo']),
+    ('Eutirox', 'Levotiroxina', '100mcg', 'Oral', 'Cada 24 horas', ['Tirotoxicosis']),
+    ('Ventolin', 'Salbutamol', '100mcg', 'Inhalatoria', 'Cada 6 horas', []),
+    ('Pulmicort', 'Budesonida', '200mcg', 'Inhalatoria', 'Cada 12 horas', []),
+    ('Prednisona Alonga', 'Prednisona', '30mg', 'Oral', 'Cada 24 horas', ['Infección sistémica']),
+    ('Sertralina Normon', 'Sertralina', '50mg', 'Oral', 'Cada 24 horas', ['Tratamiento con IMAO']),
+    ('Orfidal', 'Lorazepam', '1mg', 'Oral', 'Cada 12 horas', ['Miastenia gravis', 'Insuficiencia respiratoria']),
+    ('Sumatriptán Normon', 'Sumatriptán', '50mg', 'Oral', 'Según necesidad', ['Cardiopatía isquémica']),
+    ('Adiro', 'Ácido acetilsalicílico', '100mg', 'Oral', 'Cada 24 horas', ['Úlcera péptica', 'Alergia a AINEs']),
+    ('Voltaren', 'Diclofenaco', '50mg', 'Oral', 'Cada 12 horas', ['Úlcera péptica', 'Alergia a AINEs']),
+    ('Polaramine', 'Dexclorfeniramina', '2mg', 'Oral', 'Cada 8 horas', []),
+    ('Ebastel', 'Ebastina', '10mg', 'Oral', 'Cada 24 horas', []),
+    ('Tardyferon', 'Sulfato ferroso', '80mg', 'Oral', 'Cada 24 horas', ['Hemocromatosis']),
+    ('Fortasec', 'Loperamida', '2mg', 'Oral', 'Según necesidad', ['Colitis ulcerosa']),
+    ('Bactroban', 'Mupirocina', '2%', 'Tópica', 'Cada 8 horas', []),
+]
+
+# (nombre, tipo, reacción)
+ALERGIAS = [
+    ('Penicilina', 'Medicamento', 'Urticaria y dificultad respiratoria'),
+    ('AINEs', 'Medicamento', 'Broncoespasmo'),
+    ('Macrólidos', 'Medicamento', 'Erupción cutánea'),
+    ('Quinolonas', 'Medicamento', 'Fotosensibilidad'),
+    ('Pirazolonas', 'Medicamento', 'Reacción anafiláctica'),
+    ('Sulfamidas', 'Medicamento', 'Síndrome de Stevens-Johnson'),
+    ('Cacahuete', 'Alimento', 'Anafilaxia'),
+    ('Marisco', 'Alimento', 'Angioedema'),
+    ('Lactosa', 'Alimento', 'Molestias digestivas'),
+    ('Huevo', 'Alimento', 'Urticaria'),
+    ('Gluten', 'Alimento', 'Diarrea y dolor abdominal'),
+    ('Polen', 'Ambiental', 'Rinitis y conjuntivitis'),
+    ('Ácaros', 'Ambiental', 'Asma alérgica'),
+    ('Látex', 'Contacto', 'Dermatitis de contacto'),
+    ('Níquel', 'Contacto', 'Eccema'),
+]
+
+CONDICIONES_CRONICAS = [
+    'Diabetes tipo 2', 'Hipertensión', 'Asma', 'EPOC', 'Hipotiroidismo',
+    'Artrosis', 'Hiperlipidemia', 'Insuficiencia renal crónica', 'Migraña crónica'
+]
+
+CIRUGIAS = ['Apendicectomía', 'Colecistectomía', 'Cesárea', 'Artroscopia de rodilla',
+            'Hernioplastia', 'Amigdalectomía', 'Cataratas']
+
+VACUNAS = ['Gripe', 'COVID-19', 'Tétanos', 'Hepatitis B', 'Neumococo', 'Sarampión', 'Varicela']
+
+ESTADOS_TRATAMIENTO = ['activo', 'activo', 'completado', 'completado', 'suspendido']
+
+ESTADOS_RECETA = ['activa', 'activa', 'vencida', 'completada']
+
+INSTRUCCIONES = [
+    'Tomar con alimentos', 'Tomar en ayunas', 'No conducir durante el tratamiento',
+    'Evitar el consumo de alcohol', 'Completar el tratamiento aunque mejoren los síntomas',
+    'Suspender si aparece erupción cutánea'
+]
+
+
+def _sin_acentos(texto: str) -> str:
+    normalizado = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in normalizado if not unicodedata.combining(c)).lower().replace(' ', '')
+
+
+# Versiones ASCII precalculadas para construir emails sin normalizar por fila
+_ASCII = {
+    texto: _sin_acentos(texto)
+    for texto in NOMBRES_MASCULINOS + NOMBRES_FEMENINOS + APELLIDOS
+}
+
+_INICIO_NACIMIENTOS = datetime(1930, 1, 1)
+_DIAS_NACIMIENTOS = (datetime(2020, 12, 31) - _INICIO_NACIMIENTOS).days
+_INICIO_CITAS = datetime(2023, 1, 1)
+_DIAS_CITAS = (datetime(2025, 12, 31) - _INICIO_CITAS).days
+
+
+# =============================================================================
+# ALEATORIEDAD DETERMINISTA
+# =============================================================================
+
+_MASCARA_64 = (1 << 64) - 1
+
+
+def _mezclar(x: int) -> int:
+    """Función de mezcla splitmix64."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASCARA_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASCARA_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASCARA_64
+    return x ^ (x >> 31)
+
+
+class _Aleatorio:
+    """Secuencia pseudoaleatoria ligera derivada de una semilla."""
+
+    __slots__ = ('_estado',)
+
+    def __init__(self, semilla: int):
+        self._estado = semilla
+
+    def entero(self, n: int) -> int:
+        self._estado = _mezclar(self._estado)
+        return self._estado % n
+
+    def elegir(self, lista: List[Any]) -> Any:
+        return lista[self.entero(len(lista))]
+
+    def muestra(self, lista: List[Any], maximo: int) -> List[Any]:
+        cantidad = self.entero(maximo + 1)
+        return list({self.elegir(lista): None for _ in range(cantidad)})
+
+    def probabilidad(self, p: float) -> bool:
+        return self.entero(1_000_000) < p * 1_000_000
+
+
+def _fecha(inicio: datetime, minutos: int) -> str:
+    return (inicio + timedelta(minutes=minutos)).isoformat() + 'Z'
+
+
+# =============================================================================
+# GENERADOR
+# =============================================================================
+
+class DataGenerator:
+    """
+    Generador determinista de entidades.
+
+    Cada método `<entidad>(i)` construye el registro i de ese tipo como un
+    diccionario con claves sin prefijo (`nombre`, `paciente_id`, ...); las
+    referencias a otras entidades usan sus IDs estables. `generar(tipo)`
+    recorre un rango de índices de forma perezosa.
+    """
+
+    def __init__(self, semilla: int = SEMILLA_POR_DEFECTO, volumen: Optional[Dict[str, int]] = None):
+        self.semilla = semilla
+        self.volumen = dict(volumen or VOLUMEN_BASE)
+        self._semillas_tipo = {
+            tipo: _mezclar(semilla * 1_000_003 + posicion)
+            for posicion, tipo in enumerate(TIPOS)
+        }
+        self._constructores = {
+            'hospitales': self.hospital,
+            'departamentos': self.departamento,
+            'doctores': self.doctor,
+            'pacientes': self.paciente,
+            'historiales': self.historial,
+            'alergias': self.alergia,
+            'medicamentos': self.medicamento,
+            'citas': self.cita,
+            'diagnosticos': self.diagnostico,
+            'tratamientos': self.tratamiento,
+            'recetas': self.receta,
+        }
+
+    def _rng(self, tipo: str, indice: int) -> _Aleatorio:
+        return _Aleatorio(_mezclar((self._semillas_tipo[tipo] + indice) & _MASCARA_64))
+
+    def generar(self, tipo: str, inicio: int = 0, fin: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Genera perezosamente los registros [inicio, fin) de un tipo."""
+        constructor = self._constructores[tipo]
+        fin = self.volumen[tipo] if fin is None else min(fin, self.volumen[tipo])
+        for indice in range(inicio, fin):
+            yield constructor(indice)
+
+    def generar_todo(self, tipos: Iterable[str] = TIPOS) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Genera (tipo, registro) para todos los tipos en orden de dependencias."""
+        for tipo in tipos:
+            for registro in self.generar(tipo):
+                yield tipo, registro
+
+    # -------------------------------------------------------------------------
+    # Relaciones deterministas entre índices
+    # -------------------------------------------------------------------------
+
+    def _departamento_de_doctor(self, indice: int) -> int:
+        return indice % self.volumen['departamentos']
+
+    def _hospital_de_departamento(self, indice: int) -> int:
+        return indice % self.volumen['hospitales']
+
+    def _especialidad_de_departamento(self, indice: int) -> str:
+        posicion = indice // self.volumen['hospitales']
+        return ESPECIALIDADES[posicion % len(ESPECIALIDADES)]
+
+    @staticmethod
+    def _hijo_a_padre(hijo: int, total_hijos: int, total_padres: int) -> int:
+        """Reparte `total_hijos` uniformemente entre `total_padres`."""
+        return (hijo * total_padres) // total_hijos
+
+    @staticmethod
+    def _hijos_de_padre(padre: int, total_hijos: int, total_padres: int) -> range:
+        """Inverso de _hijo_a_padre: rango de hijos que apuntan a `padre`."""
+        inicio = -(-padre * total_hijos // total_padres)
+        fin = -(-(padre + 1) * total_hijos // total_padres)
+        return range(inicio, min(fin, total_hijos))
+
+    def _diagnosticos_de_cita(self, indice: int) -> range:
+        # Hay menos diagnósticos que citas: cada diagnóstico cae en una cita
+        # distinta y la relación se puede calcular en ambos sentidos
+        total_citas = self.volumen['citas']
+        total_diag = self.volumen['diagnosticos']
+        inicio = -(-indice * total_diag // total_citas)
+        if inicio < total_diag and (inicio * total_citas) // total_diag == indice:
+            return range(inicio, inicio + 1)
+        return range(0)
+
+    # -------------------------------------------------------------------------
+    # Entidades
+    # -------------------------------------------------------------------------
+
+    def hospital(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('hospitales', indice)
+        ciudad, _ = CIUDADES[indice % len(CIUDADES)]
+        nivel = rng.elegir(NIVELES_ATENCION)
+        return {
+            'id': formatear_id('hospitales', indice),
+            'nombre': f"{rng.elegir(TIPOS_HOSPITAL)} de {ciudad} {indice // len(CIUDADES) + 1}",
+            'direccion': f"{rng.elegir(CALLES)} {rng.entero(300) + 1}",
+            'ciudad': ciudad,
+            'telefono': f"+34-9{rng.entero(10)}-{rng.entero(900) + 100}-{rng.entero(9000) + 1000}",
+            'nivel_atencion': nivel,
+            'capacidad_camas': 50 + rng.entero(950),
+            'tiene_urgencias': nivel != 'Primario' or rng.probabilidad(0.3),
+        }
+
+    def departamento(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('departamentos', indice)
+        especialidad = self._especialidad_de_departamento(indice)
+        return {
+            'id': formatear_id('departamentos', indice),
+            'nombre': f"Servicio de {especialidad}",
+            'especialidad': especialidad,
+            'extension': str(1000 + rng.entero(9000)),
+            'hospital_id': formatear_id('hospitales', self._hospital_de_departamento(indice)),
+        }
+
+    def doctor(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('doctores', indice)
+        departamento = self._departamento_de_doctor(indice)
+        nombres = NOMBRES_FEMENINOS if rng.entero(2) else NOMBRES_MASCULINOS
+        nombre = rng.elegir(nombres)
+        apellido = rng.elegir(APELLIDOS)
+        numero = indice + 1
+        return {
+            'id': formatear_id('doctores', indice),
+            'nombre': nombre,
+            'apellido': apellido,
+            'especialidad': self._especialidad_de_departamento(departamento),
+            'email': f"{_ASCII[nombre]}.{_ASCII[apellido]}.{numero}@hospital.com",
+            'telefono': f"+34-6{rng.entero(100):02d}-{rng.entero(1000):03d}-{rng.entero(1000):03d}",
+            'numero_licencia': f"LIC-{numero:07d}",
+            'años_experiencia': 1 + rng.entero(40),
+            'hospital_id': formatear_id('hospitales', self._hospital_de_departamento(departamento)),
+            'departamento_id': formatear_id('departamentos', departamento),
+        }
+
+    def paciente(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('pacientes', indice)
+        femenino = rng.entero(2) == 1
+        nombre = rng.elegir(NOMBRES_FEMENINOS if femenino else NOMBRES_MASCULINOS)
+        apellido = rng.elegir(APELLIDOS)
+        ciudad, provincia = rng.elegir(CIUDADES)
+        return {
+            'id': formatear_id('pacientes', indice),
+            'nombre': nombre,
+            'apellido': apellido,
+            'fecha_nacimiento': _fecha(_INICIO_NACIMIENTOS, rng.entero(_DIAS_NACIMIENTOS) * 1440),
+            'genero': GENEROS[1 if femenino else 0],
+            'tipo_sangre': rng.elegir(TIPOS_SANGRE),
+            'email': f"{_ASCII[nombre]}.{_ASCII[apellido]}.{indice + 1}@email.com",
+            'telefono': f"+34-6{rng.entero(100):02d}-{rng.entero(1000):03d}-{rng.entero(1000):03d}",
+            'direccion': f"{rng.elegir(CALLES)} {rng.entero(300) + 1}",
+            'ciudad': ciudad,
+            'codigo_postal': f"{provincia}{rng.entero(1000):03d}",
+        }
+
+    def historial(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('historiales', indice)
+        return {
+            'id': formatear_id('historiales', indice),
+            'fecha_creacion': _fecha(_INICIO_CITAS, rng.entero(_DIAS_CITAS) * 1440),
+            'condiciones_cronicas': rng.muestra(CONDICIONES_CRONICAS, 2) if rng.probabilidad(0.35) else [],
+            'cirugias_previas': rng.muestra(CIRUGIAS, 2) if rng.probabilidad(0.25) else [],
+            'hospitalizaciones': [f"Ingreso {2000 + rng.entero(25)}"] if rng.probabilidad(0.15) else [],
+            'vacunas': rng.muestra(VACUNAS, 4),
+            'paciente_id': formatear_id('pacientes', indice % self.volumen['pacientes']),
+        }
+
+    def alergia(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('alergias', indice)
+        nombre, tipo, reaccion = rng.elegir(ALERGIAS)
+        return {
+            'id': formatear_id('alergias', indice),
+            'nombre': nombre,
+            'tipo': tipo,
+            'gravedad': rng.elegir(GRAVEDADES),
+            'fecha_deteccion': _fecha(_INICIO_NACIMIENTOS, (_DIAS_NACIMIENTOS + rng.entero(_DIAS_CITAS)) * 1440),
+            'reaccion': reaccion,
+            'paciente_id': formatear_id('pacientes', rng.entero(self.volumen['pacientes'])),
+        }
+
+    def medicamento(self, indice: int) -> Dict[str, Any]:
+        nombre, principio, dosis, via, frecuencia, contraindicaciones = MEDICAMENTOS[indice % len(MEDICAMENTOS)]
+        variante = indice // len(MEDICAMENTOS)
+        return {
+            'id': formatear_id('medicamentos', indice),
+            'nombre_comercial': nombre if variante == 0 else f"{nombre} Genérico {variante}",
+            'principio_activo': principio,
+            'dosis': dosis,
+            'via_administracion': via,
+            'frecuencia': frecuencia,
+            'contraindicaciones': list(contraindicaciones),
+        }
+
+    def cita(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('citas', indice)
+        diagnosticos = self._diagnosticos_de_cita(indice)
+        # Horario de consulta: de 8:00 a 18:00 en franjas de 30 minutos
+        minutos = rng.entero(_DIAS_CITAS) * 1440 + 480 + rng.entero(20) * 30
+        return {
+            'id': formatear_id('citas', indice),
+            'fecha_hora': _fecha(_INICIO_CITAS, minutos),
+            'motivo': rng.elegir(MOTIVOS_CITA),
+            'estado': 'completada' if diagnosticos else rng.elegir(ESTADOS_CITA_SIN_DIAGNOSTICO),
+            'duracion_minutos': rng.elegir(DURACIONES_CITA),
+            'tipo_consulta': rng.elegir(TIPOS_CONSULTA),
+            'notas': '',
+            'paciente_id': formatear_id('pacientes', rng.entero(self.volumen['pacientes'])),
+            'doctor_id': formatear_id('doctores', rng.entero(self.volumen['doctores'])),
+            'diagnostico_ids': [formatear_id('diagnosticos', d) for d in diagnosticos],
+        }
+
+    def diagnostico(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('diagnosticos', indice)
+        cita_indice = self._hijo_a_padre(indice, self.volumen['diagnosticos'], self.volumen['citas'])
+        cita = self.cita(cita_indice)
+        codigo, nombre, descripcion = rng.elegir(DIAGNOSTICOS_ICD10)
+        paciente_indice = int(cita['paciente_id'][1:]) - 1
+        tratamientos = self._hijos_de_padre(indice, self.volumen['tratamientos'], self.volumen['diagnosticos'])
+        return {
+            'id': formatear_id('diagnosticos', indice),
+            'codigo_icd10': codigo,
+            'nombre': nombre,
+            'descripcion': descripcion,
+            'fecha_diagnostico': cita['fecha_hora'],
+            'gravedad': rng.elegir(GRAVEDADES),
+            'paciente_id': cita['paciente_id'],
+            'doctor_id': cita['doctor_id'],
+            'cita_id': cita['id'],
+            'historial_id': formatear_id('historiales', paciente_indice),
+            'tratamiento_ids': [formatear_id('tratamientos', t) for t in tratamientos],
+        }
+
+    def tratamiento(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('tratamientos', indice)
+        diagnostico_indice = self._hijo_a_padre(indice, self.volumen['tratamientos'], self.volumen['diagnosticos'])
+        diagnostico = self.diagnostico(diagnostico_indice)
+        estado = rng.elegir(ESTADOS_TRATAMIENTO)
+        dias = 7 + rng.entero(180)
+        inicio = datetime.fromisoformat(diagnostico['fecha_diagnostico'][:-1])
+        return {
+            'id': formatear_id('tratamientos', indice),
+            'nombre': f"Tratamiento de {diagnostico['nombre']}",
+            'descripcion': f"Tratamiento farmacológico para {diagnostico['descripcion'].lower()}",
+            'fecha_inicio': diagnostico['fecha_diagnostico'],
+            'fecha_fin': _fecha(inicio, dias * 1440),
+            'estado': estado,
+            'diagnostico_id': diagnostico['id'],
+            'medicamento_ids': [
+                formatear_id('medicamentos', rng.entero(self.volumen['medicamentos']))
+                for _ in range(1 + rng.entero(3))
+            ],
+        }
+
+    def receta(self, indice: int) -> Dict[str, Any]:
+        rng = self._rng('recetas', indice)
+        return {
+            'id': formatear_id('recetas', indice),
+            'fecha_emision': _fecha(_INICIO_CITAS, rng.entero(_DIAS_CITAS) * 1440),
+            'duracion_dias': rng.elegir([7, 10, 14, 30, 60, 90, 180]),
+            'instrucciones': rng.elegir(INSTRUCCIONES),
+            'estado': rng.elegir(ESTADOS_RECETA),
+            'paciente_id': formatear_id('pacientes', rng.entero(self.volumen['pacientes'])),
+            'doctor_id': formatear_id('doctores', rng.entero(self.volumen['doctores'])),
+            'medicamento_ids': [
+                formatear_id('medicamentos', rng.entero(self.volumen['medicamentos']))
+                for _ in range(1 + rng.entero(2))
+            ],
+        }
+
+
+# =============================================================================
+# GENERACIÓN EN PARALELO
+# =============================================================================
+
+def _generar_bloque(semilla: int, volumen: Dict[str, int], tipo: str, inicio: int, fin: int) -> List[Dict[str, Any]]:
+    return list(DataGenerator(semilla, volumen).generar(tipo, inicio, fin))
+
+
+def _exportar_bloque(semilla: int, volumen: Dict[str, int], tipo: str, inicio: int, fin: int, ruta: str) -> int:
+    filas = 0
+    with open(ruta, 'w', encoding='utf-8') as f:
+        for registro in DataGenerator(semilla, volumen).generar(tipo, inicio, fin):
+            f.write(json.dumps(registro, ensure_ascii=False))
+            f.write('\n')
+            filas += 1
+    return filas
+
+
+def _rangos(total: int, tam_bloque: int) -> Iterator[Tuple[int, int]]:
+    for inicio in range(0, total, tam_bloque):
+        yield inicio, min(inicio + tam_bloque, total)
+
+
+def generar_en_paralelo(tipo: str,
+                        semilla: int = SEMILLA_POR_DEFECTO,
+                        volumen: Optional[Dict[str, int]] = None,
+                        procesos: Optional[int] = None,
+                        tam_bloque: int = TAM_BLOQUE,
+                        medidor: Optional[MedidorThroughput] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Genera los registros de un tipo repartidos entre procesos.
+
+    Produce bloques (listas de hasta `tam_bloque` registros) en orden de
+    índice. Como máximo hay 2 bloques por proceso en vuelo, así que la
+    memoria usada no depende del total aunque el consumidor sea lento.
+
+    Args:
+        tipo: Tipo de entidad (clave de TIPOS)
+        semilla: Semilla global de la generación
+        volumen: Cantidad por tipo (por defecto VOLUMEN_BASE)
+        procesos: Número de procesos (por defecto, núcleos disponibles)
+        tam_bloque: Registros por bloque de trabajo
+        medidor: Medidor opcional donde se acumulan las filas generadas
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    procesos = procesos or os.cpu_count() or 1
+    rangos = _rangos(volumen[tipo], tam_bloque)
+
+    if procesos == 1:
+        generador = DataGenerator(semilla, volumen)
+        for inicio, fin in rangos:
+            bloque = list(generador.generar(tipo, inicio, fin))
+            if medidor is not None:
+                medidor.sumar(len(bloque))
+            yield bloque
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes = deque()
+        try:
+            for inicio, fin in rangos:
+                pendientes.append(pool.submit(_generar_bloque, semilla, volumen, tipo, inicio, fin))
+                if len(pendientes) < procesos * 2:
+                    continue
+                bloque = pendientes.popleft().result()
+                if medidor is not None:
+                    medidor.sumar(len(bloque))
+                yield bloque
+
+            while pendientes:
+                bloque = pendientes.popleft().result()
+                if medidor is not None:
+                    medidor.sumar(len(bloque))
+                yield bloque
+        finally:
+            # Si el consumidor se detiene antes de tiempo, no esperar bloques
+            # que ya no se van a leer
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+def exportar_jsonl(directorio: str,
+                   semilla: int = SEMILLA_POR_DEFECTO,
+                   volumen: Optional[Dict[str, int]] = None,
+                   procesos: Optional[int] = None,
+                   tipos: Iterable[str] = TIPOS,
+                   tam_bloque: int = TAM_BLOQUE) -> Dict[str, MedidorThroughput]:
+    """
+    Genera los datos en archivos JSONL, un archivo por bloque.
+
+    Cada proceso escribe directamente su bloque en
+    `<directorio>/<tipo>/<tipo>-NNNNN.jsonl`, sin pasar los registros por el
+    proceso principal. Los scripts de población pueden leer luego los
+    archivos en paralelo.
+
+    Returns:
+        Diccionario tipo -> MedidorThroughput con las filas escritas
+    """
+    volumen = dict(volumen or VOLUMEN_BASE)
+    procesos = procesos or os.cpu_count() or 1
+    medidores = {}
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for tipo in tipos:
+            carpeta = os.path.join(directorio, tipo)
+            os.makedirs(carpeta, exist_ok=True)
+            medidor = MedidorThroughput(tipo).iniciar()
+            futuros = [
+                pool.submit(_exportar_bloque, semilla, volumen, tipo, inicio, fin,
+                            os.path.join(carpeta, f"{tipo}-{numero:05d}.jsonl"))
+                for numero, (inicio, fin) in enumerate(_rangos(volumen[tipo], tam_bloque))
+            ]
+            for futuro in futuros:
+                medidor.sumar(futuro.result())
+            medidores[tipo] = medidor.detener()
+            print(f"✓ {medidor}")
+
+    return medidores
+
+
+def leer_jsonl(directorio: str, tipo: str) -> Iterator[Dict[str, Any]]:
+    """Lee en orden los registros de un tipo exportados con exportar_jsonl."""
+    carpeta = os.path.join(directorio, tipo)
+    for nombre in sorted(os.listdir(carpeta)):
+        if not nombre.endswith('.jsonl'):
+            continue
+        with open(os.path.join(carpeta, nombre), 'r', encoding='utf-8') as f:
+            for linea in f:
+                yield json.loads(linea)
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL
+# =============================================================================
+
+def main():
+    """Genera el conjunto de datos completo en archivos JSONL."""
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos de salud")
+    parser.add_argument('--citas', type=int, default=VOLUMEN_BASE['citas'],
+                        help="Número de citas (el resto de entidades se escala en proporción)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos de generación")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--salida', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'),
+                        help="Directorio de salida")
+    parser.add_argument('--tipos', nargs='*', default=list(TIPOS), choices=TIPOS)
+    args = parser.parse_args()
+
+    volumen = calcular_volumen(args.citas)
+
+    print("=" * 70)
+    print("GENERACIÓN DE DATOS SINTÉTICOS")
+    print("=" * 70)
+    for tipo in args.tipos:
+        print(f"  {tipo:<14} {volumen[tipo]:>12,}")
+    print()
+
+    total = MedidorThroughput('total').iniciar()
+    medidores = exportar_jsonl(args.salida, args.semilla, volumen, args.procesos, args.tipos)
+    for medidor in medidores.values():
+        total.sumar(medidor.filas)
+    total.detener()
+
+    print("=" * 70)
+    print(f"✓ {total}")
+    print(f"  Archivos en: {args.salida}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
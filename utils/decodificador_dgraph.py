@@ -0,0 +1,193 @@
+"""
+Decodificador de Respuestas de Dgraph
+Plataforma de Integración de Datos de Salud
+
+json.loads(respuesta.json) construye de una vez todo el árbol de
+diccionarios de la respuesta (Paciente → historial → diagnósticos →
+tratamientos → medicamentos). Para consultas como historial_completo eso
+domina la latencia y la memoria. Este módulo ofrece:
+
+- iterar_bloque(): recorre los elementos de un bloque de la respuesta uno a
+  uno, sin materializar la lista completa. Usa ijson si está instalado y,
+  si no, json.JSONDecoder.raw_decode elemento a elemento
+- proyectar(): convierte cada elemento en registros compactos con
+  __slots__ (sin __dict__ por objeto) cuyos atributos son los predicados
+  sin prefijo: registro.nombre en lugar de d['paciente.nombre']
+
+El benchmark (benchmark.py, sección 'decodificacion') compara ambos con
+json.loads.
+"""
+
+import json
+import re
+from typing import Dict, Any, Iterator, List, Tuple, Union
+
+_ESPACIOS = re.compile(r'\s*')
+_decodificador = json.JSONDecoder()
+
+
+# =============================================================================
+# ITERACIÓN INCREMENTAL
+# =============================================================================
+
+def _saltar(texto: str, posicion: int) -> int:
+    return _ESPACIOS.match(texto, posicion).end()
+
+
+def _esperar(texto: str, posicion: int, caracter: str) -> int:
+    posicion = _saltar(texto, posicion)
+    if texto[posicion:posicion + 1] != caracter:
+        raise ValueError(f"Respuesta de Dgraph mal formada: se esperaba '{caracter}' en {posicion}")
+    return posicion + 1
+
+
+def _iterar_raw(texto: str, bloque: str) -> Iterator[Any]:
+    posicion = _esperar(texto, 0, '{')
+    while True:
+        posicion = _saltar(texto, posicion)
+        if texto[posicion:posicion + 1] == '}':
+            return
+        clave, posicion = _decodificador.raw_decode(texto, posicion)
+        posicion = _esperar(texto, posicion, ':')
+        posicion = _saltar(texto, posicion)
+
+        if clave != bloque:
+            # Otros bloques (normalmente pequeños) se decodifican y descartan
+            _, posicion = _decodificador.raw_decode(texto, posicion)
+        elif texto[posicion] != '[':
+            # Bloques de un solo objeto (p. ej. con @normalize o agregados)
+            valor, posicion = _decodificador.raw_decode(texto, posicion)
+            yield valor
+            return
+        else:
+            posicion = _saltar(texto, posicion + 1)
+            if texto[posicion] == ']':
+                return
+            while True:
+                elemento, posicion = _decodificador.raw_decode(texto, _saltar(texto, posicion))
+                yield elemento
+                posicion = _saltar(texto, posicion)
+                if texto[posicion] == ']':
+                    return
+                posicion = _esperar(texto, posicion, ',')
+
+        posicion = _saltar(texto, posicion)
+        if texto[posicion:posicion + 1] == ',':
+            posicion += 1
+
+
+def iterar_bloque(datos: Union[bytes, str], bloque: str, usar_ijson: bool = True) -> Iterator[Any]:
+    """
+    Recorre los elementos de `bloque` en una respuesta JSON de Dgraph.
+
+    Args:
+        datos: respuesta.json tal como la devuelve pydgraph
+        bloque: Nombre del bloque de la consulta (p. ej. 'pacientes')
+        usar_ijson: Usar ijson si está instalado
+
+    Yields:
+        Cada elemento del bloque como dict (el bloque ausente no produce nada)
+    """
+    if usar_ijson:
+        try:
+            import ijson
+        except ImportError:
+            pass
+        else:
+            if isinstance(datos, str):
+                datos = datos.encode('utf-8')
+            yield from ijson.items(datos, f"{bloque}.item", use_float=True)
+            return
+
+    if isinstance(datos, (bytes, bytearray)):
+        datos = datos.decode('utf-8')
+    yield from _iterar_raw(datos, bloque)
+
+
+# =============================================================================
+# REGISTROS COMPACTOS
+# =============================================================================
+
+class RegistroCompacto:
+    """
+    Base de los registros con __slots__ producidos por proyectar().
+
+    Cada combinación de campos recibe su propia subclase (creada una vez y
+    reutilizada), de modo que los objetos no llevan __dict__.
+    """
+
+    __slots__ = ()
+    _claves: Tuple[str, ...] = ()
+    _asignadores: Tuple[Any, ...] = ()
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Vuelve al formato original de Dgraph (claves con prefijo)."""
+        def convertir(valor):
+            if isinstance(valor, RegistroCompacto):
+                return valor.a_dict()
+            if isinstance(valor, list):
+                return [convertir(v) for v in valor]
+            return valor
+        return {clave: convertir(getattr(self, atributo))
+                for clave, atributo in zip(self._claves, self.__slots__)}
+
+    def __eq__(self, otro: Any) -> bool:
+        return (type(self) is type(otro)
+                and all(getattr(self, a) == getattr(otro, a) for a in self.__slots__))
+
+    def __repr__(self) -> str:
+        campos = ', '.join(f"{a}={getattr(self, a)!r}" for a in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+
+_clases: Dict[Tuple[str, ...], type] = {}
+
+
+def _atributo(clave: str) -> str:
+    nombre = clave.rsplit('.', 1)[-1]
+    nombre = re.sub(r'\W', '_', nombre)
+    return nombre if not nombre[:1].isdigit() else '_' + nombre
+
+
+def clase_para(claves: Tuple[str, ...]) -> type:
+    """Subclase de RegistroCompacto para un conjunto de claves de Dgraph."""
+    clase = _clases.get(claves)
+    if clase is None:
+        atributos = [_atributo(c) for c in claves]
+        if len(set(atributos)) != len(atributos):
+            # Dos predicados con el mismo sufijo: se conserva el prefijo
+            atributos = [re.sub(r'\W', '_', c) for c in claves]
+        prefijos = {c.split('.', 1)[0] for c in claves if '.' in c}
+        nombre = prefijos.pop().capitalize() if len(prefijos) == 1 else 'Registro'
+        clase = type(nombre, (RegistroCompacto,), {'__slots__': tuple(atributos), '_claves': claves})
+        # Descriptores de los slots, para asignar sin resolver el nombre cada vez
+        clase._asignadores = tuple(getattr(clase, a).__set__ for a in atributos)
+        _clases[claves] = clase
+    return clase
+
+
+def proyectar(valor: Any) -> Any:
+    """Convierte recursivamente dicts de Dgraph en registros compactos."""
+    if isinstance(valor, dict):
+        claves = tuple(valor)
+        clase = clase_para(claves)
+        registro = clase.__new__(clase)
+        for asignar, elemento in zip(clase._asignadores, valor.values()):
+            if isinstance(elemento, (dict, list)):
+                elemento = proyectar(elemento)
+            asignar(registro, elemento)
+        return registro
+    if isinstance(valor, list):
+        return [proyectar(v) for v in valor]
+    return valor
+
+
+def decodificar(datos: Union[bytes, str], bloque: str, compacto: bool = True) -> Iterator[Any]:
+    """iterar_bloque() con proyección opcional a registros compactos."""
+    for elemento in iterar_bloque(datos, bloque):
+        yield proyectar(elemento) if compacto else elemento
+
+
+def decodificar_todo(datos: Union[bytes, str], bloque: str, compacto: bool = True) -> List[Any]:
+    """Lista completa de un bloque (para resultados que caben en memoria)."""
+    return list(decodificar(datos, bloque, compacto))
@@ -0,0 +1,130 @@
+"""
+Métricas de Rendimiento
+Plataforma de Integración de Datos de Salud
+
+Utilidades compartidas por el generador de datos y los scripts de población
+para medir cuántas filas por segundo se procesan, y por el benchmark para
+medir latencias y memoria.
+"""
+
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+
+class MedidorThroughput:
+    """
+    Cuenta filas procesadas y calcula filas/segundo.
+
+    Es seguro entre hilos, de modo que varios cargadores concurrentes pueden
+    sumar sobre el mismo medidor.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.filas = 0
+        self.errores = 0
+        self._inicio: Optional[float] = None
+        self._fin: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def iniciar(self) -> 'MedidorThroughput':
+        self._inicio = time.perf_counter()
+        self._fin = None
+        return self
+
+    def sumar(self, filas: int, errores: int = 0):
+        with self._lock:
+            if self._inicio is None:
+                self._inicio = time.perf_counter()
+            self.filas += filas
+            self.errores += errores
+
+    def detener(self) -> 'MedidorThroughput':
+        self._fin = time.perf_counter()
+        return self
+
+    @property
+    def segundos(self) -> float:
+        if self._inicio is None:
+            return 0.0
+        fin = self._fin if self._fin is not None else time.perf_counter()
+        return fin - self._inicio
+
+    @property
+    def filas_por_segundo(self) -> float:
+        segundos = self.segundos
+        return self.filas / segundos if segundos > 0 else 0.0
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'nombre': self.nombre,
+            'filas': self.filas,
+            'errores': self.errores,
+            'segundos': round(self.segundos, 3),
+            'filas_por_segundo': round(self.filas_por_segundo, 1)
+        }
+
+    def __str__(self) -> str:
+        texto = (f"{self.nombre}: {self.filas:,} filas en {self.segundos:.2f} s "
+                 f"({self.filas_por_segundo:,.0f} filas/s)")
+        if self.errores:
+            texto += f", {self.errores:,} errores"
+        return texto
+
+
+def percentil(ordenadas: List[float], p: float) -> Optional[float]:
+    """Percentil `p` (0-1) de una lista ya ordenada, por rango más cercano."""
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+class MedidorLatencia:
+    """Acumula latencias de una operación y calcula p50/p95/p99."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.muestras: List[float] = []
+        self.errores = 0
+
+    def medir(self, funcion: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta `funcion` y registra cuánto tardó."""
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        except Exception:
+            self.errores += 1
+            raise
+        finally:
+            self.muestras.append(time.perf_counter() - inicio)
+
+    def resumen(self) -> Dict[str, Any]:
+        ordenadas = sorted(self.muestras)
+        total = sum(ordenadas)
+
+        def ms(p):
+            valor = percentil(ordenadas, p)
+            return round(valor * 1000, 4) if valor is not None else None
+
+        return {
+            'nombre': self.nombre,
+            'ejecuciones': len(ordenadas),
+            'errores': self.errores,
+            'p50_ms': ms(0.50),
+            'p95_ms': ms(0.95),
+            'p99_ms': ms(0.99),
+            'operaciones_por_segundo': round(len(ordenadas) / total, 1) if total > 0 else 0.0,
+        }
+
+
+def memoria_maxima_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso en MB (None si no se puede medir)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return round(maximo / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
@@ -10,6 +10,8 @@ import pydgraph
 import json
 import os
 
+from modelos import Doctor, Paciente
+
 def verificar_conexion():
     """Verifica la conexión a Dgraph"""
     print("📡 Verificando conexión a Dgraph...")
@@ -209,8 +211,8 @@ def consultar_datos_prueba(client):
             
             if pacientes.get('pacientes'):
                 print(f"✓ Pacientes encontrados: {len(pacientes['pacientes'])}")
-                for p in pacientes['pacientes']:
-                    print(f"  - {p.get('paciente.nombre')} {p.get('paciente.apellido')} ({p.get('paciente.email')})")
+                for p in map(Paciente.desde_nodo, pacientes['pacientes']):
+                    print(f"  - {p.nombre} {p.apellido} ({p.email})")
             else:
                 print("  No se encontraron pacientes")
                 
@@ -225,8 +227,8 @@ def consultar_datos_prueba(client):
             
             if doctores.get('doctores'):
                 print(f"✓ Doctores encontrados: {len(doctores['doctores'])}")
-                for d in doctores['doctores']:
-                    print(f"  - Dr. {d.get('doctor.nombre')} {d.get('doctor.apellido')} - {d.get('doctor.especialidad')}")
+                for d in map(Doctor.desde_nodo, doctores['doctores']):
+                    print(f"  - Dr. {d.nombre} {d.apellido} - {d.especialidad}")
             else:
                 print("  No se encontraron doctores")
                 